@@ -9,7 +9,6 @@ ERA5 850hPa解析
 - 利尻山周辺の気流パターン
 """
 
-import xarray as xr
 import numpy as np
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
@@ -18,6 +17,8 @@ from datetime import datetime
 import json
 import math
 
+import era5_toolkit
+
 # 利尻山・沓形の座標
 RISHIRI_SAN_LAT = 45.1821
 RISHIRI_SAN_LON = 141.2421
@@ -43,23 +44,16 @@ def analyze_850hpa():
     print("ERA5 850hPa ANALYSIS - TERRAIN EFFECTS")
     print("="*70)
 
-    # データ読み込み
+    # データ読み込み（初回のみ NetCDF から抽出し era5_cache/ に保存）
+    print("\nExtracting 850hPa data...")
     try:
-        ds = xr.open_dataset('era5_rishiri_august2024.nc')
+        fields = era5_toolkit.load_fields('era5_rishiri_august2024.nc', {'u': [850], 'v': [850], 't': [850]})
     except FileNotFoundError:
         print("\nError: era5_rishiri_august2024.nc not found")
         return
 
-    # 850hPa抽出
-    print("\nExtracting 850hPa data...")
-    ds_850 = ds.sel(pressure_level=850)
-
-    u_850 = ds_850['u']
-    v_850 = ds_850['v']
-    t_850 = ds_850['t']  # 温度
-
-    lat = ds_850.latitude.values
-    lon = ds_850.longitude.values
+    lat = fields.lat
+    lon = fields.lon
 
     # 沓形地点データ
     mountain_azimuth = calculate_mountain_azimuth(KUTSUGATA_LAT, KUTSUGATA_LON)
@@ -67,50 +61,19 @@ def analyze_850hpa():
     print(f"Mountain azimuth: {mountain_azimuth:.1f}deg")
 
     # 最近傍グリッド
-    lat_idx = np.abs(lat - KUTSUGATA_LAT).argmin()
-    lon_idx = np.abs(lon - KUTSUGATA_LON).argmin()
-
-    print(f"Nearest grid: lat={lat[lat_idx]:.2f}, lon={lon[lon_idx]:.2f}")
-
-    # 時系列データ収集
-    all_cos = []
-    all_wind_speed = []
-    all_temperature = []
-    all_u = []
-    all_v = []
-
-    n_times = len(ds_850.valid_time)
-    print(f"\nProcessing {n_times} timesteps...")
-
-    for t in range(n_times):
-        # 850hPa風速成分
-        u_t = u_850.isel(valid_time=t, latitude=lat_idx, longitude=lon_idx).values
-        v_t = v_850.isel(valid_time=t, latitude=lat_idx, longitude=lon_idx).values
-        temp_t = t_850.isel(valid_time=t, latitude=lat_idx, longitude=lon_idx).values
-
-        # 風向計算（気象風向）
-        wind_dir = (np.degrees(np.arctan2(-u_t, -v_t)) + 360) % 360
-        wind_speed = np.sqrt(u_t**2 + v_t**2)
-
-        # 風向-山角度差
-        wind_toward = (wind_dir + 180) % 360
-        angle_diff = abs(wind_toward - mountain_azimuth)
-        if angle_diff > 180:
-            angle_diff = 360 - angle_diff
-        cos_angle = math.cos(math.radians(angle_diff))
-
-        all_cos.append(cos_angle)
-        all_wind_speed.append(wind_speed)
-        all_temperature.append(temp_t - 273.15)  # K→℃
-        all_u.append(u_t)
-        all_v.append(v_t)
-
-    # 配列化
-    cos_vals = np.array(all_cos)
-    ws_vals = np.array(all_wind_speed)
-    temp_vals = np.array(all_temperature)
-    u_vals = np.array(all_u)
-    v_vals = np.array(all_v)
+    lat_idx, lon_idx = era5_toolkit.nearest_indices(lat, lon, [(KUTSUGATA_LAT, KUTSUGATA_LON)])
+
+    print(f"Nearest grid: lat={lat[lat_idx[0]]:.2f}, lon={lon[lon_idx[0]]:.2f}")
+    print(f"\nProcessing {len(fields.times)} timesteps...")
+
+    # 時系列データ（全時刻一括）
+    u_vals = era5_toolkit.extract_points(fields['u_850'], lat_idx, lon_idx)[:, 0].astype(float)
+    v_vals = era5_toolkit.extract_points(fields['v_850'], lat_idx, lon_idx)[:, 0].astype(float)
+    temp_vals = era5_toolkit.extract_points(fields['t_850'], lat_idx, lon_idx)[:, 0] - 273.15  # K→℃
+
+    wind_dir = era5_toolkit.wind_direction(u_vals, v_vals)  # 気象風向
+    ws_vals = era5_toolkit.wind_speed(u_vals, v_vals)
+    cos_vals = era5_toolkit.cos_mountain_angle(wind_dir, mountain_azimuth)
 
     # 相関計算
     corr_cos_ws = np.corrcoef(cos_vals, ws_vals)[0, 1]
@@ -8,7 +8,6 @@ ERA5データ等値線解析
 風向-山角度差との相関を再計算
 """
 
-import xarray as xr
 import numpy as np
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
@@ -17,6 +16,8 @@ from datetime import datetime
 import json
 import math
 
+import era5_toolkit
+
 # 利尻山・沓形の座標
 RISHIRI_SAN_LAT = 45.1821
 RISHIRI_SAN_LON = 141.2421
@@ -25,6 +26,8 @@ KUTSUGATA_LON = 141.1088
 WAKKANAI_LAT = 45.41
 WAKKANAI_LON = 141.68
 
+ERA5_FILE = 'era5_rishiri_august2024.nc'
+
 def calculate_mountain_azimuth(lat, lon):
     """山頂方位角を計算"""
     delta_lat = RISHIRI_SAN_LAT - lat
@@ -37,15 +40,6 @@ def calculate_mountain_azimuth(lat, lon):
         mountain_azimuth -= 360
     return mountain_azimuth
 
-def load_era5_data(filepath):
-    """ERA5 NetCDFデータを読み込み"""
-    print(f"Loading ERA5 data from {filepath}...")
-    ds = xr.open_dataset(filepath)
-    print(f"Dataset loaded successfully")
-    print(f"\nDimensions: {dict(ds.dims)}")
-    print(f"Variables: {list(ds.data_vars)}")
-    return ds
-
 def calculate_vorticity_spatial(u, v, lat, lon):
     """
     空間微分から相対渦度を計算
@@ -53,70 +47,12 @@ def calculate_vorticity_spatial(u, v, lat, lon):
     ζ = ∂v/∂x - ∂u/∂y
 
     Args:
-        u, v: 風速成分（m/s）
-        lat, lon: 緯度・経度グリッド
+        u, v: 風速成分（m/s）。(..., lat, lon) なら全時刻を一括計算
+        lat, lon: 緯度・経度グリッド（1次元）
     Returns:
         vorticity: 相対渦度（10^-5 s^-1）
     """
-    # 地球半径
-    R = 6371000  # m
-
-    # 緯度・経度をラジアンに変換
-    lat_rad = np.deg2rad(lat)
-    lon_rad = np.deg2rad(lon)
-
-    # dx, dy を計算（メートル）
-    # dy = R * dφ （φ: latitude in radians）
-    # dx = R * cos(φ) * dλ （λ: longitude in radians）
-
-    # 中心差分で微分
-    dv_dlon = np.gradient(v, axis=-1)  # ∂v/∂λ
-    du_dlat = np.gradient(u, axis=-2)  # ∂u/∂φ
-
-    # グリッド間隔
-    dlon = np.gradient(lon_rad)
-    dlat = np.gradient(lat_rad)
-
-    # メッシュグリッド作成
-    if len(lat.shape) == 1:
-        lon_grid, lat_grid = np.meshgrid(lon, lat)
-        lat_rad_grid = np.deg2rad(lat_grid)
-    else:
-        lat_rad_grid = lat_rad
-
-    # dx, dy
-    dx = R * np.cos(lat_rad_grid) * dlon[None, :]
-    dy = R * dlat[:, None]
-
-    # 相対渦度計算
-    dv_dx = dv_dlon / dx
-    du_dy = du_dlat / dy
-
-    vorticity = dv_dx - du_dy
-
-    # 10^-5 s^-1 単位に変換
-    vorticity_scaled = vorticity * 1e5
-
-    return vorticity_scaled
-
-def extract_point_data(ds, lat_target, lon_target, pressure_level):
-    """
-    指定地点・気圧面のデータを抽出
-
-    Args:
-        ds: xarray Dataset
-        lat_target, lon_target: 目標地点の座標
-        pressure_level: 気圧面（hPa）
-    """
-    # 最近傍点を探す
-    lat_idx = np.abs(ds.latitude.values - lat_target).argmin()
-    lon_idx = np.abs(ds.longitude.values - lon_target).argmin()
-    lev_idx = np.abs(ds.level.values - pressure_level).argmin()
-
-    # データ抽出
-    subset = ds.isel(latitude=lat_idx, longitude=lon_idx, level=lev_idx)
-
-    return subset
+    return era5_toolkit.vorticity(u, v, lat, lon)
 
 def analyze_contours_and_correlation():
     """等値線解析と相関計算"""
@@ -125,47 +61,30 @@ def analyze_contours_and_correlation():
     print("ERA5 CONTOUR ANALYSIS AND CORRELATION")
     print("="*70)
 
-    # ERA5データ読み込み
+    # ERA5データ読み込み（初回のみ NetCDF から抽出し era5_cache/ に保存）
+    # 'z' が無いファイルは 'geopotential' を読む（era5_toolkit.VARIABLE_ALIASES）
+    print(f"Loading ERA5 data from {ERA5_FILE}...")
     try:
-        ds = load_era5_data('era5_rishiri_august2024.nc')
+        fields = era5_toolkit.load_fields(ERA5_FILE, {'z': [500], 'u': [500], 'v': [500], 'w': [700]})
     except FileNotFoundError:
-        print("\nError: era5_rishiri_august2024.nc not found")
+        print(f"\nError: {ERA5_FILE} not found")
         print("Please run fetch_era5_data.py first")
         return
-
-    # 500hPa データ抽出
-    print("\nExtracting 500hPa data...")
-    ds_500 = ds.sel(pressure_level=500)
-
-    # 変数名確認（ERA5では 'z' が geopotential）
-    if 'z' in ds_500:
-        z_500 = ds_500['z'] / 9.80665  # geopotential → geopotential height (m)
-    elif 'geopotential' in ds_500:
-        z_500 = ds_500['geopotential'] / 9.80665
-    else:
-        print(f"Error: Geopotential variable not found. Available: {list(ds_500.data_vars)}")
+    except KeyError as e:
+        print(f"Error: variable/level not found in {ERA5_FILE}: {e}")
         return
 
-    u_500 = ds_500['u']
-    v_500 = ds_500['v']
-
+    lat = fields.lat
+    lon = fields.lon
+    z_500 = fields['z_500'] / 9.80665  # geopotential → geopotential height (m)
+    u_500 = fields['u_500']
+    v_500 = fields['v_500']
+    omega_700 = fields['w_700']  # vertical velocity (Pa/s)
     print(f"500hPa geopotential height shape: {z_500.shape}")
 
-    # 700hPa omega（鉛直p速度）
-    print("\nExtracting 700hPa omega...")
-    ds_700 = ds.sel(pressure_level=700)
-    omega_700 = ds_700['w']  # vertical velocity (Pa/s)
-
-    # 時間平均でテスト（1日分）
-    print("\nCalculating spatial vorticity for sample timestep...")
-    time_idx = 0
-    u_sample = u_500.isel(valid_time=time_idx).values
-    v_sample = v_500.isel(valid_time=time_idx).values
-    lat = ds_500.latitude.values
-    lon = ds_500.longitude.values
-
-    # 渦度計算（空間微分）
-    vorticity_spatial = calculate_vorticity_spatial(u_sample, v_sample, lat, lon)
+    # 渦度計算（空間微分、全時刻一括）
+    vorticity_all = calculate_vorticity_spatial(u_500, v_500, lat, lon)
+    vorticity_spatial = vorticity_all[0]
 
     print(f"Vorticity calculated: shape={vorticity_spatial.shape}")
     print(f"  Mean: {np.nanmean(vorticity_spatial):.3f} x10^-5 s^-1")
@@ -178,59 +97,26 @@ def analyze_contours_and_correlation():
     print(f"Mountain azimuth: {mountain_azimuth:.1f}deg")
 
     # 最近傍グリッド点
-    lat_idx = np.abs(lat - KUTSUGATA_LAT).argmin()
-    lon_idx = np.abs(lon - KUTSUGATA_LON).argmin()
+    lat_idx, lon_idx = era5_toolkit.nearest_indices(lat, lon, [(KUTSUGATA_LAT, KUTSUGATA_LON)])
+    lat_idx, lon_idx = int(lat_idx[0]), int(lon_idx[0])
 
     print(f"Nearest grid point: lat={lat[lat_idx]:.2f}, lon={lon[lon_idx]:.2f}")
+    print(f"\nProcessing {len(fields.times)} timesteps...")
 
-    # 全時刻のデータ収集
-    all_cos = []
-    all_vorticity_spatial = []
-    all_omega = []
-    all_dates = []
+    # 500hPa風向 → 風向-山角度差のコサイン
+    wind_dir_500 = era5_toolkit.wind_direction(u_500[:, lat_idx, lon_idx], v_500[:, lat_idx, lon_idx])
+    cos_all = era5_toolkit.cos_mountain_angle(wind_dir_500, mountain_azimuth)
+    vort_point = vorticity_all[:, lat_idx, lon_idx]
+    omega_point = np.asarray(omega_700[:, lat_idx, lon_idx])
 
-    n_times = len(ds_500.valid_time)
-    print(f"\nProcessing {n_times} timesteps...")
+    valid = ~np.isnan(vort_point) & ~np.isnan(omega_point)
+    cos_vals = cos_all[valid]
+    vort_vals = vort_point[valid]
+    omega_vals = omega_point[valid]
 
-    for t in range(n_times):
-        if t % 10 == 0:
-            print(f"  Progress: {t}/{n_times}")
-
-        # 500hPa風向
-        u_t = u_500.isel(valid_time=t, latitude=lat_idx, longitude=lon_idx).values
-        v_t = v_500.isel(valid_time=t, latitude=lat_idx, longitude=lon_idx).values
-
-        wind_dir_500 = (np.degrees(np.arctan2(-u_t, -v_t)) + 360) % 360
-
-        # 風向-山角度差のコサイン
-        wind_toward = (wind_dir_500 + 180) % 360
-        angle_diff = abs(wind_toward - mountain_azimuth)
-        if angle_diff > 180:
-            angle_diff = 360 - angle_diff
-        cos_angle = math.cos(math.radians(angle_diff))
-
-        # 空間微分による渦度（この時刻）
-        u_grid = u_500.isel(valid_time=t).values
-        v_grid = v_500.isel(valid_time=t).values
-        vort_grid = calculate_vorticity_spatial(u_grid, v_grid, lat, lon)
-        vort_point = vort_grid[lat_idx, lon_idx]
-
-        # 700hPa omega
-        omega_point = omega_700.isel(valid_time=t, latitude=lat_idx, longitude=lon_idx).values
-
-        if not np.isnan(vort_point) and not np.isnan(omega_point):
-            all_cos.append(cos_angle)
-            all_vorticity_spatial.append(vort_point)
-            all_omega.append(omega_point)
-            all_dates.append(str(ds_500.valid_time.isel(valid_time=t).values))
-
-    print(f"\nValid samples: {len(all_cos)}")
+    print(f"\nValid samples: {len(cos_vals)}")
 
     # 相関計算
-    cos_vals = np.array(all_cos)
-    vort_vals = np.array(all_vorticity_spatial)
-    omega_vals = np.array(all_omega)
-
     corr_cos_vort = np.corrcoef(cos_vals, vort_vals)[0, 1] if len(cos_vals) > 1 else 0
     corr_cos_omega = np.corrcoef(cos_vals, omega_vals)[0, 1] if len(cos_vals) > 1 else 0
     corr_vort_omega = np.corrcoef(vort_vals, omega_vals)[0, 1] if len(cos_vals) > 1 else 0
@@ -313,7 +199,7 @@ def analyze_contours_and_correlation():
 
     print(f"\nResults saved to: era5_contour_correlation_results.json")
 
-    return ds, vorticity_spatial
+    return fields, vorticity_spatial
 
 if __name__ == '__main__':
     analyze_contours_and_correlation()
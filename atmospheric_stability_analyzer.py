@@ -95,7 +95,16 @@ class AtmosphericStabilityAnalyzer:
         
         logger.info(f"Stability indices calculated for {profile.timestamp}")
         return indices
-    
+
+    def calculate_stability_indices_batch(self, pressure_levels: np.ndarray, temperature: np.ndarray,
+                                          dewpoint: np.ndarray, geopotential_height: np.ndarray,
+                                          wind_speed: Optional[np.ndarray] = None,
+                                          parcel: str = "dry") -> Dict[str, np.ndarray]:
+        """(時刻, 気圧面) などのプロファイル群を一括計算（stability_batch.stability_indices）"""
+        from stability_batch import stability_indices
+        return stability_indices(pressure_levels, temperature, dewpoint, geopotential_height,
+                                 wind_speed=wind_speed, parcel=parcel)
+
     def _calculate_ssi(self, profile: AtmosphericProfile) -> float:
         """ショワルター安定指数計算"""
         try:
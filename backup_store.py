@@ -0,0 +1,220 @@
+"""Content-addressed chunk store for BackupSystem.
+
+BackupSystem.create_backup() used to shutil.copy2() every target file into a
+fresh timestamped directory and zip the tree, so each run rewrote the whole
+dataset even when only a few records had been appended. Backups now go into
+one store under ``backups/store``:
+
+    chunks/ab/abcdef…   file contents split into fixed-size chunks
+                        (CHUNK_SIZE, a multiple of the SQLite page size so
+                        a changed page only dirties its own chunk), named by
+                        BLAKE2b digest; written once, zlib-compressed when
+                        that makes them smaller
+    manifests/<name>.json
+                        one small manifest per backup: per file its size,
+                        mtime, whole-file digest and chunk digest list
+
+    BackupStore.backup_file()   hash + store only chunks that are new; a file
+                                whose size and mtime match the previous
+                                manifest is not even read
+    BackupStore.restore_file()  reassemble from chunks, verify the digest,
+                                replace the target atomically
+    BackupStore.collect_garbage()
+                                keep the newest N manifests, then delete
+                                every chunk none of them references
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import zlib
+from typing import Iterable, Optional
+
+CHUNK_SIZE = 64 * 1024
+DIGEST_SIZE = 20
+MANIFEST_VERSION = 1
+_RAW, _ZLIB = b"\x00", b"\x01"
+
+
+def digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class BackupStore:
+    """チャンク（内容のハッシュ名）とマニフェストを置くディレクトリ。"""
+
+    def __init__(self, root: str, chunk_size: int = CHUNK_SIZE, compress: bool = True):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.manifest_dir = os.path.join(root, "manifests")
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    # -- chunks -------------------------------------------------------------
+    def _chunk_path(self, chunk_id: str) -> str:
+        return os.path.join(self.chunk_dir, chunk_id[:2], chunk_id)
+
+    def has_chunk(self, chunk_id: str) -> bool:
+        return os.path.exists(self._chunk_path(chunk_id))
+
+    def put_chunk(self, data: bytes) -> tuple[str, int]:
+        """チャンクを保存。(digest, 書き込んだバイト数 — 既存なら 0)"""
+        chunk_id = digest(data)
+        path = self._chunk_path(chunk_id)
+        if os.path.exists(path):
+            return chunk_id, 0
+        payload = _RAW + data
+        if self.compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                payload = _ZLIB + packed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, payload)
+        return chunk_id, len(payload)
+
+    def get_chunk(self, chunk_id: str) -> bytes:
+        with open(self._chunk_path(chunk_id), "rb") as f:
+            payload = f.read()
+        data = zlib.decompress(payload[1:]) if payload[:1] == _ZLIB else payload[1:]
+        if digest(data) != chunk_id:
+            raise ValueError(f"chunk {chunk_id} is corrupted")
+        return data
+
+    # -- files --------------------------------------------------------------
+    def backup_file(self, path: str, previous: Optional[dict] = None) -> tuple[dict, dict]:
+        """
+        ファイルを取り込み (エントリ, {"new_bytes": 新規チャンクの元サイズ,
+        "written_bytes": 実際に書いたサイズ}) を返す。
+        previous（前回マニフェストの同じファイル）とサイズ・mtime が同じで
+        チャンクがそろっていれば読まずに再利用する。
+        """
+        st = os.stat(path)
+        if (previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns
+                and all(self.has_chunk(c) for c in previous.get("chunks", []))):
+            return dict(previous, reused=True), {"new_bytes": 0, "written_bytes": 0}
+
+        whole = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        chunks, new_bytes, written = [], 0, 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                whole.update(data)
+                chunk_id, n = self.put_chunk(data)
+                chunks.append(chunk_id)
+                if n:
+                    new_bytes += len(data)
+                    written += n
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": whole.hexdigest(),
+                 "chunks": chunks, "reused": False}
+        return entry, {"new_bytes": new_bytes, "written_bytes": written}
+
+    def file_digest(self, path: str) -> str:
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        with open(path, "rb") as f:
+            for data in iter(lambda: f.read(self.chunk_size), b""):
+                h.update(data)
+        return h.hexdigest()
+
+    def restore_file(self, entry: dict, target: str) -> None:
+        """チャンクから組み立て、digest を確認してから target を置き換える"""
+        parent = os.path.dirname(os.path.abspath(target))
+        os.makedirs(parent, exist_ok=True)
+        tmp = f"{target}.restore.tmp"
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        try:
+            with open(tmp, "wb") as f:
+                for chunk_id in entry["chunks"]:
+                    data = self.get_chunk(chunk_id)
+                    h.update(data)
+                    f.write(data)
+            if h.hexdigest() != entry["digest"]:
+                raise ValueError(f"digest mismatch restoring {target}")
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    # -- manifests ----------------------------------------------------------
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.manifest_dir, f"{name}.json")
+
+    def save_manifest(self, name: str, manifest: dict) -> str:
+        path = self._manifest_path(name)
+        manifest = dict(manifest, manifest_version=MANIFEST_VERSION)
+        _atomic_write(path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        return path
+
+    def load_manifest(self, name: str) -> Optional[dict]:
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def delete_manifest(self, name: str) -> bool:
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+    def manifest_names(self) -> list[str]:
+        """作成日時の古い順"""
+        names = [n[:-5] for n in os.listdir(self.manifest_dir) if n.endswith(".json")]
+        return sorted(names, key=lambda n: (os.path.getmtime(self._manifest_path(n)), n))
+
+    def latest_manifest(self) -> Optional[dict]:
+        names = self.manifest_names()
+        return self.load_manifest(names[-1]) if names else None
+
+    # -- GC -----------------------------------------------------------------
+    def referenced_chunks(self, names: Optional[Iterable[str]] = None) -> set:
+        referenced = set()
+        for name in (self.manifest_names() if names is None else names):
+            manifest = self.load_manifest(name) or {}
+            for entry in manifest.get("files", []):
+                referenced.update(entry.get("chunks", []))
+        return referenced
+
+    def collect_garbage(self, keep: Optional[int] = None) -> dict:
+        """新しい keep 個より古いマニフェストを消し、どこからも参照されないチャンクを消す"""
+        names = self.manifest_names()
+        removed_manifests = []
+        if keep is not None and len(names) > keep:
+            for name in names[:len(names) - keep]:
+                self.delete_manifest(name)
+                removed_manifests.append(name)
+        referenced = self.referenced_chunks()
+        removed_chunks = freed = 0
+        for sub in os.listdir(self.chunk_dir):
+            sub_dir = os.path.join(self.chunk_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for chunk_id in os.listdir(sub_dir):
+                path = os.path.join(sub_dir, chunk_id)
+                if chunk_id not in referenced:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed_chunks += 1
+            if not os.listdir(sub_dir):
+                os.rmdir(sub_dir)
+        return {"removed_manifests": removed_manifests, "removed_chunks": removed_chunks,
+                "freed_bytes": freed}
+
+    def stored_bytes(self) -> int:
+        total = 0
+        for root, _dirs, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return total
@@ -1,13 +1,14 @@
 import os
 import json
 import shutil
-import zipfile
 import threading
 import schedule
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from backup_store import BackupStore
+
 class BackupSystem:
     """利尻島昆布干場予報システム データバックアップ・復元システム"""
     
@@ -19,8 +20,8 @@ class BackupSystem:
             "auto_backup_enabled": True,
             "backup_interval_hours": 24,  # 24時間間隔
             "backup_time": "02:00",       # 午前2時
-            "max_backups": 30,            # 最大30個のバックアップを保持
-            "compress_backups": True,     # バックアップを圧縮
+            "max_backups": 30,            # 最大30個のバックアップ（マニフェスト）を保持
+            "compress_backups": True,     # チャンクを zlib 圧縮
             "backup_targets": {
                 "critical_files": [
                     "hoshiba_spots.csv",
@@ -54,6 +55,8 @@ class BackupSystem:
         self.load_config()
         self.ensure_backup_directory()
         self.running = False
+        self._store = None
+        self._lock = threading.Lock()
         
     def load_config(self):
         """設定ファイルの読み込み"""
@@ -99,244 +102,139 @@ class BackupSystem:
             print(f"Backup directory creation error: {e}")
             return False
     
+    @property
+    def store(self):
+        """チャンクストア（backups/store）。圧縮設定はチャンク単位の zlib に使う"""
+        if self._store is None:
+            self._store = BackupStore(os.path.join(self.backup_base_dir, "store"),
+                                      compress=self.config["compress_backups"])
+        return self._store
+
     def create_backup(self, backup_name=None, include_logs=True):
-        """バックアップの作成"""
+        """バックアップの作成（新しいチャンクだけ書き込み、マニフェストを保存）"""
         try:
-            # バックアップ名の生成
-            if not backup_name:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_name = f"konbu_backup_{timestamp}"
-            
-            backup_dir = os.path.join(self.backup_base_dir, backup_name)
-            
-            # バックアップディレクトリの作成
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            backup_info = {
-                "backup_name": backup_name,
-                "created_at": datetime.now().isoformat(),
-                "backup_type": "manual",
-                "files": [],
-                "size_mb": 0,
-                "status": "in_progress"
-            }
-            
-            total_size = 0
-            
-            # クリティカルファイルのバックアップ
-            critical_dir = os.path.join(backup_dir, "critical")
-            os.makedirs(critical_dir, exist_ok=True)
-            
-            for file_path in self.config["backup_targets"]["critical_files"]:
-                if os.path.exists(file_path):
-                    dest_path = os.path.join(critical_dir, os.path.basename(file_path))
-                    shutil.copy2(file_path, dest_path)
-                    
-                    file_size = os.path.getsize(dest_path) / (1024**2)  # MB
-                    total_size += file_size
-                    
-                    backup_info["files"].append({
-                        "category": "critical",
-                        "source": file_path,
-                        "size_mb": round(file_size, 2),
-                        "backed_up": True
-                    })
-                else:
-                    backup_info["files"].append({
-                        "category": "critical",
-                        "source": file_path,
-                        "size_mb": 0,
-                        "backed_up": False,
-                        "reason": "file_not_found"
-                    })
-            
-            # 設定ファイルのバックアップ
-            config_dir = os.path.join(backup_dir, "config")
-            os.makedirs(config_dir, exist_ok=True)
-            
-            for file_path in self.config["backup_targets"]["config_files"]:
-                if os.path.exists(file_path):
-                    dest_path = os.path.join(config_dir, os.path.basename(file_path))
-                    shutil.copy2(file_path, dest_path)
-                    
-                    file_size = os.path.getsize(dest_path) / (1024**2)
-                    total_size += file_size
-                    
-                    backup_info["files"].append({
-                        "category": "config",
-                        "source": file_path,
-                        "size_mb": round(file_size, 2),
-                        "backed_up": True
-                    })
-                else:
-                    backup_info["files"].append({
-                        "category": "config",
-                        "source": file_path,
-                        "size_mb": 0,
-                        "backed_up": False,
-                        "reason": "file_not_found"
-                    })
-            
-            # ログファイルのバックアップ（オプション）
-            if include_logs:
-                log_dir = os.path.join(backup_dir, "logs")
-                os.makedirs(log_dir, exist_ok=True)
-                
-                for file_path in self.config["backup_targets"]["log_files"]:
-                    if os.path.exists(file_path):
-                        dest_path = os.path.join(log_dir, os.path.basename(file_path))
-                        shutil.copy2(file_path, dest_path)
-                        
-                        file_size = os.path.getsize(dest_path) / (1024**2)
-                        total_size += file_size
-                        
-                        backup_info["files"].append({
-                            "category": "logs",
-                            "source": file_path,
-                            "size_mb": round(file_size, 2),
-                            "backed_up": True
-                        })
-            
-            backup_info["size_mb"] = round(total_size, 2)
-            
-            # バックアップ情報ファイルの保存
-            info_path = os.path.join(backup_dir, "backup_info.json")
-            with open(info_path, 'w', encoding='utf-8') as f:
-                json.dump(backup_info, f, ensure_ascii=False, indent=2)
-            
-            # 圧縮（オプション）
-            final_path = backup_dir
-            if self.config["compress_backups"]:
-                zip_path = f"{backup_dir}.zip"
-                self._create_zip(backup_dir, zip_path)
-                shutil.rmtree(backup_dir)  # 元のディレクトリを削除
-                final_path = zip_path
-                backup_info["compressed"] = True
-                backup_info["final_path"] = zip_path
-            else:
-                backup_info["compressed"] = False
-                backup_info["final_path"] = backup_dir
-            
-            backup_info["status"] = "completed"
-            backup_info["completed_at"] = datetime.now().isoformat()
-            
-            # 古いバックアップの清理
-            self._cleanup_old_backups()
-            
-            return backup_info
-            
+            with self._lock:
+                return self._create_backup(backup_name, include_logs)
         except Exception as e:
             return {
                 "status": "error",
                 "error": str(e),
                 "created_at": datetime.now().isoformat()
             }
-    
-    def _create_zip(self, source_dir, zip_path):
-        """ディレクトリのZIP圧縮"""
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, source_dir)
-                    zipf.write(file_path, arcname)
-    
-    def _cleanup_old_backups(self):
-        """古いバックアップの削除"""
+
+    def _create_backup(self, backup_name, include_logs):
+        # バックアップ名の生成
+        if not backup_name:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_name = f"konbu_backup_{timestamp}"
+
+        backup_info = {
+            "backup_name": backup_name,
+            "created_at": datetime.now().isoformat(),
+            "backup_type": "manual",
+            "files": [],
+            "size_mb": 0,
+            "status": "in_progress"
+        }
+
+        # 前回マニフェストのエントリ（サイズ・mtime が同じファイルは読まない）
+        previous = {}
+        latest = self.store.latest_manifest()
+        if latest:
+            previous = {(f["category"], f["source"]): f for f in latest.get("files", []) if f.get("backed_up")}
+
+        categories = [("critical", "critical_files"), ("config", "config_files")]
+        if include_logs:
+            categories.append(("logs", "log_files"))
+
+        total_size = 0
+        new_bytes = 0
+        written = 0
+        for category, config_key in categories:
+            for file_path in self.config["backup_targets"][config_key]:
+                if not os.path.exists(file_path):
+                    if category != "logs":
+                        backup_info["files"].append({
+                            "category": category,
+                            "source": file_path,
+                            "size_mb": 0,
+                            "backed_up": False,
+                            "reason": "file_not_found"
+                        })
+                    continue
+
+                entry, stats = self.store.backup_file(file_path, previous.get((category, file_path)))
+                new_bytes += stats["new_bytes"]
+                written += stats["written_bytes"]
+                total_size += entry["size"]
+                entry.update({
+                    "category": category,
+                    "source": file_path,
+                    "size_mb": round(entry["size"] / (1024**2), 2),
+                    "backed_up": True
+                })
+                backup_info["files"].append(entry)
+
+        backup_info["size_mb"] = round(total_size / (1024**2), 2)
+        backup_info["written_mb"] = round(written / (1024**2), 4)
+        # 重複排除率: 論理サイズのうち既存チャンクで済んだ割合（圧縮の効果は含めない）
+        backup_info["dedup_ratio"] = round(1 - new_bytes / total_size, 4) if total_size else 1.0
+        backup_info["compressed"] = self.config["compress_backups"]
+        backup_info["status"] = "completed"
+        backup_info["completed_at"] = datetime.now().isoformat()
+        backup_info["final_path"] = self.store.save_manifest(backup_name, backup_info)
+
+        # 古いバックアップと参照されなくなったチャンクの削除
+        self.collect_garbage()
+
+        return backup_info
+
+    def collect_garbage(self):
+        """max_backups より古いマニフェストと、どこからも参照されないチャンクを削除"""
         try:
-            if not os.path.exists(self.backup_base_dir):
-                return
-            
-            # バックアップファイル・ディレクトリを取得
-            backups = []
-            for item in os.listdir(self.backup_base_dir):
-                item_path = os.path.join(self.backup_base_dir, item)
-                if item.startswith("konbu_backup_"):
-                    mtime = os.path.getmtime(item_path)
-                    backups.append((item_path, mtime))
-            
-            # 作成日時でソート（古い順）
-            backups.sort(key=lambda x: x[1])
-            
-            # 制限を超えた分を削除
-            max_backups = self.config["max_backups"]
-            if len(backups) > max_backups:
-                for backup_path, _ in backups[:-max_backups]:
-                    try:
-                        if os.path.isdir(backup_path):
-                            shutil.rmtree(backup_path)
-                        else:
-                            os.remove(backup_path)
-                        print(f"Old backup removed: {backup_path}")
-                    except Exception as e:
-                        print(f"Failed to remove old backup {backup_path}: {e}")
-                        
+            result = self.store.collect_garbage(keep=self.config["max_backups"])
+            for name in result["removed_manifests"]:
+                print(f"Old backup removed: {name}")
+            return result
         except Exception as e:
             print(f"Cleanup error: {e}")
-    
+            return None
+
     def list_backups(self):
-        """バックアップ一覧の取得"""
+        """バックアップ一覧の取得（新しい順）"""
         try:
-            if not os.path.exists(self.backup_base_dir):
-                return []
-            
             backups = []
-            for item in os.listdir(self.backup_base_dir):
-                if item.startswith("konbu_backup_"):
-                    item_path = os.path.join(self.backup_base_dir, item)
-                    
-                    backup_info = {
-                        "name": item,
-                        "path": item_path,
-                        "is_compressed": item.endswith(".zip"),
-                        "created_at": datetime.fromtimestamp(os.path.getmtime(item_path)).isoformat()
-                    }
-                    
-                    # サイズ情報
-                    if os.path.isdir(item_path):
-                        total_size = 0
-                        for root, dirs, files in os.walk(item_path):
-                            for file in files:
-                                total_size += os.path.getsize(os.path.join(root, file))
-                        backup_info["size_mb"] = round(total_size / (1024**2), 2)
-                    else:
-                        backup_info["size_mb"] = round(os.path.getsize(item_path) / (1024**2), 2)
-                    
-                    # バックアップ情報ファイルから詳細取得
-                    if backup_info["is_compressed"]:
-                        # ZIPファイルから情報を取得（簡易版）
-                        pass
-                    else:
-                        info_file = os.path.join(item_path, "backup_info.json")
-                        if os.path.exists(info_file):
-                            try:
-                                with open(info_file, 'r', encoding='utf-8') as f:
-                                    detailed_info = json.load(f)
-                                backup_info.update(detailed_info)
-                            except:
-                                pass
-                    
-                    backups.append(backup_info)
-            
+            for name in self.store.manifest_names():
+                manifest = self.store.load_manifest(name)
+                if not manifest:
+                    continue
+                backup_info = {k: v for k, v in manifest.items() if k != "files"}
+                backup_info.update({
+                    "name": name,
+                    "path": self.store._manifest_path(name),
+                    "is_compressed": bool(manifest.get("compressed")),
+                    "file_count": sum(1 for f in manifest.get("files", []) if f.get("backed_up")),
+                })
+                backups.append(backup_info)
+
             # 作成日時でソート（新しい順）
             backups.sort(key=lambda x: x["created_at"], reverse=True)
             return backups
-            
+
         except Exception as e:
             print(f"List backups error: {e}")
             return []
-    
+
     def restore_backup(self, backup_name, target_files=None, confirm_callback=None):
-        """バックアップの復元"""
+        """バックアップの復元（マニフェストからチャンクを組み立てて検証）"""
         try:
-            backup_path = os.path.join(self.backup_base_dir, backup_name)
-            
-            if not os.path.exists(backup_path):
+            manifest = self.store.load_manifest(backup_name)
+            if manifest is None:
                 return {
                     "status": "error",
                     "error": f"Backup not found: {backup_name}"
                 }
-            
+
             restore_info = {
                 "backup_name": backup_name,
                 "started_at": datetime.now().isoformat(),
@@ -344,97 +242,70 @@ class BackupSystem:
                 "errors": [],
                 "status": "in_progress"
             }
-            
-            # 圧縮されたバックアップの場合、一時展開
-            temp_dir = None
-            if backup_name.endswith(".zip"):
-                temp_dir = f"temp_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                with zipfile.ZipFile(backup_path, 'r') as zipf:
-                    zipf.extractall(temp_dir)
-                source_dir = temp_dir
-            else:
-                source_dir = backup_path
-            
-            # 復元対象ファイルの決定
-            if target_files is None:
-                # 全ファイル復元
-                categories = ["critical", "config", "logs"]
-            else:
-                categories = target_files
-            
-            # 各カテゴリのファイルを復元
-            for category in categories:
-                category_dir = os.path.join(source_dir, category)
-                if not os.path.exists(category_dir):
+
+            # 復元対象カテゴリの決定（None なら全ファイル）
+            categories = ["critical", "config", "logs"] if target_files is None else target_files
+
+            for entry in manifest.get("files", []):
+                if not entry.get("backed_up") or entry["category"] not in categories:
                     continue
-                
-                for file_name in os.listdir(category_dir):
-                    source_file = os.path.join(category_dir, file_name)
-                    target_file = file_name  # 現在のディレクトリに復元
-                    
-                    try:
-                        # 既存ファイルのバックアップ作成
-                        if os.path.exists(target_file):
-                            backup_suffix = datetime.now().strftime("_%Y%m%d_%H%M%S.backup")
-                            backup_file = f"{target_file}{backup_suffix}"
-                            shutil.copy2(target_file, backup_file)
-                            restore_info["restored_files"].append({
-                                "file": target_file,
-                                "category": category,
-                                "action": "replaced",
-                                "backup_created": backup_file
-                            })
-                        else:
+                target_file = entry["source"]
+                try:
+                    if os.path.exists(target_file):
+                        if self.store.file_digest(target_file) == entry["digest"]:
                             restore_info["restored_files"].append({
                                 "file": target_file,
-                                "category": category,
-                                "action": "created"
+                                "category": entry["category"],
+                                "action": "unchanged"
                             })
-                        
-                        # ファイル復元
-                        shutil.copy2(source_file, target_file)
-                        
-                    except Exception as e:
-                        restore_info["errors"].append({
-                            "file": target_file,
-                            "error": str(e)
-                        })
-            
-            # 一時ディレクトリの削除
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            
+                            continue
+                        # 既存ファイルのバックアップ作成
+                        backup_suffix = datetime.now().strftime("_%Y%m%d_%H%M%S.backup")
+                        backup_file = f"{target_file}{backup_suffix}"
+                        shutil.copy2(target_file, backup_file)
+                        action = {"action": "replaced", "backup_created": backup_file}
+                    else:
+                        action = {"action": "created"}
+
+                    # ファイル復元
+                    self.store.restore_file(entry, target_file)
+                    restore_info["restored_files"].append({
+                        "file": target_file,
+                        "category": entry["category"],
+                        **action
+                    })
+
+                except Exception as e:
+                    restore_info["errors"].append({
+                        "file": target_file,
+                        "error": str(e)
+                    })
+
             restore_info["status"] = "completed" if not restore_info["errors"] else "completed_with_errors"
             restore_info["completed_at"] = datetime.now().isoformat()
-            
+
             return restore_info
-            
+
         except Exception as e:
             return {
                 "status": "error",
                 "error": str(e),
                 "started_at": datetime.now().isoformat()
             }
-    
+
     def delete_backup(self, backup_name):
-        """バックアップの削除"""
+        """バックアップの削除（参照されなくなったチャンクも削除）"""
         try:
-            backup_path = os.path.join(self.backup_base_dir, backup_name)
-            
-            if not os.path.exists(backup_path):
-                return False
-            
-            if os.path.isdir(backup_path):
-                shutil.rmtree(backup_path)
-            else:
-                os.remove(backup_path)
-            
+            with self._lock:
+                if not self.store.delete_manifest(backup_name):
+                    return False
+                self.store.collect_garbage()
             return True
-            
+
         except Exception as e:
             print(f"Delete backup error: {e}")
             return False
-    
+
     def auto_backup_job(self):
         """自動バックアップジョブ"""
         try:
@@ -502,7 +373,8 @@ class BackupSystem:
     def get_backup_status(self):
         """バックアップシステム状況の取得"""
         backups = self.list_backups()
-        total_size = sum(backup["size_mb"] for backup in backups)
+        # 論理サイズではなく、チャンクストアが実際に使っているディスク量
+        total_size = self.store.stored_bytes() / (1024**2)
         
         return {
             "auto_backup_running": self.running,
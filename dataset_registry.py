@@ -0,0 +1,164 @@
+"""Process-wide cache of the CSV datasets start.py reads on hot paths.
+
+add_record() parsed hoshiba_spots.csv only to check that the spot name exists
+and then parsed hoshiba_records.csv; get_record() parsed the records again, and
+_load_feedback_sheet_rows() parsed feedback_log.csv plus the spots CSV for the
+town/district/buraku merge — on every request. This module keeps one parsed
+frame per (dataset, path):
+
+    DatasetSpec       how to read a CSV: explicit dtypes for the key columns,
+                      the column set to guarantee, and named index builders
+    DatasetRegistry   frame()  — a copy of the cached frame; the CSV is parsed
+                                 again only when its (mtime_ns, size, inode) changed
+                      index()  — a structure built once per loaded version
+                                 (name set, (name, date) → row, join table)
+                      invalidate() — write-through hook for code that has just
+                                 written the file (or restored it from Redis)
+
+Specs for the three files (SPOTS, RECORDS, FEEDBACK) live here so every
+caller shares the same dtypes and indexes. pandas is imported lazily (same
+as start.py's LazyModule) and the module is Flask-independent.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    name: str
+    dtype: Dict[str, object] = field(default_factory=dict)
+    columns: Optional[Sequence[str]] = None   # 足りない列は None で追加し、この順に並べる
+    indexes: Dict[str, Callable] = field(default_factory=dict)
+
+
+class _Entry:
+    __slots__ = ("signature", "frame", "indexes")
+
+    def __init__(self, signature, frame):
+        self.signature = signature
+        self.frame = frame
+        self.indexes: dict = {}
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def read_frame(spec: DatasetSpec, path: str):
+    """spec の dtype で CSV を読む（存在しない列の dtype 指定は無視される）"""
+    import pandas as pd
+
+    df = pd.read_csv(path, dtype=spec.dtype or None)
+    if spec.columns is not None:
+        for col in spec.columns:
+            if col not in df.columns:
+                df[col] = None
+        df = df[list(spec.columns)]
+    return df
+
+
+class DatasetRegistry:
+    """(spec, path) ごとに1回だけ CSV を読み、ファイルが変わるまで使い回す"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    def _entry(self, spec: DatasetSpec, path: str) -> _Entry:
+        """FileNotFoundError はそのまま送出（呼び出し元の既存処理に任せる）"""
+        key = (spec.name, os.path.abspath(path))
+        with self._lock:
+            signature = file_signature(path)
+            entry = self._entries.get(key)
+            if entry is not None and signature is not None and entry.signature == signature:
+                self.stats["hits"] += 1
+                return entry
+            frame = read_frame(spec, path)
+            # 読んでいる間に書き換えられていたら、次回もう一度読む
+            entry = _Entry(signature if file_signature(path) == signature else None, frame)
+            self._entries[key] = entry
+            self.stats["loads"] += 1
+            return entry
+
+    def frame(self, spec: DatasetSpec, path: str, copy: bool = True):
+        """キャッシュ済み DataFrame。呼び出し側が変更してよいよう既定でコピーを返す"""
+        frame = self._entry(spec, path).frame
+        return frame.copy() if copy else frame
+
+    def index(self, spec: DatasetSpec, path: str, name: str):
+        """spec.indexes[name](frame) の結果。読み込み1回につき1回だけ作る"""
+        entry = self._entry(spec, path)
+        with self._lock:
+            if name not in entry.indexes:
+                entry.indexes[name] = spec.indexes[name](entry.frame)
+            return entry.indexes[name]
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """ファイルを書いた直後に呼ぶ。path=None で全データセットを捨てる"""
+        target = os.path.abspath(path) if path is not None else None
+        with self._lock:
+            for key in [k for k in self._entries if target is None or k[1] == target]:
+                del self._entries[key]
+                self.stats["invalidations"] += 1
+
+
+# ── datasets ─────────────────────────────────────────────────────────────────
+
+def _spot_names(df) -> frozenset:
+    return frozenset(df["name"].dropna().astype(str))
+
+
+def _spot_metadata(df) -> dict:
+    """name → {town, district, buraku, lat, lon}（NaN は None、重複名は先勝ち）"""
+    meta = {}
+    for row in df.drop_duplicates("name").itertuples(index=False):
+        meta[str(row.name)] = {
+            key: (None if value != value else value)
+            for key, value in (("town", row.town), ("district", row.district), ("buraku", row.buraku),
+                               ("lat", row.lat), ("lon", row.lon))
+        }
+    return meta
+
+
+def _spot_join_table(df):
+    """feedback 行に現在の分類を結合するための name 索引付きテーブル"""
+    table = df.drop_duplicates("name").set_index("name")[["town", "district", "buraku"]]
+    return table.add_prefix("current_")
+
+
+def _record_rows(df) -> dict:
+    """(name, date) → 行 dict（add_record の upsert と同じく先頭行を採用）"""
+    rows = {}
+    for row in df.to_dict("records"):
+        rows.setdefault((row["name"], row["date"]), row)
+    return rows
+
+
+SPOTS = DatasetSpec(
+    name="spots",
+    dtype={"name": str, "town": str, "district": str, "buraku": str},
+    columns=("name", "lat", "lon", "town", "district", "buraku"),
+    indexes={"names": _spot_names, "metadata": _spot_metadata, "join": _spot_join_table},
+)
+
+RECORDS = DatasetSpec(
+    name="records",
+    dtype={"date": str, "name": str, "result": str, "stop_cause": str,
+           "collection_time": str, "recorded_at": str, "correction_reason": str},
+    indexes={"by_key": _record_rows},
+)
+
+FEEDBACK = DatasetSpec(
+    name="feedback",
+    dtype={"date": str, "spot_name": str, "town": str, "district": str, "buraku": str,
+           "data_source": str, "recorded_at": str},
+)
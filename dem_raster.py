@@ -0,0 +1,218 @@
+"""Local DEM raster of Rishiri Island for network-free elevation lookups.
+
+get_elevation() used to make one Open-Meteo Elevation API call per 0.01°
+cell and keep the answer only in a process-local dict. This module holds the
+same Copernicus GLO-90 data as a small regular lat/lon raster:
+
+    rishiri_dem.npz   elevation  float32 (rows south→north, cols west→east)
+                      lat0/lon0  south-west node, dlat/dlon node spacing
+                      source     "glo90-open-meteo"
+
+built once at native resolution (3 arc-seconds ≈ 90 m; ~67k nodes over the
+island bounds) by ``python dem_raster.py``. The build goes through the
+Elevation API in 100-point batches, throttled, and is resumable: progress is
+written to ``rishiri_dem.partial.npz`` and a rerun only fetches rows that are
+still missing.
+
+The committed rishiri_dem.npz is built offline by ``python dem_raster.py
+--from-terrain-db`` from the 0.001° terrain_points of rishiri_terrain.db
+(source "rishiri-terrain-db"; the same values spot_geometry already falls
+back to, sea nodes 0 m). Running the API build replaces it with GLO-90.
+DemRaster.elevation_source tells callers which one they got ('dem' for
+GLO-90, 'terrain_db' otherwise), so the geometry table labels samples
+honestly.
+
+DemRaster.elevation_at(lats, lons) is vectorized bilinear interpolation for
+arrays of any shape (a whole 2D grid in one call); points outside the raster
+(or next to a node that was never fetched) are NaN so callers can fall back
+to their previous source.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from spot_geometry import BASE_DIR, DEFAULT_TERRAIN_DB, fetch_elevations_open_meteo
+
+DEFAULT_DEM_PATH = os.path.join(BASE_DIR, "rishiri_dem.npz")
+DEM_SOURCE = "glo90-open-meteo"
+TERRAIN_DB_SOURCE = "rishiri-terrain-db"
+TERRAIN_DB_RESOLUTION = 0.001  # terrain_database.py の grid_resolution
+# terrain_database.RishiriTerrainDatabase.island_bounds と同じ範囲
+ISLAND_BOUNDS = {"lat_min": 45.05, "lat_max": 45.28, "lon_min": 141.13, "lon_max": 141.33}
+GLO90_RESOLUTION = 1.0 / 1200  # 3 arc-seconds
+
+
+class DemRaster:
+    """規則格子（緯度・経度等間隔）の標高ラスタ。"""
+
+    def __init__(self, elevation: np.ndarray, lat0: float, lon0: float, dlat: float, dlon: float,
+                 source: str = DEM_SOURCE):
+        self.elevation = np.asarray(elevation, dtype=np.float32)
+        self.lat0, self.lon0 = float(lat0), float(lon0)
+        self.dlat, self.dlon = float(dlat), float(dlon)
+        self.source = source
+
+    @property
+    def shape(self) -> tuple:
+        return self.elevation.shape
+
+    @property
+    def bounds(self) -> dict:
+        ny, nx = self.shape
+        return {"lat_min": self.lat0, "lat_max": self.lat0 + (ny - 1) * self.dlat,
+                "lon_min": self.lon0, "lon_max": self.lon0 + (nx - 1) * self.dlon}
+
+    @property
+    def elevation_source(self) -> str:
+        """ジオメトリ表の elevation_source と同じ呼び名（GLO-90 なら 'dem'）"""
+        return "dem" if self.source == DEM_SOURCE else "terrain_db"
+
+    @property
+    def complete(self) -> bool:
+        return bool(np.isfinite(self.elevation).all())
+
+    def node_coordinates(self) -> tuple[np.ndarray, np.ndarray]:
+        ny, nx = self.shape
+        return self.lat0 + np.arange(ny) * self.dlat, self.lon0 + np.arange(nx) * self.dlon
+
+    def elevation_at(self, lats, lons) -> np.ndarray:
+        """双線形補間した標高(m)。入力と同じ形の配列、範囲外は NaN。"""
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64),
+                                         np.asarray(lons, dtype=np.float64))
+        ny, nx = self.shape
+        fy = (lats - self.lat0) / self.dlat
+        fx = (lons - self.lon0) / self.dlon
+        # 端のノード上の点が丸め誤差で範囲外にならないよう、ノード間隔の 1e-6 だけ許容
+        eps = 1e-6
+        inside = (fy >= -eps) & (fy <= ny - 1 + eps) & (fx >= -eps) & (fx <= nx - 1 + eps)
+        fy = np.clip(np.where(inside, fy, 0), 0, ny - 1)
+        fx = np.clip(np.where(inside, fx, 0), 0, nx - 1)
+
+        i0 = np.minimum(np.floor(fy).astype(np.intp), max(ny - 2, 0))
+        j0 = np.minimum(np.floor(fx).astype(np.intp), max(nx - 2, 0))
+        i1 = np.minimum(i0 + 1, ny - 1)
+        j1 = np.minimum(j0 + 1, nx - 1)
+        wy = fy - i0
+        wx = fx - j0
+
+        z = self.elevation
+        out = ((1 - wy) * (1 - wx) * z[i0, j0] + (1 - wy) * wx * z[i0, j1]
+               + wy * (1 - wx) * z[i1, j0] + wy * wx * z[i1, j1])
+        return np.where(inside, out, np.nan)
+
+    def save(self, path: str = DEFAULT_DEM_PATH) -> None:
+        """一時ファイル経由でアトミックに保存（np.savez_compressed）。"""
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, elevation=self.elevation,
+                            grid=np.array([self.lat0, self.lon0, self.dlat, self.dlon]),
+                            source=np.array(self.source))
+        os.replace(tmp, path)
+
+
+def load_dem_raster(path: str = DEFAULT_DEM_PATH) -> DemRaster | None:
+    """保存済みラスタを読み込む。ファイルがない・読めないときは None。"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            lat0, lon0, dlat, dlon = data["grid"].tolist()
+            return DemRaster(data["elevation"], lat0, lon0, dlat, dlon, str(data["source"]))
+    except Exception as e:
+        print(f"[dem] failed to load {path}: {e}")
+        return None
+
+
+def empty_raster(bounds: dict = ISLAND_BOUNDS, resolution: float = GLO90_RESOLUTION) -> DemRaster:
+    ny = int(round((bounds["lat_max"] - bounds["lat_min"]) / resolution)) + 1
+    nx = int(round((bounds["lon_max"] - bounds["lon_min"]) / resolution)) + 1
+    return DemRaster(np.full((ny, nx), np.nan, dtype=np.float32),
+                     bounds["lat_min"], bounds["lon_min"], resolution, resolution)
+
+
+def build_dem_raster(path: str = DEFAULT_DEM_PATH, bounds: dict = ISLAND_BOUNDS,
+                     resolution: float = GLO90_RESOLUTION, fetch_batch=fetch_elevations_open_meteo,
+                     rows_per_request: int | None = None, pause: float = 0.5,
+                     progress=None) -> DemRaster:
+    """
+    Elevation API からラスタを作る。途中経過は <path>.partial.npz に保存し、
+    再実行時は未取得の行だけを取りに行く。取得に失敗したら途中経過を残して
+    RuntimeError。全ノードがそろったら path に保存して partial を消す。
+    """
+    partial_path = path.replace(".npz", ".partial.npz")
+    raster = load_dem_raster(partial_path)
+    if raster is None or raster.shape != empty_raster(bounds, resolution).shape:
+        raster = empty_raster(bounds, resolution)
+    lat_nodes, lon_nodes = raster.node_coordinates()
+    ny, nx = raster.shape
+    # Elevation API は1リクエスト100点まで。行単位で取得・保存する
+    rows_per_request = rows_per_request or max(1, 100 // nx)
+
+    missing_rows = [i for i in range(ny) if not np.isfinite(raster.elevation[i]).all()]
+    for n in range(0, len(missing_rows), rows_per_request):
+        rows = missing_rows[n:n + rows_per_request]
+        lats = np.repeat(lat_nodes[rows], nx)
+        lons = np.tile(lon_nodes, len(rows))
+        values = fetch_batch(lats.tolist(), lons.tolist())
+        if values is None or len(values) != len(lats):
+            raster.save(partial_path)
+            raise RuntimeError(f"elevation fetch failed at row {rows[0]}; progress saved to {partial_path}")
+        raster.elevation[rows] = np.asarray(values, dtype=np.float32).reshape(len(rows), nx)
+        if progress:
+            progress(ny - len(missing_rows) + n + len(rows), ny)
+        if (n // rows_per_request) % 20 == 19:
+            raster.save(partial_path)
+        if pause:
+            time.sleep(pause)
+
+    raster.save(path)
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    return raster
+
+
+def build_dem_from_terrain_db(path: str = DEFAULT_DEM_PATH, db_path: str = DEFAULT_TERRAIN_DB,
+                              resolution: float = TERRAIN_DB_RESOLUTION) -> DemRaster:
+    """
+    rishiri_terrain.db の terrain_points（規則格子、島外は行なし）からラスタを作る。
+    ネットワーク不要。行のないノードは海域なので 0 m。
+    """
+    import sqlite3
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT latitude, longitude, elevation FROM terrain_points").fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        raise RuntimeError(f"no terrain_points in {db_path}")
+    data = np.asarray(rows, dtype=np.float64)
+    lat0, lon0 = round(data[:, 0].min(), 6), round(data[:, 1].min(), 6)
+    iy = np.rint((data[:, 0] - lat0) / resolution).astype(np.intp)
+    ix = np.rint((data[:, 1] - lon0) / resolution).astype(np.intp)
+    elevation = np.zeros((iy.max() + 1, ix.max() + 1), dtype=np.float32)
+    elevation[iy, ix] = np.maximum(data[:, 2], 0.0)
+    raster = DemRaster(elevation, lat0, lon0, resolution, resolution, source=TERRAIN_DB_SOURCE)
+    raster.save(path)
+    return raster
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="build rishiri_dem.npz from the Open-Meteo Elevation API")
+    parser.add_argument("--output", default=DEFAULT_DEM_PATH)
+    parser.add_argument("--resolution", type=float, default=GLO90_RESOLUTION, help="node spacing in degrees")
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds between API requests")
+    parser.add_argument("--from-terrain-db", nargs="?", const=DEFAULT_TERRAIN_DB, metavar="DB",
+                        help="build offline from rishiri_terrain.db instead of the Elevation API")
+    args = parser.parse_args()
+
+    if args.from_terrain_db:
+        dem = build_dem_from_terrain_db(args.output, args.from_terrain_db)
+    else:
+        dem = build_dem_raster(args.output, resolution=args.resolution, pause=args.pause,
+                               progress=lambda done, total: print(f"\r{done}/{total} rows", end="", flush=True))
+    print(f"\nsaved {args.output}: {dem.shape[0]}x{dem.shape[1]} nodes, "
+          f"{np.nanmin(dem.elevation):.0f}-{np.nanmax(dem.elevation):.0f} m")
@@ -0,0 +1,363 @@
+"""Vectorized ERA5 field loading and analysis for the analyze_era5_* scripts.
+
+The analysis scripts used to walk the time axis with ``xarray.isel`` and
+recompute gradients one 2-D slice at a time in Python. This module instead
+extracts the requested (variable, pressure level) fields once into plain
+(time, lat, lon) float32 ``.npy`` files and works on whole arrays:
+
+    load_fields()      NetCDF → cached .npy fields, reopened with
+                       ``mmap_mode='r'`` (no xarray needed after the first run)
+    vorticity()        relative vorticity for every timestep at once
+    gradient_magnitude()  |∇f| per metre, same finite differences
+    nearest_indices() / extract_points()   per-spot time series (time, spot)
+    exceedance_fraction() / pearson()      threshold counts and correlations
+
+Cache artifacts live under ``ERA5_CACHE_DIR`` (default ``era5_cache/``) in a
+directory keyed by the SHA-256 of the source file, so a re-downloaded or
+edited .nc never reuses stale arrays. Fields are copied from the source in
+``time_chunk`` slices, so memory stays bounded for multi-year files.
+
+Source readers, in order of preference:
+  - xarray (dask-backed lazy chunks when dask is installed) — NetCDF4/HDF5
+  - scipy.io.netcdf_file(mmap=True) — NetCDF3 classic, no xarray required
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371000
+ERA5_CACHE_DIR = Path(os.environ.get("ERA5_CACHE_DIR", Path(__file__).resolve().parent / "era5_cache"))
+CACHE_FORMAT_VERSION = 1
+
+TIME_DIMS = ("valid_time", "time")
+LEVEL_DIMS = ("pressure_level", "level")
+LAT_DIMS = ("latitude", "lat")
+LON_DIMS = ("longitude", "lon")
+
+# 短縮名で要求された変数が無いとき、長い名前（CDS の旧ダウンロード形式）も探す
+VARIABLE_ALIASES = {"z": ("z", "geopotential")}
+
+
+# ---------------------------------------------------------------------------
+# Loading / cache
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Era5Fields:
+    """Extracted fields; ``fields['u_500']`` is a (time, lat, lon) array."""
+
+    lat: np.ndarray
+    lon: np.ndarray
+    times: np.ndarray
+    fields: Dict[str, np.ndarray] = field(default_factory=dict)
+    cache_path: Optional[Path] = None
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.fields[key]
+
+
+def field_key(variable: str, level: Optional[float]) -> str:
+    """'u' + 500 → 'u_500'; single-level variables keep their name."""
+    if level is None:
+        return variable
+    return f"{variable}_{int(level) if float(level).is_integer() else level}"
+
+
+def file_digest(path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents (cache key)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_fields(path, variables: Mapping[str, Optional[Sequence[float]]], cache_dir=None,
+                time_chunk: int = 240) -> Era5Fields:
+    """
+    ERA5 NetCDF から指定フィールドを (time, lat, lon) 配列として取得
+
+    Args:
+        path: ERA5 .nc ファイル
+        variables: {変数名: 気圧面リスト or None(単一面)} 例 {'u': [500], 'w': [700]}
+        cache_dir: キャッシュ親ディレクトリ（既定 ERA5_CACHE_DIR）
+        time_chunk: 抽出時に一度に読む時刻数
+    Returns:
+        Era5Fields（各フィールドは読み取り専用 memmap）
+    """
+    path = Path(path)
+    wanted = {field_key(v, lvl): (v, lvl) for v, levels in variables.items()
+              for lvl in (levels if levels is not None else [None])}
+    cache = Path(cache_dir) if cache_dir is not None else ERA5_CACHE_DIR
+    cache_path = cache / f"{path.stem}_{file_digest(path)[:16]}"
+    meta_file = cache_path / "meta.json"
+
+    meta = _read_meta(meta_file)
+    missing = [k for k in wanted if k not in meta.get("fields", [])]
+    if missing:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        with _open_source(path) as source:
+            if not meta:
+                np.save(cache_path / "_lat.npy", source.coord(LAT_DIMS))
+                np.save(cache_path / "_lon.npy", source.coord(LON_DIMS))
+                np.save(cache_path / "_times.npy", source.times())
+            for key in missing:
+                _extract_field(source, *wanted[key], cache_path / f"{key}.npy", time_chunk)
+        meta = {"version": CACHE_FORMAT_VERSION, "source": path.name,
+                "fields": sorted(set(meta.get("fields", [])) | set(missing))}
+        _write_json_atomic(meta_file, meta)
+
+    return Era5Fields(
+        lat=np.load(cache_path / "_lat.npy"),
+        lon=np.load(cache_path / "_lon.npy"),
+        times=np.load(cache_path / "_times.npy"),
+        fields={k: np.load(cache_path / f"{k}.npy", mmap_mode="r") for k in wanted},
+        cache_path=cache_path,
+    )
+
+
+def _read_meta(meta_file: Path) -> dict:
+    try:
+        with open(meta_file, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return meta if meta.get("version") == CACHE_FORMAT_VERSION else {}
+
+
+def _write_json_atomic(target: Path, payload: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, target)
+
+
+def _extract_field(source, variable: str, level: Optional[float], target: Path, time_chunk: int) -> None:
+    """(time, lat, lon) float32 を time_chunk ずつ書き出す（一時ファイル→rename）"""
+    n_time = len(source.times())
+    n_lat, n_lon = len(source.coord(LAT_DIMS)), len(source.coord(LON_DIMS))
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".npy.tmp")
+    os.close(fd)
+    try:
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n_time, n_lat, n_lon))
+        for start in range(0, n_time, time_chunk):
+            stop = min(start + time_chunk, n_time)
+            out[start:stop] = source.read(variable, level, start, stop)
+        out.flush()
+        del out
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _open_source(path: Path):
+    try:
+        import xarray  # noqa: F401
+    except ImportError:
+        return _ScipySource(path)
+    return _XarraySource(path)
+
+
+def _first_present(names: Iterable[str], candidates: Sequence[str]) -> Optional[str]:
+    names = set(names)
+    return next((c for c in candidates if c in names), None)
+
+
+def _variable_name(names: Iterable[str], variable: str) -> str:
+    """'z' → ファイル内の実名（'z' or 'geopotential'）。どれも無ければ KeyError"""
+    found = _first_present(names, VARIABLE_ALIASES.get(variable, (variable,)))
+    if found is None:
+        raise KeyError(f"variable {variable!r} not in file")
+    return found
+
+
+def _level_index(levels: np.ndarray, level: float) -> int:
+    matches = np.flatnonzero(np.isclose(levels, level))
+    if not len(matches):
+        raise KeyError(f"pressure level {level} not in {levels.tolist()}")
+    return int(matches[0])
+
+
+class _XarraySource:
+    """xarray reader; dask-backed (lazy, chunked) when dask is available."""
+
+    def __init__(self, path: Path):
+        import xarray as xr
+        try:
+            import dask  # noqa: F401
+            chunks = {}
+        except ImportError:
+            chunks = None
+        self.ds = xr.open_dataset(path, chunks=chunks)
+        self.time_dim = _first_present(self.ds.dims, TIME_DIMS)
+        self.level_dim = _first_present(self.ds.dims, LEVEL_DIMS)
+        self.lat_dim = _first_present(self.ds.dims, LAT_DIMS)
+        self.lon_dim = _first_present(self.ds.dims, LON_DIMS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.ds.close()
+
+    def coord(self, names: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.ds[_first_present(self.ds.variables, names)].values, dtype=float)
+
+    def times(self) -> np.ndarray:
+        return np.asarray(self.ds[self.time_dim].values).astype("datetime64[s]")
+
+    def read(self, variable: str, level: Optional[float], start: int, stop: int) -> np.ndarray:
+        da = self.ds[_variable_name(self.ds.data_vars, variable)]
+        if level is not None:
+            da = da.isel({self.level_dim: _level_index(self.ds[self.level_dim].values, level)})
+        da = da.isel({self.time_dim: slice(start, stop)})
+        return np.asarray(da.transpose(self.time_dim, self.lat_dim, self.lon_dim).values, dtype=np.float32)
+
+
+class _ScipySource:
+    """NetCDF3 classic reader via scipy memmap (used when xarray is not installed)."""
+
+    def __init__(self, path: Path):
+        from scipy.io import netcdf_file
+        with open(path, "rb") as f:
+            if f.read(4)[:3] != b"CDF":
+                raise ImportError(f"{path.name} is not NetCDF3; install xarray + netCDF4 to read it")
+        self.nc = netcdf_file(str(path), mode="r", mmap=True, maskandscale=False)
+        self.time_dim = _first_present(self.nc.dimensions, TIME_DIMS)
+        self.level_dim = _first_present(self.nc.dimensions, LEVEL_DIMS)
+        self.lat_dim = _first_present(self.nc.dimensions, LAT_DIMS)
+        self.lon_dim = _first_present(self.nc.dimensions, LON_DIMS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.nc.close()
+
+    def coord(self, names: Sequence[str]) -> np.ndarray:
+        return np.array(self.nc.variables[_first_present(self.nc.variables, names)][:], dtype=float)
+
+    def times(self) -> np.ndarray:
+        var = self.nc.variables[self.time_dim]
+        return _decode_cf_times(np.array(var[:]), _attr(var, "units"))
+
+    def read(self, variable: str, level: Optional[float], start: int, stop: int) -> np.ndarray:
+        level_idx = None if level is None else _level_index(self.coord(LEVEL_DIMS), level)
+        var = self.nc.variables[_variable_name(self.nc.variables, variable)]
+        dims = list(var.dimensions)
+        index = [slice(None)] * len(dims)
+        index[dims.index(self.time_dim)] = slice(start, stop)
+        if level_idx is not None:
+            index[dims.index(self.level_dim)] = level_idx
+        raw = np.array(var[tuple(index)])
+        data = raw.astype(np.float32)
+        for fill_attr in ("_FillValue", "missing_value"):
+            fill = _attr(var, fill_attr)
+            if fill is not None:
+                data[raw == fill] = np.nan
+        scale, offset = _attr(var, "scale_factor"), _attr(var, "add_offset")
+        if scale is not None:
+            data *= np.float32(scale)
+        if offset is not None:
+            data += np.float32(offset)
+        kept = [d for d, i in zip(dims, index) if isinstance(i, slice)]
+        return data.transpose([kept.index(d) for d in (self.time_dim, self.lat_dim, self.lon_dim)])
+
+
+def _attr(var, name):
+    value = getattr(var, name, None)
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, np.ndarray) and value.size == 1:
+        return value.item()
+    return value
+
+
+def _decode_cf_times(values: np.ndarray, units: Optional[str]) -> np.ndarray:
+    """'hours since 1900-01-01 00:00:00.0' 形式を datetime64[s] に変換"""
+    if not units or " since " not in units:
+        return values
+    unit, origin = units.split(" since ", 1)
+    seconds = {"seconds": 1, "minutes": 60, "hours": 3600, "days": 86400}[unit.strip().lower()]
+    origin = np.datetime64(origin.strip().replace(" ", "T").rstrip("Z").split(".")[0], "s")
+    return origin + (values.astype(np.float64) * seconds).astype("timedelta64[s]")
+
+
+# ---------------------------------------------------------------------------
+# Vectorized analysis (leading axes = time / anything)
+# ---------------------------------------------------------------------------
+
+def _grid_spacing(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(dx, dy) [m] on the (lat, lon) grid — calculate_vorticity_spatial() と同じ差分"""
+    lat_rad_grid = np.deg2rad(np.meshgrid(lon, lat)[1])
+    dx = EARTH_RADIUS_M * np.cos(lat_rad_grid) * np.gradient(np.deg2rad(lon))[None, :]
+    dy = EARTH_RADIUS_M * np.gradient(np.deg2rad(lat))[:, None]
+    return dx, dy
+
+
+def vorticity(u: np.ndarray, v: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """相対渦度 ζ = ∂v/∂x - ∂u/∂y（10^-5 s^-1）、(..., lat, lon) 全時刻一括"""
+    dx, dy = _grid_spacing(lat, lon)
+    return (np.gradient(v, axis=-1) / dx - np.gradient(u, axis=-2) / dy) * 1e5
+
+
+def gradient_magnitude(values: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """水平勾配の大きさ |∇f|（単位/m）、(..., lat, lon)"""
+    dx, dy = _grid_spacing(lat, lon)
+    return np.hypot(np.gradient(values, axis=-1) / dx, np.gradient(values, axis=-2) / dy)
+
+
+def wind_direction(u, v) -> np.ndarray:
+    """気象風向（吹いてくる方向, 度）"""
+    return (np.degrees(np.arctan2(-np.asarray(u), -np.asarray(v))) + 360) % 360
+
+
+def wind_speed(u, v) -> np.ndarray:
+    return np.hypot(u, v)
+
+
+def cos_mountain_angle(wind_dir, mountain_azimuth) -> np.ndarray:
+    """風が吹いていく方向と山頂方位角の差のコサイン"""
+    diff = np.abs((np.asarray(wind_dir) + 180) % 360 - mountain_azimuth)
+    return np.cos(np.radians(np.where(diff > 180, 360 - diff, diff)))
+
+
+def nearest_indices(lat: np.ndarray, lon: np.ndarray, points) -> Tuple[np.ndarray, np.ndarray]:
+    """各地点 (lat, lon) の最近傍グリッドインデックス"""
+    pts = np.atleast_2d(np.asarray(points, dtype=float))
+    lat_idx = np.abs(lat[None, :] - pts[:, :1]).argmin(axis=1)
+    lon_idx = np.abs(lon[None, :] - pts[:, 1:2]).argmin(axis=1)
+    return lat_idx, lon_idx
+
+
+def extract_points(values: np.ndarray, lat_idx, lon_idx) -> np.ndarray:
+    """(..., lat, lon) → (..., n_points)"""
+    return np.asarray(values[..., lat_idx, lon_idx])
+
+
+def exceedance_fraction(values: np.ndarray, threshold: float, axis: int = 0) -> np.ndarray:
+    """threshold を超えた割合（NaN は分母から除外）"""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    above = (np.where(valid, values, -np.inf) > threshold).sum(axis=axis)
+    return np.divide(above, count, out=np.full(np.shape(count), np.nan), where=count > 0)
+
+
+def pearson(a, b) -> float:
+    """NaN を含む組を除いた相関係数（有効数 < 2 なら 0）"""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    ok = ~(np.isnan(a) | np.isnan(b))
+    if ok.sum() < 2:
+        return 0.0
+    return float(np.corrcoef(a[ok], b[ok])[0, 1])
@@ -4,78 +4,19 @@
 稚内ラジオゾンデデータ一括取得（最適化版）
 
 2024年夏（6-8月）のデータを1週間ごとにバッチ取得
+解析済みプロファイルは radiosonde_cache/ に保存され、再実行時は未取得分のみ取得
 """
 
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
-import time
-import re
-
-WAKKANAI_STATION = "47401"
-WYOMING_URL = "http://weather.uwyo.edu/cgi-bin/sounding"
-
-def fetch_radiosonde(station, year, month, day, hour):
-    """Wyoming大学からラジオゾンデデータを取得"""
-    params = {
-        'region': 'np',
-        'TYPE': 'TEXT:LIST',
-        'YEAR': year,
-        'MONTH': f'{month:02d}',
-        'FROM': f'{day:02d}{hour:02d}',
-        'TO': f'{day:02d}{hour:02d}',
-        'STNM': station
-    }
 
-    try:
-        response = requests.get(WYOMING_URL, params=params, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except Exception as e:
-        return None
+from radiosonde_store import (WAKKANAI_STATION, RadiosondeFetcher, parse_sounding,
+                              profile_records)
 
 def parse_radiosonde(text):
-    """ラジオゾンデHTMLテキストを解析"""
-    if not text or "Can't get" in text or "No data" in text:
-        return None
-
-    lines = text.split('\n')
-
-    # データ部分を抽出
-    data = []
-    in_data = False
-
-    for line in lines:
-        # データセクション開始
-        if 'PRES' in line and 'HGHT' in line and 'TEMP' in line:
-            in_data = True
-            continue
-
-        # データセクション終了
-        if in_data and ('</PRE>' in line or 'Station information' in line):
-            break
-
-        if in_data and line.strip() and not line.strip().startswith('-'):
-            parts = line.split()
-            if len(parts) >= 11:
-                try:
-                    data.append({
-                        'pres': float(parts[0]),
-                        'hght': float(parts[1]),
-                        'temp': float(parts[2]) if parts[2] != '' else None,
-                        'dwpt': float(parts[3]) if parts[3] != '' else None,
-                        'relh': float(parts[4]) if parts[4] != '' else None,
-                        'mixr': float(parts[5]) if parts[5] != '' else None,
-                        'drct': float(parts[6]) if parts[6] != '' else None,
-                        'sknt': float(parts[7]) if parts[7] != '' else None,
-                        'thta': float(parts[8]) if parts[8] != '' else None,
-                        'thte': float(parts[9]) if parts[9] != '' else None,
-                        'thtv': float(parts[10]) if parts[10] != '' else None
-                    })
-                except (ValueError, IndexError):
-                    continue
-
-    return data if data else None
+    """ラジオゾンデHTMLテキストを解析（行ごとの dict のリスト）"""
+    profile = parse_sounding(text)
+    return profile_records(profile) if profile else None
 
 def get_level(data, target_pres):
     """特定気圧面のデータを取得（補間）"""
@@ -118,39 +59,31 @@ def get_level(data, target_pres):
 
     return None
 
-def fetch_period(start_date, end_date):
-    """期間のデータを取得"""
+def fetch_period(start_date, end_date, fetcher=None):
+    """期間のデータを取得（未取得分のみ並列ダウンロード、解析済みキャッシュから集計）"""
+    fetcher = fetcher or RadiosondeFetcher()
+
+    def report(when, outcome):
+        print(f"  {when.strftime('%Y-%m-%d')} {outcome}", flush=True)
+
+    stats = fetcher.fetch_range(WAKKANAI_STATION, start_date, end_date, hours=(0,), progress=report)
+    print(f"  cached={stats['cached']} fetched={stats['fetched']} "
+          f"no-data={stats['missing']} failed={stats['failed']}")
+
     results = []
-    current = start_date
-
-    while current <= end_date:
-        date_str = current.strftime('%Y-%m-%d')
-        print(f"{date_str}...", end=" ", flush=True)
-
-        text = fetch_radiosonde(WAKKANAI_STATION, current.year, current.month, current.day, 0)
-        data = parse_radiosonde(text) if text else None
-
-        if data:
-            lv500 = get_level(data, 500)
-            lv700 = get_level(data, 700)
-            lv850 = get_level(data, 850)
-
-            results.append({
-                'date': date_str,
-                'time_utc': '00Z',
-                'time_jst': '09:00',
-                'levels': {
-                    '500hPa': lv500,
-                    '700hPa': lv700,
-                    '850hPa': lv850
-                }
-            })
-            print("OK")
-        else:
-            print("No data")
-
-        current += timedelta(days=1)
-        time.sleep(1.5)  # サーバー負荷軽減
+    profiles = fetcher.cache.load_range(WAKKANAI_STATION, start_date, end_date, hours=(0,))
+    for when, profile in sorted(profiles.items()):
+        data = profile_records(profile)
+        results.append({
+            'date': when.strftime('%Y-%m-%d'),
+            'time_utc': '00Z',
+            'time_jst': '09:00',
+            'levels': {
+                '500hPa': get_level(data, 500),
+                '700hPa': get_level(data, 700),
+                '850hPa': get_level(data, 850)
+            }
+        })
 
     return results
 
@@ -167,10 +100,11 @@ def main():
     ]
 
     all_results = []
+    fetcher = RadiosondeFetcher()
 
     for start, end in periods:
         print(f"\nFetching {start.strftime('%Y-%m')}:")
-        results = fetch_period(start, end)
+        results = fetch_period(start, end, fetcher)
         all_results.extend(results)
         print(f"  Collected: {len(results)} observations")
 
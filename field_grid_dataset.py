@@ -0,0 +1,203 @@
+"""Parsed island-grid dataset shared by all /api/analysis/field computations.
+
+start.py's six _compute_*_field() functions used to each take the raw
+Open-Meteo multi-location payload (list of per-point ``{'hourly': {...}}``
+dicts) and walk every point's ``time`` strings again for every variable
+(``startswith(target_date)`` + ``int(t[11:13])``). This module parses one
+payload ONCE into a (point × hour × variable) NumPy cube with a precomputed
+date/hour index, so day-window extraction and the per-point aggregates
+(max/min/mean/sum over the 04-16 JST work window) become array slicing and
+vectorized reductions.
+
+Needs only NumPy, so GitHub Actions jobs and tests can use it without
+importing start.py.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+# 作業時間帯（04〜16時JST）— start.py の旧 _extract_day_window() と同一の窓。
+WORK_WINDOW_START_HOUR = 4
+WORK_WINDOW_END_HOUR = 16
+
+
+def _master_time_axis(payload: list) -> list[str]:
+    """Time axis of the first point that has one (Open-Meteo returns the same
+    axis for every location of a multi-location request)."""
+    for item in payload or []:
+        if not isinstance(item, dict):
+            continue
+        times = (item.get('hourly') or {}).get('time') or []
+        if times:
+            return list(times)
+    return []
+
+
+class FieldGridDataset:
+    """
+    One parsed Open-Meteo grid payload.
+
+    Attributes
+    ----------
+    points    : the grid point dicts (build_rishiri_grid() shape), in payload order
+    variables : hourly variable names, in cube order
+    times     : ISO local-time strings of the shared hour axis
+    dates     : ``YYYY-MM-DD`` per hour (np.ndarray of str)
+    hours     : hour of day per hour (np.ndarray of int)
+    cube      : float64 array (n_points, n_hours, n_variables); NaN = missing
+    present   : bool array (n_points, n_variables); False where the point's
+                payload did not contain the variable at all (failed fetch)
+    """
+
+    def __init__(self, points: list, payload: list, variables):
+        self.points = list(points)
+        self.variables = tuple(variables)
+        self._var_index = {name: k for k, name in enumerate(self.variables)}
+
+        times = _master_time_axis(payload)
+        self.times = tuple(times)
+        self._time_index = {t: k for k, t in enumerate(times)}
+        self.dates = np.array([t[:10] for t in times], dtype='U10')
+        self.hours = np.array([int(t[11:13]) for t in times], dtype=np.int16)
+        self._window_cache: dict = {}
+
+        n_points, n_hours, n_vars = len(self.points), len(times), len(self.variables)
+        cube = np.full((n_points, n_hours, n_vars), np.nan, dtype=np.float64)
+        present = np.zeros((n_points, n_vars), dtype=bool)
+
+        for p, item in enumerate((payload or [])[:n_points]):
+            hourly = (item.get('hourly') if isinstance(item, dict) else None) or {}
+            point_times = hourly.get('time') or []
+            if not point_times:
+                continue
+            # 通常は全地点が同一の時間軸。異なる場合のみ時刻→列の写像を作る。
+            if list(point_times) == times:
+                cols = None
+            else:
+                cols = np.array([self._time_index.get(t, -1) for t in point_times], dtype=np.int64)
+            for name, k in self._var_index.items():
+                values = hourly.get(name)
+                if values is None:
+                    continue
+                present[p, k] = True
+                # dtype=float は None を NaN に変換する
+                arr = np.asarray(values, dtype=np.float64)
+                if cols is None:
+                    m = min(len(arr), n_hours)
+                    cube[p, :m, k] = arr[:m]
+                else:
+                    m = min(len(arr), len(cols))
+                    ok = cols[:m] >= 0
+                    cube[p, cols[:m][ok], k] = arr[:m][ok]
+
+        self.cube = cube
+        self.present = present
+
+    @property
+    def n_points(self) -> int:
+        return self.cube.shape[0]
+
+    @property
+    def n_hours(self) -> int:
+        return self.cube.shape[1]
+
+    def has_data(self) -> bool:
+        """True when at least one point carried a usable hourly series."""
+        return self.n_hours > 0 and bool(self.present.any())
+
+    def series(self, var: str) -> np.ndarray:
+        """(n_points, n_hours) view of one variable (all NaN if unknown)."""
+        k = self._var_index.get(var)
+        if k is None:
+            return np.full((self.n_points, self.n_hours), np.nan)
+        return self.cube[:, :, k]
+
+    def time_index(self, target_time: str) -> int | None:
+        """Column of ``YYYY-MM-DDTHH:00`` on the hour axis, or None."""
+        return self._time_index.get(target_time)
+
+    def at(self, var: str, target_time: str) -> np.ndarray:
+        """(n_points,) values of ``var`` at one hour; NaN where unavailable."""
+        idx = self.time_index(target_time)
+        if idx is None:
+            return np.full(self.n_points, np.nan)
+        return self.series(var)[:, idx]
+
+    def window_columns(self, target_date: str,
+                       start_hour: int = WORK_WINDOW_START_HOUR,
+                       end_hour: int = WORK_WINDOW_END_HOUR) -> np.ndarray:
+        """Hour-axis columns of ``target_date`` between start/end hour (inclusive)."""
+        key = (target_date, start_hour, end_hour)
+        cols = self._window_cache.get(key)
+        if cols is None:
+            mask = (self.dates == target_date) & (self.hours >= start_hour) & (self.hours <= end_hour)
+            cols = np.flatnonzero(mask)
+            self._window_cache[key] = cols
+        return cols
+
+    def window(self, var: str, target_date: str, **kwargs) -> np.ndarray:
+        """(n_points, window_hours) values of ``var`` within the day window."""
+        return self.series(var)[:, self.window_columns(target_date, **kwargs)]
+
+    def window_length(self, var: str, target_date: str, **kwargs) -> np.ndarray:
+        """(n_points,) number of window hours per point — 0 where the point's
+        payload lacked ``var`` (mirrors ``len()`` of the old per-point lists)."""
+        k = self._var_index.get(var)
+        width = len(self.window_columns(target_date, **kwargs))
+        if k is None:
+            return np.zeros(self.n_points, dtype=np.int64)
+        return np.where(self.present[:, k], width, 0)
+
+
+# ── NaN-aware reductions ──────────────────────────────────────────────────────
+# np.nanmax 等は全NaN行で RuntimeWarning を出し、np.nansum は全NaN行で 0 を
+# 返してしまう。旧 _safe_max/_safe_avg/_safe_sum（「有効値が無ければ None」）と
+# 同じ意味を保つため、全NaN行は NaN のまま返す。
+
+def nanmax(values: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Max ignoring NaN; NaN where every value is NaN (or the axis is empty)."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[axis] == 0:
+        return np.full(np.delete(values.shape, axis if axis >= 0 else values.ndim + axis), np.nan)
+    return np.fmax.reduce(values, axis=axis)
+
+
+def nanmin(values: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Min ignoring NaN; NaN where every value is NaN (or the axis is empty)."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[axis] == 0:
+        return np.full(np.delete(values.shape, axis if axis >= 0 else values.ndim + axis), np.nan)
+    return np.fmin.reduce(values, axis=axis)
+
+
+def nansum(values: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Sum ignoring NaN; NaN (not 0) where every value is NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    return np.where(valid.any(axis=axis), total, np.nan)
+
+
+def nanmean(values: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Mean ignoring NaN; NaN where every value is NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    out = np.full(np.shape(total), np.nan)
+    np.divide(total, count, out=out, where=count > 0)
+    return out
+
+
+def to_optional(value) -> float | None:
+    """NumPy scalar → Python float, NaN → None (JSON/legacy-helper friendly)."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def to_optional_list(values) -> list:
+    """1-D array → list of float | None (NaN → None)."""
+    return [to_optional(v) for v in np.asarray(values, dtype=np.float64).ravel()]
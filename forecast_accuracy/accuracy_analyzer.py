@@ -12,7 +12,7 @@ from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional
 
 from config import IZUMI_SPOTS, DRYING_THRESHOLDS, DB_PATH, LOG_FORMAT, LOG_LEVEL
-from database import get_connection
+from database import create_views, get_connection
 
 # ロギング設定
 logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
@@ -268,10 +268,22 @@ def save_analysis_to_db(spot_name: str, target_date: date, days_ahead: int,
         conn.close()
 
 
+def _spot_filter(conn, spots: List[Dict]) -> None:
+    """対象干場名を一時テーブル temp.analysis_spots に入れる（SQL側で結合・絞り込み）"""
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS analysis_spots (spot_name TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM temp.analysis_spots')
+    conn.executemany('INSERT OR IGNORE INTO temp.analysis_spots (spot_name) VALUES (?)',
+                     [(spot['name'],) for spot in spots])
+
+
 def analyze_accuracy(target_date: date = None, spots: List[Dict] = None) -> Dict:
     """
     指定日の予報精度を分析
 
+    予報×実測の突合と誤差計算は forecast_vs_actual ビュー（database.create_views()）で
+    行い、全干場×1-6日先の結果を INSERT ... SELECT で一括保存、日数別の統計も
+    1本の GROUP BY クエリで求める。
+
     Parameters:
         target_date: 対象日（Noneの場合は昨日）
         spots: 干場リスト（Noneの場合はconfig.IZUMI_SPOTSを使用）
@@ -305,55 +317,120 @@ def analyze_accuracy(target_date: date = None, spots: List[Dict] = None) -> Dict
         'failed_analyses': 0,
         'by_days_ahead': {},
     }
+    expected = len({spot['name'] for spot in spots}) * 6
 
-    # 各干場、各予報日数（1-6日先）について分析
-    for spot in spots:
-        for days_ahead in range(1, 7):
-            # 予報データを取得
-            forecast = get_forecast_data(spot['name'], target_date, days_ahead)
-
-            if not forecast:
-                logger.debug(f"No forecast for {spot['name']}, {days_ahead}d ahead")
-                stats['failed_analyses'] += 1
-                continue
-
-            # 誤差計算
-            errors = calculate_errors(forecast, actual)
-
-            # 分析結果を保存
-            success = save_analysis_to_db(spot['name'], target_date, days_ahead, errors, forecast, actual)
+    conn = get_connection()
+    try:
+        with conn:
+            create_views(conn.cursor())
+            _spot_filter(conn, spots)
+            conn.execute('''
+                INSERT OR REPLACE INTO accuracy_analysis (
+                    analysis_date, spot_name, target_date, days_ahead,
+                    temp_max_error, temp_min_error, humidity_error, wind_error,
+                    precipitation_forecast, precipitation_actual, precipitation_hit,
+                    drying_forecast_score, drying_possible_forecast,
+                    drying_possible_actual, forecast_correct
+                )
+                SELECT ?, v.spot_name, v.target_date, v.days_ahead,
+                       v.temp_max_error, v.temp_min_error, v.humidity_error, v.wind_error,
+                       v.precipitation_forecast, v.precipitation_actual, v.precipitation_hit,
+                       v.drying_forecast_score, v.drying_possible_forecast,
+                       v.drying_possible_actual, v.forecast_correct
+                FROM forecast_vs_actual v
+                JOIN temp.analysis_spots s ON s.spot_name = v.spot_name
+                WHERE v.target_date = ? AND v.days_ahead BETWEEN 1 AND 6
+            ''', (date.today().isoformat(), target_date.isoformat()))
+
+            rows = conn.execute('''
+                SELECT v.days_ahead, COUNT(*), SUM(v.forecast_correct), SUM(v.precipitation_hit)
+                FROM forecast_vs_actual v
+                JOIN temp.analysis_spots s ON s.spot_name = v.spot_name
+                WHERE v.target_date = ? AND v.days_ahead BETWEEN 1 AND 6
+                GROUP BY v.days_ahead
+                ORDER BY v.days_ahead
+            ''', (target_date.isoformat(),)).fetchall()
+    except Exception as e:
+        logger.error(f"Error saving analysis to database: {e}")
+        return {
+            'target_date': target_date.isoformat(),
+            'status': 'error',
+            'message': f'Analysis failed: {e}'
+        }
+    finally:
+        conn.close()
 
-            if success:
-                stats['successful_analyses'] += 1
+    for days_ahead, count, correct, hits in rows:
+        stats['by_days_ahead'][days_ahead] = {
+            'count': count,
+            'correct_forecasts': correct or 0,
+            'precipitation_hits': hits or 0,
+        }
+        stats['successful_analyses'] += count
 
-                # 日数別統計
-                if days_ahead not in stats['by_days_ahead']:
-                    stats['by_days_ahead'][days_ahead] = {
-                        'count': 0,
-                        'correct_forecasts': 0,
-                        'precipitation_hits': 0,
-                    }
+    stats['total_analyses'] = stats['successful_analyses']
+    stats['failed_analyses'] = expected - stats['successful_analyses']
+    stats['status'] = 'success'
+    logger.info(f"Analysis completed: {stats}")
 
-                stats['by_days_ahead'][days_ahead]['count'] += 1
+    return stats
 
-                if errors['precipitation_hit']:
-                    stats['by_days_ahead'][days_ahead]['precipitation_hits'] += 1
 
-                # 乾燥可否予報の的中判定
-                drying_possible_forecast = evaluate_drying_possibility(forecast)
-                drying_possible_actual = evaluate_drying_possibility(actual)
-                if drying_possible_forecast == drying_possible_actual:
-                    stats['by_days_ahead'][days_ahead]['correct_forecasts'] += 1
+def summarize_accuracy(start_date: date = None, end_date: date = None,
+                       spots: List[Dict] = None) -> Dict[int, Dict]:
+    """
+    期間内の予報精度を日数先ごとに集計（MAE・バイアス・的中率、単一の GROUP BY）
 
-            else:
-                stats['failed_analyses'] += 1
+    Parameters:
+        start_date / end_date: 対象日の範囲（None は無制限）
+        spots: 干場リスト（None は全干場）
 
-            stats['total_analyses'] += 1
+    Returns:
+        {days_ahead: {'count', 'temp_max_mae', 'temp_max_bias', ..., 'drying_hit_rate'}}
+    """
+    metrics = ('temp_max', 'temp_min', 'humidity', 'wind')
+    select = ', '.join(
+        f'AVG(v.{m}_error), AVG(v.{m}_bias)' for m in metrics
+    )
+    where = ['v.days_ahead BETWEEN 1 AND 6']
+    params: list = []
+    if start_date is not None:
+        where.append('v.target_date >= ?')
+        params.append(start_date.isoformat())
+    if end_date is not None:
+        where.append('v.target_date <= ?')
+        params.append(end_date.isoformat())
 
-    stats['status'] = 'success'
-    logger.info(f"Analysis completed: {stats}")
+    conn = get_connection()
+    try:
+        with conn:
+            create_views(conn.cursor())
+            join = ''
+            if spots is not None:
+                _spot_filter(conn, spots)
+                join = 'JOIN temp.analysis_spots s ON s.spot_name = v.spot_name'
+            rows = conn.execute(f'''
+                SELECT v.days_ahead, COUNT(*), {select},
+                       AVG(v.precipitation_hit), AVG(v.forecast_correct)
+                FROM forecast_vs_actual v
+                {join}
+                WHERE {' AND '.join(where)}
+                GROUP BY v.days_ahead
+                ORDER BY v.days_ahead
+            ''', params).fetchall()
+    finally:
+        conn.close()
 
-    return stats
+    summary = {}
+    for row in rows:
+        entry = {'count': row[1]}
+        for k, m in enumerate(metrics):
+            entry[f'{m}_mae'] = row[2 + 2 * k]
+            entry[f'{m}_bias'] = row[3 + 2 * k]
+        entry['precipitation_hit_rate'] = row[-2]
+        entry['drying_hit_rate'] = row[-1]
+        summary[row[0]] = entry
+    return summary
 
 
 def main():
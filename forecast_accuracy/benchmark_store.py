@@ -0,0 +1,105 @@
+"""
+Forecast accuracy store benchmark
+
+合成の1年分データ（干場×365日×1-6日先の予報＋アメダス実測）を一時DBに
+投入し、一括保存・日次分析・期間集計の所要時間を計測する。
+
+使い方:
+    python benchmark_store.py              # 334干場 × 365日
+    python benchmark_store.py --spots 12 --days 30
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import database
+
+
+def synthetic_spots(n: int) -> List[Dict]:
+    """ベンチマーク用の干場リスト（名前のみ使用）"""
+    return [{'name': f'H_{1000 + i:04d}_{2000 + i:04d}', 'lat': 45.1, 'lon': 141.2} for i in range(n)]
+
+
+def seed_synthetic_year(spots: List[Dict], start: date, days: int = 365, seed: int = 0) -> Dict[str, int]:
+    """
+    database.DB_PATH に合成データを投入
+
+    Returns:
+        {'forecast_rows': ..., 'actual_rows': ...}
+    """
+    rng = random.Random(seed)
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO amedas_actual (
+                    observation_date, temp_max, temp_min, humidity_min,
+                    wind_speed_avg, wind_speed_max, precipitation, sunshine_hours
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                ((start + timedelta(days=d)).isoformat(),
+                 rng.uniform(10, 28), rng.uniform(2, 18), rng.uniform(45, 100),
+                 rng.uniform(0, 8), rng.uniform(2, 15),
+                 rng.choice([0.0, 0.0, 0.0, rng.uniform(0.5, 20)]), rng.uniform(0, 12))
+                for d in range(days)
+            ])
+    finally:
+        conn.close()
+
+    rows = []
+    for d in range(days):
+        target = start + timedelta(days=d)
+        for spot in spots:
+            for days_ahead in range(1, 7):
+                rows.append((
+                    spot['name'], (target - timedelta(days=days_ahead)).isoformat(), target.isoformat(), days_ahead,
+                    rng.uniform(10, 28), rng.uniform(2, 18), rng.uniform(45, 100), rng.uniform(0, 8),
+                    rng.choice([0.0, 0.0, rng.uniform(0.1, 15)]), rng.uniform(0, 100), 'low', '{}',
+                ))
+    database.save_forecast_rows(rows)
+    return {'forecast_rows': len(rows), 'actual_rows': days}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Forecast accuracy store benchmark')
+    parser.add_argument('--spots', type=int, default=334)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    import accuracy_analyzer
+
+    spots = synthetic_spots(args.spots)
+    start = date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_database()
+
+        t0 = time.perf_counter()
+        counts = seed_synthetic_year(spots, start, args.days)
+        t_seed = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for d in range(min(args.days, 7)):
+            accuracy_analyzer.analyze_accuracy(start + timedelta(days=d), spots)
+        t_analyze = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        summary = accuracy_analyzer.summarize_accuracy(start, start + timedelta(days=args.days - 1), spots)
+        t_summary = time.perf_counter() - t0
+
+    print(f"Seeded {counts['forecast_rows']} forecast rows / {counts['actual_rows']} actual days "
+          f"in {t_seed:.2f}s")
+    print(f"analyze_accuracy() x {min(args.days, 7)} days ({args.spots} spots x 6 horizons): {t_analyze:.2f}s")
+    print(f"summarize_accuracy() over {args.days} days: {t_summary:.2f}s")
+    for days_ahead, entry in summary.items():
+        print(f"  {days_ahead}d: n={entry['count']} temp_max MAE={entry['temp_max_mae']:.2f} "
+              f"bias={entry['temp_max_bias']:+.2f} drying hit={entry['drying_hit_rate']:.3f}")
+
+
+if __name__ == '__main__':
+    main()
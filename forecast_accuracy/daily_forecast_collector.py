@@ -15,7 +15,10 @@ from typing import List, Dict, Optional
 import time
 
 from config import IZUMI_SPOTS, FORECAST_API_BASE, DB_PATH, LOG_FORMAT, LOG_LEVEL
-from database import get_connection
+from database import FORECAST_SUMMARY_COLUMNS, save_forecast_rows
+
+# 何干場分の予報をまとめて1トランザクションで書き込むか
+WRITE_CHUNK_SPOTS = 50
 
 # ロギング設定
 logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
@@ -103,6 +106,39 @@ def extract_daily_summary(forecast_day: Dict) -> Dict:
     }
 
 
+def build_forecast_rows(spot_name: str, forecast_date: date, forecast_data: Dict) -> List[tuple]:
+    """
+    予報データを forecast_archive の行タプルに変換（1-6日先、0日目は除外）
+
+    Parameters:
+        spot_name: 干場名
+        forecast_date: 予報発表日
+        forecast_data: 予報データ
+
+    Returns:
+        database.save_forecast_rows() に渡す行のリスト
+    """
+    rows = []
+    for forecast_day in forecast_data.get('forecasts', [])[1:7]:  # Index 1-6 (1-6日先)
+        target_date_str = forecast_day.get('date')
+        days_ahead = forecast_day.get('day_number')
+
+        if not target_date_str or days_ahead is None:
+            continue
+
+        # 日次サマリーを抽出
+        summary = extract_daily_summary(forecast_day)
+        rows.append((
+            spot_name,
+            forecast_date.isoformat(),
+            target_date_str,
+            days_ahead,
+            *(summary[c] for c in FORECAST_SUMMARY_COLUMNS),
+            json.dumps(forecast_day, ensure_ascii=False),
+        ))
+    return rows
+
+
 def save_forecast_to_db(spot_name: str, forecast_date: date, forecast_data: Dict) -> int:
     """
     予報データをデータベースに保存
@@ -115,60 +151,12 @@ def save_forecast_to_db(spot_name: str, forecast_date: date, forecast_data: Dict
     Returns:
         保存した件数
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    saved_count = 0
-
     try:
-        forecasts = forecast_data.get('forecasts', [])
-
-        # 1-6日先の予報を保存（0日目は除外）
-        for forecast_day in forecasts[1:7]:  # Index 1-6 (1-6日先)
-            target_date_str = forecast_day.get('date')
-            days_ahead = forecast_day.get('day_number')
-
-            if not target_date_str or days_ahead is None:
-                continue
-
-            # 日次サマリーを抽出
-            summary = extract_daily_summary(forecast_day)
-
-            # データベースに保存（重複時は更新）
-            cursor.execute('''
-                INSERT OR REPLACE INTO forecast_archive (
-                    spot_name, forecast_date, target_date, days_ahead,
-                    temp_max, temp_min, humidity_min, wind_speed_avg,
-                    precipitation, drying_score, risk_level, forecast_data_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                spot_name,
-                forecast_date.isoformat(),
-                target_date_str,
-                days_ahead,
-                summary['temp_max'],
-                summary['temp_min'],
-                summary['humidity_min'],
-                summary['wind_speed_avg'],
-                summary['precipitation'],
-                summary['drying_score'],
-                summary['risk_level'],
-                json.dumps(forecast_day, ensure_ascii=False)
-            ))
-
-            saved_count += 1
-            logger.debug(f"Saved forecast: {spot_name}, target={target_date_str}, days_ahead={days_ahead}")
-
-        conn.commit()
-        logger.info(f"Saved {saved_count} forecast records for {spot_name}")
-
+        saved_count = save_forecast_rows(build_forecast_rows(spot_name, forecast_date, forecast_data))
     except Exception as e:
         logger.error(f"Error saving forecast to database: {e}")
-        conn.rollback()
         raise
-
-    finally:
-        conn.close()
-
+    logger.info(f"Saved {saved_count} forecast records for {spot_name}")
     return saved_count
 
 
@@ -195,27 +183,42 @@ def collect_daily_forecasts(spots: List[Dict] = None) -> Dict[str, int]:
         'total_records_saved': 0,
     }
 
-    for spot in spots:
+    # 取得した予報は WRITE_CHUNK_SPOTS 干場ごとに単一トランザクションで一括保存
+    pending_rows: List[tuple] = []
+    pending_spots: List[str] = []
+
+    def flush():
+        if not pending_spots:
+            return
+        try:
+            stats['total_records_saved'] += save_forecast_rows(pending_rows)
+            stats['successful_spots'] += len(pending_spots)
+        except Exception as e:
+            logger.error(f"Failed to save forecasts for {len(pending_spots)} spots: {e}")
+            stats['failed_spots'] += len(pending_spots)
+        pending_rows.clear()
+        pending_spots.clear()
+
+    for i, spot in enumerate(spots):
         logger.info(f"Processing spot: {spot['name']}")
 
         # 予報データ取得
         forecast_data = fetch_forecast_for_spot(spot)
 
         if forecast_data:
-            # データベースに保存
-            try:
-                saved_count = save_forecast_to_db(spot['name'], forecast_date, forecast_data)
-                stats['successful_spots'] += 1
-                stats['total_records_saved'] += saved_count
-            except Exception as e:
-                logger.error(f"Failed to save forecast for {spot['name']}: {e}")
-                stats['failed_spots'] += 1
+            pending_rows.extend(build_forecast_rows(spot['name'], forecast_date, forecast_data))
+            pending_spots.append(spot['name'])
+            if len(pending_spots) >= WRITE_CHUNK_SPOTS:
+                flush()
         else:
             logger.error(f"Failed to fetch forecast for {spot['name']}")
             stats['failed_spots'] += 1
 
-        # API負荷軽減のため少し待機
-        time.sleep(1)
+        # API負荷軽減のため少し待機（/api/forecast は 60回/分 制限）
+        if i < len(spots) - 1:
+            time.sleep(1)
+
+    flush()
 
     logger.info(f"Collection completed: {stats}")
     return stats
@@ -6,9 +6,17 @@ import sqlite3
 from datetime import datetime
 import os
 
+from config import DRYING_THRESHOLDS
+
 # Database path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'forecast_accuracy.db')
 
+# 予報アーカイブの列（forecast_data_json 以外）— 一括保存・突合ビューで共用
+FORECAST_SUMMARY_COLUMNS = (
+    'temp_max', 'temp_min', 'humidity_min', 'wind_speed_avg',
+    'precipitation', 'drying_score', 'risk_level',
+)
+
 def init_database():
     """Initialize the database with required tables"""
     conn = sqlite3.connect(DB_PATH)
@@ -35,10 +43,14 @@ def init_database():
         )
     ''')
 
-    # Index for faster queries
+    # Covering index: 対象日×日数先の突合・集計をテーブル本体に触れずに済ませる
+    # （旧 idx_forecast_target(target_date, days_ahead) はこの先頭列と重複）
+    cursor.execute('DROP INDEX IF EXISTS idx_forecast_target')
     cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_forecast_target
-        ON forecast_archive(target_date, days_ahead)
+        CREATE INDEX IF NOT EXISTS idx_forecast_target_covering
+        ON forecast_archive(target_date, days_ahead, spot_name,
+                            temp_max, temp_min, humidity_min, wind_speed_avg,
+                            precipitation, drying_score)
     ''')
 
     # Table 2: amedas_actual
@@ -88,14 +100,91 @@ def init_database():
         ON accuracy_analysis(days_ahead, target_date)
     ''')
 
+    create_views(cursor)
+
     conn.commit()
     conn.close()
 
     print(f"Database initialized: {DB_PATH}")
 
+
+def create_views(cursor):
+    """
+    予報×実測の突合ビューを（再）作成
+
+    forecast_vs_actual: forecast_archive と amedas_actual を対象日で結合し、
+    accuracy_analyzer.calculate_errors() / evaluate_drying_possibility() と
+    同じ定義の誤差・的中判定を1行ずつ計算する。乾燥判定の閾値は
+    config.DRYING_THRESHOLDS をビュー作成時に埋め込むため、閾値変更後は
+    init_database() で作り直す。
+    """
+    t = DRYING_THRESHOLDS
+
+    def drying_possible(alias):
+        return (f"(COALESCE({alias}.precipitation, 0) <= {float(t['precipitation'])}"
+                f" AND COALESCE({alias}.humidity_min, 100) <= {float(t['min_humidity'])}"
+                f" AND COALESCE({alias}.wind_speed_avg, 0) >= {float(t['avg_wind_speed'])})")
+
+    cursor.execute('DROP VIEW IF EXISTS forecast_vs_actual')
+    cursor.execute(f'''
+        CREATE VIEW forecast_vs_actual AS
+        SELECT
+            f.spot_name, f.forecast_date, f.target_date, f.days_ahead,
+            f.temp_max - a.temp_max AS temp_max_bias,
+            f.temp_min - a.temp_min AS temp_min_bias,
+            f.humidity_min - a.humidity_min AS humidity_bias,
+            f.wind_speed_avg - a.wind_speed_avg AS wind_bias,
+            ABS(f.temp_max - a.temp_max) AS temp_max_error,
+            ABS(f.temp_min - a.temp_min) AS temp_min_error,
+            ABS(f.humidity_min - a.humidity_min) AS humidity_error,
+            ABS(f.wind_speed_avg - a.wind_speed_avg) AS wind_error,
+            COALESCE(f.precipitation, 0.0) AS precipitation_forecast,
+            COALESCE(a.precipitation, 0.0) AS precipitation_actual,
+            ((COALESCE(f.precipitation, 0.0) > 0) = (COALESCE(a.precipitation, 0.0) > 0)) AS precipitation_hit,
+            f.drying_score AS drying_forecast_score,
+            {drying_possible('f')} AS drying_possible_forecast,
+            {drying_possible('a')} AS drying_possible_actual,
+            ({drying_possible('f')}) = ({drying_possible('a')}) AS forecast_correct
+        FROM forecast_archive f
+        JOIN amedas_actual a ON a.observation_date = f.target_date
+    ''')
+
+
 def get_connection():
-    """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+    """Get database connection (WAL: 収集・分析の書き込み中も読み取りをブロックしない)"""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def save_forecast_rows(rows) -> int:
+    """
+    forecast_archive へ一括保存（単一トランザクション＋executemany、重複時は更新）
+
+    Parameters:
+        rows: (spot_name, forecast_date, target_date, days_ahead,
+               *FORECAST_SUMMARY_COLUMNS, forecast_data_json) のタプル列
+
+    Returns:
+        保存した件数
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    columns = ('spot_name', 'forecast_date', 'target_date', 'days_ahead',
+               *FORECAST_SUMMARY_COLUMNS, 'forecast_data_json')
+    conn = get_connection()
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO forecast_archive ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+    finally:
+        conn.close()
+    return len(rows)
 
 if __name__ == '__main__':
     init_database()
@@ -13,7 +13,7 @@ import matplotlib.tri as tri
 from matplotlib.colors import ListedColormap, BoundaryNorm
 from matplotlib.patches import Polygon
 import seaborn as sns
-from scipy.interpolate import griddata, RectBivariateSpline
+from scipy.interpolate import RectBivariateSpline
 from scipy.ndimage import gaussian_filter
 import pandas as pd
 from dataclasses import dataclass
@@ -25,6 +25,7 @@ from datetime import datetime
 
 from multi_source_weather_api import WeatherDataPoint, MultiSourceWeatherAPI
 from terrain_database import RishiriTerrainDatabase, TerrainPoint
+from isoline_grid import ObservationLayout, terrain_elevation_raster
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -104,6 +105,12 @@ class IsolineAnalysisEngine:
         
         # 解析グリッド設定
         self.analysis_grid = self._create_analysis_grid()
+
+        # 格子ごとの地形標高・観測点配置ごとの補間ジオメトリ（パラメータ・時刻間で再利用）
+        self._terrain_elevation = None
+        self._terrain_signature = None
+        self._layouts: Dict[bytes, ObservationLayout] = {}
+        self._max_layouts = 8
         
     def _create_analysis_grid(self) -> Tuple[np.ndarray, np.ndarray]:
         """解析用グリッド作成"""
@@ -187,26 +194,9 @@ class IsolineAnalysisEngine:
                                 lon_grid: np.ndarray, parameter: str) -> np.ndarray:
         """地形効果を考慮した補間"""
         
-        # 基本補間
-        points_obs = np.column_stack((lats_obs, lons_obs))
-        grid_points = np.column_stack((lat_grid.ravel(), lon_grid.ravel()))
-        
-        # RBF補間（Radial Basis Function）
-        interpolated = griddata(points_obs, values_obs, grid_points, method='cubic')
-        
-        # NaN値を線形補間で補完
-        nan_mask = np.isnan(interpolated)
-        if np.any(nan_mask):
-            interpolated_linear = griddata(points_obs, values_obs, grid_points, method='linear')
-            interpolated[nan_mask] = interpolated_linear[nan_mask]
-        
-        # まだNaN値があれば最近傍で補完
-        nan_mask = np.isnan(interpolated)
-        if np.any(nan_mask):
-            interpolated_nearest = griddata(points_obs, values_obs, grid_points, method='nearest')
-            interpolated[nan_mask] = interpolated_nearest[nan_mask]
-        
-        interpolated_2d = interpolated.reshape(lat_grid.shape)
+        # 基本補間: cubic → linear → nearest（三角形分割・KD木は観測点配置ごとに再利用）
+        layout = self._observation_layout(lats_obs, lons_obs, lat_grid, lon_grid)
+        interpolated_2d = layout.interpolate(values_obs)
         
         # 地形効果補正
         if parameter in ['temperature', 'pressure']:
@@ -222,50 +212,46 @@ class IsolineAnalysisEngine:
     def _apply_terrain_correction(self, field: np.ndarray, lat_grid: np.ndarray, 
                                 lon_grid: np.ndarray, parameter: str) -> np.ndarray:
         """地形効果補正"""
-        corrected_field = field.copy()
-        
-        for i in range(lat_grid.shape[0]):
-            for j in range(lat_grid.shape[1]):
-                lat, lon = lat_grid[i, j], lon_grid[i, j]
-                
-                # 地形情報取得
-                terrain_info = self.terrain_db.get_terrain_at_point(lat, lon)
-                if terrain_info is None:
-                    continue
-                
-                # 標高による補正
-                if parameter == 'temperature':
-                    # 気温逓減率: 100mあたり約0.6度
-                    elevation_correction = -terrain_info.elevation * 0.006
-                    corrected_field[i, j] += elevation_correction
-                
-                elif parameter == 'pressure':
-                    # 気圧の高度補正: 100mあたり約12hPa
-                    elevation_correction = -terrain_info.elevation * 0.12
-                    corrected_field[i, j] += elevation_correction
-        
-        return corrected_field
-    
+        elevation = np.nan_to_num(self._terrain_elevation_grid(lat_grid, lon_grid), nan=0.0)
+
+        if parameter == 'temperature':
+            # 気温逓減率: 100mあたり約0.6度
+            return field - elevation * 0.006
+        if parameter == 'pressure':
+            # 気圧の高度補正: 100mあたり約12hPa
+            return field - elevation * 0.12
+        return field.copy()
+
+    def _terrain_elevation_grid(self, lat_grid: np.ndarray, lon_grid: np.ndarray) -> np.ndarray:
+        """格子の地形標高（解析グリッドはメモリ＋ディスクにキャッシュ、DB更新で作り直す）"""
+        lat_grid_a, lon_grid_a = self.analysis_grid
+        if not (lat_grid is lat_grid_a and lon_grid is lon_grid_a):
+            return terrain_elevation_raster(self.terrain_db, lat_grid, lon_grid)
+        signature = self.terrain_db.signature()
+        if self._terrain_elevation is None or self._terrain_signature != signature:
+            self._terrain_elevation = terrain_elevation_raster(self.terrain_db, lat_grid, lon_grid)
+            self._terrain_signature = signature
+        return self._terrain_elevation
+
+    def _observation_layout(self, lats_obs: np.ndarray, lons_obs: np.ndarray,
+                            lat_grid: np.ndarray, lon_grid: np.ndarray) -> ObservationLayout:
+        """観測点配置（＋格子）ごとの ObservationLayout。同じ配置なら作り直さない"""
+        key = b''.join(np.ascontiguousarray(a, dtype=np.float64).tobytes()
+                       for a in (lats_obs, lons_obs, lat_grid, lon_grid))
+        layout = self._layouts.pop(key, None)
+        if layout is None:
+            layout = ObservationLayout(lats_obs, lons_obs, lat_grid, lon_grid)
+        self._layouts[key] = layout  # 末尾 = 最近使用
+        while len(self._layouts) > self._max_layouts:
+            self._layouts.pop(next(iter(self._layouts)))
+        return layout
+
     def _create_quality_mask(self, lat_grid: np.ndarray, lon_grid: np.ndarray,
                            lats_obs: np.ndarray, lons_obs: np.ndarray) -> np.ndarray:
         """データ品質マスク作成"""
-        quality_mask = np.ones_like(lat_grid)
-        
-        # 観測点からの距離に基づく品質スコア
-        for i in range(lat_grid.shape[0]):
-            for j in range(lat_grid.shape[1]):
-                lat, lon = lat_grid[i, j], lon_grid[i, j]
-                
-                # 最近傍観測点との距離
-                distances = np.sqrt((lats_obs - lat)**2 + (lons_obs - lon)**2)
-                min_distance = np.min(distances)
-                
-                # 距離に基づく品質スコア（最大5km）
-                if min_distance > 0.05:  # 5km以上離れている場合
-                    quality_mask[i, j] = max(0.1, 1.0 - (min_distance - 0.05) * 2)
-        
-        return quality_mask
-    
+        # 観測点からの距離に基づく品質スコア（最近傍観測点との距離、5km超で低下）
+        return self._observation_layout(lats_obs, lons_obs, lat_grid, lon_grid).quality_mask()
+
     def generate_isolines(self, weather_field: WeatherField) -> List[IsolineData]:
         """等値線生成"""
         if weather_field is None:
@@ -428,8 +414,7 @@ class IsolineAnalysisEngine:
         slopes = []
         aspects = []
         
-        for lat, lon in zip(sample_lats, sample_lons):
-            terrain_info = self.terrain_db.get_terrain_at_point(lat, lon)
+        for terrain_info in self.terrain_db.get_terrain_at_points(sample_lats, sample_lons):
             if terrain_info:
                 elevations.append(terrain_info.elevation)
                 slopes.append(terrain_info.slope)
@@ -0,0 +1,134 @@
+"""Reusable grid geometry for IsolineAnalysisEngine.
+
+IsolineAnalysisEngine used to redo everything per parameter and timestamp:
+_apply_terrain_correction() looked up the terrain of every 200 m grid cell
+one get_terrain_at_point() call at a time, _interpolate_with_terrain() ran
+griddata() up to three times (cubic → linear → nearest), each building a
+fresh triangulation, and _create_quality_mask() measured the distance from
+every cell to every station in a Python loop. Only the values change between
+calls, so the geometry is built once:
+
+    terrain_elevation_raster()  nearest-terrain-point elevation for every
+                                grid cell, cached in memory and on disk
+                                (isoline_cache/terrain_<hash>.npz, keyed on
+                                the grid and the terrain DB's mtime/size)
+    ObservationLayout           Delaunay triangulation, barycentric weights
+                                of the grid cells and the cKDTree for one
+                                station layout; interpolate() reproduces the
+                                griddata cubic → linear → nearest fallback,
+                                nearest_distance feeds the quality mask
+
+Results are the same as the per-call griddata / per-cell loops.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+
+import numpy as np
+from scipy.interpolate import CloughTocher2DInterpolator
+from scipy.spatial import Delaunay, QhullError, cKDTree
+
+from spot_geometry import BASE_DIR
+
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "isoline_cache")
+
+
+def _grid_key(lat_grid, lon_grid, signature) -> str:
+    h = hashlib.sha1()
+    for a in (lat_grid, lon_grid):
+        a = np.ascontiguousarray(a, dtype=np.float64)
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    h.update(repr(signature).encode())
+    return h.hexdigest()[:16]
+
+
+def terrain_elevation_raster(terrain_db, lat_grid, lon_grid, cache_dir: str | None = DEFAULT_CACHE_DIR) -> np.ndarray:
+    """
+    格子と同じ形の標高配列（最近傍の地形点、地形データなしは NaN）。
+    cache_dir があれば格子＋DB署名ごとに npz で保存し、次回はそれを読む。
+    """
+    signature = terrain_db.signature()
+    path = None
+    if cache_dir and signature is not None:
+        path = os.path.join(cache_dir, f"terrain_{_grid_key(lat_grid, lon_grid, signature)}.npz")
+        if os.path.exists(path):
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    elevation = data["elevation"]
+                if elevation.shape == np.shape(lat_grid):
+                    return elevation
+            except Exception as e:
+                print(f"[isoline] failed to load {path}: {e}")
+
+    elevation = terrain_db.get_elevations_at_points(lat_grid, lon_grid)
+    if path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.tmp.npz"
+            np.savez_compressed(tmp, elevation=elevation)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[isoline] failed to save {path}: {e}")
+    return elevation
+
+
+class ObservationLayout:
+    """観測点配置 1 つぶんの補間ジオメトリ（三角形分割・重心座標・KD木）。"""
+
+    def __init__(self, lats_obs, lons_obs, lat_grid, lon_grid):
+        self.points = np.column_stack((np.asarray(lats_obs, dtype=np.float64),
+                                       np.asarray(lons_obs, dtype=np.float64)))
+        self.grid_shape = np.shape(lat_grid)
+        self.grid_points = np.column_stack((np.ravel(lat_grid), np.ravel(lon_grid)))
+
+        self.tree = cKDTree(self.points)
+        self.nearest_distance, self.nearest_index = self.tree.query(self.grid_points)
+
+        try:
+            self.tri = Delaunay(self.points)
+        except (QhullError, ValueError):
+            # 3点未満・一直線上 → 三角形分割できないので最近傍のみ
+            self.tri = None
+            self.simplex = np.full(len(self.grid_points), -1)
+            return
+        self.simplex = self.tri.find_simplex(self.grid_points)
+        # 線形補間の重心座標（LinearNDInterpolator と同じ計算）
+        inside = self.simplex >= 0
+        transform = self.tri.transform[self.simplex[inside]]
+        b = np.einsum("nij,nj->ni", transform[:, :2], self.grid_points[inside] - transform[:, 2])
+        self._vertices = self.tri.simplices[self.simplex[inside]]
+        self._weights = np.column_stack((b, 1 - b.sum(axis=1)))
+        self._inside = inside
+
+    def cubic(self, values) -> np.ndarray:
+        out = np.full(len(self.grid_points), np.nan)
+        if self.tri is not None:
+            out = CloughTocher2DInterpolator(self.tri, np.asarray(values, dtype=np.float64))(self.grid_points)
+        return out
+
+    def linear(self, values) -> np.ndarray:
+        out = np.full(len(self.grid_points), np.nan)
+        if self.tri is not None:
+            out[self._inside] = (np.asarray(values, dtype=np.float64)[self._vertices] * self._weights).sum(axis=1)
+        return out
+
+    def nearest(self, values) -> np.ndarray:
+        return np.asarray(values, dtype=np.float64)[self.nearest_index]
+
+    def interpolate(self, values) -> np.ndarray:
+        """griddata の cubic → linear → nearest フォールバックと同じ結果（格子の形で返す）"""
+        interpolated = self.cubic(values)
+        nan_mask = np.isnan(interpolated)
+        if nan_mask.any():
+            interpolated[nan_mask] = self.linear(values)[nan_mask]
+        nan_mask = np.isnan(interpolated)
+        if nan_mask.any():
+            interpolated[nan_mask] = self.nearest(values)[nan_mask]
+        return interpolated.reshape(self.grid_shape)
+
+    def quality_mask(self) -> np.ndarray:
+        """最近傍観測点からの距離による品質スコア（0.05° 超で低下、最小 0.1）"""
+        d = self.nearest_distance
+        return np.where(d > 0.05, np.maximum(0.1, 1.0 - (d - 0.05) * 2), 1.0).reshape(self.grid_shape)
@@ -0,0 +1,496 @@
+"""One background scheduler for start.py and the notification systems.
+
+start.py used to start seven daemon threads, each with its own
+sleep-until-time loop (amedas 03:00, LINE 16:00/01:30, forecast snapshot
+16:20, integrity check 05:00, nowcast every 10 min, warm-start snapshot every
+15 min), and notification_system.py / personal_notification_system.py polled
+the global ``schedule`` module every 60 s / 30 s (each calling
+``schedule.clear()``, wiping the other's jobs). With several gunicorn workers
+every worker ran every loop; only some jobs took a per-run Redis lock. This
+module replaces all of them:
+
+    priority queue
+        one heap of (due, priority) entries served by a single runner
+        thread, so heavy jobs (nowcast, forecast snapshot, integrity check)
+        never overlap each other; when several are due, the lower
+        ``priority`` value runs first.
+    leader lease
+        ``leader_only`` jobs run only in the worker holding the lease
+        ``scheduler:leader`` in Redis (SET NX EX, renewed by a heartbeat
+        thread every lease/3 s; each tick is one pipelined request — SET NX
+        + GET, plus EXPIRE while holding the lease — so the default 120 s
+        lease costs ~4-6k Upstash commands per worker per day). If the
+        leader dies, another worker takes
+        the lease within ``lease_seconds`` and runs what the old leader
+        left due (within ``misfire_grace``); each run is claimed with
+        ``SET scheduler:run:<job>:<time> NX`` so a run the old leader
+        already started is not repeated. Without Redis (or while it is
+        unreachable) the lease is an fcntl lock on a local file, i.e. one
+        leader per machine. Per-process jobs (warm-start snapshot) set
+        ``leader_only=False``.
+    jitter / misfire
+        each run is delayed by uniform(0, jitter) s; a run picked up more
+        than ``misfire_grace`` s late (long job ahead of it, suspended host)
+        is skipped as "misfired" (a follower that never became leader
+        records "standby" instead). Periodic jobs coalesce — a late job runs
+        once, never a backlog of missed runs.
+    retries
+        a job that raises or returns False is re-queued ``retry_delay`` s
+        later up to ``retries`` times (jobs with retries receive
+        ``attempt=`` 1, 2, …).
+    history
+        the last ``history_size`` runs per job (status, attempt, duration,
+        error) — see JobScheduler.status().
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: ファイルロックなし → 単一プロセス扱い
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+LEADER_KEY = "scheduler:leader"
+RUN_KEY_PREFIX = "scheduler:run"
+
+
+# ── triggers ─────────────────────────────────────────────────────────────────
+class DailyAt:
+    """毎日 hour:minute（tz の時刻）"""
+
+    def __init__(self, hour: int, minute: int = 0, tz=JST):
+        self.hour, self.minute, self.tz = hour, minute, tz
+
+    @classmethod
+    def parse(cls, hhmm: str, tz=JST) -> "DailyAt":
+        """'16:00' → DailyAt(16, 0)"""
+        parsed = datetime.strptime(hhmm, "%H:%M")
+        return cls(parsed.hour, parsed.minute, tz)
+
+    def next_after(self, ts: float) -> float:
+        now = datetime.fromtimestamp(ts, self.tz)
+        run = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if run <= now:
+            run += timedelta(days=1)
+        return run.timestamp()
+
+    def __str__(self) -> str:
+        return f"daily@{self.hour:02d}:{self.minute:02d}"
+
+
+class Every:
+    """
+    seconds ごと。aligned=True なら tz の時刻の区切り（10分なら :00, :10, …）、
+    False なら前回から seconds 後。hours=(4, 16) なら 04:00〜16:59 の間だけ。
+    """
+
+    def __init__(self, seconds: float, hours: Optional[tuple[int, int]] = None,
+                 aligned: bool = True, tz=JST):
+        if seconds <= 0:
+            raise ValueError("interval must be positive")
+        self.seconds, self.hours, self.aligned, self.tz = seconds, hours, aligned, tz
+
+    def next_after(self, ts: float) -> float:
+        if self.aligned:
+            offset = datetime.fromtimestamp(ts, self.tz).utcoffset().total_seconds()
+            t = ((ts + offset) // self.seconds + 1) * self.seconds - offset
+        else:
+            t = ts + self.seconds
+        if self.hours is None:
+            return t
+        start, end = self.hours
+        dt = datetime.fromtimestamp(t, self.tz)
+        if start <= dt.hour <= end:
+            return t
+        window = dt.replace(hour=start, minute=0, second=0, microsecond=0)
+        if dt.hour > end:
+            window += timedelta(days=1)
+        return window.timestamp()
+
+    def __str__(self) -> str:
+        window = f" {self.hours[0]:02d}-{self.hours[1]:02d}h" if self.hours else ""
+        return f"every {self.seconds:g}s{window}"
+
+
+# ── jobs ─────────────────────────────────────────────────────────────────────
+@dataclass
+class Job:
+    name: str
+    func: Callable[..., Any]
+    trigger: Any
+    priority: int = 100
+    jitter: float = 0.0
+    misfire_grace: float = 300.0
+    retries: int = 0
+    retry_delay: float = 60.0
+    leader_only: bool = True
+    group: Optional[str] = None
+    history: deque = field(default_factory=lambda: deque(maxlen=50))
+    next_run: Optional[float] = None
+    generation: int = 0
+    runs: int = 0
+    failures: int = 0
+
+
+def _iso(ts: Optional[float], tz=JST) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz).isoformat(timespec="seconds") if ts is not None else None
+
+
+class JobScheduler:
+    """優先度つきキュー + リーダーリースのスケジューラ（ジョブは1本のスレッドで順番に実行）"""
+
+    def __init__(self, redis_pipeline: Optional[Callable[[list], Optional[list]]] = None,
+                 lease_seconds: int = 120, lock_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time, rng: Optional[random.Random] = None,
+                 history_size: int = 50, owner: Optional[str] = None, tz=JST):
+        self.redis_pipeline = redis_pipeline
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = max(1.0, lease_seconds / 3)
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), "rishiri_scheduler_leader.lock")
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.history_size = history_size
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.tz = tz
+        self._jobs: dict[str, Job] = {}
+        self._queue: list = []
+        self._deferred: list = []   # 非リーダーのため保留中のエントリ
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._run_lock = threading.Lock()
+        self._lease_until = 0.0
+        self._lease_source: Optional[str] = None
+        self._lock_file = None
+        self._running_job: Optional[str] = None
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+
+    # -- jobs ---------------------------------------------------------------
+    def add_job(self, name: str, func: Callable[..., Any], trigger, **options) -> Job:
+        """name が同じジョブは置き換える。options は Job のフィールド（priority, jitter, …）"""
+        with self._cond:
+            old = self._jobs.get(name)
+            job = Job(name, func, trigger, history=deque(maxlen=self.history_size), **options)
+            if old is not None:
+                job.generation = old.generation + 1
+                job.history.extend(old.history)
+            self._jobs[name] = job
+            self._schedule_next(job, self.clock())
+            self._cond.notify_all()
+        return job
+
+    def remove_job(self, name: str) -> bool:
+        with self._cond:
+            return self._jobs.pop(name, None) is not None
+
+    def remove_group(self, group: str) -> int:
+        with self._cond:
+            names = [n for n, j in self._jobs.items() if j.group == group]
+            for name in names:
+                del self._jobs[name]
+            return len(names)
+
+    def get_job(self, name: str) -> Optional[Job]:
+        return self._jobs.get(name)
+
+    def _push(self, job: Job, scheduled_for: float, attempt: int, delay: float = 0.0) -> float:
+        due = scheduled_for + delay
+        heapq.heappush(self._queue, (due, job.priority, next(self._seq), job, job.generation,
+                                     scheduled_for, attempt))
+        return due
+
+    def _schedule_next(self, job: Job, after: float) -> None:
+        scheduled_for = job.trigger.next_after(after)
+        jitter = self.rng.uniform(0, job.jitter) if job.jitter else 0.0
+        job.next_run = self._push(job, scheduled_for, 1, jitter)
+
+    def _is_current(self, job: Job, generation: int) -> bool:
+        return self._jobs.get(job.name) is job and job.generation == generation
+
+    # -- leader lease -------------------------------------------------------
+    def heartbeat(self) -> bool:
+        """リースを取得・延長する。リーダーなら True"""
+        now = self.clock()
+        if self.redis_pipeline is not None:
+            commands = [
+                ["SET", LEADER_KEY, self.owner, "NX", "EX", self.lease_seconds],
+                ["GET", LEADER_KEY],
+            ]
+            holding = self._lease_source == "redis" and self._lease_until > now
+            if holding:
+                # 保持中は延長も同じリクエストで送る。失効後に他者が取っていた場合は
+                # そのリースを延ばすだけで、GET で他者と分かれば降りる
+                commands.append(["EXPIRE", LEADER_KEY, self.lease_seconds])
+            results = self.redis_pipeline(commands)
+            if results is not None and len(results) == len(commands):
+                if results[0] == "OK":
+                    self._set_leader(now + self.lease_seconds, "redis")
+                elif results[1] == self.owner:
+                    if not holding:
+                        # ローカルでは失効扱いだがキーは自分のまま（Redis 一時障害明けなど）
+                        self.redis_pipeline([["EXPIRE", LEADER_KEY, self.lease_seconds]])
+                    self._set_leader(now + self.lease_seconds, "redis")
+                else:
+                    self._set_leader(0.0, None)
+                return self.is_leader()
+            if self._lease_source == "redis" and self._lease_until > now:
+                return True  # Redis 一時障害: リース期限まではリーダーのまま
+        leader = self._acquire_file_lock()
+        self._set_leader(now + self.lease_seconds if leader else 0.0, "file" if leader else None)
+        return leader
+
+    def _set_leader(self, until: float, source: Optional[str]) -> None:
+        was_leader = self._lease_until > self.clock()
+        self._lease_until, self._lease_source = until, source
+        if (until > self.clock()) != was_leader:
+            logger.info("[scheduler] %s %s leadership (%s)", self.owner,
+                        "acquired" if not was_leader else "lost", source or "-")
+            with self._cond:
+                self._cond.notify_all()
+
+    def _acquire_file_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        if self._lock_file is not None:
+            return True
+        try:
+            f = open(self.lock_path, "a+")
+        except OSError as exc:
+            logger.warning("[scheduler] leader lock file unavailable (%s), running as leader", exc)
+            return True
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+    def is_leader(self) -> bool:
+        return self._lease_until > self.clock()
+
+    def release(self) -> None:
+        """リーダーを降りる（停止時）"""
+        if self.redis_pipeline is not None and self._lease_source == "redis":
+            results = self.redis_pipeline([["GET", LEADER_KEY]])
+            if results and results[0] == self.owner:
+                self.redis_pipeline([["DEL", LEADER_KEY]])
+        if self._lock_file is not None:
+            try:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._lock_file.close()
+                self._lock_file = None
+        self._set_leader(0.0, None)
+
+    # -- running ------------------------------------------------------------
+    def run_pending(self) -> list[dict]:
+        """期限の来たジョブを優先度順に実行し、その記録を返す"""
+        with self._run_lock:
+            now = self.clock()
+            with self._cond:
+                due, self._deferred = self._deferred, []
+                while self._queue and self._queue[0][0] <= now:
+                    due.append(heapq.heappop(self._queue))
+                due.sort(key=lambda e: (e[1], e[0], e[2]))
+            records = []
+            deferred = []
+            for entry in due:
+                _, _, _, job, generation, scheduled_for, attempt = entry
+                if not self._is_current(job, generation):
+                    continue
+                now = self.clock()
+                late = now - entry[0]
+                if job.leader_only and not self.is_leader():
+                    if late > job.misfire_grace:
+                        records.append(self._finish(job, entry, "standby", now, now))
+                    else:
+                        # フェイルオーバーに備え misfire_grace の間は待つ
+                        deferred.append(entry)
+                    continue
+                if late > job.misfire_grace:
+                    records.append(self._finish(job, entry, "misfired", now, now,
+                                                error=f"{late:.0f}s late"))
+                    continue
+                if job.leader_only and not self._claim(job, scheduled_for, attempt):
+                    # フェイルオーバー前のリーダーが実行済み
+                    records.append(self._finish(job, entry, "standby", now, now))
+                    continue
+                records.append(self._execute(job, entry))
+            with self._cond:
+                self._deferred.extend(deferred)
+            return records
+
+    def _claim(self, job: Job, scheduled_for: float, attempt: int) -> bool:
+        """この回を実行済みとして Redis に記録（SET NX）。取れなければ他のリーダーが実行済み"""
+        if self.redis_pipeline is None:
+            return True
+        key = f"{RUN_KEY_PREFIX}:{job.name}:{int(scheduled_for)}:{attempt}"
+        ttl = int(job.misfire_grace + job.jitter + self.lease_seconds) + 1
+        results = self.redis_pipeline([["SET", key, self.owner, "NX", "EX", ttl]])
+        return not results or results[0] == "OK"  # Redis 障害時は実行する
+
+    def _execute(self, job: Job, entry: tuple) -> dict:
+        attempt = entry[6]
+        started = self.clock()
+        self._running_job = job.name
+        error, ok = None, False
+        try:
+            result = job.func(attempt=attempt) if job.retries else job.func()
+            ok = result is not False
+            if not ok:
+                error = "returned False"
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            logger.exception("[scheduler] job %s failed", job.name)
+        finally:
+            self._running_job = None
+        finished = self.clock()
+        if ok:
+            status = "ok"
+        elif attempt <= job.retries:
+            status = "retry"
+        else:
+            status = "failed"
+        return self._finish(job, entry, status, started, finished, error=error)
+
+    def _finish(self, job: Job, entry: tuple, status: str, started: float, finished: float,
+                error: Optional[str] = None) -> dict:
+        _, _, _, _, generation, scheduled_for, attempt = entry
+        record = {
+            "job": job.name,
+            "status": status,
+            "attempt": attempt,
+            "scheduled_for": _iso(scheduled_for, self.tz),
+            "started_at": _iso(started, self.tz),
+            "duration_s": round(finished - started, 3),
+        }
+        if error:
+            record["error"] = error
+        with self._cond:
+            job.history.append(record)
+            if status not in ("misfired", "standby"):
+                job.runs += 1
+            if status in ("retry", "failed"):
+                job.failures += 1
+            if self._is_current(job, generation):
+                if status == "retry":
+                    self._push(job, finished + job.retry_delay, attempt + 1)
+                if attempt == 1:
+                    self._schedule_next(job, max(scheduled_for, finished))
+        log = logger.info if status in ("ok", "standby") else logger.warning
+        log("[scheduler] %s %s (attempt %d, %.1fs)%s", job.name, status, attempt,
+            record["duration_s"], f": {error}" if error else "")
+        return record
+
+    def seconds_until_next(self) -> Optional[float]:
+        with self._cond:
+            while self._queue and not self._is_current(self._queue[0][3], self._queue[0][4]):
+                heapq.heappop(self._queue)
+            return max(0.0, self._queue[0][0] - self.clock()) if self._queue else None
+
+    # -- threads ------------------------------------------------------------
+    def start(self) -> bool:
+        """ランナーとハートビートのスレッドを起動（2回目以降は何もしない）"""
+        with self._cond:
+            if self._threads:
+                return False
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._heartbeat_loop, name="scheduler-heartbeat", daemon=True),
+                threading.Thread(target=self._run_loop, name="scheduler-runner", daemon=True),
+            ]
+        for t in self._threads:
+            t.start()
+        return True
+
+    def stop(self, release: bool = True) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if release:
+            self.release()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.heartbeat()
+            except Exception as exc:
+                logger.warning("[scheduler] heartbeat error: %s", exc)
+            self._stop.wait(self.heartbeat_interval)
+
+    def _run_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as exc:
+                logger.error("[scheduler] runner error: %s", exc)
+            wait = self.seconds_until_next()
+            if wait is None or self._deferred:
+                # 保留中のジョブはリーダー交代（ハートビート）で動けるようになる
+                wait = min(self.heartbeat_interval, wait if wait is not None else self.heartbeat_interval)
+            if wait <= 0:
+                continue
+            with self._cond:
+                if not self._stop.is_set():
+                    self._cond.wait(wait)
+
+    # -- status -------------------------------------------------------------
+    def status(self) -> dict:
+        with self._cond:
+            jobs = sorted(self._jobs.values(), key=lambda j: (j.next_run or 0, j.priority))
+            return {
+                "owner": self.owner,
+                "leader": self.is_leader(),
+                "lease_source": self._lease_source,
+                "lease_until": _iso(self._lease_until, self.tz) if self.is_leader() else None,
+                "running": self.running,
+                "running_job": self._running_job,
+                "jobs": [{
+                    "name": j.name,
+                    "trigger": str(j.trigger),
+                    "priority": j.priority,
+                    "leader_only": j.leader_only,
+                    "group": j.group,
+                    "next_run": _iso(j.next_run, self.tz),
+                    "runs": j.runs,
+                    "failures": j.failures,
+                    "last": j.history[-1] if j.history else None,
+                    "history": list(j.history),
+                } for j in jobs],
+            }
+
+
+_default_scheduler: Optional[JobScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> JobScheduler:
+    """プロセス共通のスケジューラ（Redis は UPSTASH_REDIS_REST_URL/TOKEN から）"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            from rate_limiter import upstash_pipeline_from_env
+            _default_scheduler = JobScheduler(redis_pipeline=upstash_pipeline_from_env())
+        return _default_scheduler
@@ -7,6 +7,153 @@ Based on scientific formulas from Hokkaido research
 import math
 import numpy as np
 
+try:
+    import numba  # 任意: あれば多地点シミュレーションのループを JIT コンパイル
+except ImportError:
+    numba = None
+
+
+# ---------------------------------------------------------------------------
+# 多地点一括シミュレーション（spots × hours 配列）
+#
+# KelpDryingModel.simulate_drying_process() と同じ式・同じ打ち切り条件。
+# Python の max(定数, x) は x が NaN のとき定数を返すため np.fmax を使う。
+# ---------------------------------------------------------------------------
+
+def _saturation_vapor_pressure(temperature):
+    """飽和水蒸気圧（Magnus式）[hPa]"""
+    return 6.112 * np.exp((17.67 * temperature) / (temperature + 243.5))
+
+
+def absolute_humidity_array(temperature, relative_humidity, pressure=1013.25):
+    """calculate_absolute_humidity() の配列版 [kg/kg']"""
+    e = _saturation_vapor_pressure(temperature) * (relative_humidity / 100.0)
+    return 0.622 * e / (pressure - e)
+
+
+def wet_bulb_saturation_humidity_array(temperature, relative_humidity, pressure=1013.25):
+    """calculate_wet_bulb_saturation_humidity() の配列版 [kg/kg']"""
+    wet_bulb_temp = temperature * np.arctan(0.151977 * np.sqrt(relative_humidity + 8.313659)) + \
+        np.arctan(temperature + relative_humidity) - \
+        np.arctan(relative_humidity - 1.676331) + \
+        0.00391838 * (relative_humidity ** 1.5) * np.arctan(0.023101 * relative_humidity) - 4.686035
+    es_wb = _saturation_vapor_pressure(wet_bulb_temp)
+    return 0.622 * es_wb / (pressure - es_wb)
+
+
+def _advance_numpy(temperature, humidity_gap, wind_factor, time_step, initial, target, out):
+    """時間方向のみループし、地点方向はベクトル演算"""
+    n_spots, n_hours = temperature.shape
+    water = np.full(n_spots, float(initial))
+    active = np.ones(n_spots, dtype=bool)
+    steps = np.zeros(n_spots, dtype=np.int64)
+    for j in range(n_hours):
+        equilibrium = np.fmax(8.0, 15.0 - temperature[:, j] * 0.1)
+        free = np.fmax(0.0, water - equilibrium)
+        coeff = np.fmax(0.0, (-0.00134 * free ** 2 + 0.02162 * free) * wind_factor[:, j])
+        rate = np.fmax(0.0, coeff * humidity_gap[:, j])
+        loss = rate * time_step[:, j]
+        water = np.where(active, np.fmax(target, water - loss * 100), water)
+        for name, values in (("water_content", water), ("free_water_content", free),
+                             ("drying_rate", rate), ("water_loss", loss)):
+            out[name][active, j] = values[active]
+        steps += active
+        active &= ~(water <= target)
+        if not active.any():
+            break
+    return steps
+
+
+def _advance_loops(temperature, humidity_gap, wind_factor, time_step, initial, target,
+                   water_out, free_out, rate_out, loss_out, steps):
+    """地点×時間の二重ループ版（numba があれば JIT、結果は _advance_numpy と同一）"""
+    n_spots, n_hours = temperature.shape
+    for i in range(n_spots):
+        water = initial
+        for j in range(n_hours):
+            equilibrium = max(8.0, 15.0 - temperature[i, j] * 0.1)
+            free = max(0.0, water - equilibrium)
+            coeff = max(0.0, (-0.00134 * free ** 2 + 0.02162 * free) * wind_factor[i, j])
+            rate = max(0.0, coeff * humidity_gap[i, j])
+            loss = rate * time_step[i, j]
+            water = max(target, water - loss * 100)
+            water_out[i, j] = water
+            free_out[i, j] = free
+            rate_out[i, j] = rate
+            loss_out[i, j] = loss
+            steps[i] = j + 1
+            if water <= target:
+                break
+
+
+_advance_jit = numba.njit(cache=True)(_advance_loops) if numba is not None else None
+
+
+def simulate_drying_batch(temperature, relative_humidity, wind_speed, time_step=3600,
+                          initial_water_content=300.0, target_water_content=15.0,
+                          pressure=1013.25, backend="auto"):
+    """
+    複数干場の乾燥過程を一括シミュレーション
+
+    Args:
+        temperature, relative_humidity, wind_speed: (spots, hours) 配列
+        time_step: 各ステップの秒数（スカラー or (spots, hours)）
+        initial_water_content: 初期含水率 [% d.b.]
+        target_water_content: 目標含水率 [% d.b.]
+        backend: "auto"（numba があれば JIT）/ "numpy" / "numba"
+
+    Returns:
+        {
+          'water_content', 'free_water_content', 'drying_rate', 'water_loss':
+              (spots, hours)、乾燥完了後の時間は NaN,
+          'steps': 各干場のシミュレーション時間数,
+          'completed_hour': 乾燥完了した時間インデックス（未完了は -1）,
+          'final_water_content': 最終含水率
+        }
+    """
+    temperature = np.atleast_2d(np.asarray(temperature, dtype=float))
+    relative_humidity = np.atleast_2d(np.asarray(relative_humidity, dtype=float))
+    wind_speed = np.atleast_2d(np.asarray(wind_speed, dtype=float))
+    shape = temperature.shape
+    time_step = np.broadcast_to(np.asarray(time_step, dtype=float), shape)
+
+    # 含水率に依存しない項は全地点・全時間まとめて計算
+    humidity_gap = (wet_bulb_saturation_humidity_array(temperature, relative_humidity, pressure) -
+                    absolute_humidity_array(temperature, relative_humidity, pressure))
+    wind_factor = (0.159 * wind_speed + 0.0132) / 0.050
+
+    out = {name: np.full(shape, np.nan) for name in
+           ("water_content", "free_water_content", "drying_rate", "water_loss")}
+    if backend == "numba" and _advance_jit is None:
+        raise RuntimeError("numba is not installed")
+    if backend == "numba" or (backend == "auto" and _advance_jit is not None):
+        steps = np.zeros(shape[0], dtype=np.int64)
+        _advance_jit(temperature, humidity_gap, wind_factor, np.ascontiguousarray(time_step),
+                     float(initial_water_content), float(target_water_content),
+                     out["water_content"], out["free_water_content"], out["drying_rate"],
+                     out["water_loss"], steps)
+    else:
+        steps = _advance_numpy(temperature, humidity_gap, wind_factor, time_step,
+                               float(initial_water_content), float(target_water_content), out)
+
+    rows = np.arange(shape[0])
+    last = np.maximum(steps - 1, 0)
+    final = np.where(steps > 0, out["water_content"][rows, last], float(initial_water_content))
+    out["steps"] = steps
+    out["final_water_content"] = final
+    out["completed_hour"] = np.where((steps > 0) & (final <= target_water_content), last, -1)
+    return out
+
+
+def drying_condition_scores(completed_hour, final_water_content):
+    """evaluate_drying_conditions() の判定（5段階スコア）を配列で"""
+    completed = completed_hour >= 0
+    return np.select(
+        [completed & (completed_hour <= 8), completed & (completed_hour <= 10),
+         final_water_content <= 25, final_water_content <= 50],
+        [5, 4, 3, 2], default=1)
+
+
 class KelpDryingModel:
     """昆布乾燥速度の定量的モデル"""
     
@@ -127,48 +274,37 @@ class KelpDryingModel:
         Returns:
             乾燥シミュレーション結果
         """
+        if not weather_data:
+            return []
+
+        batch = simulate_drying_batch(
+            [[data['temperature'] for data in weather_data]],
+            [[data['relative_humidity'] for data in weather_data]],
+            [[data['wind_speed'] for data in weather_data]],
+            time_step=[[data.get('time_step', 3600) for data in weather_data]],  # デフォルト1時間
+            initial_water_content=initial_water_content,
+            target_water_content=target_water_content,
+        )
+
         results = []
-        current_water_content = initial_water_content
         total_time = 0
-        
-        for i, data in enumerate(weather_data):
-            temp = data['temperature']
-            humidity = data['relative_humidity']
-            wind = data['wind_speed']
-            time_step = data.get('time_step', 3600)  # デフォルト1時間
-            
-            # 自由含水率（簡易モデル：含水率から平衡含水率を差し引いた値）
-            equilibrium_water = max(8.0, 15.0 - temp * 0.1)  # 簡易平衡含水率
-            free_water = max(0, current_water_content - equilibrium_water)
-            
-            # 乾燥速度計算
-            drying_rate = self.calculate_drying_rate(temp, humidity, wind, free_water)
-            
-            # 含水率更新（時間積分）
-            water_loss = drying_rate * time_step
-            current_water_content = max(target_water_content, current_water_content - water_loss * 100)
-            
-            # 結果記録
-            result = {
+        for i in range(int(batch['steps'][0])):
+            data = weather_data[i]
+            current_water_content = float(batch['water_content'][0, i])
+            results.append({
                 'time': total_time,
                 'hour': i,
-                'temperature': temp,
-                'humidity': humidity,
-                'wind_speed': wind,
+                'temperature': data['temperature'],
+                'humidity': data['relative_humidity'],
+                'wind_speed': data['wind_speed'],
                 'water_content': current_water_content,
-                'free_water_content': free_water,
-                'drying_rate': drying_rate,
-                'water_loss': water_loss,
+                'free_water_content': float(batch['free_water_content'][0, i]),
+                'drying_rate': float(batch['drying_rate'][0, i]),
+                'water_loss': float(batch['water_loss'][0, i]),
                 'drying_completed': current_water_content <= target_water_content
-            }
-            results.append(result)
-            
-            total_time += time_step / 3600  # 時間に変換
-            
-            # 目標含水率達成で終了
-            if current_water_content <= target_water_content:
-                break
-        
+            })
+            total_time += data.get('time_step', 3600) / 3600  # 時間に変換
+
         return results
     
     def evaluate_drying_conditions(self, weather_forecast):
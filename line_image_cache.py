@@ -0,0 +1,209 @@
+"""Rendering cache for PIL images sent to LINE (rich menu, image replies).
+
+generate_rich_menu_image() drew the 2500×1686 rich menu from scratch with PIL
+on every /api/line/setup-richmenu call, searching the font list and loading
+the TrueType file again each time, on the single sync worker. This module
+gives every LINE image a cache key and keeps the rendered PNG:
+
+    render_key()          sha256 of the layout spec (JSON, sorted keys), the
+                          font files' (path, mtime_ns, size) and
+                          RENDERER_VERSION — any change re-renders, nothing
+                          else does
+    ImageRenderCache      memory → disk (``line_image_cache/<kind>_<key>.png``)
+                          → Redis (base64, optional) → render; a hit on a
+                          lower tier fills the tiers above it
+    optimize_png()        palette-quantized (≤256 colours, no dither) PNG
+                          with zlib optimize — flat button art loses nothing
+                          visible and the upload to LINE gets smaller
+    resolve_font_path()   the first candidate font Pillow can actually load
+    load_font()           TrueType fonts (and variable-font axes) loaded once
+                          per process per (path, size)
+
+Flask-independent; Pillow is imported lazily (same as line_integration.py).
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+RENDERER_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'line_image_cache')
+REDIS_PREFIX = 'line_img'
+REDIS_TTL = 30 * 24 * 3600
+
+
+def asset_signature(paths: Iterable[str]) -> list:
+    """存在するファイルの [path, mtime_ns, size]（フォントが入れ替わればキーが変わる）"""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        sig.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+    return sig
+
+
+def render_key(kind: str, spec, assets: Iterable[str] = ()) -> str:
+    raw = json.dumps({'kind': kind, 'spec': spec, 'assets': asset_signature(assets),
+                      'version': RENDERER_VERSION}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def resolve_font_path(candidates: Sequence[str]) -> Optional[str]:
+    """
+    候補を順に実際に読み込み、最初に読めたフォントのパス（旧 _try_font と同じ）。
+    存在しても壊れている・Pillow が読めないファイルは飛ばす。
+    """
+    for path in candidates:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if _font_loads(path, st.st_mtime_ns, st.st_size):
+            return path
+    return None
+
+
+@lru_cache(maxsize=64)
+def _font_loads(path: str, mtime_ns: int, size: int) -> bool:
+    """ImageFont.truetype で読めるか（ファイルが変わらない限り1回だけ試す）"""
+    from PIL import ImageFont
+    try:
+        ImageFont.truetype(path, 12)
+        return True
+    except Exception as exc:
+        logger.warning('font load failed %s: %s', path, exc)
+        return False
+
+
+@lru_cache(maxsize=32)
+def load_font(path: Optional[str], size: int, axes: tuple = ()):
+    """
+    TrueType フォントを (path, size) ごとに1回だけ読む。path が None か読めなければ
+    Pillow 内蔵フォント。axes はバリアブルフォントの軸値の候補（先に効いたものを使う）。
+    """
+    from PIL import ImageFont
+    if path:
+        try:
+            font = ImageFont.truetype(path, size)
+            for value in axes:
+                try:
+                    font.set_variation_by_axes([value])
+                    break
+                except Exception:
+                    pass
+            logger.debug('font loaded: %s @ %d', path, size)
+            return font
+        except Exception as exc:
+            logger.warning('font load failed %s: %s', path, exc)
+    try:
+        return ImageFont.load_default(size=size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def optimize_png(img, colors: int = 256) -> bytes:
+    """パレット化（ディザなし）+ optimize で PNG バイト列に"""
+    from PIL import Image
+    if img.mode not in ('RGB', 'RGBA', 'P', 'L'):
+        img = img.convert('RGB')
+    if img.mode in ('RGB', 'RGBA'):
+        method = Image.Quantize.FASTOCTREE
+        img = img.quantize(colors=colors, method=method, dither=Image.Dither.NONE)
+    buf = io.BytesIO()
+    img.save(buf, 'PNG', optimize=True)
+    return buf.getvalue()
+
+
+class ImageRenderCache:
+    """メモリ → ディスク → Redis → 描画 の順に探す PNG キャッシュ"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 redis_get: Optional[Callable[[str], Optional[str]]] = None,
+                 redis_set: Optional[Callable[[str, str, int], bool]] = None,
+                 max_memory_items: int = 16):
+        self.cache_dir = cache_dir
+        self.redis_get = redis_get
+        self.redis_set = redis_set
+        self.max_memory_items = max_memory_items
+        self._memory: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.stats = {'memory': 0, 'disk': 0, 'redis': 0, 'render': 0}
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{kind}_{key}.png')
+
+    def get_or_render(self, kind: str, spec, render: Callable[[], object],
+                      assets: Iterable[str] = ()) -> tuple[bytes, str]:
+        """(PNG バイト列, どこから来たか 'memory'|'disk'|'redis'|'render')"""
+        key = render_key(kind, spec, assets)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self.stats['memory'] += 1
+                return data, 'memory'
+
+            source = 'disk'
+            data = self._read_disk(kind, key)
+            if data is None:
+                source = 'redis'
+                data = self._read_redis(key)
+                if data is not None:
+                    self._write_disk(kind, key, data)
+            if data is None:
+                source = 'render'
+                data = optimize_png(render())
+                self._write_disk(kind, key, data)
+                self._write_redis(key, data)
+            self.stats[source] += 1
+            if len(self._memory) >= self.max_memory_items:
+                self._memory.pop(next(iter(self._memory)))
+            self._memory[key] = data
+            logger.info('line image %s/%s from %s (%d bytes)', kind, key[:8], source, len(data))
+            return data, source
+
+    def _read_disk(self, kind: str, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(kind, key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, kind: str, key: str, data: bytes) -> None:
+        path = self._path(kind, key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f'{path}.tmp{os.getpid()}'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning('line image cache write failed %s: %s', path, exc)
+
+    def _read_redis(self, key: str) -> Optional[bytes]:
+        if self.redis_get is None:
+            return None
+        try:
+            raw = self.redis_get(f'{REDIS_PREFIX}:{key}')
+            return base64.b64decode(raw) if raw else None
+        except Exception as exc:
+            logger.warning('line image cache redis read failed: %s', exc)
+            return None
+
+    def _write_redis(self, key: str, data: bytes) -> None:
+        if self.redis_set is None:
+            return
+        try:
+            self.redis_set(f'{REDIS_PREFIX}:{key}', base64.b64encode(data).decode('ascii'), REDIS_TTL)
+        except Exception as exc:
+            logger.warning('line image cache redis write failed: %s', exc)
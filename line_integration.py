@@ -3334,77 +3334,78 @@ def _build_rich_menu_payload() -> dict:
     }
 
 
-def generate_rich_menu_image(path: str) -> bool:
-    """
-    Generate a 2500×1686 rich menu PNG with 6 colored button areas.
+# Button definitions: (col, row, bg_color, line1, line2)
+# Two-line layout: short top line (大) + detail bottom line (小)
+# 絵文字は除外 — Pillow on Linux ではカラー絵文字フォントが不安定
+_RICH_MENU_BUTTONS = [
+    (0, 0, '#1d4ed8', '今日',     '予報'),
+    (1, 0, '#0369a1', '明日',     '予報'),
+    (2, 0, '#0e7490', '今週',     '予報'),
+    (0, 1, '#15803d', '干し',     '記録'),
+    (1, 1, '#7c3aed', '干場',     '登録'),
+    (2, 1, '#0d9488', 'アプリ',   'を開く'),
+]
 
-    Renders Japanese labels only (no emoji) for maximum compatibility.
-    Font search order:
-      1. Windows Japanese fonts (local dev)
-      2. Linux Noto Sans CJK (Render/Debian — installed via apt-get)
-      3. Pillow built-in bitmap fallback (ASCII short labels)
+# Font search paths — Japanese first, ASCII fallback last
+# static/fonts/NotoSansJP.ttf はリポジトリに同梱済み（最優先）
+_RICH_MENU_FONT_PATHS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'fonts', 'NotoSansJP.ttf'),  # bundled ★
+    'C:/Windows/Fonts/meiryo.ttc',
+    'C:/Windows/Fonts/msgothic.ttc',
+    'C:/Windows/Fonts/YuGothB.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+]
 
-    Returns True on success.
-    """
-    try:
-        from PIL import Image, ImageDraw, ImageFont
-    except ImportError:
-        logger.error('Pillow not installed; cannot generate rich menu image')
-        return False
+_line_image_cache = None
 
-    W, H = _RICH_MENU_W, _RICH_MENU_H
-    BW, BH = W // 3, H // 2
-    BORDER = 8
 
-    # Button definitions: (col, row, bg_color, line1, line2)
-    # Two-line layout: short top line (大) + detail bottom line (小)
-    # 絵文字は除外 — Pillow on Linux ではカラー絵文字フォントが不安定
-    BTNS = [
-        (0, 0, '#1d4ed8', '今日',     '予報'),
-        (1, 0, '#0369a1', '明日',     '予報'),
-        (2, 0, '#0e7490', '今週',     '予報'),
-        (0, 1, '#15803d', '干し',     '記録'),
-        (1, 1, '#7c3aed', '干場',     '登録'),
-        (2, 1, '#0d9488', 'アプリ',   'を開く'),
-    ]
+def _get_line_image_cache():
+    """LINE 画像の描画キャッシュ（line_image_cache.py）。Upstash があれば Redis も使う"""
+    global _line_image_cache
+    if _line_image_cache is None:
+        from line_image_cache import ImageRenderCache  # noqa: PLC0415
+        if _upstash_available():
+            _line_image_cache = ImageRenderCache(
+                redis_get=_upstash_get,
+                redis_set=lambda key, value, ttl: _upstash_set(key, value, ttl=ttl),
+            )
+        else:
+            _line_image_cache = ImageRenderCache()
+    return _line_image_cache
 
-    # Font search paths — Japanese first, ASCII fallback last
-    # static/fonts/NotoSansJP.ttf はリポジトリに同梱済み（最優先）
-    _HERE = os.path.dirname(os.path.abspath(__file__))
-    _FONT_PATHS = [
-        os.path.join(_HERE, 'static', 'fonts', 'NotoSansJP.ttf'),  # bundled ★
-        'C:/Windows/Fonts/meiryo.ttc',
-        'C:/Windows/Fonts/msgothic.ttc',
-        'C:/Windows/Fonts/YuGothB.ttc',
-        '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
-        '/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc',
-        '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
-        '/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc',
-        '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-    ]
 
-    def _try_font(size: int):
-        for fp in _FONT_PATHS:
-            try:
-                f = ImageFont.truetype(fp, size)
-                logger.debug('Rich menu font loaded: %s @ %d', fp, size)
-                # バリアブルフォント: Black(900)を指定して極太に
-                for axes_val in ([900.0], [700.0]):
-                    try:
-                        f.set_variation_by_axes(axes_val)
-                        break
-                    except Exception:
-                        pass
-                return f
-            except Exception:
-                continue
-        try:
-            return ImageFont.load_default(size=size)
-        except Exception:
-            return ImageFont.load_default()
+def _rich_menu_spec() -> dict:
+    """描画結果を決めるもの全部（キャッシュキー）: レイアウト・ボタン・フォント候補"""
+    return {
+        'size': [_RICH_MENU_W, _RICH_MENU_H],
+        'payload': _build_rich_menu_payload()['areas'],
+        'buttons': _RICH_MENU_BUTTONS,
+        'font': _resolve_rich_menu_font(),
+        'font_sizes': [220, 140],
+    }
+
+
+def _resolve_rich_menu_font():
+    from line_image_cache import resolve_font_path  # noqa: PLC0415
+    return resolve_font_path(_RICH_MENU_FONT_PATHS)
+
 
-    font_large = _try_font(220)   # top line — 太字・大きめ
-    font_small = _try_font(140)   # bottom line
+def _render_rich_menu(font_path):
+    """2500×1686 のリッチメニューを PIL で描く（キャッシュミス時のみ呼ばれる）"""
+    from PIL import Image, ImageDraw  # noqa: PLC0415
+    from line_image_cache import load_font  # noqa: PLC0415
+
+    W, H = _RICH_MENU_W, _RICH_MENU_H
+    BW, BH = W // 3, H // 2
+    BORDER = 8
+
+    # バリアブルフォント: Black(900)を指定して極太に
+    font_large = load_font(font_path, 220, (900.0, 700.0))   # top line — 太字・大きめ
+    font_small = load_font(font_path, 140, (900.0, 700.0))   # bottom line
 
     img = Image.new('RGB', (W, H), '#0f172a')
     draw = ImageDraw.Draw(img)
@@ -3422,7 +3423,7 @@ def generate_rich_menu_image(path: str) -> bool:
         except Exception as exc:
             logger.debug('_draw_centered failed for %r: %s', text, exc)
 
-    for col, row, color, line1, line2 in BTNS:
+    for col, row, color, line1, line2 in _RICH_MENU_BUTTONS:
         x1 = col * BW + BORDER
         y1 = row * BH + BORDER
         x2 = (col + 1) * BW - BORDER
@@ -3441,10 +3442,58 @@ def generate_rich_menu_image(path: str) -> bool:
         _draw_centered(line1, font_large, cx, cy - 85)
         _draw_centered(line2, font_small,  cx, cy + 125)
 
-    import os as _os
-    _os.makedirs(_os.path.dirname(path), exist_ok=True)
+    return img
+
+
+def rich_menu_image_bytes() -> 'bytes | None':
+    """
+    リッチメニュー PNG（パレット化済み）。レイアウト・フォントが同じなら
+    メモリ／ディスク／Redis のキャッシュから返し、PIL では描かない。
+    """
     try:
-        img.save(path, 'PNG', optimize=True)
+        import PIL  # noqa: F401, PLC0415
+    except ImportError:
+        logger.error('Pillow not installed; cannot generate rich menu image')
+        return None
+    spec = _rich_menu_spec()
+    data, source = _get_line_image_cache().get_or_render(
+        'rich_menu', spec, lambda: _render_rich_menu(spec['font']),
+        assets=[spec['font']] if spec['font'] else [],
+    )
+    logger.info('rich menu image: %s (%d bytes)', source, len(data))
+    return data
+
+
+def generate_rich_menu_image(path: str) -> bool:
+    """
+    Generate a 2500×1686 rich menu PNG with 6 colored button areas.
+
+    Renders Japanese labels only (no emoji) for maximum compatibility.
+    Font search order:
+      1. Windows Japanese fonts (local dev)
+      2. Linux Noto Sans CJK (Render/Debian — installed via apt-get)
+      3. Pillow built-in bitmap fallback (ASCII short labels)
+
+    The PNG comes from rich_menu_image_bytes() (render cache); *path* is
+    only rewritten when its content differs.
+
+    Returns True on success.
+    """
+    data = rich_menu_image_bytes()
+    if data is None:
+        return False
+    try:
+        try:
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    return True
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
         logger.info('generate_rich_menu_image saved to %s', path)
         return True
     except Exception as e:
@@ -3487,17 +3536,12 @@ def create_rich_menu() -> dict:
     logger.info('Rich menu created: %s', rich_menu_id)
 
     # ── Step 2: generate + upload image ─────────────────────────────────────
-    import os as _os
-    image_path = _os.path.join(
-        _os.path.dirname(_os.path.abspath(__file__)),
-        'static', 'icons', 'rich_menu.png',
-    )
+    # 描画キャッシュ（line_image_cache.py）: 再デプロイ時も PIL で描き直さない
     image_uploaded = False
 
-    if generate_rich_menu_image(image_path):
+    img_data = rich_menu_image_bytes()
+    if img_data is not None:
         try:
-            with open(image_path, 'rb') as f:
-                img_data = f.read()
             img_resp = _requests.post(
                 f'{_LINE_DATA_API}/richmenu/{rich_menu_id}/content',
                 headers={
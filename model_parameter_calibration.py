@@ -17,7 +17,46 @@ import matplotlib.pyplot as plt
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from kelp_drying_model import KelpDryingModel
+from kelp_drying_model import KelpDryingModel, drying_condition_scores, simulate_drying_batch
+from parameter_search import DEFAULT_CHECKPOINT, SearchRunner, budget_subset, feature_digest
+
+# 較正で探索するパラメータ（simulate_terrain_effects の固定値が現行値）
+CALIBRATION_SEARCH_SPACE = {
+    'score_threshold': (0.0, 6.0),
+    'forest_elevation': (50.0, 150.0),         # 現行 100m
+    'forest_wind_correction': (-4.0, 0.0),     # 現行 -2.5 m/s
+    'forest_humidity_correction': (0.0, 20.0), # 現行 +10 %
+    'temperature_lapse': (0.004, 0.010),       # 現行 0.006 ℃/m
+}
+
+
+def calibration_accuracy(features, params, budget=1.0):
+    """
+    地形補正 → 乾燥シミュレーション → 閾値判定 を全ケース一括で評価
+
+    Args:
+        features: ModelParameterCalibrator.build_calibration_features() の出力
+        params: CALIBRATION_SEARCH_SPACE のキーを持つ dict
+        budget: 使うケースの割合（0-1）
+
+    Returns:
+        的中率（0-1）
+    """
+    n = len(features['success'])
+    if n == 0:
+        return 0.0
+    idx = budget_subset(n, budget)
+    elevation = features['elevation'][idx]
+    forest = (elevation > params['forest_elevation'])[:, None]
+
+    temperature = features['temperature'][idx] - (elevation * params['temperature_lapse'])[:, None]
+    humidity = np.minimum(100, features['humidity'][idx] + np.where(forest, params['forest_humidity_correction'], 0))
+    wind = np.maximum(0, features['wind_speed'][idx] + np.where(forest, params['forest_wind_correction'], 0))
+
+    batch = simulate_drying_batch(temperature, humidity, wind)
+    scores = drying_condition_scores(batch['completed_hour'], batch['final_water_content'])
+    return float(np.mean((scores >= params['score_threshold']) == features['success'][idx]))
+
 
 class ModelParameterCalibrator:
     """昆布乾燥モデルのパラメータ較正システム"""
@@ -191,6 +230,10 @@ class ModelParameterCalibrator:
                 print(f"  Failed to extract work hours weather")
                 continue
             
+            # 補正前の時別値（simulate_terrain_effects は hourly_data を書き換えるので先に控える）
+            base_hourly = {key: np.array([h[key] for h in work_weather['hourly_data']], dtype=float)
+                           for key in ('temperature', 'relative_humidity', 'wind_speed')}
+
             # 地形補正適用
             corrected_weather, terrain_info = self.simulate_terrain_effects(location, work_weather)
             
@@ -206,7 +249,8 @@ class ModelParameterCalibrator:
                     'predicted_score': drying_evaluation['score'],
                     'weather': corrected_weather,
                     'terrain': terrain_info,
-                    'model_prediction': drying_evaluation
+                    'model_prediction': drying_evaluation,
+                    'base_hourly': base_hourly
                 }
                 
                 calibration_data.append(case_data)
@@ -285,6 +329,13 @@ class ModelParameterCalibrator:
         optimal_threshold = self.find_optimal_threshold(all_data)
         print(f"Recommended score threshold: {optimal_threshold:.2f} (current: 4.0)")
         
+        # 地形補正係数も含めた探索
+        best_trial = self.search_parameters(all_data)
+        if best_trial is not None:
+            print(f"Joint search accuracy: {best_trial.score*100:.1f}%")
+            for name, value in best_trial.params.items():
+                print(f"  {name}: {value:.3f}")
+        
         # 地形効果の検証
         forest_cases = [case for case in all_data if case['terrain']['is_forest']]
         non_forest_cases = [case for case in all_data if not case['terrain']['is_forest']]
@@ -308,28 +359,49 @@ class ModelParameterCalibrator:
             'total_cases': len(all_data),
             'accuracy': accuracy,
             'optimal_threshold': optimal_threshold,
+            'searched_parameters': best_trial.params if best_trial else None,
             'success_cases': success_cases,
             'failure_cases': failure_cases,
             'calibration_data': all_data
         }
     
     def find_optimal_threshold(self, data):
-        """最適なスコア閾値を求める"""
-        scores = [case['predicted_score'] for case in data]
-        actual = [case['actual_success'] for case in data]
-        
-        best_threshold = 4.0
-        best_accuracy = 0
-        
-        for threshold in np.arange(0, 6, 0.1):
-            predicted = [score >= threshold for score in scores]
-            accuracy = accuracy_score(actual, predicted)
-            
-            if accuracy > best_accuracy:
-                best_accuracy = accuracy
-                best_threshold = threshold
-        
-        return best_threshold
+        """最適なスコア閾値を求める（0-6 を 0.1 刻みで一括評価）"""
+        scores = np.array([case['predicted_score'] for case in data], dtype=float)
+        actual = np.array([case['actual_success'] for case in data], dtype=bool)
+        thresholds = np.arange(0, 6, 0.1)
+        
+        accuracies = ((scores[None, :] >= thresholds[:, None]) == actual[None, :]).mean(axis=1)
+        if not len(scores) or accuracies.max() <= 0:
+            return 4.0
+        return thresholds[int(np.argmax(accuracies))]  # 同率なら最小の閾値
+    
+    def build_calibration_features(self, data):
+        """calibrate_parameters() で集めたケース → calibration_accuracy() 用の配列"""
+        cases = [case for case in data if 'base_hourly' in case]
+        hourly = lambda key: np.array([case['base_hourly'][key] for case in cases], dtype=float).reshape(len(cases), 12)
+        return {
+            'temperature': hourly('temperature'),
+            'humidity': hourly('relative_humidity'),
+            'wind_speed': hourly('wind_speed'),
+            'elevation': np.array([case['terrain']['elevation'] for case in cases], dtype=float),
+            'success': np.array([case['actual_success'] for case in cases], dtype=bool),
+        }
+    
+    def search_parameters(self, data, strategy="halving", n_candidates=243, workers=None,
+                          checkpoint=DEFAULT_CHECKPOINT):
+        """
+        地形補正係数と閾値を同時に探索（parameter_search.SearchRunner）
+
+        Returns:
+            最良の Trial（params / score=的中率 0-1）。ケースが無ければ None
+        """
+        features = self.build_calibration_features(data)
+        if not len(features['success']):
+            return None
+        with SearchRunner(calibration_accuracy, features, study=f"calibration_{feature_digest(features)}",
+                          checkpoint=checkpoint, workers=workers) as runner:
+            return runner.run(strategy, CALIBRATION_SEARCH_SPACE, n_candidates=n_candidates)
     
     def output_detailed_analysis(self, data):
         """詳細分析結果をファイル出力"""
@@ -1,15 +1,269 @@
 """
 Monitoring and logging configuration for Rishiri Kelp Forecast System
 利尻島昆布干場予報システム - モニタリング・ログ設定
+
+- LatencyHistogram: 固定バケットのレイテンシ分布（p50/p95/p99、メモリ一定）
+- instrument_http(): requests / urllib の呼び出しを HTTP 層で計測し、
+  Open-Meteo / Upstash / JMA ごとのヒストグラムに記録
+- SlowRequestProfiler: opt-in のスタックサンプラー。閾値を超えたリクエストの
+  collapsed stack（flamegraph.pl / speedscope で読める形式）を書き出す
 """
 
 import os
+import sys
 import logging
+import random
+import threading
 import time
+import urllib.error
+import urllib.request
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 from flask import request, g
 import json
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+
+import requests
+
+# レイテンシのバケット上限 (ms)。最後のバケットは上限なし
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+SLOW_REQUEST_MS = 1000
+RECENT_WINDOW = 100  # ヘルスチェック用に直近何件を保持するか
+
+# ホスト名の末尾 → 上流サービス名
+UPSTREAM_HOSTS = {
+    'open-meteo.com': 'open_meteo',
+    'upstash.io': 'upstash',
+    'jma.go.jp': 'jma',
+}
+
+
+class LatencyHistogram:
+    """固定バケットのレイテンシヒストグラム（スレッドセーフ）"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms):
+        index = next((i for i, upper in enumerate(self.buckets) if value_ms <= upper), len(self.buckets))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value_ms
+            self.min = value_ms if self.min is None else min(self.min, value_ms)
+            self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def percentile(self, q):
+        """q (0-100) パーセンタイル。バケット内は線形補間し、観測の min/max でクリップ"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q / 100 * self.count
+            cumulative = 0
+            for i, n in enumerate(self.counts):
+                if n and cumulative + n >= rank:
+                    if i == len(self.buckets):
+                        return self.max
+                    lower = self.buckets[i - 1] if i else 0.0
+                    value = lower + (self.buckets[i] - lower) * max(0.0, rank - cumulative) / n
+                    return min(max(value, self.min), self.max)
+                cumulative += n
+            return self.max
+
+    def count_above(self, threshold_ms):
+        """threshold_ms を超えた件数（threshold_ms はバケット境界であること）"""
+        index = self.buckets.index(threshold_ms) + 1
+        with self._lock:
+            return sum(self.counts[index:])
+
+    def to_dict(self):
+        p50, p95, p99 = (self.percentile(q) for q in (50, 95, 99))
+        with self._lock:
+            return {
+                'count': self.count,
+                'avg_ms': round(self.total / self.count, 2) if self.count else None,
+                'min_ms': round(self.min, 2) if self.min is not None else None,
+                'max_ms': round(self.max, 2) if self.max is not None else None,
+                'p50_ms': round(p50, 2) if p50 is not None else None,
+                'p95_ms': round(p95, 2) if p95 is not None else None,
+                'p99_ms': round(p99, 2) if p99 is not None else None,
+                'buckets': {f'le_{upper}': n for upper, n in zip(self.buckets, self.counts)} |
+                           {'le_inf': self.counts[-1]},
+            }
+
+
+def upstream_name(url):
+    """URL → 上流サービス名（対象外は None）"""
+    host = (urlsplit(url).hostname or '').lower()
+    for suffix, name in UPSTREAM_HOSTS.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return name
+    return None
+
+
+_http_patch_lock = threading.Lock()
+_http_originals = {}
+
+
+def instrument_http(manager):
+    """
+    requests.Session.request と urllib の OpenerDirector.open を包み、
+    UPSTREAM_HOSTS 宛ての呼び出し時間を manager.record_upstream() に渡す。
+    requests.get/post も Session.request を通るので呼び出し側の変更は不要。
+    urllib はレスポンスヘッダ受信までの時間（本文の read は含まない）。
+    何度呼んでも一度だけ包む。
+    """
+    with _http_patch_lock:
+        if _http_originals:
+            _http_originals['manager'] = manager
+            return
+        _http_originals.update(manager=manager,
+                               requests=requests.Session.request,
+                               urllib=urllib.request.OpenerDirector.open)
+
+        original_request = _http_originals['requests']
+        original_open = _http_originals['urllib']
+
+        def timed_request(session, method, url, *args, **kwargs):
+            name = upstream_name(url)
+            if name is None:
+                return original_request(session, method, url, *args, **kwargs)
+            start = time.perf_counter()
+            status = None
+            try:
+                response = original_request(session, method, url, *args, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                _http_originals['manager'].record_upstream(name, (time.perf_counter() - start) * 1000, status)
+
+        def timed_open(opener, fullurl, *args, **kwargs):
+            url = fullurl if isinstance(fullurl, str) else fullurl.full_url
+            name = upstream_name(url)
+            if name is None:
+                return original_open(opener, fullurl, *args, **kwargs)
+            start = time.perf_counter()
+            status = None
+            try:
+                response = original_open(opener, fullurl, *args, **kwargs)
+                status = getattr(response, 'status', None)
+                return response
+            except urllib.error.HTTPError as e:
+                status = e.code
+                raise
+            finally:
+                _http_originals['manager'].record_upstream(name, (time.perf_counter() - start) * 1000, status)
+
+        requests.Session.request = timed_request
+        urllib.request.OpenerDirector.open = timed_open
+
+
+def uninstrument_http():
+    """instrument_http() を元に戻す（テスト用）"""
+    with _http_patch_lock:
+        if _http_originals:
+            requests.Session.request = _http_originals['requests']
+            urllib.request.OpenerDirector.open = _http_originals['urllib']
+            _http_originals.clear()
+
+
+class StackSampler:
+    """対象スレッドのスタックを interval 秒ごとに採取し、collapsed stack で数える"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+
+class SlowRequestProfiler:
+    """
+    opt-in のリクエストプロファイラ（環境変数 PROFILE_SLOW_REQUEST_MS で有効化）
+
+    sample_rate の割合のリクエストでスタックサンプラーを走らせ、
+    threshold_ms 以上かかったものだけ output_dir に .folded を書き出す。
+    """
+
+    def __init__(self, threshold_ms, output_dir, interval=0.005, sample_rate=1.0, max_files=50):
+        self.threshold_ms = threshold_ms
+        self.output_dir = output_dir
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+
+    @classmethod
+    def from_env(cls, base_dir):
+        threshold = os.environ.get('PROFILE_SLOW_REQUEST_MS', '').strip()
+        if not threshold:
+            return None
+        return cls(
+            threshold_ms=float(threshold),
+            output_dir=os.environ.get('PROFILE_DIR', os.path.join(base_dir, 'profiles')),
+            interval=float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000,
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '1.0')),
+        )
+
+    def begin(self):
+        if random.random() >= self.sample_rate:
+            return None
+        return StackSampler(threading.get_ident(), self.interval).start()
+
+    def finish(self, sampler, elapsed_ms, label):
+        """サンプラーを止め、遅ければ書き出したパスを返す"""
+        stacks = sampler.stop()
+        if elapsed_ms < self.threshold_ms or not stacks:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)[:60]
+        path = os.path.join(self.output_dir,
+                            f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{safe_label}_{int(elapsed_ms)}ms.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self._prune()
+        return path
+
+    def recent_dumps(self, limit=10):
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted(n for n in os.listdir(self.output_dir) if n.endswith('.folded'))[-limit:]
+
+    def _prune(self):
+        dumps = sorted(n for n in os.listdir(self.output_dir) if n.endswith('.folded'))
+        for name in dumps[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
 
 class MonitoringManager:
     """Monitoring and metrics collection manager"""
@@ -18,36 +272,62 @@ class MonitoringManager:
         self.app = app
         self.metrics = defaultdict(list)
         self.error_counts = defaultdict(int)
-        self.response_times = defaultdict(list)
+        self.started_at = datetime.now()
+        self.latency = defaultdict(LatencyHistogram)           # endpoint -> histogram
+        self.upstream_latency = defaultdict(LatencyHistogram)  # upstream -> histogram
+        self.upstream_errors = defaultdict(int)
+        self.response_times = defaultdict(lambda: deque(maxlen=RECENT_WINDOW))
+        self.profiler = None
+        self.log_all_requests = False
         
         if app:
             self.init_app(app)
     
-    def init_app(self, app):
-        """Initialize monitoring for Flask app"""
+    def init_app(self, app, configure_logging=True, profiler=None, auth=None, log_all_requests=None):
+        """
+        Initialize monitoring for Flask app
+
+        auth: 呼ぶと None（許可）かエラーレスポンスを返す関数。/metrics と
+              /health/detailed の前に呼ぶ（start.py では _check_admin_secret）
+        log_all_requests: 正常・高速なリクエストも INFO で記録するか。既定は
+              環境変数 LOG_ALL_REQUESTS（未設定なら遅いリクエストと 4xx/5xx のみ）
+        """
         self.app = app
+        self.profiler = profiler
+        if log_all_requests is None:
+            log_all_requests = os.environ.get('LOG_ALL_REQUESTS', '').strip().lower() in ('1', 'true', 'yes')
+        self.log_all_requests = log_all_requests
         
         # Configure logging
-        self.setup_logging()
+        if configure_logging:
+            self.setup_logging()
         
         # Add request timing middleware
         @app.before_request
         def before_request():
             g.start_time = time.time()
             g.request_id = self.generate_request_id()
+            g.profile_sampler = self.profiler.begin() if self.profiler else None
         
         @app.after_request
         def after_request(response):
             return self.log_request(response)
         
+        @app.teardown_request
+        def teardown_request(exc):
+            # after_request が走らなかった場合もサンプラースレッドを止める
+            sampler = g.pop('profile_sampler', None)
+            if sampler:
+                sampler.stop()
+        
         # Add metrics endpoints
         @app.route('/metrics')
         def metrics_endpoint():
-            return self.get_metrics()
+            return (auth and auth()) or self.get_metrics()
         
         @app.route('/health/detailed')
         def detailed_health():
-            return self.get_detailed_health()
+            return (auth and auth()) or self.get_detailed_health()
     
     def setup_logging(self):
         """Configure structured logging"""
@@ -97,11 +377,14 @@ class MonitoringManager:
             
             # Store metrics
             endpoint = request.endpoint or 'unknown'
+            self.latency[endpoint].observe(response_time)
             self.response_times[endpoint].append(response_time)
             
-            # Keep only recent metrics (last 1000 requests per endpoint)
-            if len(self.response_times[endpoint]) > 1000:
-                self.response_times[endpoint] = self.response_times[endpoint][-1000:]
+            sampler = g.pop('profile_sampler', None)
+            if sampler:
+                dump = self.profiler.finish(sampler, response_time, f"{request.method}_{endpoint}")
+                if dump:
+                    self.app.logger.warning(f"Slow request profile written: {dump}")
             
             # Log request details
             log_data = {
@@ -123,9 +406,9 @@ class MonitoringManager:
             elif response.status_code >= 400:
                 self.app.logger.warning(f"Client Error: {json.dumps(log_data)}")
                 self.error_counts['4xx'] += 1
-            elif response_time > 1000:  # Slow request
+            elif response_time > SLOW_REQUEST_MS:  # Slow request
                 self.app.logger.warning(f"Slow Request: {json.dumps(log_data)}")
-            else:
+            elif self.log_all_requests:
                 self.app.logger.info(f"Request: {json.dumps(log_data)}")
         
         return response
@@ -136,35 +419,51 @@ class MonitoringManager:
         
         # Calculate response time statistics
         endpoint_stats = {}
-        for endpoint, times in self.response_times.items():
-            if times:
-                endpoint_stats[endpoint] = {
-                    'count': len(times),
-                    'avg_response_time': round(sum(times) / len(times), 2),
-                    'min_response_time': round(min(times), 2),
-                    'max_response_time': round(max(times), 2),
-                    'slow_requests': len([t for t in times if t > 1000])
-                }
+        for endpoint, histogram in list(self.latency.items()):
+            stats = histogram.to_dict()
+            stats['slow_requests'] = histogram.count_above(SLOW_REQUEST_MS)
+            endpoint_stats[endpoint] = stats
+        
+        upstream_stats = {}
+        for name, histogram in list(self.upstream_latency.items()):
+            stats = histogram.to_dict()
+            stats['errors'] = self.upstream_errors.get(name, 0)
+            upstream_stats[name] = stats
         
         metrics = {
             'timestamp': current_time.isoformat(),
-            'uptime_seconds': int((current_time - datetime.now()).total_seconds()),
+            'uptime_seconds': int((current_time - self.started_at).total_seconds()),
             'endpoints': endpoint_stats,
+            'upstreams': upstream_stats,
             'error_counts': dict(self.error_counts),
             'system': {
                 'environment': self.app.config.get('FLASK_ENV'),
                 'version': '1.0.0'
             }
         }
+        if self.profiler:
+            metrics['profiles'] = {
+                'threshold_ms': self.profiler.threshold_ms,
+                'recent': self.profiler.recent_dumps(),
+            }
         
         return metrics
     
+    def record_upstream(self, name, elapsed_ms, status=None):
+        """上流サービス呼び出し1回分を記録（status None は例外）"""
+        self.upstream_latency[name].observe(elapsed_ms)
+        if status is None or status >= 500 or status == 429:
+            self.upstream_errors[name] += 1
+    
     def get_detailed_health(self):
         """Get detailed health check information"""
         try:
-            # Check cache system
-            from konbu_flask_final import offline_cache
-            cache_status = offline_cache.get_cache_status()
+            # Check cache system (legacy offline cache; absent in start.py deployments)
+            try:
+                from konbu_flask_final import offline_cache
+                cache_status = offline_cache.get_cache_status()
+            except ImportError:
+                cache_status = {'status': 'not_configured'}
             cache_healthy = 'error' not in cache_status
             
             # Check disk space (simplified)
@@ -172,8 +471,8 @@ class MonitoringManager:
             
             # Check response times
             recent_times = []
-            for times in self.response_times.values():
-                recent_times.extend(times[-10:])  # Last 10 requests per endpoint
+            for times in list(self.response_times.values()):
+                recent_times.extend(list(times)[-10:])  # Last 10 requests per endpoint
             
             avg_response_time = sum(recent_times) / len(recent_times) if recent_times else 0
             response_time_healthy = avg_response_time < 1000  # Less than 1 second
@@ -240,9 +539,11 @@ class MonitoringManager:
 # Global monitoring manager
 monitoring_manager = MonitoringManager()
 
-def init_monitoring(app):
+def init_monitoring(app, configure_logging=True, base_dir=None, auth=None):
     """Initialize monitoring for Flask app"""
-    monitoring_manager.init_app(app)
+    profiler = SlowRequestProfiler.from_env(base_dir or os.path.dirname(os.path.abspath(__file__)))
+    monitoring_manager.init_app(app, configure_logging=configure_logging, profiler=profiler, auth=auth)
+    instrument_http(monitoring_manager)
     
     # Add custom log handlers for production
     if app.config.get('FLASK_ENV') == 'production':
@@ -1,8 +1,5 @@
 import json
 import os
-import threading
-import schedule
-import time
 from datetime import datetime, timedelta
 import requests
 import smtplib
@@ -10,6 +7,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
 
+from job_scheduler import DailyAt, default_scheduler
+
 # 漁期管理システムとの連携
 try:
     from fishing_season_manager import FishingSeasonManager
@@ -18,6 +17,8 @@ except ImportError:
 
 class NotificationSystem:
     """利尻島昆布漁師向け自動通知システム（柔軟な時刻設定対応）"""
+
+    SCHEDULER_GROUP = "notification_system"
     
     def __init__(self):
         self.config_file = "notification_config.json"
@@ -551,35 +552,34 @@ class NotificationSystem:
             self.logger.error(f"Season start prompt error: {e}")
     
     def setup_schedule(self):
-        """スケジュールの設定"""
-        # 既存のスケジュールをクリア
-        schedule.clear()
+        """スケジュールの設定（共通スケジューラ job_scheduler.py に登録）"""
+        # 既存のスケジュールをクリア（このシステムのジョブだけ）
+        scheduler = default_scheduler()
+        scheduler.remove_group(self.SCHEDULER_GROUP)
+        if not self.running:
+            return
         
-        # 設定された時刻で各通知をスケジュール
+        # 設定された時刻で各通知をスケジュール（リーダーのワーカーだけが送る）
         times = self.config["notification_times"]
         
         if self.config["notification_types"]["daily_forecast"]["enabled"]:
-            schedule.every().day.at(times["daily_forecast"]).do(self.daily_forecast_job)
+            scheduler.add_job("notification:daily_forecast", self.daily_forecast_job,
+                              DailyAt.parse(times["daily_forecast"]), priority=15,
+                              misfire_grace=1800, group=self.SCHEDULER_GROUP)
             self.logger.info(f"Daily forecast scheduled at {times['daily_forecast']}")
     
     def start_scheduler(self):
         """スケジューラーの開始"""
-        self.setup_schedule()
         self.running = True
-        
-        def run_scheduler():
-            while self.running:
-                schedule.run_pending()
-                time.sleep(60)  # 1分間隔でチェック
-        
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
+        self.setup_schedule()
+        default_scheduler().start()
         
         self.logger.info("Notification scheduler started")
     
     def stop_scheduler(self):
         """スケジューラーの停止"""
         self.running = False
+        default_scheduler().remove_group(self.SCHEDULER_GROUP)
         self.logger.info("Notification scheduler stopped")
     
     def get_config_summary(self):
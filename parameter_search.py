@@ -0,0 +1,297 @@
+"""Parallel, resumable parameter search shared by the tuning/calibration scripts.
+
+parameter_tuning_system.py and model_parameter_calibration.py used to walk
+their candidate lists serially and rebuild the whole scoring pipeline
+(CSV reads, per-record loops) for every candidate. SearchRunner instead:
+
+  - takes feature arrays precomputed once by the caller; with ``workers > 1``
+    they are shipped to each pool process once via the pool initializer,
+    not once per candidate
+  - evaluates candidates with a module-level objective
+    ``objective(features, params, budget) -> score`` (higher is better;
+    ``budget`` in (0, 1] is the fraction of records to use)
+  - checkpoints every trial to sqlite (one row per study/params/budget), so
+    an interrupted run resumes and skips finished candidates
+  - supports grid, random, Latin hypercube and successive-halving search
+
+DEFAULT_CHECKPOINT is shared by both scripts; studies are keyed by name
+plus feature_digest(), so changed input data never reuses stale scores.
+
+Search spaces map a name to either a ``(low, high)`` tuple (continuous) or
+a list of discrete choices.
+"""
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_CHECKPOINT = "parameter_search.sqlite"
+
+Objective = Callable[[Any, Dict[str, Any], float], float]
+
+
+@dataclass
+class Trial:
+    params: Dict[str, Any]
+    score: float
+    budget: float = 1.0
+    cached: bool = False
+
+
+# ---------------------------------------------------------------------------
+# Candidate generation
+# ---------------------------------------------------------------------------
+
+def _is_range(spec) -> bool:
+    return isinstance(spec, tuple) and len(spec) == 2
+
+
+def _python_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def grid_candidates(space: Mapping[str, Sequence]) -> List[Dict[str, Any]]:
+    """全組み合わせ（全パラメータが離散リストであること）"""
+    if any(_is_range(spec) for spec in space.values()):
+        raise ValueError("grid search needs discrete choices for every parameter")
+    names = list(space)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(space[n] for n in names))]
+
+
+def random_candidates(space: Mapping[str, Any], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, spec in space.items():
+        if _is_range(spec):
+            columns[name] = rng.uniform(spec[0], spec[1], n)
+        else:
+            columns[name] = [spec[i] for i in rng.integers(0, len(spec), n)]
+    return [{name: _python_value(columns[name][i]) for name in space} for i in range(n)]
+
+
+def latin_hypercube_candidates(space: Mapping[str, Any], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """各次元を n 等分し、各区間からちょうど1点ずつ取る"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, spec in space.items():
+        u = (rng.permutation(n) + rng.random(n)) / n  # [0, 1) の層化サンプル
+        if _is_range(spec):
+            columns[name] = spec[0] + u * (spec[1] - spec[0])
+        else:
+            columns[name] = [spec[i] for i in np.minimum((u * len(spec)).astype(int), len(spec) - 1)]
+    return [{name: _python_value(columns[name][i]) for name in space} for i in range(n)]
+
+
+def candidate_key(params: Mapping[str, Any]) -> str:
+    """チェックポイント用の正規化キー（順序・浮動小数の表記ゆれを吸収）"""
+    def norm(v):
+        v = _python_value(v)
+        return float(f"{v:.12g}") if isinstance(v, float) else v
+    return json.dumps({k: norm(v) for k, v in sorted(params.items())}, ensure_ascii=False, sort_keys=True)
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint store
+# ---------------------------------------------------------------------------
+
+class TrialStore:
+    """sqlite チェックポイント（study × params × budget ごとに1行）"""
+
+    def __init__(self, path: str, study: str):
+        self.path = path
+        self.study = study
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS trials (
+                study TEXT NOT NULL,
+                params_key TEXT NOT NULL,
+                budget REAL NOT NULL,
+                score REAL NOT NULL,
+                elapsed_s REAL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (study, params_key, budget)
+            )
+        """)
+        self._conn.commit()
+
+    def completed(self, budget: float) -> Dict[str, float]:
+        rows = self._conn.execute(
+            "SELECT params_key, score FROM trials WHERE study = ? AND budget = ?", (self.study, budget))
+        return dict(rows.fetchall())
+
+    def record_many(self, rows: Iterable[tuple]) -> None:
+        """rows: (params_key, budget, score, elapsed_s)"""
+        now = datetime.now().isoformat()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO trials (study, params_key, budget, score, elapsed_s, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.study, key, budget, score, elapsed, now) for key, budget, score, elapsed in rows])
+
+    def best(self, budget: float = 1.0) -> Optional[Trial]:
+        row = self._conn.execute(
+            "SELECT params_key, score FROM trials WHERE study = ? AND budget = ? ORDER BY score DESC LIMIT 1",
+            (self.study, budget)).fetchone()
+        return Trial(json.loads(row[0]), row[1], budget, cached=True) if row else None
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+_worker_objective: Optional[Objective] = None
+_worker_features: Any = None
+
+
+def _init_worker(objective: Objective, features: Any) -> None:
+    global _worker_objective, _worker_features
+    _worker_objective, _worker_features = objective, features
+
+
+def _run_trial(task):
+    index, params, budget = task
+    start = time.perf_counter()
+    score = float(_worker_objective(_worker_features, params, budget))
+    return index, score, time.perf_counter() - start
+
+
+class SearchRunner:
+    """
+    使い方:
+        runner = SearchRunner(tuning_accuracy, features, study="stage3", checkpoint="tuning.sqlite", workers=4)
+        best = runner.run("lhs", space, n_candidates=200)
+    """
+
+    COMMIT_EVERY = 50  # 中断時に失うのは最大この件数
+
+    def __init__(self, objective: Objective, features: Any, study: str = "default",
+                 checkpoint: Optional[str] = None, workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None):
+        self.objective = objective
+        self.features = features
+        self.study = study
+        self.store = TrialStore(checkpoint, study) if checkpoint else None
+        self.workers = (os.cpu_count() or 1) if workers is None else max(1, workers)
+        self.progress = progress
+        self.evaluated = 0  # このプロセスで実際に計算した件数
+
+    def close(self) -> None:
+        if self.store:
+            self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def evaluate(self, candidates: Sequence[Dict[str, Any]], budget: float = 1.0) -> List[Trial]:
+        """候補を評価（チェックポイント済みは再計算しない）。入力順の Trial を返す"""
+        keys = [candidate_key(c) for c in candidates]
+        done = self.store.completed(budget) if self.store else {}
+        trials: List[Optional[Trial]] = [None] * len(candidates)
+        tasks = []
+        for i, (params, key) in enumerate(zip(candidates, keys)):
+            if key in done:
+                trials[i] = Trial(dict(params), done[key], budget, cached=True)
+            else:
+                tasks.append((i, dict(params), budget))
+
+        pending = []
+
+        def collect(index, score, elapsed):
+            trials[index] = Trial(tasks_by_index[index], score, budget)
+            pending.append((keys[index], budget, score, elapsed))
+            self.evaluated += 1
+            if self.store and len(pending) >= self.COMMIT_EVERY:
+                self.store.record_many(pending)
+                pending.clear()
+            if self.progress:
+                self.progress(sum(t is not None for t in trials), len(trials))
+
+        tasks_by_index = {i: params for i, params, _ in tasks}
+        try:
+            if self.workers > 1 and len(tasks) > 1:
+                chunksize = max(1, len(tasks) // (self.workers * 8))
+                with multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                          initargs=(self.objective, self.features)) as pool:
+                    for result in pool.imap_unordered(_run_trial, tasks, chunksize=chunksize):
+                        collect(*result)
+            else:
+                _init_worker(self.objective, self.features)
+                for task in tasks:
+                    collect(*_run_trial(task))
+        finally:
+            if self.store and pending:
+                self.store.record_many(pending)
+        return trials
+
+    def successive_halving(self, candidates: Sequence[Dict[str, Any]], min_budget: float = 1 / 9,
+                           eta: int = 3) -> List[Trial]:
+        """
+        少ないデータ量で全候補を評価し、上位 1/eta だけ eta 倍のデータ量で再評価…を budget=1 まで繰り返す
+
+        Returns:
+            最終段（budget=1.0）の Trial（スコア降順）
+        """
+        survivors = list(candidates)
+        budget = min_budget
+        while True:
+            budget = min(1.0, budget)
+            trials = sorted(self.evaluate(survivors, budget), key=lambda t: t.score, reverse=True)
+            if budget >= 1.0 or len(trials) <= 1:
+                return trials
+            survivors = [t.params for t in trials[:max(1, math.ceil(len(trials) / eta))]]
+            budget *= eta
+
+    def run(self, strategy: str, space: Mapping[str, Any], n_candidates: int = 100, seed: int = 0,
+            budget: float = 1.0, **halving) -> Trial:
+        """
+        strategy: "grid" / "random" / "lhs" / "halving"（LHS 候補を successive halving）
+        """
+        if strategy == "grid":
+            candidates = grid_candidates(space)
+        elif strategy == "random":
+            candidates = random_candidates(space, n_candidates, seed)
+        elif strategy in ("lhs", "halving"):
+            candidates = latin_hypercube_candidates(space, n_candidates, seed)
+        else:
+            raise ValueError(f"unknown strategy: {strategy}")
+
+        if strategy == "halving":
+            return self.successive_halving(candidates, **halving)[0]
+        return max(self.evaluate(candidates, budget), key=lambda t: t.score)
+
+
+def feature_digest(features: Mapping[str, np.ndarray]) -> str:
+    """特徴量配列のハッシュ（study 名に含めて、データが変わったら古いチェックポイントを使わない）"""
+    h = hashlib.sha1()
+    for name in sorted(features):
+        array = np.ascontiguousarray(features[name])
+        h.update(name.encode())
+        h.update(str(array.dtype).encode())
+        h.update(str(array.shape).encode())
+        h.update(array.tobytes())
+    return h.hexdigest()[:12]
+
+
+def budget_subset(n_records: int, budget: float, seed: int = 42) -> np.ndarray:
+    """budget（0-1）に応じたレコード添字。同じ seed なら小さい budget は大きい budget の部分集合"""
+    order = np.random.default_rng(seed).permutation(n_records)
+    return np.sort(order[:max(1, int(round(n_records * min(1.0, budget))))]) if n_records else order
@@ -8,17 +8,102 @@ Parameter Tuning System for Enhanced Forecast
 """
 
 import asyncio
+import copy
 import pandas as pd
 import numpy as np
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
-from itertools import product
 import warnings
 from sklearn.metrics import roc_curve, auc
 from scipy.optimize import minimize
 
 from enhanced_forecast_system import EnhancedForecastSystem
+from parameter_search import DEFAULT_CHECKPOINT, SearchRunner, budget_subset, feature_digest
+
+# Stage 3 の探索空間（grid はこのまま、random/lhs/halving は各リストから抽選）
+TUNING_SEARCH_SPACE = {
+    "marginal_to_good": [4.6, 4.8, 5.0, 5.2],
+    "good_to_excellent": [6.2, 6.5, 6.8, 7.0],
+    "temperature_coeff": [-0.2, -0.3, -0.4],
+    "humidity_coastal": [3, 4, 5]
+}
+
+MOUNTAIN_LAT, MOUNTAIN_LON = 45.1821, 141.2421
+ISLAND_CENTER_LAT, ISLAND_CENTER_LON = 45.18, 141.24
+
+
+def build_tuning_features(records_df: pd.DataFrame, spots_df: pd.DataFrame, seed: int = 42) -> Dict[str, np.ndarray]:
+    """
+    検証レコードごとの特徴量を一度だけ作る（候補ごとに CSV・干場検索をやり直さない）
+
+    模擬気象は seed 固定で1回だけ抽選するので、全候補が同じ条件で比較される
+    """
+    spots = spots_df.drop_duplicates('name').set_index('name')
+    records = records_df[records_df['name'].isin(spots.index)]
+    lat = spots.loc[records['name'], 'lat'].to_numpy(dtype=float)
+    lon = spots.loc[records['name'], 'lon'].to_numpy(dtype=float)
+
+    mountain_distance = np.hypot(lat - MOUNTAIN_LAT, lon - MOUNTAIN_LON)
+    center_distance = np.hypot(lat - ISLAND_CENTER_LAT, lon - ISLAND_CENTER_LON) * 111
+    rng = np.random.default_rng(seed)
+    n = len(records)
+    return {
+        "elevation": np.maximum(0, 200 - mountain_distance * 1000),
+        "coastal": np.maximum(0.1, center_distance - 8) < 0.5,
+        "temperature": rng.normal(20, 5, n),
+        "humidity": rng.normal(70, 15, n),
+        "wind": rng.normal(8, 3, n),
+        "success": (records['result'] == "完全乾燥").to_numpy(),
+    }
+
+
+def tuning_accuracy(features: Dict[str, np.ndarray], params: Dict, budget: float = 1.0) -> float:
+    """
+    calculate_simple_score_with_params + predict_success_with_params の一括版
+
+    Args:
+        params: flatten_params() 形式（TUNING_SEARCH_SPACE のキー）
+        budget: 使うレコードの割合（0-1）
+
+    Returns:
+        的中率（%）
+    """
+    n = len(features["success"])
+    if n == 0:
+        return 0.0
+    idx = budget_subset(n, budget)
+    corrected_temp = features["temperature"][idx] + params["temperature_coeff"] * (features["elevation"][idx] / 100)
+    corrected_humidity = features["humidity"][idx] + np.where(features["coastal"][idx], params["humidity_coastal"], 0)
+
+    temp_score = 1.0 - np.abs(corrected_temp - 20) / 20
+    humidity_score = np.maximum(0, (100 - corrected_humidity) / 100)
+    wind_score = np.clip(features["wind"][idx] / 10, 0, 1)
+    score = np.clip((temp_score * 0.3 + humidity_score * 0.4 + wind_score * 0.3) * 10, 0, 10)
+
+    predicted = score >= params["marginal_to_good"]
+    return float(np.mean(predicted == features["success"][idx]) * 100)
+
+
+def flatten_params(params: Dict) -> Dict:
+    """入れ子パラメータ → 探索用のフラットな dict"""
+    return {
+        "marginal_to_good": params["thresholds"]["marginal_to_good"],
+        "good_to_excellent": params["thresholds"]["good_to_excellent"],
+        "temperature_coeff": params["terrain_corrections"]["temperature_coeff"],
+        "humidity_coastal": params["terrain_corrections"]["humidity_coastal"],
+    }
+
+
+def apply_flat_params(base_params: Dict, flat: Dict) -> Dict:
+    """フラットな探索結果を入れ子パラメータへ戻す（base_params は変更しない）"""
+    params = copy.deepcopy(base_params)
+    params["thresholds"]["marginal_to_good"] = flat["marginal_to_good"]
+    params["thresholds"]["good_to_excellent"] = flat["good_to_excellent"]
+    params["terrain_corrections"]["temperature_coeff"] = flat["temperature_coeff"]
+    params["terrain_corrections"]["humidity_coastal"] = flat["humidity_coastal"]
+    return params
+
 
 class ParameterTuner:
     """パラメータチューニングクラス"""
@@ -48,6 +133,13 @@ class ParameterTuner:
         
         # 最適化履歴
         self.optimization_history = []
+        self._features = None
+
+    def tuning_features(self) -> Dict[str, np.ndarray]:
+        """build_tuning_features() の結果（初回のみ作成）"""
+        if self._features is None:
+            self._features = build_tuning_features(*self.load_validation_data())
+        return self._features
         
     def load_validation_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """検証用データ読み込み"""
@@ -76,7 +168,7 @@ class ParameterTuner:
         best_accuracy = 0
         
         for threshold_set in emergency_thresholds:
-            test_params = self.current_params.copy()
+            test_params = copy.deepcopy(self.current_params)
             test_params["thresholds"].update(threshold_set)
             
             # 高速検証（サンプリング）
@@ -110,11 +202,11 @@ class ParameterTuner:
             {"temperature_coeff": -0.5, "humidity_coastal": 6},  # 微調整
         ]
         
-        best_params = base_params.copy()
+        best_params = copy.deepcopy(base_params)
         best_accuracy = 0
         
         for terrain_set in terrain_candidates:
-            test_params = base_params.copy()
+            test_params = copy.deepcopy(base_params)
             test_params["terrain_corrections"].update(terrain_set)
             
             accuracy = self.quick_validate_params(test_params, sample_ratio=0.5)
@@ -135,48 +227,38 @@ class ParameterTuner:
         print(f"Stage 2 Best: {best_accuracy:.1f}% (+{best_accuracy-self.optimization_history[0]['best_accuracy']:.1f}%)")
         return best_params
     
-    def stage3_grid_search_optimization(self, base_params: Dict) -> Dict:
-        """Stage 3: グリッドサーチ最適化"""
-        print("\n=== Stage 3: Grid Search Optimization ===")
-        
-        # グリッドサーチパラメータ
-        param_grid = {
-            "marginal_to_good": [4.6, 4.8, 5.0, 5.2],
-            "good_to_excellent": [6.2, 6.5, 6.8, 7.0],
-            "temperature_coeff": [-0.2, -0.3, -0.4],
-            "humidity_coastal": [3, 4, 5]
-        }
-        
-        best_params = base_params.copy()
-        best_accuracy = 0
-        total_combinations = np.prod([len(v) for v in param_grid.values()])
-        
-        print(f"  Testing {total_combinations} parameter combinations...")
-        
-        combination_count = 0
-        for mg_threshold, ex_threshold, temp_coeff, humidity_coastal in product(
-            param_grid["marginal_to_good"],
-            param_grid["good_to_excellent"], 
-            param_grid["temperature_coeff"],
-            param_grid["humidity_coastal"]
-        ):
-            combination_count += 1
-            
-            test_params = base_params.copy()
-            test_params["thresholds"]["marginal_to_good"] = mg_threshold
-            test_params["thresholds"]["good_to_excellent"] = ex_threshold
-            test_params["terrain_corrections"]["temperature_coeff"] = temp_coeff
-            test_params["terrain_corrections"]["humidity_coastal"] = humidity_coastal
-            
-            accuracy = self.quick_validate_params(test_params, sample_ratio=0.2)
-            
-            if combination_count % 10 == 0:
-                print(f"    Progress: {combination_count}/{total_combinations} ({accuracy:.1f}%)")
-            
-            if accuracy > best_accuracy:
-                best_accuracy = accuracy
-                best_params = test_params
-                print(f"    New best: {accuracy:.1f}% (MG:{mg_threshold}, EX:{ex_threshold}, T:{temp_coeff}, H:{humidity_coastal})")
+    def stage3_grid_search_optimization(self, base_params: Dict, strategy: str = "grid",
+                                        n_candidates: int = 144, workers: Optional[int] = None,
+                                        checkpoint: Optional[str] = DEFAULT_CHECKPOINT) -> Dict:
+        """
+        Stage 3: グリッドサーチ最適化
+
+        strategy: "grid" / "random" / "lhs" / "halving"（parameter_search.SearchRunner）
+        checkpoint の sqlite に評価済み候補が残るので、中断しても再実行で続きから
+        """
+        print(f"\n=== Stage 3: {strategy.title()} Search Optimization ===")
+
+        features = self.tuning_features()
+        total = np.prod([len(v) for v in TUNING_SEARCH_SPACE.values()]) if strategy == "grid" else n_candidates
+        print(f"  Testing {total} parameter combinations...")
+
+        def progress(done, total):
+            if done % 10 == 0 or done == total:
+                print(f"    Progress: {done}/{total}")
+
+        with SearchRunner(tuning_accuracy, features, study=f"tuning_stage3_{feature_digest(features)}",
+                          checkpoint=checkpoint, workers=workers, progress=progress) as runner:
+            if strategy == "halving":
+                best = runner.run(strategy, TUNING_SEARCH_SPACE, n_candidates=n_candidates)
+            else:
+                best = runner.run(strategy, TUNING_SEARCH_SPACE, n_candidates=n_candidates, budget=0.2)
+            print(f"  Evaluated {runner.evaluated} new candidates (others resumed from checkpoint)")
+
+        best_accuracy = best.score
+        best_params = apply_flat_params(base_params, best.params)
+        flat = best.params
+        print(f"    Best: {best_accuracy:.1f}% (MG:{flat['marginal_to_good']}, EX:{flat['good_to_excellent']}, "
+              f"T:{flat['temperature_coeff']}, H:{flat['humidity_coastal']})")
         
         self.optimization_history.append({
             "stage": "grid_search",
@@ -189,40 +271,9 @@ class ParameterTuner:
         return best_params
     
     def quick_validate_params(self, params: Dict, sample_ratio: float = 1.0) -> float:
-        """高速パラメータ検証"""
+        """高速パラメータ検証（事前計算した特徴量で一括評価）"""
         try:
-            records_df, spots_df = self.load_validation_data()
-            
-            # サンプリング
-            if sample_ratio < 1.0:
-                sample_size = max(1, int(len(records_df) * sample_ratio))
-                records_df = records_df.sample(n=sample_size, random_state=42)
-            
-            correct_predictions = 0
-            total_predictions = 0
-            
-            # 簡易検証ループ
-            for _, record in records_df.iterrows():
-                spot_name = record['name']
-                actual_result = record['result']
-                
-                spot_row = spots_df[spots_df['name'] == spot_name]
-                if spot_row.empty:
-                    continue
-                
-                lat, lon = float(spot_row.iloc[0]['lat']), float(spot_row.iloc[0]['lon'])
-                
-                # 簡易スコア計算（非同期処理なし）
-                score = self.calculate_simple_score_with_params(lat, lon, params)
-                predicted_success = self.predict_success_with_params(score, params)
-                actual_success = actual_result == "完全乾燥"
-                
-                if (predicted_success and actual_success) or (not predicted_success and not actual_success):
-                    correct_predictions += 1
-                total_predictions += 1
-            
-            return (correct_predictions / total_predictions * 100) if total_predictions > 0 else 0
-            
+            return tuning_accuracy(self.tuning_features(), flatten_params(params), sample_ratio)
         except Exception as e:
             print(f"Validation error: {e}")
             return 0
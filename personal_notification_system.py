@@ -1,10 +1,9 @@
 import json
 import os
 from datetime import datetime, timedelta
-import threading
-import time
-import schedule
 from typing import Dict, List, Optional, Callable
+
+from job_scheduler import DailyAt, Every, default_scheduler
 try:
     import smtplib
     from email.mime.text import MimeText
@@ -25,6 +24,8 @@ class PersonalNotificationSystem:
     各ユーザーの作業スケジュール、位置情報、連絡手段に応じた
     パーソナライズされた通知を提供する統合システム
     """
+
+    SCHEDULER_GROUP = "personal_notification_system"
     
     def __init__(self):
         self.config_file = "personal_notification_config.json"
@@ -110,9 +111,8 @@ class PersonalNotificationSystem:
         # 海霧アラートシステムとの連携
         self.fog_alert_system = SeaFogAlertSystem() if SeaFogAlertSystem else None
         
-        # スケジューラー管理
+        # スケジューラー管理（共通スケジューラ job_scheduler.py に登録）
         self.scheduler_running = False
-        self.scheduler_thread = None
         
         # 通知キュー
         self.notification_queue = []
@@ -294,22 +294,33 @@ class PersonalNotificationSystem:
         return None
     
     def setup_notification_schedule(self):
-        """通知スケジュールの設定"""
-        schedule.clear()
+        """通知スケジュールの設定（サービス開始中のみ共通スケジューラに登録）"""
+        scheduler = default_scheduler()
+        scheduler.remove_group(self.SCHEDULER_GROUP)
+        if not self.scheduler_running:
+            return
+        
+        def add(name, func, trigger, **options):
+            scheduler.add_job(f"personal:{name}", func, trigger, group=self.SCHEDULER_GROUP, **options)
         
         # 定期天気確認
         check_hours = self.config["notification_timing"]["weather_check_hours"]
         for hour in check_hours:
-            schedule.every().day.at(f"{hour:02d}:00").do(self.send_scheduled_weather_updates)
+            add(f"weather@{hour:02d}", self.send_scheduled_weather_updates, DailyAt(hour),
+                priority=60, misfire_grace=1800)
         
         # 作業開始前通知チェック
-        schedule.every(15).minutes.do(self.check_work_start_notifications)
+        add("work_start", self.check_work_start_notifications, Every(15 * 60), priority=60)
         
         # 海霧警報チェック
-        schedule.every(10).minutes.do(self.check_fog_alerts)
+        add("fog_alerts", self.check_fog_alerts, Every(10 * 60), priority=60)
         
         # 失敗した通知の再試行
-        schedule.every(30).minutes.do(self.retry_failed_notifications)
+        add("retry_failed", self.retry_failed_notifications, Every(30 * 60), priority=70)
+        
+        # 通知キューの送信（30秒間隔。キューはプロセスごとなので各ワーカーで実行）
+        add("queue", self.process_notification_queue, Every(30, aligned=False), priority=60,
+            misfire_grace=30, leader_only=False)
     
     def start_notification_service(self):
         """通知サービスの開始"""
@@ -317,8 +328,8 @@ class PersonalNotificationSystem:
             return {"status": "already_running"}
         
         self.scheduler_running = True
-        self.scheduler_thread = threading.Thread(target=self._notification_scheduler_loop, daemon=True)
-        self.scheduler_thread.start()
+        self.setup_notification_schedule()
+        default_scheduler().start()
         
         return {
             "status": "started",
@@ -329,25 +340,13 @@ class PersonalNotificationSystem:
     def stop_notification_service(self):
         """通知サービスの停止"""
         self.scheduler_running = False
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5)
+        default_scheduler().remove_group(self.SCHEDULER_GROUP)
         
         return {
             "status": "stopped",
             "message": "個人別通知サービスを停止しました"
         }
     
-    def _notification_scheduler_loop(self):
-        """通知スケジューラーループ"""
-        while self.scheduler_running:
-            try:
-                schedule.run_pending()
-                self.process_notification_queue()
-                time.sleep(30)  # 30秒間隔でチェック
-            except Exception as e:
-                print(f"Notification scheduler error: {e}")
-                time.sleep(60)
-    
     def send_scheduled_weather_updates(self):
         """定期天気更新の送信"""
         try:
@@ -0,0 +1,333 @@
+"""Concurrent University of Wyoming radiosonde fetcher + parsed-profile cache.
+
+fetch_radiosonde_batch.py used to download one sounding at a time with a
+fixed ``time.sleep(1.5)`` and kept only a few interpolated levels in JSON, so
+every new analysis had to re-download and re-parse the raw HTML text.
+
+This module:
+  - fetches soundings with a bounded thread pool; ``HostPoliteness`` caps
+    in-flight requests per host and spaces request starts
+    (``min_interval``) so the Wyoming server sees the same polite load
+  - retries transient failures (network errors, HTTP 5xx, Wyoming's
+    "try again later" page) with exponential backoff
+  - stores each parsed profile as a columnar ``.npz``
+    (pres/hght/temp/dwpt/relh/mixr/drct/sknt/thta/thte/thtv, NaN = blank)
+    under ``radiosonde_cache/<station>/<YYYYMMDDHH>.npz``
+  - is resumable: cached soundings are never refetched, and soundings the
+    server has no data for are remembered in ``_missing.json``
+
+Downstream analyses read the cache directly with load_profile() /
+load_profiles() and need no network.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+
+WYOMING_URL = "http://weather.uwyo.edu/cgi-bin/sounding"
+WAKKANAI_STATION = "47401"
+DEFAULT_CACHE_DIR = Path(os.environ.get("RADIOSONDE_CACHE_DIR",
+                                        Path(__file__).resolve().parent / "radiosonde_cache"))
+
+COLUMNS = ("pres", "hght", "temp", "dwpt", "relh", "mixr", "drct", "sknt", "thta", "thte", "thtv")
+COLUMN_WIDTH = 7  # Wyoming TEXT:LIST は 7 文字固定幅
+NO_DATA_MARKERS = ("Can't get", "No data")
+BUSY_MARKERS = ("try again later", "Server busy")
+
+
+# ---------------------------------------------------------------------------
+# Parsing / cache
+# ---------------------------------------------------------------------------
+
+def parse_sounding(text: Optional[str]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Wyoming TEXT:LIST の HTML を列ごとの配列に変換
+
+    空欄（上層の露点など）は NaN。データが無ければ None。
+    """
+    if not text or any(marker in text for marker in NO_DATA_MARKERS):
+        return None
+
+    rows = []
+    in_data = False
+    for line in text.split("\n"):
+        if "PRES" in line and "HGHT" in line and "TEMP" in line:
+            in_data = True
+            continue
+        if in_data and ("</PRE>" in line or "Station information" in line):
+            break
+        if not in_data or not line.strip() or line.strip().startswith("-") or "hPa" in line:
+            continue
+        cells = [line[i * COLUMN_WIDTH:(i + 1) * COLUMN_WIDTH].strip() for i in range(len(COLUMNS))]
+        try:
+            row = [float(c) if c else np.nan for c in cells]
+        except ValueError:
+            continue
+        if not np.isnan(row[0]):
+            rows.append(row)
+
+    if not rows:
+        return None
+    table = np.array(rows, dtype=np.float64)
+    return {name: table[:, i] for i, name in enumerate(COLUMNS)}
+
+
+def profile_records(profile: Dict[str, np.ndarray]) -> List[Dict[str, Optional[float]]]:
+    """列形式 → 行ごとの dict（NaN は None）。fetch_radiosonde_batch.get_level() 用"""
+    n = len(profile["pres"])
+    return [
+        {name: (None if np.isnan(profile[name][i]) else float(profile[name][i])) for name in COLUMNS}
+        for i in range(n)
+    ]
+
+
+def sounding_key(when: datetime) -> str:
+    return when.strftime("%Y%m%d%H")
+
+
+class ProfileCache:
+    """radiosonde_cache/<station>/<YYYYMMDDHH>.npz の読み書き"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self._missing_lock = threading.Lock()
+
+    def _station_dir(self, station: str) -> Path:
+        return self.cache_dir / str(station)
+
+    def path(self, station: str, when: datetime) -> Path:
+        return self._station_dir(station) / f"{sounding_key(when)}.npz"
+
+    def has(self, station: str, when: datetime) -> bool:
+        return self.path(station, when).exists()
+
+    def save(self, station: str, when: datetime, profile: Dict[str, np.ndarray]) -> Path:
+        target = self.path(station, when)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".npz.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **{name: np.asarray(profile[name], dtype=np.float64) for name in COLUMNS})
+        os.replace(tmp, target)
+        return target
+
+    def load(self, station: str, when: datetime) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            with np.load(self.path(station, when)) as npz:
+                return {name: npz[name] for name in COLUMNS}
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def load_range(self, station: str, start: datetime, end: datetime,
+                   hours: Iterable[int] = (0, 12)) -> Dict[datetime, Dict[str, np.ndarray]]:
+        """期間内でキャッシュ済みのプロファイル {観測時刻: 列dict}"""
+        profiles = {}
+        for when in sounding_times(start, end, hours):
+            profile = self.load(station, when)
+            if profile is not None:
+                profiles[when] = profile
+        return profiles
+
+    # -- 「データなし」記録（再開時に再取得しない） --
+    def _missing_path(self, station: str) -> Path:
+        return self._station_dir(station) / "_missing.json"
+
+    def missing(self, station: str) -> set:
+        try:
+            with open(self._missing_path(station), encoding="utf-8") as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            return set()
+
+    def mark_missing(self, station: str, keys: Iterable[str]) -> None:
+        keys = set(keys)
+        if not keys:
+            return
+        with self._missing_lock:
+            merged = sorted(self.missing(station) | keys)
+            target = self._missing_path(station)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp, target)
+
+
+def sounding_times(start: datetime, end: datetime, hours: Iterable[int] = (0,)) -> Iterator[datetime]:
+    """start〜end（日付単位、両端含む）の観測時刻"""
+    hours = sorted(set(hours))
+    day = datetime(start.year, start.month, start.day)
+    while day.date() <= end.date():
+        for hour in hours:
+            yield day.replace(hour=hour)
+        day += timedelta(days=1)
+
+
+def load_profile(when: datetime, station: str = WAKKANAI_STATION, cache_dir=None):
+    """キャッシュ済みプロファイル（無ければ None）"""
+    return ProfileCache(cache_dir).load(station, when)
+
+
+def load_profiles(start: datetime, end: datetime, station: str = WAKKANAI_STATION,
+                  hours: Iterable[int] = (0, 12), cache_dir=None):
+    """期間内のキャッシュ済みプロファイル {観測時刻: 列dict}"""
+    return ProfileCache(cache_dir).load_range(station, start, end, hours)
+
+
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
+
+class HostPoliteness:
+    """ホストごとの同時接続数上限と、リクエスト開始間隔の下限"""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, tuple] = {}
+
+    def _host_state(self, host: str):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (threading.BoundedSemaphore(self.max_concurrent), threading.Lock(), [0.0])
+            return self._hosts[host]
+
+    @contextmanager
+    def slot(self, url: str):
+        semaphore, start_lock, next_start = self._host_state(urlsplit(url).netloc)
+        with semaphore:
+            with start_lock:
+                wait = next_start[0] - self._clock()
+                if wait > 0:
+                    self._sleep(wait)
+                next_start[0] = self._clock() + self.min_interval
+            yield
+
+
+class TransientFetchError(Exception):
+    """再試行で回復しうる取得失敗（通信エラー・5xx・混雑ページ）"""
+
+
+class RadiosondeFetcher:
+    """
+    並列・再開可能なラジオゾンデ取得
+
+    使い方:
+        fetcher = RadiosondeFetcher()
+        stats = fetcher.fetch_range("47401", datetime(2024, 6, 1), datetime(2024, 8, 31))
+        profiles = fetcher.cache.load_range("47401", datetime(2024, 6, 1), datetime(2024, 8, 31), hours=(0,))
+    """
+
+    def __init__(self, cache_dir=None, url: str = WYOMING_URL, max_workers: int = 4,
+                 per_host_concurrency: int = 2, min_interval: float = 0.5, retries: int = 3,
+                 backoff: float = 2.0, timeout: float = 30, sleep: Callable[[float], None] = time.sleep):
+        self.cache = ProfileCache(cache_dir)
+        self.url = url
+        self.max_workers = max_workers
+        self.politeness = HostPoliteness(per_host_concurrency, min_interval, sleep=sleep)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._sleep = sleep
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # Session はスレッド間で共有しない（keep-alive はスレッドごと）
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _params(self, station: str, when: datetime) -> Dict[str, object]:
+        return {
+            "region": "np",
+            "TYPE": "TEXT:LIST",
+            "YEAR": when.year,
+            "MONTH": f"{when.month:02d}",
+            "FROM": f"{when.day:02d}{when.hour:02d}",
+            "TO": f"{when.day:02d}{when.hour:02d}",
+            "STNM": station,
+        }
+
+    def fetch_text(self, station: str, when: datetime) -> str:
+        """1観測分の生テキスト（再試行込み）。失敗が続けば TransientFetchError"""
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                with self.politeness.slot(self.url):
+                    response = self._session().get(self.url, params=self._params(station, when),
+                                                   timeout=self.timeout)
+                if response.status_code >= 500:
+                    raise TransientFetchError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                if any(marker in response.text for marker in BUSY_MARKERS):
+                    raise TransientFetchError("server busy")
+                return response.text
+            except (requests.ConnectionError, requests.Timeout, TransientFetchError) as e:
+                last_error = e
+        raise TransientFetchError(f"{station} {sounding_key(when)}: {last_error}")
+
+    def _fetch_one(self, station: str, when: datetime) -> str:
+        profile = parse_sounding(self.fetch_text(station, when))
+        if profile is None:
+            return "missing"
+        self.cache.save(station, when, profile)
+        return "fetched"
+
+    def fetch_many(self, station: str, times: Iterable[datetime], retry_missing: bool = False,
+                   progress: Optional[Callable[[datetime, str], None]] = None) -> Dict[str, int]:
+        """
+        未キャッシュの観測のみ並列取得
+
+        Returns:
+            {'cached': n, 'fetched': n, 'missing': n, 'failed': n}
+        """
+        stats = {"cached": 0, "fetched": 0, "missing": 0, "failed": 0}
+        known_missing = set() if retry_missing else self.cache.missing(station)
+        todo = []
+        for when in times:
+            if self.cache.has(station, when):
+                stats["cached"] += 1
+            elif sounding_key(when) in known_missing:
+                stats["missing"] += 1
+            else:
+                todo.append(when)
+
+        new_missing = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_one, station, when): when for when in todo}
+            for future in as_completed(futures):
+                when = futures[future]
+                try:
+                    outcome = future.result()
+                except (TransientFetchError, requests.RequestException):
+                    outcome = "failed"
+                stats[outcome] += 1
+                if outcome == "missing":
+                    new_missing.append(sounding_key(when))
+                if progress:
+                    progress(when, outcome)
+
+        self.cache.mark_missing(station, new_missing)
+        return stats
+
+    def fetch_range(self, station: str, start: datetime, end: datetime, hours: Iterable[int] = (0,),
+                    **kwargs) -> Dict[str, int]:
+        return self.fetch_many(station, sounding_times(start, end, hours), **kwargs)
@@ -0,0 +1,358 @@
+"""One rate limiter (GCRA) with expiring blocks, shared across workers via Redis.
+
+Two limiters used to run side by side: flask_limiter (every limited request
+made a synchronous round trip to Upstash for its counter) and
+security.SecurityManager (per-IP timestamp lists rebuilt with a list
+comprehension on every request, plus a blocked_ips set that never expired).
+Both are replaced by this module:
+
+    GCRA (generic cell rate algorithm)
+        one float per (scope, client) — the theoretical arrival time.
+        "60 per minute" admits a burst of 60 and then one request per
+        second; the check is O(1) with no per-request list.
+    expiring blocks (opt-in)
+        with ``block_after`` set (per limiter or per ``limit()``), a client
+        that keeps going after being limited (``block_after`` rejected
+        requests in one period) is blocked for ``block_seconds`` on every
+        limited endpoint, then automatically released. Off by default:
+        flask_limiter never blocked, and behind a shared proxy address one
+        client's lockout would hit everyone.
+    asynchronous reconcile
+        requests are decided in-process; a daemon thread pushes the hits
+        counted since the last sync to Redis every ``sync_interval``
+        seconds in one pipeline (INCRBY per fixed window, SET EX for
+        blocks). Only buckets with unsent hits are pushed; an idle tick
+        sends nothing. The global count each INCRBY returns tells the
+        worker how many requests *other* workers admitted; those are
+        charged to the local GCRA state. A bucket with no local traffic is
+        polled with a plain GET at most every ``poll_interval`` seconds
+        (period/10 if longer) until its arrival time passes. Block keys
+        carry the limiter's ``namespace`` and block TTLs are only polled by
+        limiters that can block, so SecurityManager's blocks do not leak
+        into start.limiter. Without Redis (local dev) it is a plain
+        in-process limiter.
+
+Limits may overshoot by at most what other workers admit within one sync
+interval — the trade for taking Redis off the request path.
+
+RateLimiter.limit("20 per minute") is a drop-in for flask_limiter's
+decorator (``enabled`` toggles it off the same way); the 429 body is the
+JSON SecurityManager already returned, with a Retry-After header.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$", re.IGNORECASE)
+KEY_PREFIX = "rl"
+
+
+def parse_limit(spec: str) -> tuple[int, float]:
+    """'60 per minute' / '2/hour' / '10 per 5 minutes' → (回数, 期間[秒])"""
+    m = _LIMIT_RE.match(spec)
+    if not m:
+        raise ValueError(f"invalid rate limit: {spec!r}")
+    count = int(m.group(1))
+    if count <= 0:
+        raise ValueError(f"invalid rate limit: {spec!r}")
+    return count, float(int(m.group(2) or 1) * PERIODS[m.group(3).lower()])
+
+
+def upstash_pipeline_from_env(timeout: float = 3.0) -> Optional[Callable[[list], Optional[list]]]:
+    """UPSTASH_REDIS_REST_URL/TOKEN があれば /pipeline を呼ぶ関数、なければ None"""
+    rest_url = os.environ.get('UPSTASH_REDIS_REST_URL', '').strip().rstrip('/')
+    token = os.environ.get('UPSTASH_REDIS_REST_TOKEN', '')
+    if not rest_url or not token:
+        return None
+
+    def pipeline(commands: list) -> Optional[list]:
+        import requests
+        try:
+            resp = requests.post(f'{rest_url}/pipeline',
+                                 headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+                                 json=commands, timeout=timeout)
+            results = resp.json()
+            return [r.get('result') if isinstance(r, dict) else None for r in results] \
+                if isinstance(results, list) else None
+        except Exception as exc:
+            logger.warning('[rate_limiter] redis sync failed: %s', exc)
+            return None
+
+    return pipeline
+
+
+@dataclass
+class _Bucket:
+    limit: int
+    period: float
+    tat: float = 0.0          # theoretical arrival time
+    window: int = -1          # 固定窓の番号（Redis 集計単位）
+    pending: int = 0          # 未送信のローカル許可数
+    sent: int = 0             # この窓で送信済みのローカル許可数
+    others: int = 0           # この窓で反映済みの他ワーカー分
+    rejected: int = 0         # この窓での拒否数（ブロック判定）
+    polled_at: float = 0.0    # 最後に Redis の集計を見た時刻
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.limit
+
+
+class RateLimiter:
+    """GCRA レート制限 + 期限つきブロック。Redis とは非同期に突き合わせる。"""
+
+    def __init__(self, app=None, key_func: Optional[Callable[[], str]] = None,
+                 redis_pipeline: Optional[Callable[[list], Optional[list]]] = None,
+                 sync_interval: float = 2.0, block_after: Optional[int] = None,
+                 block_seconds: float = 900.0, clock: Callable[[], float] = time.time,
+                 namespace: str = 'default', poll_interval: float = 30.0):
+        self.enabled = True
+        self.key_func = key_func
+        self.redis_pipeline = redis_pipeline
+        self.sync_interval = sync_interval
+        self.block_after = block_after
+        self.block_seconds = block_seconds
+        self.clock = clock
+        self.namespace = namespace
+        self.poll_interval = poll_interval
+        self._uses_blocks = bool(block_after)   # ブロックし得る limiter だけ Redis のブロックを見る
+        self._buckets: dict[tuple[str, str], _Bucket] = {}
+        self._blocks: dict[str, float] = {}          # client → 解除時刻
+        self._new_blocks: dict[str, float] = {}      # Redis 未送信のブロック
+        self._lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        app.extensions['rate_limiter'] = self
+
+    # -- core ---------------------------------------------------------------
+    def hit(self, scope: str, key: str, limit: int, period: float,
+            block_after: Optional[int] = None) -> tuple[bool, float]:
+        """
+        1リクエスト分を判定。(許可, retry_after 秒)
+        block_after（省略時はインスタンスの値）回拒否したらブロック。None/0 ならブロックしない。
+        retry_after は GCRA の待ち時間とブロック残り時間の長い方。
+        """
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get((scope, key))
+            if bucket is None or bucket.limit != limit or bucket.period != period:
+                bucket = self._buckets[(scope, key)] = _Bucket(limit, period)
+            self._roll_window(bucket, now)
+            new_tat = max(bucket.tat, now) + bucket.interval
+            gcra_wait = max(0.0, new_tat - now - period)
+
+            blocked_until = self._blocks.get(key)
+            if blocked_until is not None:
+                if blocked_until > now:
+                    return False, max(gcra_wait, blocked_until - now)
+                del self._blocks[key]
+
+            if gcra_wait > 1e-9:
+                bucket.rejected += 1
+                threshold = block_after if block_after is not None else self.block_after
+                if threshold and bucket.rejected >= threshold:
+                    self._blocks[key] = self._new_blocks[key] = now + self.block_seconds
+                    return False, max(gcra_wait, self.block_seconds)
+                return False, gcra_wait
+            bucket.tat = new_tat
+            bucket.pending += 1
+        self._ensure_sync_thread()
+        return True, 0.0
+
+    def is_blocked(self, key: str) -> bool:
+        with self._lock:
+            until = self._blocks.get(key)
+            return until is not None and until > self.clock()
+
+    def block(self, key: str, seconds: Optional[float] = None) -> None:
+        with self._lock:
+            self._uses_blocks = True
+            self._blocks[key] = self._new_blocks[key] = self.clock() + (seconds or self.block_seconds)
+
+    def unblock(self, key: str) -> None:
+        with self._lock:
+            self._blocks.pop(key, None)
+            self._new_blocks.pop(key, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._blocks.clear()
+            self._new_blocks.clear()
+
+    def _roll_window(self, bucket: _Bucket, now: float) -> None:
+        window = int(now // bucket.period)
+        if window != bucket.window:
+            bucket.window = window
+            # 前の窓の未送信分 (pending) は新しい窓のカウンタに載せる（取りこぼさない）
+            bucket.sent = bucket.others = bucket.rejected = 0
+
+    # -- Redis reconcile ----------------------------------------------------
+    def _block_key(self, key: str) -> str:
+        return f'{KEY_PREFIX}:{self.namespace}:block:{key}'
+
+    def _should_poll(self, b: _Bucket, now: float) -> bool:
+        """ローカルの流量がない生きたバケットは、poll_interval（長い期間なら period/10）ごとに GET"""
+        return b.tat > now and now - b.polled_at >= max(self.poll_interval, b.period / 10)
+
+    def sync(self) -> bool:
+        """未送信の許可数とブロックを Redis へ送り、他ワーカーの分を取り込む"""
+        if self.redis_pipeline is None:
+            return False
+        now = self.clock()
+        with self._lock:
+            entries, polls = [], []
+            for (scope, key), b in self._buckets.items():
+                self._roll_window(b, now)
+                if b.pending:
+                    entries.append((scope, key, b, b.pending, b.window))
+                    b.polled_at = now
+                elif self._should_poll(b, now):
+                    polls.append((scope, key, b, b.window))
+                    b.polled_at = now
+            blocks = dict(self._new_blocks)
+            self._new_blocks.clear()
+            for *_, b, pending, _ in entries:
+                b.pending -= pending
+                b.sent += pending
+            clients = sorted({key for _, key, *_ in entries}) if self._uses_blocks else []
+
+        commands = []
+        for scope, key, b, pending, window in entries:
+            counter = f'{KEY_PREFIX}:{scope}:{key}:{window}'
+            commands.append(['INCRBY', counter, pending])
+            commands.append(['EXPIRE', counter, int(b.period * 2) + 1])
+        for scope, key, b, window in polls:
+            commands.append(['GET', f'{KEY_PREFIX}:{scope}:{key}:{window}'])
+        for key, until in blocks.items():
+            commands.append(['SET', self._block_key(key), '1', 'EX', max(1, int(until - now))])
+        for key in clients:
+            commands.append(['TTL', self._block_key(key)])
+        if not commands:
+            return True
+
+        results = self.redis_pipeline(commands)
+        with self._lock:
+            if results is None or len(results) != len(commands):
+                # 送れなかった分は次回に回す
+                for *_, b, pending, window in entries:
+                    if b.window == window:
+                        b.sent -= pending
+                    b.pending += pending
+                for key, until in blocks.items():
+                    self._new_blocks.setdefault(key, until)
+                return False
+
+            totals = [(b, window, results[2 * i]) for i, (_, _, b, _, window) in enumerate(entries)]
+            totals += [(b, window, results[2 * len(entries) + j]) for j, (_, _, b, window) in enumerate(polls)]
+            for b, window, total in totals:
+                try:
+                    total = int(total)
+                except (TypeError, ValueError):
+                    continue
+                if b.window != window:
+                    continue
+                others = max(0, total - b.sent)
+                delta = others - b.others
+                if delta > 0:
+                    # 他ワーカーが許可した分だけ GCRA の到着時刻を進める
+                    b.tat = min(max(b.tat, now) + delta * b.interval, now + b.period + b.interval)
+                    b.others = others
+            ttl_results = results[len(commands) - len(clients):]
+            for key, ttl in zip(clients, ttl_results):
+                try:
+                    ttl = int(ttl)
+                except (TypeError, ValueError):
+                    continue
+                if ttl > 0:
+                    self._blocks[key] = max(self._blocks.get(key, 0), now + ttl)
+            self._prune(now)
+        return True
+
+    def _prune(self, now: float) -> None:
+        """到着時刻が過ぎ、未送信もないバケットと期限切れブロックを捨てる"""
+        for k in [k for k, b in self._buckets.items() if b.tat <= now and not b.pending]:
+            del self._buckets[k]
+        for k in [k for k, until in self._blocks.items() if until <= now]:
+            del self._blocks[k]
+
+    def _ensure_sync_thread(self) -> None:
+        if self.redis_pipeline is None or self._sync_thread is not None:
+            return
+        with self._lock:
+            if self._sync_thread is not None:
+                return
+            self._sync_thread = threading.Thread(target=self._sync_loop, name='rate-limiter-sync', daemon=True)
+            self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as exc:
+                logger.warning('[rate_limiter] sync error: %s', exc)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self.clock()
+            return {
+                'buckets': len(self._buckets),
+                'blocked': sum(1 for until in self._blocks.values() if until > now),
+                'pending_hits': sum(b.pending for b in self._buckets.values()),
+                'redis': self.redis_pipeline is not None,
+            }
+
+    # -- Flask --------------------------------------------------------------
+    def limit(self, spec: str, key_func: Optional[Callable[[], str]] = None, scope: Optional[str] = None,
+              block_after: Optional[int] = None):
+        """@app.route の下に付けるデコレータ（flask_limiter の limiter.limit と同じ使い方）"""
+        count, period = parse_limit(spec)
+        if block_after:
+            self._uses_blocks = True
+
+        def decorator(f):
+            name = scope or f'{f.__module__}.{f.__qualname__}'
+
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                from flask import request
+                key = (key_func or self.key_func or (lambda: request.remote_addr or '127.0.0.1'))()
+                allowed, retry_after = self.hit(name, key, count, period, block_after)
+                if not allowed:
+                    return self._too_many_requests(key, retry_after)
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def _too_many_requests(self, key: str, retry_after: float):
+        from flask import jsonify
+        retry = max(1, int(retry_after + 0.999))
+        if self.is_blocked(key):
+            body = {'error': 'Access denied', 'message': 'Your IP has been temporarily blocked',
+                    'retry_after': retry}
+        else:
+            body = {'error': 'Rate limit exceeded', 'message': 'Too many requests. Please try again later.',
+                    'retry_after': retry}
+        response = jsonify(body)
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry)
+        return response
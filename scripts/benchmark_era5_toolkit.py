@@ -0,0 +1,146 @@
+"""Benchmark era5_toolkit against the per-timestep loop of analyze_era5_contours.py.
+
+Writes a synthetic hourly ERA5-like NetCDF3 file (u/v/w on 500/700/850 hPa)
+to a temporary directory and times:
+
+  legacy   per-timestep slicing + 2-D vorticity, one time step at a time
+           (xarray.isel when xarray is installed, else the same loop on
+           scipy's memmap — the xarray version is slower still)
+  cold     era5_toolkit.load_fields() extraction to .npy + vectorized pass
+  warm     cache hit (memmap reopen) + vectorized pass
+
+    python scripts/benchmark_era5_toolkit.py
+    python scripts/benchmark_era5_toolkit.py --years 3 --grid 25
+"""
+import argparse
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.io import netcdf_file
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import era5_toolkit  # noqa: E402
+
+LEVELS = (500, 700, 850)
+KUTSUGATA = (45.2422, 141.1088)
+MOUNTAIN_AZIMUTH = 114.0
+
+
+def write_synthetic_era5(path, n_time, n_grid, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = np.linspace(45.75, 44.75, n_grid)
+    lon = np.linspace(140.5, 141.9, n_grid)
+    with netcdf_file(str(path), "w") as nc:
+        nc.createDimension("valid_time", n_time)
+        nc.createDimension("pressure_level", len(LEVELS))
+        nc.createDimension("latitude", n_grid)
+        nc.createDimension("longitude", n_grid)
+        nc.createVariable("latitude", "f8", ("latitude",))[:] = lat
+        nc.createVariable("longitude", "f8", ("longitude",))[:] = lon
+        nc.createVariable("pressure_level", "i4", ("pressure_level",))[:] = LEVELS
+        time_var = nc.createVariable("valid_time", "i4", ("valid_time",))
+        time_var[:] = np.arange(n_time)
+        time_var.units = b"hours since 2023-01-01 00:00:00"
+        dims = ("valid_time", "pressure_level", "latitude", "longitude")
+        for name, scale in (("u", 10.0), ("v", 10.0), ("w", 0.3)):
+            var = nc.createVariable(name, "f4", dims)
+            for start in range(0, n_time, 1000):
+                stop = min(start + 1000, n_time)
+                var[start:stop] = rng.normal(0, scale, (stop - start, len(LEVELS), n_grid, n_grid))
+    return lat, lon
+
+
+def legacy_loop(path):
+    """analyze_era5_contours.py の旧ループ（1時刻ずつスライスして2次元渦度）"""
+    try:
+        import xarray as xr
+    except ImportError:
+        xr = None
+    if xr is not None:
+        ds = xr.open_dataset(path)
+        u_500 = ds["u"].sel(pressure_level=500)
+        v_500 = ds["v"].sel(pressure_level=500)
+        omega_700 = ds["w"].sel(pressure_level=700)
+        lat, lon = ds.latitude.values, ds.longitude.values
+
+        def take(da, t, point=None):
+            sel = {"valid_time": t} if point is None else {"valid_time": t, "latitude": point[0],
+                                                           "longitude": point[1]}
+            return da.isel(sel).values
+    else:
+        nc = netcdf_file(str(path), mmap=True)
+        u_500, v_500, omega_700 = (nc.variables[n][:, LEVELS.index(lvl)]
+                                   for n, lvl in (("u", 500), ("v", 500), ("w", 700)))
+        lat, lon = nc.variables["latitude"][:].copy(), nc.variables["longitude"][:].copy()
+
+        def take(arr, t, point=None):
+            return np.array(arr[t] if point is None else arr[t, point[0], point[1]])
+
+    lat_idx = np.abs(lat - KUTSUGATA[0]).argmin()
+    lon_idx = np.abs(lon - KUTSUGATA[1]).argmin()
+    cos_list, vort_list, omega_list = [], [], []
+    for t in range(u_500.shape[0]):
+        u_t = take(u_500, t, (lat_idx, lon_idx))
+        v_t = take(v_500, t, (lat_idx, lon_idx))
+        wind_dir = (np.degrees(np.arctan2(-u_t, -v_t)) + 360) % 360
+        angle_diff = abs((wind_dir + 180) % 360 - MOUNTAIN_AZIMUTH)
+        if angle_diff > 180:
+            angle_diff = 360 - angle_diff
+        vort_grid = era5_toolkit.vorticity(take(u_500, t), take(v_500, t), lat, lon)
+        cos_list.append(math.cos(math.radians(angle_diff)))
+        vort_list.append(vort_grid[lat_idx, lon_idx])
+        omega_list.append(take(omega_700, t, (lat_idx, lon_idx)))
+    return np.corrcoef(cos_list, vort_list)[0, 1], np.corrcoef(cos_list, omega_list)[0, 1]
+
+
+def vectorized(path, cache_dir):
+    fields = era5_toolkit.load_fields(path, {"u": [500], "v": [500], "w": [700]}, cache_dir=cache_dir)
+    lat_idx, lon_idx = era5_toolkit.nearest_indices(fields.lat, fields.lon, [KUTSUGATA])
+    vort = era5_toolkit.extract_points(
+        era5_toolkit.vorticity(fields["u_500"], fields["v_500"], fields.lat, fields.lon), lat_idx, lon_idx)[:, 0]
+    u, v, w = (era5_toolkit.extract_points(fields[k], lat_idx, lon_idx)[:, 0] for k in ("u_500", "v_500", "w_700"))
+    cos_vals = era5_toolkit.cos_mountain_angle(era5_toolkit.wind_direction(u, v), MOUNTAIN_AZIMUTH)
+    return era5_toolkit.pearson(cos_vals, vort), era5_toolkit.pearson(cos_vals, w)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="era5_toolkit benchmark")
+    parser.add_argument("--years", type=float, default=1.0, help="hourly steps = years * 8760")
+    parser.add_argument("--grid", type=int, default=17, help="grid points per side")
+    args = parser.parse_args()
+    n_time = int(args.years * 8760)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "era5_synthetic.nc"
+        t0 = time.perf_counter()
+        write_synthetic_era5(path, n_time, args.grid)
+        print(f"Synthetic file: {n_time} steps x {len(LEVELS)} levels x {args.grid}x{args.grid} "
+              f"({path.stat().st_size / 1e6:.0f} MB) written in {time.perf_counter() - t0:.1f}s")
+
+        t0 = time.perf_counter()
+        legacy = legacy_loop(path)
+        t_legacy = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        cold = vectorized(path, Path(tmp) / "cache")
+        t_cold = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        warm = vectorized(path, Path(tmp) / "cache")
+        t_warm = time.perf_counter() - t0
+
+    assert np.allclose(legacy, cold, atol=1e-6) and np.allclose(cold, warm)
+    print(f"legacy per-step loop : {t_legacy:8.3f}s")
+    print(f"toolkit cold (extract): {t_cold:8.3f}s  ({t_legacy / t_cold:5.1f}x)")
+    print(f"toolkit warm (cached) : {t_warm:8.3f}s  ({t_legacy / t_warm:5.1f}x)")
+    print(f"r(cos, vort500)={cold[0]:+.4f}  r(cos, omega700)={cold[1]:+.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Track the cold-start import cost of the web worker.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters and
+reports the median total import time plus the slowest top-level imports.
+Modules listed in DEFERRED must not be imported at all (they are loaded
+lazily, see warm_start.py); the script exits non-zero if one shows up or if
+the median exceeds --budget-ms.
+
+    python scripts/benchmark_import_time.py
+    python scripts/benchmark_import_time.py --runs 5 --save importtime.json
+    python scripts/benchmark_import_time.py --baseline importtime.json --budget-ms 900
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# import start の時点で読み込まれてはいけない重いモジュール
+DEFERRED = ("pandas", "scipy.optimize", "PIL", "matplotlib", "xarray")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module):
+    """1回分: {'total_ms', 'modules': {name: cumulative_ms}, 'top_level': {...}}"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    modules, top_level = {}, {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        depth = (len(match.group(3)) - 1) // 2
+        name = match.group(4)
+        modules[name] = cumulative_ms
+        if depth == 1:
+            top_level[name] = cumulative_ms
+    return {"total_ms": modules.get(module, 0.0), "modules": modules, "top_level": top_level}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import-time benchmark")
+    parser.add_argument("--module", default="start")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if the median exceeds this")
+    parser.add_argument("--save", type=Path, help="write results JSON")
+    parser.add_argument("--baseline", type=Path, help="compare with a saved results JSON")
+    args = parser.parse_args()
+
+    measure(args.module)  # .pyc を作るための1回目は捨てる
+    runs = [measure(args.module) for _ in range(args.runs)]
+    total = statistics.median(r["total_ms"] for r in runs)
+    last = runs[-1]
+
+    samples = ", ".join(f"{r['total_ms']:.0f}" for r in runs)
+    print(f"import {args.module}: median {total:.0f} ms over {args.runs} runs ({samples})")
+    print(f"{'top-level import':32s} {'cumulative':>12s}")
+    for name, ms in sorted(last["top_level"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:30s} {ms:10.1f}ms")
+
+    failed = False
+    if args.baseline:
+        base = json.loads(args.baseline.read_text())
+        print(f"vs baseline {base['median_ms']:.0f} ms: {(total - base['median_ms']) / base['median_ms'] * 100:+.1f}%")
+    leaked = [name for name in DEFERRED if name in last["modules"]]
+    if leaked:
+        print(f"deferred modules imported eagerly: {', '.join(leaked)}")
+        failed = True
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"over budget: {total:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if args.save:
+        args.save.write_text(json.dumps({"module": args.module, "median_ms": total,
+                                         "runs_ms": [r["total_ms"] for r in runs],
+                                         "top_level": last["top_level"]}, indent=2))
+        print(f"saved: {args.save}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
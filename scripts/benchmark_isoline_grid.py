@@ -0,0 +1,93 @@
+"""Benchmark IsolineAnalysisEngine field interpolation for a forecast day:
+five parameters × 24 hours on the 200 m analysis grid, one station layout.
+
+legacy: griddata cubic → linear → nearest per field, per-cell terrain lookup
+        and per-cell quality-mask loop (the previous engine code)
+new:    isoline_grid.ObservationLayout + cached terrain_elevation_raster()
+
+Uses the repository's rishiri_terrain.db (read-only; raster cache in a temp dir).
+
+    python scripts/benchmark_isoline_grid.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.interpolate import griddata
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from isoline_grid import ObservationLayout, terrain_elevation_raster  # noqa: E402
+from terrain_database import RishiriTerrainDatabase  # noqa: E402
+
+PARAMETERS = ('temperature', 'humidity', 'pressure', 'wind_speed', 'precipitation')
+HOURS = 24
+LEGACY_FIELDS = 2  # 旧方式は2場だけ測って外挿
+
+
+def analysis_grid():
+    lats = np.arange(45.05, 45.28, 0.002)
+    lons = np.arange(141.13, 141.33, 0.002)
+    return np.meshgrid(lats, lons)
+
+
+def legacy_field(db, lats_obs, lons_obs, values, lat_grid, lon_grid, parameter):
+    points_obs = np.column_stack((lats_obs, lons_obs))
+    grid_points = np.column_stack((lat_grid.ravel(), lon_grid.ravel()))
+    out = griddata(points_obs, values, grid_points, method='cubic')
+    nan_mask = np.isnan(out)
+    out[nan_mask] = griddata(points_obs, values, grid_points, method='linear')[nan_mask]
+    nan_mask = np.isnan(out)
+    out[nan_mask] = griddata(points_obs, values, grid_points, method='nearest')[nan_mask]
+    out = out.reshape(lat_grid.shape)
+    if parameter in ('temperature', 'pressure'):
+        for i in range(lat_grid.shape[0]):
+            for j in range(lat_grid.shape[1]):
+                info = db.get_terrain_at_point(lat_grid[i, j], lon_grid[i, j])
+                out[i, j] -= info.elevation * (0.006 if parameter == 'temperature' else 0.12)
+    quality = np.ones_like(lat_grid)
+    for i in range(lat_grid.shape[0]):
+        for j in range(lat_grid.shape[1]):
+            d = np.min(np.sqrt((lats_obs - lat_grid[i, j]) ** 2 + (lons_obs - lon_grid[i, j]) ** 2))
+            if d > 0.05:
+                quality[i, j] = max(0.1, 1.0 - (d - 0.05) * 2)
+    return out, quality
+
+
+def main() -> None:
+    db = RishiriTerrainDatabase(str(ROOT / "rishiri_terrain.db"))
+    lat_grid, lon_grid = analysis_grid()
+    rng = np.random.default_rng(0)
+    lats_obs, lons_obs = rng.uniform(45.08, 45.25, 30), rng.uniform(141.15, 141.30, 30)
+    values = {(p, h): rng.normal(10, 3, 30) for p in PARAMETERS for h in range(HOURS)}
+    n_fields = len(values)
+    print(f"grid {lat_grid.shape[0]}x{lat_grid.shape[1]}, {len(lats_obs)} stations, {n_fields} fields")
+
+    t0 = time.perf_counter()
+    for (p, _), v in list(values.items())[:LEGACY_FIELDS]:
+        legacy_field(db, lats_obs, lons_obs, v, lat_grid, lon_grid, p)
+    t_legacy = (time.perf_counter() - t0) * n_fields / LEGACY_FIELDS
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t0 = time.perf_counter()
+        elevation = np.nan_to_num(terrain_elevation_raster(db, lat_grid, lon_grid, cache_dir))
+        layout = ObservationLayout(lats_obs, lons_obs, lat_grid, lon_grid)
+        t_setup = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for (p, _), v in values.items():
+            field = layout.interpolate(v)
+            if p in ('temperature', 'pressure'):
+                field = field - elevation * (0.006 if p == 'temperature' else 0.12)
+            layout.quality_mask()
+        t_new = time.perf_counter() - t0
+
+    print(f"legacy {t_legacy:8.1f}s*  (extrapolated from {LEGACY_FIELDS} fields)")
+    print(f"new    {t_setup + t_new:8.2f}s   (setup {t_setup * 1e3:.0f}ms + {t_new:.2f}s)  "
+          f"{t_legacy / (t_setup + t_new):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Offline benchmark of the web app's upstream-bound paths.
+
+Starts upstream_stubs.OfflineUpstreams (local Open-Meteo / JMA / LINE stubs and
+an in-memory Upstash REST emulator), then runs scripted workloads against
+start.py in-process and reports throughput, tail latency and upstream calls:
+
+  forecast  GET /api/forecast for a rotating set of spots
+  field     GET /api/analysis/field for every field type
+  notify    line_integration.notify_all('evening') for N subscribers
+            (date pinned inside the kelp season)
+  nowcast   start._record_nowcast_snapshot() (JMA tiles -> Redis)
+
+No network access is needed; any request to a host other than the stubs
+fails. Save a run with --save and compare later runs with --baseline.
+
+    python scripts/benchmark_offline.py
+    python scripts/benchmark_offline.py --latency-ms 80 --jitter-ms 40 --cold
+    python scripts/benchmark_offline.py --workloads forecast --error-rate 0.1 --save baseline.json
+    python scripts/benchmark_offline.py --baseline baseline.json
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import start  # noqa: E402
+import line_integration  # noqa: E402
+from upstream_stubs import OfflineUpstreams  # noqa: E402
+
+JST = timezone(timedelta(hours=9))
+FIELD_TYPES = ("score", "wind", "humidity", "temperature", "solar", "precipitation")
+SEASON_NOW = datetime(2026, 7, 15, 10, 0, tzinfo=JST)
+
+
+class _SeasonDatetime(datetime):
+    """notify_all の季節判定を通すため、notify 実行中だけ now() を昆布シーズンに固定"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return SEASON_NOW.astimezone(tz) if tz else SEASON_NOW.replace(tzinfo=None)
+
+
+def load_spots(limit):
+    with open(start.CSV_FILE, encoding="utf-8") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("name") and r.get("lat") and r.get("lon")]
+    return rows[:limit]
+
+
+def reset_app_caches():
+    """--cold: プロセス内キャッシュを空にして毎回上流まで取りに行かせる"""
+    for name in ("_elevation_cache", "_analysis_field_cache", "_field_dataset_cache"):
+        cache = getattr(start, name, None)
+        if isinstance(cache, dict):
+            cache.clear()
+    for name in ("_AMEDAS_RT_CACHE", "_NOWCAST_CACHE"):
+        cache = getattr(start, name, None)
+        if isinstance(cache, dict):
+            cache.update(data=None, fetched_at=None)
+
+
+def forecast_ops(spots, iterations):
+    client = start.app.test_client()
+    for i in range(iterations):
+        spot = spots[i % len(spots)]
+        yield lambda s=spot: client.get(f"/api/forecast?lat={s['lat']}&lon={s['lon']}&name={s['name']}").status_code
+
+
+def field_ops(spots, iterations):
+    client = start.app.test_client()
+    for i in range(iterations):
+        field = FIELD_TYPES[i % len(FIELD_TYPES)]
+        yield lambda f=field, d=i // len(FIELD_TYPES) % 3: client.get(
+            f"/api/analysis/field?type={f}&day={d}&hour=10").status_code
+
+
+def notify_ops(spots, iterations, upstreams, subscribers):
+    subs = {}
+    for i in range(subscribers):
+        source_id = f"U{i:032d}"
+        subs[f"user:{source_id}"] = {
+            "source_type": "user", "source_id": source_id, "notify_enabled": True,
+            "spots": [spots[(i * 3 + k) % len(spots)]["name"] for k in range(3)],
+        }
+    upstreams.redis.execute("SET", line_integration._UPSTASH_REDIS_KEY, json.dumps(subs))
+
+    def run():
+        # 実行ロック・送信済みキーを消して毎回フルに通知させる
+        for key in upstreams.redis.execute("KEYS", "line_notify_run:*") + \
+                upstreams.redis.execute("KEYS", "notify_sent:*"):
+            upstreams.redis.execute("DEL", key)
+        saved = start.datetime, line_integration.datetime, upstreams.open_meteo_fixtures.today
+        start.datetime = line_integration.datetime = _SeasonDatetime
+        upstreams.open_meteo_fixtures.today = SEASON_NOW
+        try:
+            result = line_integration.notify_all("evening")
+        finally:
+            start.datetime, line_integration.datetime, upstreams.open_meteo_fixtures.today = saved
+        return 200 if result.get("sent") == subscribers else 500
+
+    for _ in range(iterations):
+        yield run
+
+
+def nowcast_ops(spots, iterations, upstreams):
+    def run():
+        for key in upstreams.redis.execute("KEYS", "nowcast:*"):
+            upstreams.redis.execute("DEL", key)
+        start._NOWCAST_CACHE.update(data=None, fetched_at=None)
+        start._record_nowcast_snapshot()
+        return 200 if upstreams.redis.execute("KEYS", "nowcast:daily:*") else 500
+
+    for _ in range(iterations):
+        yield run
+
+
+def run_workload(name, ops, upstreams, cold):
+    upstreams.reset_counts()
+    latencies, failures = [], 0
+    started = time.perf_counter()
+    for op in ops:
+        if cold:
+            reset_app_caches()
+        t0 = time.perf_counter()
+        status = op()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        failures += status >= 400
+    elapsed = time.perf_counter() - started
+    calls = upstreams.call_counts()
+    values = np.array(latencies)
+    return {
+        "ops": len(latencies),
+        "failures": int(failures),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(values, 50)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "p99_ms": round(float(np.percentile(values, 99)), 1),
+        "max_ms": round(float(values.max()), 1),
+        "upstream_calls": calls,
+        "upstream_calls_per_op": {k: round(v / len(latencies), 2) for k, v in calls.items()},
+        "redis_commands": dict(upstreams.redis.commands),
+    }
+
+
+def print_report(results, baseline=None):
+    header = f"{'workload':10s} {'ops':>5s} {'fail':>5s} {'ops/s':>9s} {'p50':>8s} {'p95':>8s} {'p99':>8s}  upstream calls/op"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        calls = " ".join(f"{k}={v:g}" for k, v in r["upstream_calls_per_op"].items() if v)
+        print(f"{name:10s} {r['ops']:5d} {r['failures']:5d} {r['throughput_ops_s']:9.2f} "
+              f"{r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms  {calls}")
+        base = (baseline or {}).get(name)
+        if base:
+            def delta(key):
+                return (r[key] - base[key]) / base[key] * 100 if base.get(key) else float("nan")
+            base_calls = sum(base["upstream_calls"].values())
+            call_delta = sum(r["upstream_calls"].values()) / r["ops"] - base_calls / base["ops"]
+            print(f"{'  vs base':10s} {'':11s} {delta('throughput_ops_s'):+8.1f}% {delta('p50_ms'):+8.1f}% "
+                  f"{delta('p95_ms'):+8.1f}% {delta('p99_ms'):+8.1f}%  calls/op {call_delta:+.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline benchmark with local upstream stubs")
+    parser.add_argument("--workloads", default="forecast,field,notify,nowcast")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--spots", type=int, default=30, help="distinct spots used by forecast/notify")
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stub response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub responses that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fixtures", type=Path, default=None,
+                        help="directory of recorded Open-Meteo JSON (<host>/<path>.json)")
+    parser.add_argument("--cold", action="store_true", help="clear in-process caches before every op")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, help="write results JSON")
+    parser.add_argument("--baseline", type=Path, help="compare with a saved results JSON")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+    start.limiter.enabled = False
+    spots = load_spots(args.spots)
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            OfflineUpstreams(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                             error_status=args.error_status, fixture_dir=args.fixtures, seed=args.seed) as upstreams:
+        # 予報履歴などのファイル書き込みはリポジトリではなく一時ディレクトリへ
+        start.FORECAST_HISTORY_DIR = os.path.join(tmp, "forecast_history")
+        os.environ.setdefault("LINE_CHANNEL_ACCESS_TOKEN", "stub-token")
+
+        factories = {
+            "forecast": lambda: forecast_ops(spots, args.iterations),
+            "field": lambda: field_ops(spots, args.iterations),
+            "notify": lambda: notify_ops(spots, max(1, args.iterations // 10), upstreams, args.subscribers),
+            "nowcast": lambda: nowcast_ops(spots, max(1, args.iterations // 4), upstreams),
+        }
+        results = {}
+        for name in args.workloads.split(","):
+            results[name] = run_workload(name, factories[name](), upstreams, args.cold)
+
+    report = {
+        "generated_at": datetime.now(JST).isoformat(),
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "workloads": results,
+    }
+    baseline = json.loads(args.baseline.read_text())["workloads"] if args.baseline else None
+    print_report(results, baseline)
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"saved: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark parameter_search.SearchRunner on the model calibration objective.
+
+Builds synthetic calibration cases (12 work hours each, a third of them
+above the forest line) and reports candidates per second for:
+
+  legacy   per-case loop: terrain correction on hourly dicts +
+           KelpDryingModel.evaluate_drying_conditions(), one candidate at a time
+  serial   calibration_accuracy() (batch drying simulation), workers=1
+  pool     same objective in a multiprocessing pool
+  resume   rerun against the sqlite checkpoint written by the pool run
+
+    python scripts/benchmark_parameter_search.py
+    python scripts/benchmark_parameter_search.py --cases 2000 --candidates 400 --workers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import parameter_search  # noqa: E402
+from kelp_drying_model import KelpDryingModel  # noqa: E402
+from model_parameter_calibration import CALIBRATION_SEARCH_SPACE, calibration_accuracy  # noqa: E402
+
+
+def synthetic_features(n_cases, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "temperature": rng.uniform(12, 28, (n_cases, 12)),
+        "humidity": rng.uniform(40, 100, (n_cases, 12)),
+        "wind_speed": rng.uniform(0, 10, (n_cases, 12)),
+        "elevation": rng.choice([0.0, 60.0, 150.0], n_cases),
+        "success": rng.random(n_cases) < 0.5,
+    }
+
+
+def legacy_accuracy(model, features, params):
+    correct = 0
+    for i in range(len(features["success"])):
+        elevation = features["elevation"][i]
+        forest = elevation > params["forest_elevation"]
+        hourly = []
+        for t, h, w in zip(features["temperature"][i], features["humidity"][i], features["wind_speed"][i]):
+            hourly.append({
+                "temperature": t - elevation * params["temperature_lapse"],
+                "relative_humidity": min(100, h + (params["forest_humidity_correction"] if forest else 0)),
+                "wind_speed": max(0, w + (params["forest_wind_correction"] if forest else 0)),
+                "time_step": 3600,
+            })
+        score = model.evaluate_drying_conditions(hourly)["score"]
+        correct += (score >= params["score_threshold"]) == features["success"][i]
+    return correct / len(features["success"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parameter_search benchmark")
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--legacy-candidates", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    features = synthetic_features(args.cases)
+    candidates = parameter_search.latin_hypercube_candidates(CALIBRATION_SEARCH_SPACE, args.candidates, seed=1)
+    print(f"{args.cases} cases x 12 hours, {args.candidates} LHS candidates, {args.workers} workers")
+
+    model = KelpDryingModel()
+    start = time.perf_counter()
+    legacy = [legacy_accuracy(model, features, c) for c in candidates[:args.legacy_candidates]]
+    legacy_rate = args.legacy_candidates / (time.perf_counter() - start)
+
+    with parameter_search.SearchRunner(calibration_accuracy, features, workers=1) as runner:
+        start = time.perf_counter()
+        serial = runner.evaluate(candidates)
+        serial_rate = args.candidates / (time.perf_counter() - start)
+    assert np.allclose(legacy, [t.score for t in serial[:args.legacy_candidates]])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = str(Path(tmp) / "bench.sqlite")
+        with parameter_search.SearchRunner(calibration_accuracy, features, checkpoint=checkpoint,
+                                           workers=args.workers) as runner:
+            start = time.perf_counter()
+            runner.evaluate(candidates)
+            pool_rate = args.candidates / (time.perf_counter() - start)
+        with parameter_search.SearchRunner(calibration_accuracy, features, checkpoint=checkpoint,
+                                           workers=args.workers) as runner:
+            start = time.perf_counter()
+            runner.evaluate(candidates)
+            resume_rate = args.candidates / (time.perf_counter() - start)
+
+    print(f"legacy per-case loop : {legacy_rate:10.1f} candidates/s")
+    print(f"serial vectorized    : {serial_rate:10.1f} candidates/s  ({serial_rate / legacy_rate:6.1f}x)")
+    print(f"pool ({args.workers:2d} workers)    : {pool_rate:10.1f} candidates/s  ({pool_rate / legacy_rate:6.1f}x)")
+    print(f"resume (checkpoint)  : {resume_rate:10.1f} candidates/s")
+
+
+if __name__ == "__main__":
+    main()
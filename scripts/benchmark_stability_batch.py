@@ -0,0 +1,66 @@
+"""Benchmark stability_batch.stability_indices() against the per-profile
+AtmosphericStabilityAnalyzer.calculate_stability_indices() loop.
+
+Synthetic 11-level profiles; one 7-day hourly timeline is 168 profiles,
+every spot × 7 days is ~1000 × 168.
+
+    python scripts/benchmark_stability_batch.py
+"""
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import stability_batch  # noqa: E402
+from atmospheric_stability_analyzer import AtmosphericProfile, AtmosphericStabilityAnalyzer  # noqa: E402
+
+PRESSURE = np.array([1000, 925, 850, 700, 500, 400, 300, 250, 200, 150, 100], dtype=np.float64)
+HEIGHT = np.array([110, 770, 1460, 3010, 5580, 7190, 9160, 10360, 11780, 13610, 16180], dtype=np.float64)
+BATCH_SIZES = (168, 16_800, 168_000)
+SCALAR_MAX_PROFILES = 500  # 旧方式は外挿で表示
+
+
+def main() -> None:
+    logging.disable(logging.INFO)
+    analyzer = AtmosphericStabilityAnalyzer()
+    rng = np.random.default_rng(0)
+
+    t0 = time.perf_counter()
+    stability_batch.default_table()
+    print(f"pseudo-adiabat table build {(time.perf_counter() - t0) * 1e3:.1f}ms")
+
+    print(f"{'profiles':>9} {'scalar':>12} {'batch dry':>12} {'batch moist':>12} {'speedup':>9}")
+    for n in BATCH_SIZES:
+        temperature = 18 - 0.0068 * HEIGHT.clip(max=11000) + rng.normal(0, 2, (n, len(PRESSURE)))
+        dewpoint = temperature - rng.uniform(0.5, 12, temperature.shape)
+        wind = rng.uniform(0, 35, temperature.shape)
+
+        m = min(n, SCALAR_MAX_PROFILES)
+        t0 = time.perf_counter()
+        for i in range(m):
+            analyzer.calculate_stability_indices(AtmosphericProfile(
+                datetime(2026, 7, 1), 45.18, 141.24, PRESSURE, temperature[i], dewpoint[i], wind[i],
+                np.zeros(len(PRESSURE)), HEIGHT))
+        t_scalar = (time.perf_counter() - t0) * n / m
+
+        t0 = time.perf_counter()
+        stability_batch.stability_indices(PRESSURE, temperature, dewpoint, HEIGHT, wind)
+        t_dry = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        stability_batch.stability_indices(PRESSURE, temperature, dewpoint, HEIGHT, wind, parcel="moist")
+        t_moist = time.perf_counter() - t0
+
+        note = "*" if m < n else " "
+        print(f"{n:>9} {t_scalar * 1e3:>10.1f}ms{note} {t_dry * 1e3:>10.2f}ms {t_moist * 1e3:>10.2f}ms "
+              f"{t_scalar / t_dry:>8.0f}x")
+    print("* extrapolated from the first", SCALAR_MAX_PROFILES, "profiles")
+
+
+if __name__ == "__main__":
+    main()
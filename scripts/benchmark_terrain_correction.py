@@ -0,0 +1,70 @@
+"""Benchmark the vectorized grid terrain correction across grid resolutions.
+
+Offline: elevations come from open_meteo_prefetch.approximate_elevation_m()
+(no Elevation API calls), so timings measure only the correction itself.
+
+    python scripts/benchmark_terrain_correction.py
+    python scripts/benchmark_terrain_correction.py --repeat 20
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from open_meteo_prefetch import approximate_elevation_m  # noqa: E402
+from terrain_correction import build_terrain_grid, correct_grid  # noqa: E402
+
+# 利尻島を覆う矩形（build_rishiri_grid() と同じ範囲）
+LAT_RANGE = (45.08, 45.28)
+LON_RANGE = (141.12, 141.36)
+# 格子間隔[m] → 点数（緯度1° ≈ 111 km）
+RESOLUTIONS_M = (2000, 1000, 500, 250, 100)
+
+
+def island_grid(resolution_m: float):
+    step = resolution_m / 111_000
+    lat = np.arange(LAT_RANGE[0], LAT_RANGE[1] + step / 2, step)
+    lon = np.arange(LON_RANGE[0], LON_RANGE[1] + step / 2, step)
+    return np.meshgrid(lat, lon, indexing="ij")
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="best-of-N repeats per timing")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'res':>6} {'cells':>8} {'terrain':>10} {'wind':>10} {'humidity':>10} {'us/cell':>8}")
+    for res in RESOLUTIONS_M:
+        lat, lon = island_grid(res)
+        elevation = np.vectorize(approximate_elevation_m)(lat, lon)
+        wind = rng.uniform(0, 12, lat.shape)
+        rh = rng.uniform(40, 100, lat.shape)
+        temp = rng.uniform(5, 25, lat.shape)
+        wdir = rng.uniform(0, 360, lat.shape)
+
+        t_terrain = timed(lambda: build_terrain_grid(lat, lon, elevation), args.repeat)
+        terrain = build_terrain_grid(lat, lon, elevation)
+        t_wind = timed(lambda: correct_grid(wind, "wind", terrain, grid_wind_direction=wdir), args.repeat)
+        t_hum = timed(lambda: correct_grid(rh, "humidity", terrain, temp, wdir, 1.0, 1.2), args.repeat)
+
+        print(f"{res:>5}m {lat.size:>8} {t_terrain * 1e3:>8.2f}ms {t_wind * 1e3:>8.2f}ms "
+              f"{t_hum * 1e3:>8.2f}ms {t_hum * 1e6 / lat.size:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark RishiriTerrainDatabase nearest-point lookups: KD-tree index vs
+the previous per-call "ORDER BY squared distance LIMIT 1" SQL query.
+
+Uses the repository's rishiri_terrain.db (read-only).
+
+    python scripts/benchmark_terrain_lookup.py
+"""
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from terrain_database import RishiriTerrainDatabase  # noqa: E402
+
+DB_PATH = ROOT / "rishiri_terrain.db"
+QUERY_SIZES = (1, 100, 10_000)
+SQL_MAX_POINTS = 100  # 旧方式は1点あたり全件ソート → 10k点は外挿で表示
+
+
+def legacy_lookup(lat, lon):
+    """旧 get_terrain_at_point(): 呼び出しごとに接続を開き全行を距離でソート"""
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute("""
+        SELECT latitude, longitude, elevation, land_use, distance_to_coast,
+               slope, aspect, theta,
+               (latitude - ?)*(latitude - ?) + (longitude - ?)*(longitude - ?) as distance
+        FROM terrain_points
+        ORDER BY distance
+        LIMIT 1
+    """, (lat, lat, lon, lon)).fetchone()
+    conn.close()
+    return row
+
+
+def main() -> None:
+    db = RishiriTerrainDatabase(str(DB_PATH))
+    t0 = time.perf_counter()
+    db.get_terrain_at_point(45.15, 141.2)  # インデックス構築
+    build = time.perf_counter() - t0
+    n_rows = len(db._index["rows"])
+    print(f"terrain_points: {n_rows} rows, index build {build * 1e3:.1f}ms")
+
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8} {'sql':>12} {'kdtree':>12} {'speedup':>9}")
+    for n in QUERY_SIZES:
+        lats = rng.uniform(45.05, 45.28, n)
+        lons = rng.uniform(141.13, 141.33, n)
+
+        m = min(n, SQL_MAX_POINTS)
+        t0 = time.perf_counter()
+        for lat, lon in zip(lats[:m], lons[:m]):
+            legacy_lookup(lat, lon)
+        t_sql = (time.perf_counter() - t0) * n / m
+
+        t0 = time.perf_counter()
+        db.get_terrain_at_points(lats, lons)
+        t_tree = time.perf_counter() - t0
+
+        note = "*" if m < n else " "
+        print(f"{n:>8} {t_sql * 1e3:>10.1f}ms{note} {t_tree * 1e3:>10.2f}ms {t_sql / t_tree:>8.0f}x")
+    print("* extrapolated from the first", SQL_MAX_POINTS, "points")
+
+
+if __name__ == "__main__":
+    main()
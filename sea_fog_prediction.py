@@ -19,6 +19,17 @@ class SeaFogPredictionEngine:
     5. 地形効果（利尻山による上昇気流）
     """
     
+    # 類似条件検索の特徴量: (conditions キー, weather_data キー, 過去データ欠損時の値,
+    # 予報欠損時の値, 類似度の正規化幅) — calculate_condition_similarity() と同じ定義
+    ANALOG_FEATURES = (
+        ("temperature", "temperature_2m", 15, 0, 20.0),
+        ("humidity", "relative_humidity_2m", 70, 0, 50.0),
+        ("wind_speed", "wind_speed_10m", 5, 0, 10.0),
+        ("pressure", "pressure_msl", 1013, 1013, 50.0),
+    )
+    ANALOG_SIMILARITY_THRESHOLD = 0.7  # 70%以上の類似度
+    MAX_HISTORICAL_RECORDS = 1000      # データ数制限（最新1000件）
+    
     def __init__(self):
         self.config_file = "sea_fog_config.json"
         self.historical_data_file = "sea_fog_historical.json"
@@ -92,6 +103,38 @@ class SeaFogPredictionEngine:
         except Exception as e:
             print(f"Historical data load error: {e}")
             self.historical_data = []
+        self._build_analog_index()
+    
+    def _analog_row(self, record):
+        """過去レコード → 特徴量ベクトル（数値でない値があれば NaN 行）"""
+        conditions = record.get("conditions", {}) if isinstance(record, dict) else None
+        if not isinstance(conditions, dict):
+            return [np.nan] * len(self.ANALOG_FEATURES)
+        row = [conditions.get(key, hist_default) for key, _, hist_default, _, _ in self.ANALOG_FEATURES]
+        if not all(isinstance(v, (int, float)) for v in row):
+            return [np.nan] * len(self.ANALOG_FEATURES)
+        return row
+    
+    def _build_analog_index(self):
+        """
+        過去データの特徴量行列と霧観測フラグを一度だけ構築。
+        毎時・毎地点で全レコードを辞書から読み直す代わりに、行列演算で
+        全予報時刻の類似度をまとめて計算する。
+        """
+        records = self.historical_data
+        self._analog_matrix = np.array([self._analog_row(r) for r in records],
+                                       dtype=np.float64).reshape(len(records), len(self.ANALOG_FEATURES))
+        self._analog_fog = np.array([bool(r.get("fog_observed", False)) if isinstance(r, dict) else False
+                                     for r in records], dtype=bool)
+        self._analog_scale = np.array([f[4] for f in self.ANALOG_FEATURES], dtype=np.float64)
+    
+    def _append_analog_record(self, record):
+        """観測追加時の差分更新（行を1つ追加し、件数制限に合わせて古い行を落とす）"""
+        self._analog_matrix = np.vstack([self._analog_matrix, [self._analog_row(record)]])
+        self._analog_fog = np.append(self._analog_fog, bool(record.get("fog_observed", False)))
+        if len(self._analog_fog) > self.MAX_HISTORICAL_RECORDS:
+            self._analog_matrix = self._analog_matrix[-self.MAX_HISTORICAL_RECORDS:]
+            self._analog_fog = self._analog_fog[-self.MAX_HISTORICAL_RECORDS:]
     
     def save_historical_data(self):
         """過去データの保存"""
@@ -269,38 +312,55 @@ class SeaFogPredictionEngine:
     
     def calculate_statistical_fog_probability(self, weather_data, lat, lon, hour_index):
         """過去データに基づく統計的海霧発生確率"""
+        return float(self.calculate_statistical_fog_probabilities(weather_data, lat, lon, [hour_index])[0])
+    
+    def calculate_statistical_fog_probabilities(self, weather_data, lat, lon, hour_indices):
+        """
+        過去データに基づく統計的海霧発生確率（複数時刻を一括計算）
+        
+        各時刻の条件と全過去レコードの類似度（calculate_condition_similarity()
+        と同じ定義）を (時刻 × レコード) 行列で求め、類似度 > 0.7 のレコード中の
+        霧観測率を返す。類似レコードがない時刻は季節・地域別の基準確率。
+        """
+        n = len(hour_indices)
         try:
-            # 過去データから類似条件を検索
-            current_conditions = {
-                "temperature": weather_data.get("temperature_2m", [0] * 200)[hour_index],
-                "humidity": weather_data.get("relative_humidity_2m", [0] * 200)[hour_index],
-                "wind_speed": weather_data.get("wind_speed_10m", [0] * 200)[hour_index],
-                "pressure": weather_data.get("pressure_msl", [1013] * 200)[hour_index]
-            }
-            
-            # 過去データがない場合は物理モデルベースの初期値
-            if not self.historical_data:
-                return self.estimate_seasonal_probability(lat, lon)
-            
-            # 類似条件の検索と確率計算
-            similar_count = 0
-            fog_count = 0
-            
-            for record in self.historical_data:
-                similarity = self.calculate_condition_similarity(current_conditions, record)
-                if similarity > 0.7:  # 70%以上の類似度
-                    similar_count += 1
-                    if record.get("fog_observed", False):
-                        fog_count += 1
-            
-            if similar_count > 0:
-                return fog_count / similar_count
-            else:
-                return self.estimate_seasonal_probability(lat, lon)
+            if not len(self._analog_fog):
+                # 過去データがない場合は物理モデルベースの初期値
+                return np.full(n, self.estimate_seasonal_probability(lat, lon))
+            
+            current = np.full((n, len(self.ANALOG_FEATURES)), np.nan)
+            failed = np.zeros(n, dtype=bool)  # 予報値の取得自体に失敗した時刻 → 0.1
+            for k, (_, weather_key, _, current_default, _) in enumerate(self.ANALOG_FEATURES):
+                series = weather_data.get(weather_key, [current_default] * 200)
+                for i, hour_index in enumerate(hour_indices):
+                    try:
+                        value = series[hour_index]
+                    except (IndexError, KeyError, TypeError):
+                        failed[i] = True
+                        continue
+                    if isinstance(value, (int, float)):
+                        current[i, k] = value
+            
+            # 項目ごとの類似度 1 - |差|/正規化幅（負値は0にクリップ）→ 平均
+            sims = 1.0 - np.abs(current[:, None, :] - self._analog_matrix[None, :, :]) / self._analog_scale
+            sims = np.where(sims > 0, sims, 0.0)
+            similarity = sims.sum(axis=2) / len(self.ANALOG_FEATURES)
+            # 数値でない条件を含む組み合わせは類似度0（旧実装の例外時と同じ）
+            invalid = np.isnan(current).any(axis=1)[:, None] | np.isnan(self._analog_matrix).any(axis=1)[None, :]
+            similar = (similarity > self.ANALOG_SIMILARITY_THRESHOLD) & ~invalid
+            
+            similar_count = similar.sum(axis=1)
+            fog_count = (similar & self._analog_fog[None, :]).sum(axis=1)
+            result = np.full(n, np.nan)
+            np.divide(fog_count, similar_count, out=result, where=similar_count > 0)
+            if (similar_count == 0).any():
+                result[similar_count == 0] = self.estimate_seasonal_probability(lat, lon)
+            result[failed] = 0.1
+            return result
                 
         except Exception as e:
             print(f"Statistical fog probability calculation error: {e}")
-            return 0.1  # デフォルト確率
+            return np.full(n, 0.1)  # デフォルト確率
     
     def calculate_condition_similarity(self, current, historical):
         """気象条件の類似度計算"""
@@ -365,14 +425,18 @@ class SeaFogPredictionEngine:
                 return {"error": "気象データ取得に失敗しました"}
             
             predictions = []
+            hours = range(min(hours_ahead, len(weather_data.get("temperature_2m", []))))
+            
+            # 統計モデル確率（全時刻を一括計算）
+            statistical_probs = self.calculate_statistical_fog_probabilities(weather_data, lat, lon, list(hours))
             
-            for hour in range(min(hours_ahead, len(weather_data.get("temperature_2m", [])))):
+            for hour in hours:
                 # 物理モデル確率
                 physical_result = self.calculate_physical_fog_probability(weather_data, lat, lon, hour)
                 physical_prob = physical_result["probability"]
                 
                 # 統計モデル確率
-                statistical_prob = self.calculate_statistical_fog_probability(weather_data, lat, lon, hour)
+                statistical_prob = float(statistical_probs[hour])
                 
                 # 重み付き統合
                 model_weights = self.config["prediction_models"]
@@ -569,8 +633,9 @@ class SeaFogPredictionEngine:
             self.historical_data.append(observation)
             
             # データ数制限（最新1000件）
-            if len(self.historical_data) > 1000:
-                self.historical_data = self.historical_data[-1000:]
+            if len(self.historical_data) > self.MAX_HISTORICAL_RECORDS:
+                self.historical_data = self.historical_data[-self.MAX_HISTORICAL_RECORDS:]
+            self._append_analog_record(observation)
             
             self.save_historical_data()
             return True
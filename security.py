@@ -6,17 +6,18 @@ Security configurations for Rishiri Kelp Forecast System
 import os
 from flask import request, jsonify, redirect
 from functools import wraps
-import time
-from collections import defaultdict
 import hashlib
 
+from rate_limiter import RateLimiter, upstash_pipeline_from_env
+
 class SecurityManager:
     """Security manager for production deployment"""
     
-    def __init__(self, app=None):
+    def __init__(self, app=None, limiter=None):
         self.app = app
-        self.rate_limits = defaultdict(list)
-        self.blocked_ips = set()
+        # レート制限・ブロックは rate_limiter.RateLimiter に一本化（期限つきブロック、Redis 共有）
+        self.limiter = limiter or RateLimiter(key_func=self.get_client_ip, namespace='security',
+                                              redis_pipeline=upstash_pipeline_from_env())
         
         if app:
             self.init_app(app)
@@ -32,44 +33,14 @@ class SecurityManager:
     
     def rate_limit(self, max_requests=60, window=60):
         """Rate limiting decorator"""
-        def decorator(f):
-            @wraps(f)
-            def decorated_function(*args, **kwargs):
-                client_ip = self.get_client_ip()
-                
-                # Check if IP is blocked
-                if client_ip in self.blocked_ips:
-                    return jsonify({
-                        'error': 'Access denied',
-                        'message': 'Your IP has been temporarily blocked'
-                    }), 429
-                
-                current_time = time.time()
-                
-                # Clean old requests
-                self.rate_limits[client_ip] = [
-                    req_time for req_time in self.rate_limits[client_ip]
-                    if current_time - req_time < window
-                ]
-                
-                # Check rate limit
-                if len(self.rate_limits[client_ip]) >= max_requests:
-                    # Block IP for repeated violations
-                    if len(self.rate_limits[client_ip]) > max_requests * 2:
-                        self.blocked_ips.add(client_ip)
-                    
-                    return jsonify({
-                        'error': 'Rate limit exceeded',
-                        'message': 'Too many requests. Please try again later.',
-                        'retry_after': window
-                    }), 429
-                
-                # Add current request
-                self.rate_limits[client_ip].append(current_time)
-                
-                return f(*args, **kwargs)
-            return decorated_function
-        return decorator
+        # 旧実装と同じ閾値: 窓内のリクエストが max_requests の2倍を超えたら
+        # （＝max_requests 件許可した後、さらに max_requests + 1 回拒否したら）ブロック
+        return self.limiter.limit(f"{max_requests} per {window} seconds", key_func=self.get_client_ip,
+                                  block_after=max_requests + 1)
+
+    def is_blocked(self, client_ip):
+        """Whether the IP is currently (temporarily) blocked"""
+        return self.limiter.is_blocked(client_ip)
     
     def get_client_ip(self):
         """Get client IP address"""
@@ -2,12 +2,13 @@
 // Version 2.6.15 - 伝統風名廃止: windDisplay(矢印+英略語)に統一
 
 // Production configuration
+// ★ v2.6.56: 予報APIを stale-while-revalidate 化（鮮度はヘッダで表現、本文は書き換えない）
 // ★ v2.6.15: JMA降水ナウキャスト(hrpns) /api/nowcast/precip エンドポイント追加
 // ★ v2.6.15: scoreColor JS→Python _score_color() に同期 (#1f9d55/#c9a500/#d64545)
 // ★ v2.6.15: 伝統風名(アイ/シモ/クダリ等)廃止 → windDisplay() 矢印+英略語に統一
-const CACHE_NAME = 'rishiri-kelp-v2-6-55';
-const STATIC_CACHE_NAME = 'rishiri-kelp-static-v2-6-55';
-const WEATHER_CACHE_NAME = 'rishiri-kelp-weather-v2-6-55';
+const CACHE_NAME = 'rishiri-kelp-v2-6-56';
+const STATIC_CACHE_NAME = 'rishiri-kelp-static-v2-6-56';
+const WEATHER_CACHE_NAME = 'rishiri-kelp-weather-v2-6-56';
 
 // Determine base URL based on environment
 const BASE_URL = self.location.origin;
@@ -27,13 +28,31 @@ const STATIC_RESOURCES = [
     'https://unpkg.com/leaflet@1.9.4/dist/leaflet.js'
 ];
 
-// Weather API endpoints to cache
+// Weather API endpoints to cache (pathname exact match — /api/forecast_calibration は対象外)
 const WEATHER_ENDPOINTS = [
+    '/api/forecast',
+    '/forecast',
     '/weather/forecast',
     '/sea_fog/predict',
     '/visualization/dashboard'
 ];
 
+// Stale-while-revalidate: FRESH の間はキャッシュのみ、MAX_STALE までは
+// キャッシュを即返しつつ裏で更新、それより古ければネットワーク優先
+const WEATHER_FRESH_MS = 10 * 60 * 1000;        // 10 minutes
+const WEATHER_MAX_STALE_MS = 6 * 60 * 60 * 1000; // 6 hours (従来の有効期限)
+const CACHED_AT_HEADER = 'X-SW-Cached-At';
+const CACHE_STATE_HEADER = 'X-SW-Cache';         // fresh | stale | offline
+const FAVORITES_KEY = '/__sw/favorite-spots';
+const FAVORITES_PREFETCH_LIMIT = 10;
+// 夕方のLINE通知(16:00 JST)の前後に登録干場の予報を先読みする
+const EVENING_PREFETCH_WINDOW = { startMinute: 15 * 60 + 40, endMinute: 17 * 60 }; // JST
+const weatherChannel = typeof BroadcastChannel !== 'undefined'
+    ? new BroadcastChannel('rishiri-weather') : null;
+
+// 同じキーの更新は全タブ共通で1本にまとめる（SWはタブ間で共有される）
+const inflightRevalidations = new Map();
+
 // Install event - Cache static resources
 self.addEventListener('install', event => {
     console.log('Service Worker: Installing...');
@@ -91,8 +110,9 @@ self.addEventListener('fetch', event => {
     const url = new URL(request.url);
     
     // Handle weather API requests
-    if (WEATHER_ENDPOINTS.some(endpoint => url.pathname.includes(endpoint))) {
-        event.respondWith(handleWeatherRequest(request));
+    if (request.method === 'GET' && url.origin === self.location.origin &&
+        WEATHER_ENDPOINTS.includes(url.pathname)) {
+        event.respondWith(handleWeatherRequest(request, event));
         return;
     }
     
@@ -120,65 +140,109 @@ self.addEventListener('fetch', event => {
     );
 });
 
-// Handle weather API requests with cache strategy
-async function handleWeatherRequest(request) {
+// Cache key per endpoint + query: params sorted, lat/lon rounded to 4 decimals.
+// name は残す（/api/forecast は name を使うので `&name=` の有無は別エントリ）
+function weatherCacheKey(requestUrl) {
+    const url = new URL(requestUrl, self.location.origin);
+    const params = [...url.searchParams.entries()]
+        .map(([k, v]) => [k, (k === 'lat' || k === 'lon') && !isNaN(parseFloat(v))
+            ? parseFloat(v).toFixed(4) : v])
+        .sort(([a], [b]) => a.localeCompare(b));
+    const query = new URLSearchParams(params).toString();
+    return `${url.origin}${url.pathname}${query ? '?' + query : ''}`;
+}
+
+function cachedAge(response) {
+    const cachedAt = Date.parse(response.headers.get(CACHED_AT_HEADER) || '');
+    return isNaN(cachedAt) ? Infinity : Date.now() - cachedAt;
+}
+
+// 本文はそのまま（JSONを parse/stringify しない）、ヘッダだけ付け替える
+async function withHeaders(response, extra) {
+    const headers = new Headers(response.headers);
+    Object.entries(extra).forEach(([k, v]) => headers.set(k, v));
+    return new Response(await response.blob(), {
+        status: response.status,
+        statusText: response.statusText,
+        headers
+    });
+}
+
+function serveCached(cached, state) {
+    const age = cachedAge(cached);
+    return withHeaders(cached, {
+        [CACHE_STATE_HEADER]: state,
+        'Age': String(Math.max(0, Math.round(age / 1000)))
+    });
+}
+
+// Fetch from network and store; concurrent callers for the same key share one
+// fetch. Resolves to { blob, init } so every caller can build its own Response.
+function revalidateWeather(key, url = key) {
+    if (inflightRevalidations.has(key)) {
+        return inflightRevalidations.get(key);
+    }
+    const pending = (async () => {
+        const response = await fetch(url, { cache: 'no-store' });
+        const headers = new Headers(response.headers);
+        if (response.ok) {
+            headers.set(CACHED_AT_HEADER, new Date().toISOString());
+        }
+        const entry = {
+            blob: await response.blob(),
+            init: { status: response.status, statusText: response.statusText, headers }
+        };
+        if (response.ok) {
+            const cache = await caches.open(WEATHER_CACHE_NAME);
+            await cache.put(key, new Response(entry.blob, entry.init));
+            if (weatherChannel) {
+                weatherChannel.postMessage({ type: 'weather-updated', key });
+            }
+        }
+        return entry;
+    })().finally(() => inflightRevalidations.delete(key));
+    inflightRevalidations.set(key, pending);
+    return pending;
+}
+
+// Handle weather API requests: stale-while-revalidate per spot + endpoint
+async function handleWeatherRequest(request, event) {
+    const key = weatherCacheKey(request.url);
     const cache = await caches.open(WEATHER_CACHE_NAME);
-    
+    const cached = await cache.match(key);
+    const age = cached ? cachedAge(cached) : Infinity;
+
+    if (cached && age < WEATHER_FRESH_MS) {
+        return serveCached(cached, 'fresh');
+    }
+
+    if (cached && age < WEATHER_MAX_STALE_MS) {
+        // 即座にキャッシュを返し、裏で更新（失敗しても表示は続ける）
+        const refresh = revalidateWeather(key, request.url).catch(error => {
+            console.log('Service Worker: Background weather refresh failed', key, error);
+        });
+        if (event) {
+            event.waitUntil(refresh);
+        }
+        return serveCached(cached, 'stale');
+    }
+
     try {
-        // Try network first
-        const response = await fetch(request);
-        
-        if (response.ok) {
-            // Cache successful responses with timestamp
-            const responseClone = response.clone();
-            const data = await responseClone.json();
-            
-            // Add cache timestamp
-            data.cached_at = new Date().toISOString();
-            data.cache_expires_at = new Date(Date.now() + 6 * 60 * 60 * 1000).toISOString(); // 6 hours
-            
-            const modifiedResponse = new Response(JSON.stringify(data), {
-                status: response.status,
-                statusText: response.statusText,
-                headers: response.headers
-            });
-            
-            cache.put(request, modifiedResponse.clone());
-            console.log('Service Worker: Weather data cached', request.url);
-            
-            return modifiedResponse;
+        const { blob, init } = await revalidateWeather(key, request.url);
+        if (init.status >= 200 && init.status < 300) {
+            const headers = new Headers(init.headers);
+            headers.set(CACHE_STATE_HEADER, 'miss');
+            return new Response(blob, { ...init, headers });
         }
-        
         throw new Error('Network response not ok');
-        
     } catch (error) {
         console.log('Service Worker: Network failed, trying cache', error);
-        
-        // Try cache
-        const cachedResponse = await cache.match(request);
-        if (cachedResponse) {
-            const cachedData = await cachedResponse.json();
-            
-            // Check if cache is still valid (6 hours)
-            const cacheExpiry = new Date(cachedData.cache_expires_at);
-            const now = new Date();
-            
-            if (now < cacheExpiry) {
-                console.log('Service Worker: Serving valid cached weather data');
-                // Add offline indicator
-                cachedData.offline_mode = true;
-                cachedData.data_age_hours = Math.round((now - new Date(cachedData.cached_at)) / (1000 * 60 * 60));
-                
-                return new Response(JSON.stringify(cachedData), {
-                    status: 200,
-                    statusText: 'OK (Cached)',
-                    headers: { 'Content-Type': 'application/json' }
-                });
-            } else {
-                console.log('Service Worker: Cached weather data expired');
-            }
+
+        if (cached) {
+            // 有効期限切れでもオフラインなら最後のデータを返す（鮮度はヘッダで判断）
+            return serveCached(cached, 'offline');
         }
-        
+
         // Return offline fallback
         return new Response(JSON.stringify({
             error: 'Offline mode - weather data unavailable',
@@ -187,11 +251,78 @@ async function handleWeatherRequest(request) {
         }), {
             status: 503,
             statusText: 'Service Unavailable',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', [CACHE_STATE_HEADER]: 'offline' }
         });
     }
 }
 
+// ── 登録干場（ページから postMessage で受け取る）の夕方先読み ──────────────
+function jstMinuteOfDay(date = new Date()) {
+    return ((date.getUTCHours() + 9) % 24) * 60 + date.getUTCMinutes();
+}
+
+function isEveningPrefetchWindow(date = new Date()) {
+    const minute = jstMinuteOfDay(date);
+    return minute >= EVENING_PREFETCH_WINDOW.startMinute && minute < EVENING_PREFETCH_WINDOW.endMinute;
+}
+
+async function saveFavoriteSpots(spots) {
+    const cache = await caches.open(WEATHER_CACHE_NAME);
+    const list = (spots || [])
+        .filter(s => s && isFinite(s.lat) && isFinite(s.lon))
+        .slice(0, FAVORITES_PREFETCH_LIMIT)
+        .map(s => ({ name: s.name || '', lat: Number(s.lat), lon: Number(s.lon) }));
+    await cache.put(FAVORITES_KEY, new Response(JSON.stringify(list), {
+        headers: { 'Content-Type': 'application/json' }
+    }));
+    return list;
+}
+
+async function loadFavoriteSpots() {
+    const cache = await caches.open(WEATHER_CACHE_NAME);
+    const stored = await cache.match(FAVORITES_KEY);
+    return stored ? stored.json() : [];
+}
+
+// 古くなっている登録干場の予報だけ取り直す（新しいものは触らない）
+async function prefetchFavoriteForecasts() {
+    const spots = await loadFavoriteSpots();
+    const cache = await caches.open(WEATHER_CACHE_NAME);
+    const results = await Promise.allSettled(spots.map(async spot => {
+        // 干場一覧（ランキング・部落別）と同じ `&name=` 付き URL で先読みする
+        const name = spot.name ? `&name=${encodeURIComponent(spot.name)}` : '';
+        const url = `/api/forecast?lat=${spot.lat}&lon=${spot.lon}${name}`;
+        const key = weatherCacheKey(url);
+        const cached = await cache.match(key);
+        if (cached && cachedAge(cached) < WEATHER_FRESH_MS) {
+            return false;
+        }
+        const { init } = await revalidateWeather(key, url);
+        return init.status >= 200 && init.status < 300;
+    }));
+    const refreshed = results.filter(r => r.status === 'fulfilled' && r.value).length;
+    console.log(`Service Worker: Prefetched ${refreshed}/${spots.length} favorite spot forecasts`);
+    return refreshed;
+}
+
+self.addEventListener('message', event => {
+    const data = event.data || {};
+    if (data.type === 'favorite-spots') {
+        event.waitUntil(saveFavoriteSpots(data.spots).then(() => {
+            if (isEveningPrefetchWindow()) {
+                return prefetchFavoriteForecasts();
+            }
+        }));
+    }
+});
+
+// Periodic Background Sync（対応ブラウザのみ）: 夕方の通知時間帯に先読み
+self.addEventListener('periodicsync', event => {
+    if (event.tag === 'evening-forecast-prefetch' && isEveningPrefetchWindow()) {
+        event.waitUntil(prefetchFavoriteForecasts());
+    }
+});
+
 // Handle static resource requests
 async function handleStaticRequest(request) {
     if (request.destination === 'document') {
@@ -288,7 +419,7 @@ self.addEventListener('sync', event => {
     console.log('Service Worker: Background sync triggered');
     
     if (event.tag === 'weather-data-sync') {
-        event.waitUntil(syncWeatherData());
+        event.waitUntil(syncWeatherData().then(prefetchFavoriteForecasts));
     }
 });
 
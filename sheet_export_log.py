@@ -0,0 +1,176 @@
+"""Cursor-paginated change logs behind the n8n / Google Sheets export routes.
+
+Every /sheets route rebuilt and returned its whole result set on each poll
+(up to 334 spots × 73 nowcast snapshots for one day), although a scheduled
+Sheets sync only needs the rows that changed since its previous run. This
+module keeps, per export and parameter set, the latest version of each row
+in append order:
+
+    RowLog.apply()    diff a freshly built result set against the log; new or
+                      changed rows (compared without volatile fields such as
+                      synced_at_jst) get the next sequence number, rows that
+                      disappeared are dropped
+    RowLog.page()     rows with seq > cursor, oldest first, at most `limit`,
+                      plus the next cursor — a sync costs O(changed rows)
+    RowLog.derived()  a value computed from the current rows (summary tables),
+                      rebuilt only after the log changed
+    RowLog.source_version
+                      an opaque version of the source (e.g. CSV signatures);
+                      callers skip rebuilding the rows while it is unchanged
+
+Cursors look like ``<epoch>-<seq>``. The epoch is new for every log instance,
+so after a restart or an LRU eviction a stale cursor is answered from the
+beginning with ``reset: true`` (Sheets upserts by key, so a resend is safe).
+"""
+from __future__ import annotations
+
+import bisect
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_LIMIT = 1000
+MAX_PAGE_LIMIT = 5000
+VOLATILE_FIELDS = ('synced_at_jst',)
+
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[Optional[str], int]:
+    """'<epoch>-<seq>' → (epoch, seq)。空・不正な値は (None, 0)＝先頭から"""
+    if not cursor:
+        return None, 0
+    epoch, _, seq = str(cursor).rpartition('-')
+    try:
+        return (epoch or None), max(int(seq), 0)
+    except ValueError:
+        return None, 0
+
+
+class RowLog:
+    """キー（upsert_key 等）ごとの最新行を、変更順の連番付きで保持する"""
+
+    def __init__(self, key_field: str = 'upsert_key', volatile: Sequence[str] = VOLATILE_FIELDS):
+        self.key_field = key_field
+        self.volatile = frozenset(volatile)
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.source_version = None
+        self.summary: Optional[dict] = None
+        self._rows: Dict[str, Tuple[int, tuple, dict]] = {}   # key → (seq, fingerprint, row)
+        self._seqs: List[int] = []                           # 追記順（昇順）
+        self._keys: List[str] = []
+        self._derived: Dict[str, Tuple[int, object]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> str:
+        return f'{self.epoch}-{self.seq}'
+
+    def _fingerprint(self, row: dict) -> tuple:
+        return tuple((k, v) for k, v in row.items() if k not in self.volatile)
+
+    def apply(self, rows: Iterable[dict], source_version=None, summary: Optional[dict] = None) -> dict:
+        """
+        rows（全件）を現在の状態として取り込む。
+        戻り値: {"changed": 追加・変更された行数, "removed": 消えた行数}
+        """
+        with self._lock:
+            seen = set()
+            changed = 0
+            for row in rows:
+                key = str(row.get(self.key_field))
+                seen.add(key)
+                fp = self._fingerprint(row)
+                current = self._rows.get(key)
+                if current is not None and current[1] == fp:
+                    continue
+                self.seq += 1
+                self._rows[key] = (self.seq, fp, row)
+                self._seqs.append(self.seq)
+                self._keys.append(key)
+                changed += 1
+            removed = [key for key in self._rows if key not in seen]
+            for key in removed:
+                del self._rows[key]
+            if removed or source_version != self.source_version:
+                self._derived.clear()  # 行は送らないが、派生値（集計表）は作り直す
+            if len(self._seqs) > 2 * len(self._rows) + 1024:
+                self._compact()
+            self.source_version = source_version
+            self.summary = summary
+            return {'changed': changed, 'removed': len(removed)}
+
+    def _compact(self) -> None:
+        live = sorted((seq, key) for key, (seq, _, _) in self._rows.items())
+        self._seqs = [seq for seq, _ in live]
+        self._keys = [key for _, key in live]
+
+    def rows(self) -> List[dict]:
+        """現在の全行（変更順）"""
+        with self._lock:
+            return [row for _, _, row in sorted(self._rows.values(), key=lambda item: item[0])]
+
+    def page(self, since: Optional[str] = None, limit: int = DEFAULT_PAGE_LIMIT) -> dict:
+        """since より後に追加・変更された行を古い順に最大 limit 件"""
+        limit = min(max(int(limit), 1), MAX_PAGE_LIMIT)
+        epoch, after = parse_cursor(since)
+        reset = bool(since) and (epoch != self.epoch or after > self.seq)
+        if reset:
+            after = 0
+        with self._lock:
+            out, last = [], after
+            i = bisect.bisect_right(self._seqs, after)
+            has_more = False
+            while i < len(self._seqs):
+                seq, key = self._seqs[i], self._keys[i]
+                i += 1
+                current = self._rows.get(key)
+                if current is None or current[0] != seq:
+                    continue  # 後で更新・削除された古い版
+                if len(out) >= limit:
+                    has_more = True
+                    break
+                out.append(current[2])
+                last = seq
+            next_seq = last if has_more else self.seq
+            return {
+                'rows': out,
+                'since': since or None,
+                'next_cursor': f'{self.epoch}-{next_seq}',
+                'has_more': has_more,
+                'reset': reset,
+                'limit': limit,
+            }
+
+    def derived(self, name: str, build: Callable[[List[dict]], object]):
+        """build(現在の全行) をログが変わるまで使い回す（集計表など）"""
+        with self._lock:
+            cached = self._derived.get(name)
+            if cached is not None and cached[0] == self.seq:
+                return cached[1]
+        value = build(self.rows())
+        with self._lock:
+            self._derived[name] = (self.seq, value)
+        return value
+
+
+class SheetExportLogs:
+    """(エクスポート名, パラメータ) ごとの RowLog。古いものから捨てる"""
+
+    def __init__(self, max_logs: int = 16):
+        self.max_logs = max_logs
+        self._logs: 'OrderedDict[tuple, RowLog]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, export: str, params: tuple = (), key_field: str = 'upsert_key') -> RowLog:
+        key = (export, params)
+        with self._lock:
+            log = self._logs.get(key)
+            if log is None:
+                log = RowLog(key_field)
+                self._logs[key] = log
+                while len(self._logs) > self.max_logs:
+                    self._logs.popitem(last=False)
+            else:
+                self._logs.move_to_end(key)
+            return log
@@ -0,0 +1,253 @@
+"""Incremental regeneration of the spot artifacts derived from hoshiba_spots.csv.
+
+sync_all_files_from_csv() used to pd.read_csv() the whole spots CSV and then
+rebuild hoshiba_spots_named.kml and all_spots_array.js with iterrows() on
+every /add and /delete, writing both files in place (a reader could see a
+half-written file). This module keeps a small manifest next to the artifacts,
+with one record per output:
+
+    rows        [name, fingerprint] per CSV row the file was rendered from,
+                in CSV order (per output, so sync(only=['kml']) followed by
+                sync(only=['js']) still updates the JS file)
+    etag / signature / lengths
+                content hash (ETag), (mtime_ns, size) of the file as written,
+                and the length of every rendered entry
+
+SpotArtifacts.sync() diffs the CSV against the manifest and renders only the
+added / changed rows; unchanged entries are sliced out of the current file by
+their recorded lengths. If nothing changed, neither file is touched. Files are
+written atomically (temp + os.replace). An artifact that was edited by hand
+(signature differs from the manifest) or a missing manifest falls back to a
+full render, so the output is always byte-identical to a full rebuild.
+
+SpotArtifacts.etag() returns the content hash for conditional GETs of
+/all_spots_array.js without re-reading the file.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+MANIFEST_VERSION = 2
+SPOT_FIELDS = ("name", "lat", "lon", "town", "district", "buraku")
+
+
+@dataclass(frozen=True)
+class ArtifactFormat:
+    header: str
+    footer: str
+    separator: str
+    render: Callable[[dict], str]
+
+    def assemble(self, entries: List[str]) -> str:
+        return self.header + self.separator.join(entries) + "\n" + self.footer
+
+
+def _kml_placemark(spot: dict) -> str:
+    return (f"<Placemark>\n<name>{spot['name']}</name>\n"
+            f"<Point><coordinates>{spot['lon']:.7f},{spot['lat']:.7f}</coordinates></Point>\n"
+            f"</Placemark>")
+
+
+def _js_entry(spot: dict) -> str:
+    return (f'    {{ name: "{spot["name"]}", lat: {spot["lat"]:.7f}, lon: {spot["lon"]:.7f}, '
+            f'town: "{spot["town"]}", district: "{spot["district"]}", buraku: "{spot["buraku"]}" }}')
+
+
+KML_FORMAT = ArtifactFormat(
+    header="<?xml version='1.0' encoding='UTF-8'?>\n<kml xmlns='http://www.opengis.net/kml/2.2'>\n<Document>\n",
+    footer="</Document>\n</kml>",
+    separator="\n",
+    render=_kml_placemark,
+)
+JS_FORMAT = ArtifactFormat(
+    header="const hoshibaSpots = [\n",
+    footer="];\n",
+    separator=",\n",
+    render=_js_entry,
+)
+
+
+def _text(value) -> str:
+    """pandas の NaN / None / 'nan' は空文字（旧 sync_js_array_file と同じ）"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value != value:
+        return ""
+    return str(value)
+
+
+def normalize_spot(row: dict) -> dict:
+    return {
+        "name": str(row["name"]),
+        "lat": float(row["lat"]),
+        "lon": float(row["lon"]),
+        "town": _text(row.get("town", "")),
+        "district": _text(row.get("district", "")),
+        "buraku": _text(row.get("buraku", "")),
+    }
+
+
+def read_spots(csv_path: str) -> List[dict]:
+    """CSV を csv モジュールで読む（pandas 不要）。座標が読めない行は飛ばす"""
+    spots = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                spots.append(normalize_spot(row))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return spots
+
+
+def spot_fingerprint(spot: dict) -> str:
+    raw = "\x1f".join(f"{spot[k]:.7f}" if k in ("lat", "lon") else spot[k] for k in SPOT_FIELDS)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def content_etag(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _signature(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SpotArtifacts:
+    """干場CSVから派生する KML / JS 配列ファイルの差分生成とETag"""
+
+    def __init__(self, outputs: Dict[str, Tuple[str, ArtifactFormat]], manifest_path: str):
+        self.outputs = outputs
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self._etags: Dict[str, Tuple[Optional[List[int]], str]] = {}
+
+    # -- manifest -----------------------------------------------------------
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if manifest.get("manifest_version") == MANIFEST_VERSION else {}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        manifest = dict(manifest, manifest_version=MANIFEST_VERSION)
+        _atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+
+    # -- sync ---------------------------------------------------------------
+    def sync(self, spots: List[dict], only: Optional[List[str]] = None) -> dict:
+        """
+        spots（CSV順）に合わせて各ファイルを更新する。前回の行はファイルごとに比べる。
+        戻り値: {"added", "removed", "changed", "unchanged", "written": [key, ...],
+                 "full": [全体を描き直した key, ...]}
+        件数は最初に対象になったファイルの前回の行との比較。
+        """
+        with self._lock:
+            artifacts = dict(self.load_manifest().get("artifacts", {}))
+            new_rows = [[s["name"], spot_fingerprint(s)] for s in spots]
+            keys = [key for key in self.outputs if only is None or key in only]
+            stats = self._diff_stats((artifacts.get(keys[0]) or {}).get("rows", []) if keys else [], new_rows)
+
+            for key in keys:
+                path, fmt = self.outputs[key]
+                previous = artifacts.get(key) or {}
+                old_rows = previous.get("rows", [])
+                old_fp = dict((name, fp) for name, fp in old_rows)
+                reusable = self._previous_entries(path, fmt, old_rows, previous)
+                if reusable is not None and old_rows == new_rows:
+                    continue  # 変化なし → 書かない
+                entries = []
+                for spot, (name, fp) in zip(spots, new_rows):
+                    cached = reusable.get(name) if reusable is not None else None
+                    entries.append(cached if cached is not None and old_fp.get(name) == fp else fmt.render(spot))
+                data = fmt.assemble(entries).encode("utf-8")
+                _atomic_write(path, data)
+                etag = content_etag(data)
+                artifacts[key] = {"rows": new_rows, "etag": etag, "signature": _signature(path),
+                                  "lengths": [len(e) for e in entries]}
+                self._etags[key] = (artifacts[key]["signature"], etag)
+                stats["written"].append(key)
+                if reusable is None:
+                    stats["full"].append(key)
+
+            if stats["written"]:
+                self._save_manifest({"artifacts": artifacts})
+            return stats
+
+    @staticmethod
+    def _diff_stats(old_rows: list, new_rows: list) -> dict:
+        old_fp = dict((name, fp) for name, fp in old_rows)
+        new_names = {name for name, _ in new_rows}
+        stats = {
+            "added": sum(1 for name, _ in new_rows if name not in old_fp),
+            "removed": sum(1 for name in old_fp if name not in new_names),
+            "changed": sum(1 for name, fp in new_rows if name in old_fp and old_fp[name] != fp),
+            "written": [],
+            "full": [],
+        }
+        stats["unchanged"] = len(new_rows) - stats["added"] - stats["changed"]
+        return stats
+
+    @staticmethod
+    def _previous_entries(path: str, fmt: ArtifactFormat, old_rows: list,
+                          previous: Optional[dict]) -> Optional[Dict[str, str]]:
+        """前回書いたファイルが手つかずなら name → エントリ文字列、そうでなければ None"""
+        if not previous or previous.get("signature") is None or _signature(path) != previous["signature"]:
+            return None
+        lengths = previous.get("lengths", [])
+        if len(lengths) != len(old_rows):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+        except OSError:
+            return None
+        if not (content.startswith(fmt.header) and content.endswith("\n" + fmt.footer)):
+            return None
+        entries, pos = {}, len(fmt.header)
+        for i, ((name, _), length) in enumerate(zip(old_rows, lengths)):
+            if i:
+                if content[pos:pos + len(fmt.separator)] != fmt.separator:
+                    return None
+                pos += len(fmt.separator)
+            entries[name] = content[pos:pos + length]
+            pos += length
+        if pos != len(content) - len(fmt.footer) - 1:
+            return None
+        return entries
+
+    # -- ETag ---------------------------------------------------------------
+    def etag(self, key: str) -> Optional[str]:
+        """ファイル内容のハッシュ。(mtime, size) が変わったときだけ読み直す"""
+        path = self.outputs[key][0]
+        signature = _signature(path)
+        if signature is None:
+            return None
+        cached = self._etags.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+        recorded = self.load_manifest().get("artifacts", {}).get(key)
+        if recorded and recorded.get("signature") == signature:
+            etag = recorded["etag"]
+        else:
+            with open(path, "rb") as f:
+                etag = content_etag(f.read())
+        self._etags[key] = (signature, etag)
+        return etag
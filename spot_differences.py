@@ -0,0 +1,97 @@
+"""Vectorized spot-to-spot weather differences (/api/analysis/spot-differences).
+
+start.py's get_spot_weather_differences() used to parse each spot name, then
+compute distance / bearing with scalar math and call get_elevation() and
+is_forest_area() twice per spot (the reference point every time). Here the
+same estimate is expressed over arrays:
+
+    parse_spot_names()      H_<lat>_<lon> names → coordinate arrays
+    difference_arrays()     distance, bearing, elevation difference and the
+                            predicted temperature / humidity / wind deltas;
+                            broadcasts, so ``ref[:, None]`` vs ``spot[None, :]``
+                            gives the all-pairs spot × spot matrix
+    confidence_percent()    the old per-spot confidence formula over arrays
+
+Elevations come from the caller (start.py resolves them in one batch through
+the geometry table / DEM raster / elevation cache). Values match the old
+per-spot loop.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from spot_geometry import forest_mask
+
+KM_PER_DEG = 111
+DIRECTION_NAMES = ('北', '北北東', '北東', '東北東', '東', '東南東', '南東', '南南東',
+                   '南', '南南西', '南西', '西南西', '西', '西北西', '北西', '北北西')
+CONFIDENCE_LEVELS = ((80, 'high'), (60, 'medium'), (40, 'low'))
+
+
+def parse_spot_names(names) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """'H_1631_1434' → (45.1631, 141.1434)。形式が違う名前は読み飛ばす（従来どおり）。"""
+    kept, lats, lons = [], [], []
+    for name in names:
+        name = name.strip()
+        parts = name.split('_')
+        if len(parts) != 3 or parts[0] != 'H':
+            continue
+        try:
+            lat = 45.0 + float(parts[1]) / 10000.0
+            lon = 141.0 + float(parts[2]) / 10000.0
+        except ValueError:
+            continue
+        kept.append(name)
+        lats.append(lat)
+        lons.append(lon)
+    return kept, np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64)
+
+
+def difference_arrays(ref_lat, ref_lon, ref_elevation, lats, lons, elevations) -> dict:
+    """
+    基準点から見た各地点の差異。引数はすべてブロードキャスト可能な配列で、
+    戻り値の各配列はその形になる。
+    """
+    ref_lat = np.asarray(ref_lat, dtype=np.float64)
+    ref_lon = np.asarray(ref_lon, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    dy = lats - ref_lat
+    dx = lons - ref_lon
+
+    distance = (dy ** 2 + dx ** 2) ** 0.5 * KM_PER_DEG
+    direction = (np.degrees(np.arctan2(dx, dy)) + 360) % 360
+    elevation_diff = np.asarray(elevations, dtype=np.float64) - np.asarray(ref_elevation, dtype=np.float64)
+
+    spot_forest = forest_mask(lats, lons)
+    ref_forest = forest_mask(ref_lat, ref_lon)
+    # 森林に入る: 湿度+10%・風-2.5m/s、森林から出る: その逆
+    forest_step = (spot_forest & ~ref_forest).astype(np.float64) - (ref_forest & ~spot_forest)
+    per_100m = elevation_diff / 100
+
+    return {
+        'distance_km': distance,
+        'direction_deg': direction,
+        'elevation_difference_m': elevation_diff,
+        'temperature_c': -per_100m * 0.6,
+        'humidity_percent': forest_step * 10.0 - per_100m * 1.0,
+        'wind_speed_ms': forest_step * -2.5 + per_100m * 0.5,
+    }
+
+
+def confidence_percent(distance_km, elevation_diff) -> np.ndarray:
+    """距離 1km ごとに -10%、標高差 100m ごとに -5%（0-100 にクリップ）"""
+    confidence = 100.0 - np.asarray(distance_km) * 10 - np.abs(elevation_diff) / 100 * 5
+    return np.clip(confidence, 0, 100)
+
+
+def confidence_level(percent: float) -> str:
+    for threshold, level in CONFIDENCE_LEVELS:
+        if percent >= threshold:
+            return level
+    return 'very_low'
+
+
+def direction_names(degrees) -> np.ndarray:
+    index = ((np.asarray(degrees) + 11.25) / 22.5).astype(int) % 16
+    return np.array(DIRECTION_NAMES)[index]
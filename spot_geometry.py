@@ -0,0 +1,373 @@
+"""Precomputed per-point geometry table for spots and the island grid.
+
+Every hoshiba spot (hoshiba_spots.csv) and every build_rishiri_grid() point
+gets one row holding the static geometry start.py otherwise recomputes per
+request / per grid point from raw lat/lon:
+
+    elevation         GLO-90 DEM (Open-Meteo Elevation API, one batch fetch at
+                      build time) → rishiri_terrain.db nearest point → the
+                      network-free distance-decay approximation
+    theta             calculate_spot_theta()  (干場極座標θ)
+    mountain_azimuth  mountain_azimuth()      (地点→山頂の方位角)
+    sea_direction     get_onshore_wind_factor()'s radial "sea side" azimuth —
+                      the onshore factor for any wind direction is one cosine
+                      of the difference (onshore_factor() below)
+    is_forest/is_coastal  is_forest_area() / is_coastal_area()
+
+The table is a NumPy structured array saved as .npy and loaded with
+``mmap_mode='r'`` at startup, so it survives restarts and costs no network.
+start.py's sync_all_files_from_csv() regenerates it whenever spots change;
+``python spot_geometry.py`` rebuilds it by hand.
+"""
+from __future__ import annotations
+
+import csv
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+import requests
+
+from open_meteo_prefetch import SUMMIT_LAT, SUMMIT_LON, approximate_elevation_m, build_rishiri_grid
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TABLE_PATH = os.path.join(BASE_DIR, "spot_geometry.npy")
+DEFAULT_SPOTS_CSV = os.path.join(BASE_DIR, "hoshiba_spots.csv")
+DEFAULT_TERRAIN_DB = os.path.join(BASE_DIR, "rishiri_terrain.db")
+
+# 利尻山（島中心）— start.py の calculate_spot_theta() / is_forest_area() /
+# get_onshore_wind_factor() が使う旧座標。フェーン用の SUMMIT_LAT/LON とは別物。
+ISLAND_CENTER_LAT = 45.1821
+ISLAND_CENTER_LON = 141.2421
+# θ=0 基準点（南岸境界、仕様書 line 73）
+THETA_BASE_LAT = 45.1007
+THETA_BASE_LON = 141.2461
+FOREST_RADIUS_DEG = 0.02  # is_forest_area(): 山頂から約2km以内
+
+ELEVATION_API_URL = "https://api.open-meteo.com/v1/elevation"
+ELEVATION_BATCH_SIZE = 100  # Open-Meteo Elevation API の1リクエスト上限
+
+GEOMETRY_DTYPE = np.dtype([
+    ("name", "U32"),
+    ("kind", "U5"),               # 'spot' | 'grid'
+    ("lat", "f8"),
+    ("lon", "f8"),
+    ("elevation", "f8"),
+    ("elevation_source", "U10"),  # 'dem' | 'terrain_db' | 'approx'
+    ("theta", "f8"),
+    ("mountain_azimuth", "f8"),
+    ("sea_direction", "f8"),
+    ("is_forest", "?"),
+    ("is_coastal", "?"),
+])
+
+
+# ── Vectorized geometry (scalar originals live in start.py) ───────────────────
+
+def spot_theta(lats, lons) -> np.ndarray:
+    """calculate_spot_theta() over arrays: θ from the south-coast baseline [deg]."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    base_angle = np.degrees(np.arctan2(THETA_BASE_LAT - ISLAND_CENTER_LAT, THETA_BASE_LON - ISLAND_CENTER_LON))
+    spot_angle = np.degrees(np.arctan2(lats - ISLAND_CENTER_LAT, lons - ISLAND_CENTER_LON))
+    return (spot_angle - base_angle) % 360
+
+
+def mountain_azimuth(lats, lons) -> np.ndarray:
+    """mountain_azimuth() over arrays: point → summit bearing [deg, N=0, clockwise]."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    math_angle = np.degrees(np.arctan2(SUMMIT_LAT - lats, SUMMIT_LON - lons))
+    return (90 - math_angle) % 360
+
+
+def sea_direction(lats, lons) -> np.ndarray:
+    """Island center → point bearing (the side the sea is on) [deg]."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    math_angle = np.degrees(np.arctan2(lats - ISLAND_CENTER_LAT, lons - ISLAND_CENTER_LON))
+    return (90 - math_angle) % 360
+
+
+def forest_mask(lats, lons) -> np.ndarray:
+    """is_forest_area() over arrays."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    return np.hypot(lats - ISLAND_CENTER_LAT, lons - ISLAND_CENTER_LON) < FOREST_RADIUS_DEG
+
+
+def coastal_mask(lats, lons) -> np.ndarray:
+    """is_coastal_area() over arrays (every Rishiri spot is treated as coastal)."""
+    return np.ones(np.shape(np.asarray(lats)), dtype=bool)
+
+
+def onshore_factor(sea_dir, wind_direction) -> np.ndarray:
+    """get_onshore_wind_factor() from a precomputed sea_direction: 1.0 = fully
+    onshore, 0.0 = parallel or offshore. NaN wind direction → NaN."""
+    sea_dir = np.asarray(sea_dir, dtype=np.float64)
+    wind_direction = np.asarray(wind_direction, dtype=np.float64)
+    diff = np.abs(wind_direction - sea_dir)
+    diff = np.where(diff > 180, 360 - diff, diff)
+    return np.where(diff <= 90, np.maximum(0.0, np.cos(np.radians(diff))), np.where(np.isnan(diff), np.nan, 0.0))
+
+
+# ── Elevation sources ─────────────────────────────────────────────────────────
+
+def fetch_elevations_open_meteo(lats, lons, requests_module=requests, timeout: int = 10) -> list | None:
+    """One-time batch fetch from the Open-Meteo Elevation API (GLO-90), in
+    chunks of ELEVATION_BATCH_SIZE. Returns None on any failure so callers can
+    fall back to an offline source instead of storing bogus zeros."""
+    out: list = []
+    try:
+        for i in range(0, len(lats), ELEVATION_BATCH_SIZE):
+            chunk_lat = lats[i:i + ELEVATION_BATCH_SIZE]
+            chunk_lon = lons[i:i + ELEVATION_BATCH_SIZE]
+            url = (
+                f"{ELEVATION_API_URL}?latitude={','.join(f'{v:.4f}' for v in chunk_lat)}"
+                f"&longitude={','.join(f'{v:.4f}' for v in chunk_lon)}"
+            )
+            resp = requests_module.get(url, timeout=timeout)
+            resp.raise_for_status()
+            values = resp.json().get("elevation") or []
+            if len(values) != len(chunk_lat) or any(v is None for v in values):
+                return None
+            out.extend(max(0.0, float(v)) for v in values)
+    except Exception as e:
+        print(f"[spot-geometry] elevation batch fetch failed: {e}")
+        return None
+    return out
+
+
+def terrain_db_elevations(lats, lons, db_path: str = DEFAULT_TERRAIN_DB) -> np.ndarray | None:
+    """Nearest terrain_points row of rishiri_terrain.db for each point (offline)."""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT latitude, longitude, elevation FROM terrain_points").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"[spot-geometry] terrain db read failed: {e}")
+        return None
+    if not rows:
+        return None
+    from scipy.spatial import cKDTree
+
+    data = np.asarray(rows, dtype=np.float64)
+    tree = cKDTree(data[:, :2])
+    _, idx = tree.query(np.column_stack([lats, lons]))
+    return np.maximum(0.0, data[idx, 2])
+
+
+# ── Table build / persistence ─────────────────────────────────────────────────
+
+def _coord_key(lat: float, lon: float) -> tuple:
+    return (round(float(lat), 4), round(float(lon), 4))
+
+
+def collect_points(spots_csv: str = DEFAULT_SPOTS_CSV, grid: list | None = None) -> list[tuple]:
+    """(name, kind, lat, lon) for every spot in the CSV plus every grid point."""
+    points = []
+    if os.path.exists(spots_csv):
+        with open(spots_csv, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    points.append((row["name"], "spot", float(row["lat"]), float(row["lon"])))
+                except (KeyError, TypeError, ValueError):
+                    continue
+    for g in (grid if grid is not None else build_rishiri_grid()):
+        points.append((g.get("label") or "", "grid", float(g["lat"]), float(g["lon"])))
+    return points
+
+
+def resolve_elevations(points: list[tuple], previous: "SpotGeometryTable | None" = None,
+                       fetch_batch=fetch_elevations_open_meteo,
+                       terrain_db_path: str = DEFAULT_TERRAIN_DB,
+                       dem=None) -> tuple[np.ndarray, list[str]]:
+    """
+    Elevation per point. Points already in ``previous`` with a DEM value keep
+    it (no refetch on regeneration); new points and points that only had an
+    offline fallback are sampled from the local DEM raster (``dem``, a
+    dem_raster.DemRaster) when it covers them, then go to ``fetch_batch``
+    (one batch call), then the terrain db, then the approximation. A raster
+    built from the terrain db (not GLO-90) is only used after the fetch, in
+    place of the nearest terrain_points row, so the next regeneration still
+    tries to upgrade those points to DEM values.
+    """
+    n = len(points)
+    elevations = np.full(n, np.nan)
+    sources = [""] * n
+    if previous is not None:
+        for i, (_, _, lat, lon) in enumerate(points):
+            row = previous.index_of(lat, lon)
+            if row is not None and previous.array["elevation_source"][row] == "dem":
+                elevations[i] = previous.array["elevation"][row]
+                sources[i] = "dem"
+
+    def sample_raster(missing):
+        sampled = dem.elevation_at([points[i][2] for i in missing], [points[i][3] for i in missing])
+        for i, v in zip(missing, sampled):
+            if np.isfinite(v):
+                elevations[i] = max(0.0, float(v))
+                sources[i] = dem.elevation_source
+        return [i for i in missing if np.isnan(elevations[i])]
+
+    missing = [i for i in range(n) if np.isnan(elevations[i])]
+    if missing and dem is not None and dem.elevation_source == "dem":
+        missing = sample_raster(missing)
+
+    if missing and fetch_batch is not None:
+        fetched = fetch_batch([points[i][2] for i in missing], [points[i][3] for i in missing])
+        if fetched is not None and len(fetched) == len(missing):
+            for i, v in zip(missing, fetched):
+                elevations[i] = max(0.0, float(v))
+                sources[i] = "dem"
+            missing = []
+
+    if missing and dem is not None and dem.elevation_source != "dem":
+        missing = sample_raster(missing)
+
+    if missing:
+        db_vals = terrain_db_elevations([points[i][2] for i in missing], [points[i][3] for i in missing],
+                                        terrain_db_path)
+        if db_vals is not None:
+            for i, v in zip(missing, db_vals):
+                elevations[i] = float(v)
+                sources[i] = "terrain_db"
+            missing = []
+
+    for i in missing:
+        elevations[i] = approximate_elevation_m(points[i][2], points[i][3])
+        sources[i] = "approx"
+    return elevations, sources
+
+
+def build_geometry_table(points: list[tuple], elevations, elevation_sources) -> np.ndarray:
+    """Structured GEOMETRY_DTYPE array for ``points`` (name, kind, lat, lon)."""
+    table = np.zeros(len(points), dtype=GEOMETRY_DTYPE)
+    if not points:
+        return table
+    names, kinds, lats, lons = zip(*points)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    table["name"] = names
+    table["kind"] = kinds
+    table["lat"] = lats
+    table["lon"] = lons
+    table["elevation"] = elevations
+    table["elevation_source"] = elevation_sources
+    table["theta"] = spot_theta(lats, lons)
+    table["mountain_azimuth"] = mountain_azimuth(lats, lons)
+    table["sea_direction"] = sea_direction(lats, lons)
+    table["is_forest"] = forest_mask(lats, lons)
+    table["is_coastal"] = coastal_mask(lats, lons)
+    return table
+
+
+def save_geometry_table(table: np.ndarray, path: str = DEFAULT_TABLE_PATH) -> None:
+    """Atomic write (temp file + rename) so a concurrent mmap reader never
+    sees a half-written file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".spot_geometry.", suffix=".npy", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, table, allow_pickle=False)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class SpotGeometryTable:
+    """Read-only view over a geometry array with coordinate / name indexes."""
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self._by_coord = {}
+        self._by_name = {}
+        for i, (name, lat, lon) in enumerate(zip(array["name"], array["lat"], array["lon"])):
+            self._by_coord.setdefault(_coord_key(lat, lon), i)
+            if name:
+                self._by_name.setdefault(str(name), i)
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def index_of(self, lat: float, lon: float) -> int | None:
+        """Row for a coordinate (matched at 1e-4°, ≈10 m), or None."""
+        return self._by_coord.get(_coord_key(lat, lon))
+
+    def index_of_name(self, name: str) -> int | None:
+        return self._by_name.get(name)
+
+    def row(self, lat: float, lon: float) -> dict | None:
+        """Plain-Python dict of one row, or None when the point isn't tabulated."""
+        i = self.index_of(lat, lon)
+        if i is None:
+            return None
+        rec = self.array[i]
+        return {
+            "name": str(rec["name"]),
+            "kind": str(rec["kind"]),
+            "lat": float(rec["lat"]),
+            "lon": float(rec["lon"]),
+            "elevation": float(rec["elevation"]),
+            "elevation_source": str(rec["elevation_source"]),
+            "theta": float(rec["theta"]),
+            "mountain_azimuth": float(rec["mountain_azimuth"]),
+            "sea_direction": float(rec["sea_direction"]),
+            "is_forest": bool(rec["is_forest"]),
+            "is_coastal": bool(rec["is_coastal"]),
+        }
+
+    def rows_for(self, lats, lons) -> np.ndarray:
+        """Row index per point (-1 where not tabulated)."""
+        return np.array([self._by_coord.get(_coord_key(a, b), -1) for a, b in zip(lats, lons)],
+                        dtype=np.int64)
+
+
+def load_geometry_table(path: str = DEFAULT_TABLE_PATH) -> SpotGeometryTable | None:
+    """Memory-map a saved table; None if missing or unreadable (callers then
+    fall back to computing geometry on the fly)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        array = np.load(path, mmap_mode="r", allow_pickle=False)
+    except Exception as e:
+        print(f"[spot-geometry] failed to load {path}: {e}")
+        return None
+    if array.dtype != GEOMETRY_DTYPE:
+        print(f"[spot-geometry] {path} has an outdated schema; ignoring")
+        return None
+    return SpotGeometryTable(array)
+
+
+def regenerate_geometry_table(spots_csv: str = DEFAULT_SPOTS_CSV, path: str = DEFAULT_TABLE_PATH,
+                              fetch_batch=fetch_elevations_open_meteo,
+                              terrain_db_path: str = DEFAULT_TERRAIN_DB,
+                              dem=None) -> SpotGeometryTable:
+    """Rebuild the table for the current CSV + grid, reusing elevations of
+    points that were already tabulated, and write it atomically. ``dem``
+    defaults to the bundled rishiri_dem.npz when it exists."""
+    if dem is None:
+        from dem_raster import load_dem_raster  # dem_raster imports this module
+        dem = load_dem_raster()
+    previous = load_geometry_table(path)
+    points = collect_points(spots_csv)
+    elevations, sources = resolve_elevations(points, previous, fetch_batch, terrain_db_path, dem=dem)
+    table = build_geometry_table(points, elevations, sources)
+    save_geometry_table(table, path)
+    return load_geometry_table(path)
+
+
+if __name__ == "__main__":
+    result = regenerate_geometry_table()
+    kinds, counts = np.unique(result.array["elevation_source"], return_counts=True)
+    print(f"spot geometry: {len(result)} points -> {DEFAULT_TABLE_PATH}")
+    print("elevation sources: " + ", ".join(f"{k}={c}" for k, c in zip(kinds, counts)))
@@ -0,0 +1,248 @@
+"""Array-native atmospheric stability indices for batches of profiles.
+
+atmospheric_stability_analyzer.AtmosphericStabilityAnalyzer works on one
+profile at a time: CAPE/CIN walks the pressure levels in a Python loop and
+SSI / LI / K-index / Total Totals each re-interpolate to 850/700/500 hPa.
+Here every quantity is computed over (..., level) arrays — a 7-day hourly
+profile is (168, L), a grid of spots is (spot, time, L):
+
+    stability_indices()     SSI, CAPE, CIN, LI, K, TT, omega, θe850, PW
+                            in one pass; pressure may be shared (L,)
+    interpolate_to_level()  linear-in-p interpolation to one level
+    PseudoAdiabatTable      pseudo-adiabats T(p, θw) integrated once (RK4)
+                            and sampled bilinearly; moist_parcel_temperature()
+                            lifts parcels dry to the LCL (Bolton 1980), then
+                            along the table
+
+parcel="dry" reproduces the scalar analyzer (its parcel is dry-adiabatic all
+the way up) — tests/test_stability_batch.py checks the two agree.
+parcel="moist" lifts along the pseudo-adiabats instead. Levels must be
+ordered surface first (decreasing pressure), as in the analyzer.
+
+One intentional difference: the analyzer's off-level interpolation calls
+np.interp on descending pressures (undefined); here it is a proper linear
+interpolation. On the standard levels (850/700/500 present) both agree.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+
+# atmospheric_stability_analyzer.AtmosphericStabilityAnalyzer と同じ定数
+R_D = 287.0       # J/kg/K
+C_P = 1004.0      # J/kg/K
+L_V = 2.5e6       # J/kg
+G = 9.81          # m/s²
+EPSILON = 0.622
+KAPPA = R_D / C_P
+T0 = 273.15
+
+
+def saturation_vapor_pressure(temperature_c):
+    """Magnus 式 (hPa)。analyzer の _calculate_mixing_ratio と同じ係数"""
+    temperature_c = np.asarray(temperature_c, dtype=np.float64)
+    return 6.112 * np.exp(17.67 * temperature_c / (temperature_c + T0 - 29.65))
+
+
+def mixing_ratio(dewpoint_c, pressure_hpa):
+    """混合比 (kg/kg)"""
+    es = saturation_vapor_pressure(dewpoint_c)
+    return EPSILON * es / (np.asarray(pressure_hpa, dtype=np.float64) - es)
+
+
+def interpolate_to_level(pressure, values, target: float):
+    """
+    (..., L) → (...)。気圧について線形補間、範囲外は NaN。
+    target と一致する気圧面があればその値をそのまま返す。
+    """
+    pressure = np.broadcast_to(np.asarray(pressure, dtype=np.float64), np.shape(values))
+    values = np.asarray(values, dtype=np.float64)
+    exact = pressure == target
+    has_exact = exact.any(axis=-1)
+    exact_value = np.take_along_axis(values, exact.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+
+    # 隣り合う2面で target を挟む区間（気圧は降順でも昇順でもよい）
+    lo, hi = pressure[..., :-1], pressure[..., 1:]
+    between = ((lo - target) * (hi - target) <= 0) & (lo != hi)
+    has_between = between.any(axis=-1)
+    k = between.argmax(axis=-1)[..., None]
+    p0 = np.take_along_axis(lo, k, axis=-1)[..., 0]
+    p1 = np.take_along_axis(hi, k, axis=-1)[..., 0]
+    v0 = np.take_along_axis(values[..., :-1], k, axis=-1)[..., 0]
+    v1 = np.take_along_axis(values[..., 1:], k, axis=-1)[..., 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        interpolated = v0 + (v1 - v0) * (target - p0) / (p1 - p0)
+    return np.where(has_exact, exact_value, np.where(has_between, interpolated, np.nan))
+
+
+def dry_parcel_temperature(start_temperature_k, start_pressure, pressure):
+    """乾燥断熱上昇したパーセル温度 (K)。analyzer と同じく 1000hPa の温位を経由"""
+    theta = start_temperature_k * (1000 / start_pressure) ** KAPPA
+    return theta * (pressure / 1000) ** KAPPA
+
+
+def lifting_condensation_level(temperature_c, dewpoint_c, pressure_hpa):
+    """持ち上げ凝結高度 (p_lcl [hPa], T_lcl [K])。Bolton (1980) eq. 15"""
+    t_k = np.asarray(temperature_c, dtype=np.float64) + T0
+    td_k = np.minimum(np.asarray(dewpoint_c, dtype=np.float64) + T0, t_k)
+    t_lcl = 1.0 / (1.0 / (td_k - 56.0) + np.log(t_k / td_k) / 800.0) + 56.0
+    p_lcl = np.asarray(pressure_hpa, dtype=np.float64) * (t_lcl / t_k) ** (1.0 / KAPPA)
+    return p_lcl, t_lcl
+
+
+def _moist_lapse(pressure, temperature_k):
+    """偽断熱減率 dT/dp (K/hPa)"""
+    es = saturation_vapor_pressure(temperature_k - T0)
+    rs = EPSILON * es / (pressure - es)
+    return (R_D * temperature_k + L_V * rs) / (
+        pressure * (C_P + L_V ** 2 * rs * EPSILON / (R_D * temperature_k ** 2)))
+
+
+class PseudoAdiabatTable:
+    """
+    偽断熱線の表 T(p, θw)。1000hPa で T=θw の状態から上下に RK4 で積分する。
+    p は p_min..p_max を dp 刻み、θw は theta_w_min..theta_w_max を d_theta_w 刻み。
+    """
+
+    def __init__(self, p_min: float = 100.0, p_max: float = 1050.0, dp: float = 5.0,
+                 theta_w_min: float = -40.0, theta_w_max: float = 40.0, d_theta_w: float = 0.25):
+        self.pressure = np.arange(p_min, p_max + dp / 2, dp)
+        self.theta_w = np.arange(theta_w_min, theta_w_max + d_theta_w / 2, d_theta_w)
+        self.p_min, self.dp = float(p_min), float(dp)
+        self.tw_min, self.dtw = float(theta_w_min), float(d_theta_w)
+
+        table = np.empty((len(self.pressure), len(self.theta_w)))
+        start = int(round((1000.0 - p_min) / dp))
+        table[start] = self.theta_w + T0
+        for direction in (-1, 1):
+            t = table[start].copy()
+            k = start
+            while 0 <= k + direction < len(self.pressure):
+                p = self.pressure[k]
+                h = direction * dp
+                k1 = _moist_lapse(p, t)
+                k2 = _moist_lapse(p + h / 2, t + h / 2 * k1)
+                k3 = _moist_lapse(p + h / 2, t + h / 2 * k2)
+                k4 = _moist_lapse(p + h, t + h * k3)
+                t = t + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+                k += direction
+                table[k] = t
+        self.table = table
+
+    def _pressure_index(self, pressure):
+        fp = np.clip((np.asarray(pressure, dtype=np.float64) - self.p_min) / self.dp, 0, len(self.pressure) - 1)
+        k0 = np.minimum(np.floor(fp).astype(np.intp), len(self.pressure) - 2)
+        return k0, fp - k0
+
+    def theta_w_index(self, pressure, temperature_k):
+        """(p, T) を通る偽断熱線の θw 方向の小数インデックス"""
+        k0, f = self._pressure_index(pressure)
+        rows = self.table[k0] * (1 - f)[..., None] + self.table[k0 + 1] * f[..., None]
+        t = np.asarray(temperature_k, dtype=np.float64)[..., None]
+        j0 = np.clip((rows < t).sum(axis=-1) - 1, 0, len(self.theta_w) - 2)
+        lo = np.take_along_axis(rows, j0[..., None], axis=-1)[..., 0]
+        hi = np.take_along_axis(rows, j0[..., None] + 1, axis=-1)[..., 0]
+        return np.clip(j0 + (t[..., 0] - lo) / (hi - lo), 0, len(self.theta_w) - 1)
+
+    def temperature(self, pressure, theta_w_index):
+        """偽断熱線（小数インデックス）上の気圧 pressure での気温 (K)"""
+        k0, f = self._pressure_index(pressure)
+        w = np.asarray(theta_w_index, dtype=np.float64)
+        j0 = np.minimum(np.floor(w).astype(np.intp), len(self.theta_w) - 2)
+        g = w - j0
+        t = self.table
+        return ((1 - f) * (1 - g) * t[k0, j0] + (1 - f) * g * t[k0, j0 + 1]
+                + f * (1 - g) * t[k0 + 1, j0] + f * g * t[k0 + 1, j0 + 1])
+
+
+@lru_cache(maxsize=1)
+def default_table() -> PseudoAdiabatTable:
+    return PseudoAdiabatTable()
+
+
+def moist_parcel_temperature(temperature_c, dewpoint_c, start_pressure, pressure, table=None):
+    """
+    (..., ) の始点から (..., L) の各気圧へ持ち上げたパーセル温度 (K)。
+    LCL までは乾燥断熱、それより上は偽断熱線に沿う。
+    """
+    table = table or default_table()
+    start_pressure = np.asarray(start_pressure, dtype=np.float64)
+    p_lcl, t_lcl = lifting_condensation_level(temperature_c, dewpoint_c, start_pressure)
+    w = table.theta_w_index(np.where(np.isfinite(p_lcl), p_lcl, 1000.0), np.where(np.isfinite(t_lcl), t_lcl, T0))
+    pressure = np.asarray(pressure, dtype=np.float64)
+    dry = dry_parcel_temperature(np.asarray(temperature_c, dtype=np.float64)[..., None] + T0,
+                                 start_pressure[..., None], pressure)
+    moist = table.temperature(np.broadcast_to(pressure, dry.shape), w[..., None])
+    out = np.where(pressure >= p_lcl[..., None], dry, moist)
+    return np.where(np.isfinite(p_lcl)[..., None], out, np.nan)
+
+
+def stability_indices(pressure, temperature, dewpoint, height, wind_speed=None, parcel: str = "dry") -> dict:
+    """
+    (..., L) のプロファイル群の安定度指標。pressure は (L,) 共有でもよい。
+    戻り値は各指標 → (...) 配列の dict（キー名は StabilityIndices と同じ）。
+    """
+    if parcel not in ("dry", "moist"):
+        raise ValueError(f"parcel must be 'dry' or 'moist', got {parcel!r}")
+    temperature = np.asarray(temperature, dtype=np.float64)
+    dewpoint = np.asarray(dewpoint, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+    pressure = np.broadcast_to(np.asarray(pressure, dtype=np.float64), temperature.shape)
+    n_levels = temperature.shape[-1]
+
+    t850 = interpolate_to_level(pressure, temperature, 850)
+    t700 = interpolate_to_level(pressure, temperature, 700)
+    t500 = interpolate_to_level(pressure, temperature, 500)
+    td850 = interpolate_to_level(pressure, dewpoint, 850)
+    td700 = interpolate_to_level(pressure, dewpoint, 700)
+
+    surface_pressure = pressure.max(axis=-1)
+    surface_k = temperature[..., 0] + T0
+
+    if parcel == "dry":
+        ssi_parcel = dry_parcel_temperature(t850 + T0, 850.0, 500.0)
+        li_parcel = dry_parcel_temperature(surface_k, surface_pressure, 500.0)
+        parcel_k = dry_parcel_temperature(surface_k[..., None], surface_pressure[..., None], pressure)
+    else:
+        ssi_parcel = moist_parcel_temperature(t850, td850, np.full(t850.shape, 850.0), np.array([500.0]))[..., 0]
+        li_parcel = moist_parcel_temperature(temperature[..., 0], dewpoint[..., 0], surface_pressure,
+                                             np.array([500.0]))[..., 0]
+        parcel_k = moist_parcel_temperature(temperature[..., 0], dewpoint[..., 0], surface_pressure, pressure)
+
+    # CAPE/CIN: analyzer と同じく地表より上、最上層を除く各面で (Tp-Te)/Te·g·Δz
+    env_k = temperature + T0
+    dz = np.diff(height, axis=-1, prepend=np.nan)
+    level = np.arange(n_levels)
+    use = (level > 0) & (level < n_levels - 1) & (pressure < surface_pressure[..., None])
+    # 欠測の気圧面は積分から外す（プロファイル全体を NaN にしない）
+    use &= np.isfinite(dz) & np.isfinite(parcel_k) & np.isfinite(env_k)
+    warm = parcel_k > env_k
+    with np.errstate(invalid="ignore"):
+        cape = np.where(use & warm, G * (parcel_k - env_k) / env_k * dz, 0.0).sum(axis=-1)
+        cin = np.where(use & ~warm, G * (env_k - parcel_k) / env_k * dz, 0.0).sum(axis=-1)
+
+    if wind_speed is not None and n_levels >= 3:
+        wind_speed = np.asarray(wind_speed, dtype=np.float64)
+        omega = -np.mean(np.diff(wind_speed, axis=-1) / np.diff(pressure, axis=-1), axis=-1) * 100
+    else:
+        omega = np.full(temperature.shape[:-1], np.nan)
+
+    theta_850 = (t850 + T0) * (1000 / 850) ** KAPPA
+    theta_e_850 = theta_850 * np.exp(L_V * mixing_ratio(td850, 850) / (C_P * (t850 + T0)))
+
+    w = mixing_ratio(dewpoint, pressure)
+    precipitable_water = ((w[..., :-1] + w[..., 1:]) / 2 * (pressure[..., :-1] - pressure[..., 1:]) * 100 / G
+                          ).sum(axis=-1)
+
+    return {
+        "ssi": t500 - (ssi_parcel - T0),
+        "cape": cape,
+        "cin": cin,
+        "lifted_index": t500 - (li_parcel - T0),
+        "k_index": (t850 - t500) + td850 - (t700 - td700),
+        "total_totals": (t850 - t500) + (td850 - t500),
+        "vertical_p_velocity": omega,
+        "equivalent_potential_temp_850": theta_e_850,
+        "precipitable_water": precipitable_water,
+    }
@@ -11,14 +11,12 @@ import logging
 import threading
 import numpy as np
 import requests
-import pandas as pd
 import json
 from datetime import datetime, timedelta, timezone
 from html import escape
 from urllib.parse import urlencode
 from flask import Flask, jsonify, request, send_file, send_from_directory
 from flask_cors import CORS
-from scipy.optimize import fsolve
 from open_meteo_guard import (
     OpenMeteoCircuitOpenError,
     OpenMeteoRateLimitError,
@@ -27,10 +25,52 @@ from open_meteo_guard import (
     is_enabled as open_meteo_circuit_enabled,
 )
 from open_meteo_prefetch import (
+    FIELD_GRID_HOURLY_VARS,
     SUMMIT_LAT,
     SUMMIT_LON,
     build_rishiri_grid,
 )
+from spot_geometry import (
+    fetch_elevations_open_meteo,
+    load_geometry_table,
+    onshore_factor as _geometry_onshore_factor,
+    regenerate_geometry_table,
+)
+from field_grid_dataset import (
+    FieldGridDataset,
+    nanmax,
+    nanmean,
+    nanmin,
+    nansum,
+    to_optional,
+    to_optional_list,
+)
+from terrain_correction import (
+    build_terrain_grid,
+    correct_grid as correct_terrain_grid,
+)
+from dem_raster import load_dem_raster
+import spot_differences as _spot_diff
+from spot_artifacts import JS_FORMAT, KML_FORMAT, SpotArtifacts, normalize_spot, read_spots
+# file_signature は2つある: dataset_registry 版は (mtime_ns, size, inode)（/sheets の版）、
+# warm_start 版は (mtime_ns, size)（スナップショットに保存済みの値と比べる）
+from dataset_registry import (
+    FEEDBACK, RECORDS, SPOTS, DatasetRegistry, file_signature as dataset_file_signature,
+)
+from sheet_export_log import DEFAULT_PAGE_LIMIT, SheetExportLogs
+from warm_start import (
+    DEFAULT_SNAPSHOT_FILE,
+    FirstRequestHook,
+    LazyModule,
+    file_signature,
+    load_snapshot,
+    preload as preload_lazy_modules,
+    save_snapshot,
+)
+
+# pandas (~0.4s) はワーカー起動時ではなく、CSVを読むルートが最初に呼ばれた時点で
+# import する（warm_start.py）。初回リクエスト後にバックグラウンドで先読みもする。
+pd = LazyModule("pandas")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JST = timezone(timedelta(hours=9))  # 日本標準時 (UTC+9)
@@ -45,17 +85,23 @@ CORS(app, origins=[
 ])
 
 # M-3: APIレート制限（外部API呼び出しを誘発するエンドポイントを保護）
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-# Use Upstash Redis as limiter backend (shared across Gunicorn workers).
-# Falls back to in-memory if env vars are not set (local dev).
-_limiter_storage_uri = 'memory://'
-_ul_rest   = os.environ.get('UPSTASH_REDIS_REST_URL', '').strip().rstrip('/')
-_ul_token  = os.environ.get('UPSTASH_REDIS_REST_TOKEN', '')
-if _ul_rest and _ul_token:
-    _ul_host = _ul_rest.replace('https://', '').replace('http://', '')
-    _limiter_storage_uri = f'rediss://default:{_ul_token}@{_ul_host}:6379'
-limiter = Limiter(get_remote_address, app=app, default_limits=[], storage_uri=_limiter_storage_uri)
+# 判定はプロセス内の GCRA、Upstash Redis とは数秒ごとにまとめて突き合わせる
+# （ワーカー間で共有、リクエストごとの Redis 往復なし）。env 未設定時はプロセス内のみ。
+from rate_limiter import RateLimiter, upstash_pipeline_from_env
+from job_scheduler import DailyAt, Every, default_scheduler
+# block_after=None: 1つのルートで制限されても他のルートは止めない（flask_limiter と同じ）。
+# ProxyFix なしでは共有プロキシの IP で全員が締め出されるため、ブロックは使わない。
+limiter = RateLimiter(app, key_func=lambda: request.remote_addr or '127.0.0.1',
+                      redis_pipeline=upstash_pipeline_from_env(), block_after=None,
+                      namespace='app')
+
+# ルート別レイテンシヒストグラム (/metrics)、Open-Meteo/Upstash/JMA 呼び出しの計測、
+# PROFILE_SLOW_REQUEST_MS 設定時のみ遅いリクエストのスタックサンプリング（monitoring.py）
+# /metrics・/health/detailed は管理者用（_check_admin_secret、下で定義）。アクセスログは
+# 遅いリクエストと 4xx/5xx のみ（全件は LOG_ALL_REQUESTS=1 のときだけ）
+from monitoring import init_monitoring
+monitoring_manager = init_monitoring(app, configure_logging=False, base_dir=BASE_DIR,
+                                     auth=lambda: _check_admin_secret())
 
 _THREADS_OAUTH_CODE_CACHE = {}
 _THREADS_OAUTH_CODE_CACHE_LOCK = threading.Lock()
@@ -64,8 +110,14 @@ _THREADS_OAUTH_CODE_CACHE_TTL = 600
 # Configuration — all paths are BASE_DIR-relative so the app works regardless of cwd
 CSV_FILE             = os.path.join(BASE_DIR, "hoshiba_spots.csv")
 RECORD_FILE          = os.path.join(BASE_DIR, "hoshiba_records.csv")
+
+# 干場・記録・フィードバックCSVのパース結果をプロセス内で共有（dataset_registry.py）。
+# ファイルの (mtime, size) が変わるか、書き込み側が invalidate() を呼ぶまで使い回す。
+_datasets = DatasetRegistry()
 KML_FILE             = os.path.join(BASE_DIR, "hoshiba_spots_named.kml")
 JS_ARRAY_FILE        = os.path.join(BASE_DIR, "all_spots_array.js")
+SPOT_GEOMETRY_FILE   = os.path.join(BASE_DIR, "spot_geometry.npy")
+DEM_FILE             = os.path.join(BASE_DIR, "rishiri_dem.npz")
 USER_FAVORITES_FILE  = os.path.join(BASE_DIR, "user_favorites.json")
 NOTIFICATION_FILE    = os.path.join(BASE_DIR, "notification_users.json")
 FORECAST_HISTORY_DIR = os.path.join(BASE_DIR, "forecast_history")
@@ -164,6 +216,9 @@ class ThetaECorrector:
             theta_e_calc = self.equivalent_potential_temperature(T, Td, P)
             return theta_e_calc - theta_e_target
 
+        # scipy.optimize (~0.4s) はエマグラムθₑ補正でしか使わないので遅延 import
+        from scipy.optimize import fsolve
+
         try:
             T_solution = fsolve(objective, initial_guess, full_output=True)
             if T_solution[2] == 1:  # 収束した場合
@@ -419,34 +474,34 @@ def calculate_wind_angle_difference(wind_direction, spot_theta):
 # 4-File Synchronization Functions (4ファイル自動同期)
 # ============================================================================
 
+_spot_artifacts_cache: dict = {}
+
+
+def _spot_artifacts() -> SpotArtifacts:
+    """KML / JS 配列ファイルの差分生成器（spot_artifacts.py）。マニフェストはJSの隣に置く"""
+    key = (KML_FILE, JS_ARRAY_FILE)
+    if key not in _spot_artifacts_cache:
+        manifest = os.path.join(os.path.dirname(JS_ARRAY_FILE), 'spot_artifacts_manifest.json')
+        _spot_artifacts_cache[key] = SpotArtifacts(
+            {'kml': (KML_FILE, KML_FORMAT), 'js': (JS_ARRAY_FILE, JS_FORMAT)}, manifest
+        )
+    return _spot_artifacts_cache[key]
+
+
+def _spots_from_df(df) -> list:
+    return [normalize_spot(row) for row in df.to_dict('records')]
+
+
 def sync_kml_file(df):
     """
-    CSVデータからKMLファイルを生成（hoshiba_spots.csvと同期）
+    CSVデータからKMLファイルを生成（hoshiba_spots.csvと同期）。
+    変更のあった干場だけ描き直し、アトミックに書き換える。
 
     Args:
         df: hoshiba_spots.csvのDataFrame
     """
     try:
-        kml_header = """<?xml version='1.0' encoding='UTF-8'?>
-<kml xmlns='http://www.opengis.net/kml/2.2'>
-<Document>
-"""
-        kml_footer = """</Document>
-</kml>"""
-
-        placemark_entries = []
-        for _, row in df.iterrows():
-            placemark = f"""<Placemark>
-<name>{row['name']}</name>
-<Point><coordinates>{row['lon']:.7f},{row['lat']:.7f}</coordinates></Point>
-</Placemark>"""
-            placemark_entries.append(placemark)
-
-        kml_content = kml_header + "\n".join(placemark_entries) + "\n" + kml_footer
-
-        with open(KML_FILE, 'w', encoding='utf-8') as f:
-            f.write(kml_content)
-
+        _spot_artifacts().sync(_spots_from_df(df), only=['kml'])
         return True
     except Exception as e:
         print(f"KML sync error: {e}")
@@ -455,61 +510,81 @@ def sync_kml_file(df):
 
 def sync_js_array_file(df):
     """
-    CSVデータからJavaScript配列ファイルを生成（hoshiba_spots.csvと同期）
+    CSVデータからJavaScript配列ファイルを生成（hoshiba_spots.csvと同期）。
+    変更のあった干場だけ描き直し、アトミックに書き換える。
 
     Args:
         df: hoshiba_spots.csvのDataFrame
     """
     try:
-        js_header = "const hoshibaSpots = [\n"
-        js_footer = "];\n"
-
-        js_entries = []
-        for _, row in df.iterrows():
-            # Handle NaN values
-            town = row.get('town', '')
-            district = row.get('district', '')
-            buraku = row.get('buraku', '')
+        _spot_artifacts().sync(_spots_from_df(df), only=['js'])
+        return True
+    except Exception as e:
+        print(f"JS array sync error: {e}")
+        return False
 
-            if pd.isna(town):
-                town = ''
-            if pd.isna(district):
-                district = ''
-            if pd.isna(buraku):
-                buraku = ''
 
-            js_entry = f'    {{ name: "{row["name"]}", lat: {row["lat"]:.7f}, lon: {row["lon"]:.7f}, town: "{town}", district: "{district}", buraku: "{buraku}" }}'
-            js_entries.append(js_entry)
+def _geometry_elevation_fetch(lats, lons):
+    """
+    spot_geometry の標高一括取得（新規干場のみ）。/add・/delete のリクエスト内で
+    呼ばれるため、サーキットブレーカー経由の1リクエストに限定し、失敗・429時は
+    None を返して rishiri_terrain.db の最近傍標高にフォールバックさせる。
+    """
+    from types import SimpleNamespace
+    guarded = SimpleNamespace(
+        get=lambda url, **kwargs: guarded_get(url, source='spots', logger=app.logger, **kwargs)
+    )
+    return fetch_elevations_open_meteo(lats, lons, requests_module=guarded)
 
-        js_content = js_header + ",\n".join(js_entries) + "\n" + js_footer
 
-        with open(JS_ARRAY_FILE, 'w', encoding='utf-8') as f:
-            f.write(js_content)
+def sync_geometry_file():
+    """
+    CSVと島内グリッドから干場ジオメトリ表（spot_geometry.npy）を再生成し、
+    プロセス内のメモリマップ表を差し替える。既存点のDEM標高は再利用する。
 
-        return True
+    Returns:
+        bool: 成功したかどうか
+    """
+    global _spot_geometry
+    try:
+        _spot_geometry = regenerate_geometry_table(
+            CSV_FILE, SPOT_GEOMETRY_FILE, fetch_batch=_geometry_elevation_fetch
+        )
+        return _spot_geometry is not None
     except Exception as e:
-        print(f"JS array sync error: {e}")
+        print(f"Geometry sync error: {e}")
         return False
 
 
 def sync_all_files_from_csv():
     """
-    CSVを基準として全4ファイルを同期
+    CSVを基準として全4ファイル＋ジオメトリ表を同期。
+    KML / JS は前回のマニフェストとの差分（追加・変更・削除された干場）だけ
+    描き直す（spot_artifacts.py）。
 
     Returns:
-        dict: 同期結果 {"csv": True, "kml": bool, "js": bool}
+        dict: 同期結果 {"csv": True, "kml": bool, "js": bool, "geometry": bool,
+                        "total_spots": int, "changes": {...}}
     """
     try:
-        df = pd.read_csv(CSV_FILE)
+        spots = read_spots(CSV_FILE)
 
-        kml_success = sync_kml_file(df)
-        js_success = sync_js_array_file(df)
+        try:
+            changes = _spot_artifacts().sync(spots)
+            kml_success = js_success = True
+        except Exception as e:
+            print(f"Spot artifact sync error: {e}")
+            changes = {"error": str(e)}
+            kml_success = js_success = False
+        geometry_success = sync_geometry_file()
 
         return {
             "csv": True,
             "kml": kml_success,
             "js": js_success,
-            "total_spots": len(df)
+            "geometry": geometry_success,
+            "total_spots": len(spots),
+            "changes": changes,
         }
     except Exception as e:
         print(f"Sync all files error: {e}")
@@ -517,6 +592,7 @@ def sync_all_files_from_csv():
             "csv": False,
             "kml": False,
             "js": False,
+            "geometry": False,
             "error": str(e)
         }
 
@@ -744,8 +820,14 @@ def drying_map():
 # Static file routes for JavaScript files
 @app.route('/all_spots_array.js')
 def serve_all_spots_js():
-    """Serve the all_spots_array.js file"""
-    return send_file(os.path.join(BASE_DIR, 'all_spots_array.js'), mimetype='application/javascript')
+    """Serve the all_spots_array.js file.
+
+    ETag = content hash (spot_artifacts.py), so clients revalidate with
+    If-None-Match and get 304 unless a spot was added/edited/deleted."""
+    response = send_file(JS_ARRAY_FILE, mimetype='application/javascript',
+                         etag=_spot_artifacts().etag('js') or True, conditional=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/rishiri_wind_names.js')
 def serve_wind_names_js():
@@ -1114,31 +1196,22 @@ def _save_daily_forecast_snapshot():
 
 
 def _scheduled_forecast_snapshot():
-    """バックグラウンドスレッド: 毎日16:20 JSTに全334地点の予報履歴を保存する。
+    """スケジューラジョブ: 毎日16:20 JSTに全334地点の予報履歴を保存する。
 
     16:00のLINE通知（登録干場のみ・少数）とOpen-Meteoへのアクセスが重ならない
     よう、意図的に16:20開始にしている（LINE通知の安定性・429対策）。
     2026-08-05: 16:05→16:20に変更。_save_daily_forecast_snapshot() 側の
     地点間スリープも合わせて低速化した。
     """
-    import time as _time
-    from datetime import timedelta
-    while True:
-        now = datetime.now(tz=JST)
-        next_run = now.replace(hour=16, minute=20, second=0, microsecond=0)
-        if now >= next_run:
-            next_run += timedelta(days=1)
-        _time.sleep((next_run - now).total_seconds())
-
-        date_str = datetime.now(tz=JST).strftime('%Y%m%d')
-        lock_key = f'forecast_snapshot_lock:{date_str}'
-        if _try_acquire_notify_lock(lock_key):
-            try:
-                _save_daily_forecast_snapshot()
-            except Exception as exc:
-                app.logger.error('[forecast_snapshot] batch error: %s', exc)
-        else:
-            app.logger.info('[forecast_snapshot] already run by another worker, skipping')
+    date_str = datetime.now(tz=JST).strftime('%Y%m%d')
+    lock_key = f'forecast_snapshot_lock:{date_str}'
+    if _try_acquire_notify_lock(lock_key):
+        try:
+            _save_daily_forecast_snapshot()
+        except Exception as exc:
+            app.logger.error('[forecast_snapshot] batch error: %s', exc)
+    else:
+        app.logger.info('[forecast_snapshot] already run by another worker, skipping')
 
 
 def _enhanced_prefetch_canary_spots() -> set:
@@ -1819,6 +1892,145 @@ def is_coastal_area(lat, lon):
     return True
 
 _elevation_cache: dict = {}  # key=(round(lat,2), round(lon,2)) → metres
+
+# 干場・島内グリッド点の事前計算ジオメトリ表（spot_geometry.py）。起動時に
+# メモリマップで読み込み、sync_all_files_from_csv() で再生成・差し替え。
+# 表にない座標（任意のlat/lon指定など）は従来どおりその場で計算する。
+_spot_geometry = load_geometry_table(SPOT_GEOMETRY_FILE)
+
+# 島全域の標高ラスタ（dem_raster.py）。`python dem_raster.py` で作る GLO-90 版なら
+# 範囲内の任意の座標は双線形補間で求まるので Elevation API を呼ばない。同梱版は
+# `--from-terrain-db` で作った rishiri_terrain.db 由来で、API が使えないときの代替。
+_dem_raster = load_dem_raster(DEM_FILE)
+
+
+def _dem_elevation(lat, lon, offline: bool = False) -> float | None:
+    """
+    DEM ラスタの標高(m)。ラスタがない・範囲外なら None。
+    GLO-90 のラスタは API より先に使う。同梱の rishiri_terrain.db 由来のラスタは
+    API が使えないときの代替（offline=True）としてだけ使う。
+    """
+    raster = _dem_raster
+    if raster is None or (raster.elevation_source == 'dem') == offline:
+        return None
+    value = float(raster.elevation_at(lat, lon))
+    return max(0.0, value) if math.isfinite(value) else None
+
+
+def _spot_geometry_row(lat, lon) -> dict | None:
+    """事前計算ジオメトリ表の該当行（1e-4°一致）。表がない・未登録なら None。"""
+    table = _spot_geometry
+    if table is None:
+        return None
+    return table.row(lat, lon)
+
+
+_GEOMETRY_ARRAY_FIELDS = ('theta', 'mountain_azimuth', 'sea_direction', 'is_forest', 'is_coastal')
+
+
+def _geometry_arrays(lats, lons) -> dict:
+    """
+    地点配列の静的ジオメトリ（θ・山頂方位角・海側方位・森林/海岸フラグ）。
+    表にある点は spot_geometry.npy から、ない点だけ spot_geometry のベクトル版
+    関数でその場計算する（どちらも calculate_spot_theta() 等と同値）。
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    table = _spot_geometry
+    idx = table.rows_for(lats, lons) if table is not None else np.full(len(lats), -1)
+    hit = idx >= 0
+    if hit.all() and len(idx):
+        rows = table.array[idx]
+        return {f: np.asarray(rows[f]) for f in _GEOMETRY_ARRAY_FIELDS}
+    import spot_geometry as _sg
+    out = {
+        'theta':            _sg.spot_theta(lats, lons),
+        'mountain_azimuth': _sg.mountain_azimuth(lats, lons),
+        'sea_direction':    _sg.sea_direction(lats, lons),
+        'is_forest':        _sg.forest_mask(lats, lons),
+        'is_coastal':       _sg.coastal_mask(lats, lons),
+    }
+    if hit.any():
+        rows = table.array[idx[hit]]
+        for f in _GEOMETRY_ARRAY_FIELDS:
+            out[f][hit] = rows[f]
+    return out
+
+
+# apply_terrain_correction_to_grid() 用の地形グリッドキャッシュ。
+# キー = (shape, 緯度経度配列のダイジェスト)。同じ格子で全カテゴリー・全時刻を
+# 補正するので、セルごとの get_elevation() / is_forest_area() は格子あたり1回で済む。
+_terrain_grid_cache: dict = {}
+_TERRAIN_GRID_CACHE_MAX = 8
+
+
+def _grid_elevations(lats, lons) -> np.ndarray:
+    """
+    格子点の標高(m)を一括解決。get_elevation() と同じ優先順位・同じ
+    0.01°キャッシュを使うが、未キャッシュのセルは1セルずつではなく
+    Elevation API のバッチ要求（100点単位）でまとめて取得する。
+
+    1. ジオメトリ表の DEM 値
+    2. DEM ラスタ（rishiri_dem.npz、GLO-90 のとき）の双線形補間
+    3. _elevation_cache（0.01°単位、get_elevation() と共有）
+    4. Elevation API バッチ取得 → 失敗時はジオメトリ表の標高 → terrain db 由来の
+       ラスタ → 簡易計算
+    """
+    _seed_canary_elevations()
+    lats = np.asarray(lats, dtype=np.float64).ravel()
+    lons = np.asarray(lons, dtype=np.float64).ravel()
+    out = np.full(len(lats), np.nan)
+
+    table = _spot_geometry
+    if table is not None and len(lats):
+        idx = table.rows_for(lats, lons)
+        hit = idx >= 0
+        if hit.any():
+            rows = table.array[idx[hit]]
+            is_dem = rows['elevation_source'] == 'dem'
+            out[np.flatnonzero(hit)[is_dem]] = rows['elevation'][is_dem]
+
+    todo = np.isnan(out)
+    if _dem_raster is not None and _dem_raster.elevation_source == 'dem' and todo.any():
+        out[todo] = np.maximum(_dem_raster.elevation_at(lats[todo], lons[todo]), 0.0)  # 範囲外は NaN のまま
+
+    # 0.01°セルごとに、最初に現れた格子点の座標で問い合わせる（ループ版と同じ）
+    pending: dict = {}
+    for k in np.flatnonzero(np.isnan(out)):
+        key = (round(lats[k], 2), round(lons[k], 2))
+        if key in _elevation_cache:
+            out[k] = _elevation_cache[key]
+        else:
+            pending.setdefault(key, []).append(k)
+
+    if pending:
+        first = [cells[0] for cells in pending.values()]
+        fetched = fetch_elevations_open_meteo(lats[first], lons[first])
+        for n, (key, cells) in enumerate(pending.items()):
+            if fetched is not None:
+                value = max(0, fetched[n])
+            else:
+                value = _offline_elevation(lats[cells[0]], lons[cells[0]])
+            _elevation_cache[key] = value
+            out[cells] = value
+    return out
+
+
+def _get_terrain_grid(grid_lat, grid_lon):
+    """格子（2D lat/lon 配列）の TerrainGrid をキャッシュから取得、なければ構築。"""
+    grid_lat = np.asarray(grid_lat, dtype=np.float64)
+    grid_lon = np.asarray(grid_lon, dtype=np.float64)
+    key = (grid_lat.shape, hash(grid_lat.tobytes()), hash(grid_lon.tobytes()))
+    terrain = _terrain_grid_cache.get(key)
+    if terrain is None:
+        elevation = _grid_elevations(grid_lat, grid_lon).reshape(grid_lat.shape)
+        terrain = build_terrain_grid(grid_lat, grid_lon, elevation)
+        if len(_terrain_grid_cache) >= _TERRAIN_GRID_CACHE_MAX:
+            _terrain_grid_cache.pop(next(iter(_terrain_grid_cache)))
+        _terrain_grid_cache[key] = terrain
+    return terrain
+
+
 _canary_elevation_seeded = False
 
 def _seed_canary_elevations():
@@ -1875,7 +2087,17 @@ def get_elevation(lat, lon, source: str | None = None):
     Get elevation from Open-Meteo Elevation API (Copernicus GLO-90 DEM).
     Results are cached in-process at 0.01° resolution (~1 km) to avoid
     repeated API calls when scoring 334 spots sharing the same grid cell.
+    Points covered by a GLO-90 DEM raster (rishiri_dem.npz) never reach the API;
+    the bundled terrain-db raster only answers when the API fails.
     """
+    # 事前計算表にDEM（GLO-90）標高があればネットワーク不要
+    geometry = _spot_geometry_row(lat, lon)
+    if geometry is not None and geometry['elevation_source'] == 'dem':
+        return geometry['elevation']
+    dem_value = _dem_elevation(lat, lon)
+    if dem_value is not None:
+        return dem_value
+
     _seed_canary_elevations()
     cache_key = (round(lat, 2), round(lon, 2))
     if cache_key in _elevation_cache:
@@ -1900,11 +2122,19 @@ def get_elevation(lat, lon, source: str | None = None):
     except Exception:
         pass
 
-    # Fallback: simplified calculation
-    result = _approximate_elevation_no_network(lat, lon)
+    result = _offline_elevation(lat, lon)
     _elevation_cache[cache_key] = result
     return result
 
+
+def _offline_elevation(lat, lon) -> float:
+    """API が使えないときの標高: ジオメトリ表 → terrain db 由来のラスタ → 簡易計算"""
+    geometry = _spot_geometry_row(lat, lon)
+    if geometry is not None:
+        return geometry['elevation']
+    value = _dem_elevation(lat, lon, offline=True)
+    return value if value is not None else _approximate_elevation_no_network(lat, lon)
+
 def get_onshore_wind_factor(lat, lon, wind_direction):
     """
     海岸補正の風向依存係数を計算（放射方向モデル）
@@ -2027,132 +2257,16 @@ def apply_terrain_correction_to_grid(grid_lat, grid_lon, grid_values, category,
     - corrected_values: 地形補正後の値（2D array）
     - correction_stats: 補正統計情報dict（クリップ発生回数等）
     """
-    corrected_values = grid_values.copy()
-
-    # 補正統計（ログ用）
-    correction_stats = {
-        'clipped_high': 0,  # 上限クリップ回数
-        'clipped_low': 0,   # 下限クリップ回数
-        'wind_reduced_to_zero': 0,  # 風速がゼロに減衰した回数
-        'humidity_saturated': 0,  # 湿度が100%に達した回数
-        'onshore_wind_active': 0,  # onshore wind補正が有効だった回数
-        'forest_transpiration_active': 0  # 森林蒸散補正が有効だった回数
-    }
+    # 地形（森林・海岸マスク、標高、海側方位）はグリッドごとに一度だけ求めてキャッシュ
+    terrain = _get_terrain_grid(grid_lat, grid_lon)
 
-    # カテゴリー別に補正を適用
-    for i in range(grid_lat.shape[0]):
-        for j in range(grid_lat.shape[1]):
-            lat = grid_lat[i, j]
-            lon = grid_lon[i, j]
+    # 季節・日射係数（森林補正用）は month/hour のみに依存 → 1回だけ計算
+    transp_factor, shade_factor = get_season_solar_factor(month, hour_jst)
 
-            # 地形特性を取得
-            is_forest = is_forest_area(lat, lon)
-            is_coastal = is_coastal_area(lat, lon)
-            elevation = get_elevation(lat, lon)
-
-            # 風向を取得（海岸補正用）
-            wind_dir = grid_wind_direction[i, j] if grid_wind_direction is not None else None
-
-            # 季節・日射係数を取得（森林補正用）
-            transp_factor, shade_factor = get_season_solar_factor(month, hour_jst)
-
-            # カテゴリー別補正
-            if category in ['wind', 'wind_850hpa', 'wind_700hpa']:
-                # 風速補正（乗算型：物理的により妥当、負値を自然に防ぐ）
-                original_wind = corrected_values[i, j]
-                reduction_factor = 1.0
-
-                if is_forest:
-                    reduction_factor *= 0.4  # 森林で60%減衰（実測：2.5m/s減少@4m/s → 約60%減）
-
-                # 海岸補正（風向依存）
-                if is_coastal and wind_dir is not None:
-                    onshore_factor = get_onshore_wind_factor(lat, lon, wind_dir)
-                    if onshore_factor > 0.1:  # 閾値：onshore windと判定
-                        reduction_factor *= (1.0 + 0.25 * onshore_factor)  # 最大25%増加
-                        correction_stats['onshore_wind_active'] += 1
-
-                corrected_values[i, j] = max(0, original_wind * reduction_factor)
-
-                if corrected_values[i, j] == 0 and original_wind > 0:
-                    correction_stats['wind_reduced_to_zero'] += 1
-
-            elif category in ['humidity', 'humidity_850hpa', 'humidity_700hpa']:
-                # 湿度補正（相対湿度→水蒸気圧→補正→相対湿度：物理的により妥当）
-                RH_original = corrected_values[i, j]
-
-                # 気温データがない場合は簡易補正（後方互換性）
-                if grid_temperature is None:
-                    if is_forest:
-                        corrected_values[i, j] = min(100, RH_original + 10.0)
-                    if is_coastal:
-                        corrected_values[i, j] = min(100, corrected_values[i, j] + 5.0)
-                    if elevation > 10:
-                        corrected_values[i, j] = max(0, corrected_values[i, j] - (elevation / 100) * 1.0)
-                else:
-                    # 気温データがある場合：水蒸気圧ベースの物理的補正
-                    T_celsius = grid_temperature[i, j]
-
-                    # 飽和水蒸気圧（Magnus式、Sonntag 1990）
-                    def es(T):
-                        return 6.112 * np.exp(17.67 * T / (T + 243.5))  # hPa
-
-                    es_original = es(T_celsius)
-                    e_original = es_original * (RH_original / 100.0)  # 実際の水蒸気圧
-
-                    # 水蒸気圧を補正（森林・海岸効果、状況依存）
-                    e_corrected = e_original
-
-                    # 森林補正（季節・日射依存）
-                    if is_forest:
-                        # 基本係数1.15を季節・日射で変調
-                        # 蒸散成分（日射依存）+ 遮蔽成分（季節依存）
-                        forest_factor = 1.0 + (0.10 * transp_factor + 0.05 * shade_factor)
-                        e_corrected *= forest_factor
-
-                        if transp_factor > 0.3:  # 昼間の蒸散が有効
-                            correction_stats['forest_transpiration_active'] += 1
-
-                    # 海岸補正（風向依存）
-                    if is_coastal and wind_dir is not None:
-                        onshore_factor = get_onshore_wind_factor(lat, lon, wind_dir)
-                        if onshore_factor > 0.1:  # onshore windの時のみ
-                            # 基本係数1.08を風向で変調
-                            coastal_factor = 1.0 + (0.08 * onshore_factor)
-                            e_corrected *= coastal_factor
-                            correction_stats['onshore_wind_active'] += 1
-
-                    # 標高補正（断熱減率と気圧低下を考慮）
-                    if elevation > 10:
-                        # Open-Meteoの気温データをそのまま使用（既に標高補正済み）
-                        es_at_elevation = es(T_celsius)
-                        # 混合比保存：気圧低下に応じて水蒸気圧も変化
-                        pressure_ratio = (1000 - elevation / 9) / 1000  # 簡易的な気圧低下（標高100m≈12hPa）
-                        e_corrected *= pressure_ratio
-
-                        # 相対湿度を再計算
-                        RH_corrected = (e_corrected / es_at_elevation) * 100
-                    else:
-                        # 標高補正なし
-                        RH_corrected = (e_corrected / es_original) * 100
-
-                    corrected_values[i, j] = RH_corrected
-
-                # 境界値処理＆統計記録
-                if corrected_values[i, j] >= 100:
-                    correction_stats['humidity_saturated'] += 1
-                if corrected_values[i, j] > 100:
-                    corrected_values[i, j] = 100
-                    correction_stats['clipped_high'] += 1
-                if corrected_values[i, j] < 0:
-                    corrected_values[i, j] = 0
-                    correction_stats['clipped_low'] += 1
-
-            elif category in ['temperature', 'temperature_850hpa', 'temperature_700hpa']:
-                # 気温補正は削除：Open-Meteoが既に0.7°C/100mで補正済み
-                pass
-
-    return corrected_values, correction_stats
+    return correct_terrain_grid(grid_values, category, terrain,
+                                grid_temperature=grid_temperature,
+                                grid_wind_direction=grid_wind_direction,
+                                transp_factor=transp_factor, shade_factor=shade_factor)
 
 @app.route('/api/spots')
 def get_spots():
@@ -2227,6 +2341,56 @@ def get_spot_master_for_sheets():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+# ── Sheets エクスポートの差分配信（sheet_export_log.py）──────────────────────
+# ?since=<cursor>&limit= を付けると、前回の next_cursor 以降に追加・変更された
+# 行だけを返す（定期同期が全履歴ではなく新しい行の数に比例するコストで済む）。
+# 付けなければ従来どおり全件を返し、cursor.next_cursor だけ追加で返す。
+_sheet_exports = SheetExportLogs()
+
+
+def _synced_sheet_log(export: str, params: tuple, load, version=None, key_field: str = 'upsert_key'):
+    """
+    export/params のログを最新化して (log, rows) を返す。version が前回と同じなら
+    load() を呼ばず rows=None（ソースが変わっていない）。
+    """
+    log = _sheet_exports.get(export, params, key_field)
+    if version is not None and log.source_version == version:
+        return log, None
+    rows, summary = load()
+    log.apply(rows, source_version=version, summary=summary)
+    return log, rows
+
+
+def _sheets_payload(export: str, params: tuple, columns: list, load,
+                    sync_mode: str | None = None, version=None, key_field: str = 'upsert_key') -> dict:
+    """/sheets ルート共通のレスポンス。since/limit があればカーソル方式で返す"""
+    since = request.args.get('since')
+    limit = request.args.get('limit')
+    paged = since is not None or limit is not None
+    # 全件モードは行の並び順を従来どおりにするため、常に load() し直す
+    log, rows = _synced_sheet_log(export, params, load, version if paged else None, key_field)
+    payload = {
+        'status': 'ok',
+        'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
+    }
+    if sync_mode:
+        payload['sync_mode'] = sync_mode
+    payload['columns'] = columns
+    payload['summary'] = log.summary
+    if not paged:
+        payload['rows'] = rows
+        payload['cursor'] = {'next_cursor': log.cursor, 'has_more': False}
+        return payload
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_LIMIT
+    except ValueError:
+        limit = DEFAULT_PAGE_LIMIT
+    page = log.page(since, limit)
+    payload['rows'] = page.pop('rows')
+    payload['cursor'] = page
+    return payload
+
+
 FORECAST_SNAPSHOT_COLUMNS = [
     'upsert_key',
     'forecast_date', 'target_date', 'spot_name', 'spot_type',
@@ -2359,15 +2523,11 @@ def get_forecast_snapshots_for_sheets():
         forecast_date = _normalize_yyyymmdd(request.args.get('forecast_date') or request.args.get('date'))
         max_days_ahead = min(max(int(request.args.get('max_days_ahead', 6)), 0), 6)
         spot_name = request.args.get('spot') or None
-        rows, summary = _load_forecast_snapshot_rows(forecast_date, max_days_ahead, spot_name)
-        return jsonify({
-            'status': 'ok',
-            'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'sync_mode': 'append_or_update_snapshot_rows',
-            'columns': FORECAST_SNAPSHOT_COLUMNS,
-            'summary': summary,
-            'rows': rows,
-        })
+        return jsonify(_sheets_payload(
+            'forecast_snapshots', (forecast_date, max_days_ahead, spot_name), FORECAST_SNAPSHOT_COLUMNS,
+            lambda: _load_forecast_snapshot_rows(forecast_date, max_days_ahead, spot_name),
+            sync_mode='append_or_update_snapshot_rows',
+        ))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -2800,15 +2960,11 @@ def get_amedas_observations_for_sheets():
             request.args.get('date'),
             (datetime.now(tz=JST) - timedelta(days=1)).strftime('%Y%m%d'),
         )
-        rows, summary = _load_amedas_observation_rows(date_yyyymmdd)
-        return jsonify({
-            'status': 'ok',
-            'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'sync_mode': 'append_or_update_observation_rows',
-            'columns': AMEDAS_OBSERVATION_COLUMNS,
-            'summary': summary,
-            'rows': rows,
-        })
+        return jsonify(_sheets_payload(
+            'amedas_observations', (date_yyyymmdd,), AMEDAS_OBSERVATION_COLUMNS,
+            lambda: _load_amedas_observation_rows(date_yyyymmdd),
+            sync_mode='append_or_update_observation_rows',
+        ))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -2819,15 +2975,11 @@ def get_nowcast_observations_for_sheets():
     try:
         date_yyyymmdd = _normalize_yyyymmdd(request.args.get('date'))
         spot_name = request.args.get('spot') or None
-        rows, summary = _load_nowcast_observation_rows(date_yyyymmdd, spot_name)
-        return jsonify({
-            'status': 'ok',
-            'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'sync_mode': 'append_or_update_observation_rows',
-            'columns': NOWCAST_OBSERVATION_COLUMNS,
-            'summary': summary,
-            'rows': rows,
-        })
+        return jsonify(_sheets_payload(
+            'nowcast_observations', (date_yyyymmdd, spot_name), NOWCAST_OBSERVATION_COLUMNS,
+            lambda: _load_nowcast_observation_rows(date_yyyymmdd, spot_name),
+            sync_mode='append_or_update_observation_rows',
+        ))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -2838,15 +2990,11 @@ def get_nowcast_daily_summary_for_sheets():
     try:
         date_yyyymmdd = _normalize_yyyymmdd(request.args.get('date'))
         spot_name = request.args.get('spot') or None
-        rows, summary = _load_nowcast_daily_summary_rows(date_yyyymmdd, spot_name)
-        return jsonify({
-            'status': 'ok',
-            'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'sync_mode': 'append_or_update_daily_summary_rows',
-            'columns': NOWCAST_DAILY_SUMMARY_COLUMNS,
-            'summary': summary,
-            'rows': rows,
-        })
+        return jsonify(_sheets_payload(
+            'nowcast_daily_summary', (date_yyyymmdd, spot_name), NOWCAST_DAILY_SUMMARY_COLUMNS,
+            lambda: _load_nowcast_daily_summary_rows(date_yyyymmdd, spot_name),
+            sync_mode='append_or_update_daily_summary_rows',
+        ))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -2861,19 +3009,13 @@ def get_forecast_precip_accuracy_by_horizon_for_sheets():
         )
         max_days_ahead = min(max(int(request.args.get('max_days_ahead', 6)), 0), 6)
         spot_name = request.args.get('spot') or None
-        rows, summary = _load_forecast_precip_accuracy_by_horizon_rows(
-            target_date,
-            max_days_ahead,
-            spot_name,
-        )
-        return jsonify({
-            'status': 'ok',
-            'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'sync_mode': 'append_or_update_horizon_summary_rows',
-            'columns': FORECAST_PRECIP_ACCURACY_BY_HORIZON_COLUMNS,
-            'summary': summary,
-            'rows': rows,
-        })
+        return jsonify(_sheets_payload(
+            'precip_accuracy_by_horizon', (target_date, max_days_ahead, spot_name),
+            FORECAST_PRECIP_ACCURACY_BY_HORIZON_COLUMNS,
+            lambda: _load_forecast_precip_accuracy_by_horizon_rows(target_date, max_days_ahead, spot_name),
+            sync_mode='append_or_update_horizon_summary_rows',
+            key_field='summary_key',
+        ))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -2943,6 +3085,7 @@ def add_spot():
         # Add new spot
         df = pd.concat([df, new_row], ignore_index=True)
         df.to_csv(CSV_FILE, index=False, encoding="utf-8")
+        _datasets.invalidate(CSV_FILE)
 
         # 4ファイル自動同期: KMLとJSファイルも更新
         sync_result = sync_all_files_from_csv()
@@ -3068,6 +3211,7 @@ def delete_spot():
         # すべての制限をクリア - 削除実行
         df = df[df["name"] != name]
         df.to_csv(CSV_FILE, index=False, encoding="utf-8")
+        _datasets.invalidate(CSV_FILE)
 
         # 4ファイル自動同期: KMLとJSファイルも更新
         sync_result = sync_all_files_from_csv()
@@ -3154,6 +3298,7 @@ def _records_redis_restore() -> bool:
     try:
         with open(RECORD_FILE, 'w', encoding='utf-8') as f:
             f.write(csv_str)
+        _datasets.invalidate(RECORD_FILE)
         app.logger.info('[records_redis] restored hoshiba_records.csv from Redis (%d chars)', len(csv_str))
         return True
     except Exception as e:
@@ -3265,6 +3410,7 @@ def _feedback_log_redis_restore() -> bool:
     try:
         with open(FEEDBACK_FILE, 'w', encoding='utf-8') as f:
             f.write(csv_str)
+        _datasets.invalidate(FEEDBACK_FILE)
         app.logger.info('[feedback_redis] restored feedback_log.csv from Redis (%d chars)', len(csv_str))
         return True
     except Exception as e:
@@ -3277,20 +3423,8 @@ def _load_spot_metadata_map() -> dict:
     if not os.path.exists(CSV_FILE):
         return {}
     try:
-        spots_df = pd.read_csv(CSV_FILE)
-        result = {}
-        for _, row in spots_df.iterrows():
-            name = row.get('name')
-            if not name:
-                continue
-            result[str(name)] = {
-                'town': _json_safe_value(row.get('town')),
-                'district': _json_safe_value(row.get('district')),
-                'buraku': _json_safe_value(row.get('buraku')),
-                'lat': _json_safe_value(row.get('lat')),
-                'lon': _json_safe_value(row.get('lon')),
-            }
-        return result
+        metadata = _datasets.index(SPOTS, CSV_FILE, 'metadata')
+        return {name: dict(meta) for name, meta in metadata.items()}
     except Exception as exc:
         app.logger.warning('[spot_metadata] load failed: %s', exc)
         return {}
@@ -3315,6 +3449,17 @@ def _json_safe_value(value):
     return str(value)
 
 
+ACCURACY_SHEET_COLUMNS = [
+    'upsert_key',
+    'date', 'spot_name', 'town', 'district', 'buraku', 'days_ahead',
+    'actual_precip_0416_mm', 'actual_precip_total_mm', 'actual_rain_0416',
+    'forecast_precip_mm', 'forecast_rain', 'precip_forecast_correct',
+    'forecast_score', 'forecast_suitability', 'forecast_label',
+    'actual_result', 'actual_label', 'judgment_correct',
+    'has_drying_record', 'data_source', 'recorded_at',
+]
+
+
 def _load_feedback_sheet_rows(days_back: int = 90, spot_name: str | None = None,
                               has_record: str | None = None) -> tuple[list[dict], dict]:
     """Return feedback_log.csv as flat rows for n8n / Google Sheets ingestion."""
@@ -3325,7 +3470,7 @@ def _load_feedback_sheet_rows(days_back: int = 90, spot_name: str | None = None,
             'note': 'feedback_log.csv not found yet',
         }
 
-    fb_df = pd.read_csv(FEEDBACK_FILE)
+    fb_df = _datasets.frame(FEEDBACK, FEEDBACK_FILE)
     for col in FEEDBACK_COLUMNS:
         if col not in fb_df.columns:
             fb_df[col] = None
@@ -3357,14 +3502,7 @@ def _load_feedback_sheet_rows(days_back: int = 90, spot_name: str | None = None,
 
     if os.path.exists(CSV_FILE):
         try:
-            spots_df = pd.read_csv(CSV_FILE)[['name', 'town', 'district', 'buraku']]
-            spots_df.rename(columns={
-                'town': 'current_town',
-                'district': 'current_district',
-                'buraku': 'current_buraku',
-            }, inplace=True)
-            fb_df = fb_df.merge(spots_df, left_on='spot_name', right_on='name', how='left')
-            fb_df.drop(columns=['name'], inplace=True, errors='ignore')
+            fb_df = fb_df.join(_datasets.index(SPOTS, CSV_FILE, 'join'), on='spot_name')
             for col in ('town', 'district', 'buraku'):
                 current_col = f'current_{col}'
                 fb_df[col] = fb_df[col].combine_first(fb_df[current_col])
@@ -3378,15 +3516,7 @@ def _load_feedback_sheet_rows(days_back: int = 90, spot_name: str | None = None,
     fb_df['date'] = fb_df['date'].dt.strftime('%Y-%m-%d')
     fb_df.sort_values(['date', 'spot_name', 'days_ahead'], inplace=True)
 
-    sheet_columns = [
-        'upsert_key',
-        'date', 'spot_name', 'town', 'district', 'buraku', 'days_ahead',
-        'actual_precip_0416_mm', 'actual_precip_total_mm', 'actual_rain_0416',
-        'forecast_precip_mm', 'forecast_rain', 'precip_forecast_correct',
-        'forecast_score', 'forecast_suitability', 'forecast_label',
-        'actual_result', 'actual_label', 'judgment_correct',
-        'has_drying_record', 'data_source', 'recorded_at',
-    ]
+    sheet_columns = ACCURACY_SHEET_COLUMNS
     for col in sheet_columns:
         if col not in fb_df.columns:
             fb_df[col] = None
@@ -3427,26 +3557,37 @@ def get_accuracy_for_sheets():
         days_back = min(max(int(request.args.get('days', 90)), 1), 365)
         spot_name = request.args.get('spot') or None
         has_record = request.args.get('has_record')
-        rows, summary = _load_feedback_sheet_rows(days_back, spot_name, has_record)
-        return jsonify({
-            'status': 'ok',
-            'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'columns': [
-                'upsert_key',
-                'date', 'spot_name', 'town', 'district', 'buraku', 'days_ahead',
-                'actual_precip_0416_mm', 'actual_precip_total_mm', 'actual_rain_0416',
-                'forecast_precip_mm', 'forecast_rain', 'precip_forecast_correct',
-                'forecast_score', 'forecast_suitability', 'forecast_label',
-                'actual_result', 'actual_label', 'judgment_correct',
-                'has_drying_record', 'data_source', 'recorded_at',
-            ],
-            'summary': summary,
-            'rows': rows,
-        })
+        return jsonify(_sheets_payload(
+            'accuracy', (days_back, spot_name, has_record), ACCURACY_SHEET_COLUMNS,
+            lambda: _load_feedback_sheet_rows(days_back, spot_name, has_record),
+            version=_accuracy_source_version(),
+        ))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+def _accuracy_source_version():
+    """
+    feedback_log.csv と干場CSVの (path, mtime, size, inode) と今日の日付（days_back の
+    窓が動く）。feedback_log.csv が無い間は None（毎回 Redis 復元を試みる）。
+    """
+    feedback_sig = dataset_file_signature(FEEDBACK_FILE)
+    if feedback_sig is None:
+        return None
+    return (FEEDBACK_FILE, feedback_sig, CSV_FILE, dataset_file_signature(CSV_FILE),
+            datetime.now(tz=JST).date().isoformat())
+
+
+def _accuracy_sheet_log(days_back: int, spot_name: str | None, has_record: str | None):
+    """精度行のログ。ソースが変わっていなければ CSV から作り直さない"""
+    log, _ = _synced_sheet_log(
+        'accuracy', (days_back, spot_name, has_record),
+        lambda: _load_feedback_sheet_rows(days_back, spot_name, has_record),
+        version=_accuracy_source_version(),
+    )
+    return log
+
+
 def _pct(series):
     valid = series.dropna()
     if valid.empty:
@@ -3520,9 +3661,7 @@ def _accuracy_expected_spot_count() -> int:
     """Return the expected number of drying spots used for completeness checks."""
     try:
         if os.path.exists(CSV_FILE):
-            spots_df = pd.read_csv(CSV_FILE)
-            if 'name' in spots_df.columns:
-                return int(spots_df['name'].astype(str).str.startswith('H_').sum())
+            return sum(1 for name in _datasets.index(SPOTS, CSV_FILE, 'names') if name.startswith('H_'))
     except Exception as exc:
         app.logger.warning('[accuracy] expected spot count failed: %s', exc)
     return 331
@@ -3554,7 +3693,7 @@ def _as_int_or_none(value):
         return None
 
 
-def _build_reliability_by_days_ahead(df: pd.DataFrame) -> list[dict]:
+def _build_reliability_by_days_ahead(df: 'pd.DataFrame') -> list[dict]:
     """Summarize how trustworthy each N-day-ahead forecast is."""
     if df.empty:
         return []
@@ -3596,7 +3735,7 @@ def _build_reliability_by_days_ahead(df: pd.DataFrame) -> list[dict]:
     return sorted(table, key=lambda r: (r['days_ahead'] is None, r['days_ahead']))
 
 
-def _build_coverage_by_day_days_ahead(df: pd.DataFrame, expected_spots: int) -> list[dict]:
+def _build_coverage_by_day_days_ahead(df: 'pd.DataFrame', expected_spots: int) -> list[dict]:
     """Show whether each target date has the expected rows for each forecast horizon."""
     if df.empty:
         return []
@@ -3665,13 +3804,17 @@ def get_accuracy_reliability():
         recent_days = min(max(int(request.args.get('recent_days', 2)), 1), 14)
         spot_name = request.args.get('spot') or None
         has_record = request.args.get('has_record')
-        rows, source_summary = _load_feedback_sheet_rows(days_back, spot_name, has_record)
-        tables = _build_accuracy_summary_tables(rows)
+        # 集計表は精度行のログが変わったときだけ作り直す
+        log = _accuracy_sheet_log(days_back, spot_name, has_record)
+        tables = log.derived('summary_tables', _build_accuracy_summary_tables)
         return jsonify({
             'status': 'ok',
             'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'source_summary': source_summary,
-            'recent_health': _build_recent_accuracy_health(rows, recent_days),
+            'source_summary': log.summary,
+            'recent_health': log.derived(
+                f'recent_health:{recent_days}',
+                lambda rows: _build_recent_accuracy_health(rows, recent_days),
+            ),
             'reliability_by_days_ahead': tables['reliability_by_days_ahead'],
             'coverage_by_day_days_ahead': tables['coverage_by_day_days_ahead'],
             'methodology': (
@@ -3690,12 +3833,12 @@ def get_accuracy_sheet_summaries():
         days_back = min(max(int(request.args.get('days', 90)), 1), 365)
         spot_name = request.args.get('spot') or None
         has_record = request.args.get('has_record')
-        rows, source_summary = _load_feedback_sheet_rows(days_back, spot_name, has_record)
-        tables = _build_accuracy_summary_tables(rows)
+        log = _accuracy_sheet_log(days_back, spot_name, has_record)
+        tables = log.derived('summary_tables', _build_accuracy_summary_tables)
         return jsonify({
             'status': 'ok',
             'generated_at_jst': datetime.now(tz=JST).strftime('%Y-%m-%dT%H:%M:%S+09:00'),
-            'source_summary': source_summary,
+            'source_summary': log.summary,
             'tables': tables,
             'recommended_sheet_tabs': [
                 'raw_feedback',
@@ -3828,6 +3971,7 @@ def _record_forecast_feedback(name, date_str, result):
             fb_df = pd.concat([fb_df, pd.DataFrame(new_rows)], ignore_index=True)
 
         fb_df.to_csv(FEEDBACK_FILE, index=False, encoding='utf-8')
+        _datasets.invalidate(FEEDBACK_FILE)
         # 主: デプロイをまたいで永続化（_auto_compare_precip_forecast()の定期実行を待たず、
         # 記録提出のたびに即座に保護する。records/2026-08-08と同じ理由）。
         _feedback_log_redis_save(fb_df)
@@ -3849,7 +3993,7 @@ def _load_records():
     """
     _records_redis_restore()
     try:
-        df = pd.read_csv(RECORD_FILE)
+        df = _datasets.frame(RECORDS, RECORD_FILE)
     except FileNotFoundError:
         return pd.DataFrame(columns=RECORD_COLUMNS)
     for col in RECORD_COLUMNS:
@@ -3890,8 +4034,7 @@ def add_record():
 
         # hoshiba_spots.csv に存在しない干場名は拒否（孤児レコード生成防止）
         try:
-            spots_df = pd.read_csv(CSV_FILE)
-            if name not in spots_df['name'].values:
+            if name not in _datasets.index(SPOTS, CSV_FILE, 'names'):
                 return jsonify({
                     "status": "error",
                     "message": f"干場 '{name}' は存在しません。先に干場を登録してください。"
@@ -3942,6 +4085,7 @@ def add_record():
             message = f"記録が追加されました: {name} ({date}) - {result}"
 
         df.to_csv(RECORD_FILE, index=False, encoding="utf-8")
+        _datasets.invalidate(RECORD_FILE)
         # 主: デプロイをまたいで永続化（2026-08-04緊急修正、feedback_logと同方式）
         # 2026-08-06: 戻り値をレスポンスに含める（呼び出し元がRedis保存の成否を
         # 推測せず直接確認できるようにする — 過去に「ローカル読み取りが成功した
@@ -3969,11 +4113,13 @@ def add_record():
 def get_record(name, date):
     """指定した干場・日付の記録を取得（v2.6.0: 全カラム返却）"""
     try:
-        df = _load_records()
-        existing = df[(df["name"] == name) & (df["date"] == date)]
+        _records_redis_restore()
+        try:
+            row = _datasets.index(RECORDS, RECORD_FILE, 'by_key').get((name, date))
+        except FileNotFoundError:
+            row = None
 
-        if len(existing) > 0:
-            row = existing.iloc[0]
+        if row is not None:
             def _val(v):
                 import math
                 if v is None:
@@ -4031,6 +4177,7 @@ def delete_record(name, date):
         removed = df[mask].iloc[0].to_dict()
         df = df[~mask].reset_index(drop=True)
         df.to_csv(RECORD_FILE, index=False, encoding="utf-8")
+        _datasets.invalidate(RECORD_FILE)
         redis_persisted = _records_redis_save(df)
         if not redis_persisted:
             app.logger.error(
@@ -4211,7 +4358,6 @@ def fetch_marine_data(lat, lon, forecast_hours=168):
 # ---------------------------------------------------------------------------
 # Analysis field API — island-wide distribution maps (replaces matplotlib PNG)
 # ---------------------------------------------------------------------------
-import math as _math
 
 _analysis_field_cache: dict = {}
 _FIELD_CACHE_TTL = 3600  # 60 min: normal freshness window
@@ -4484,8 +4630,17 @@ def _field_cache_set(key: str, data, ttl: int = _FIELD_CACHE_TTL):
     }
 
 
+# 解析済みの干場カタログ。CSVの (mtime, size) が変わらない限り再パースしない。
+# ウォームスタートのスナップショットからも復元される（_restore_warm_start_snapshot）。
+_spot_catalog: dict = {'path': None, 'signature': None, 'spots': []}
+
+
 def _load_all_spots_for_field() -> list:
     """Load all 334 spots from CSV for field analysis."""
+    signature = file_signature(CSV_FILE)
+    if (signature is not None and _spot_catalog['path'] == CSV_FILE
+            and _spot_catalog['signature'] == signature):
+        return [dict(spot) for spot in _spot_catalog['spots']]
     spots = []
     try:
         import csv as _csv
@@ -4505,6 +4660,8 @@ def _load_all_spots_for_field() -> list:
                     continue
     except Exception as e:
         print(f'[field] _load_all_spots error: {e}')
+        return spots
+    _spot_catalog.update(path=CSV_FILE, signature=signature, spots=[dict(spot) for spot in spots])
     return spots
 
 
@@ -4887,7 +5044,16 @@ def _get_field_grid_elevations(field_type: str, day: int, lats: list, lons: list
     _fetch_elevations_batch() path with no behavior change.
     """
     if _field_prefetch_allowed(field_type, day):
-        return [_approximate_elevation_no_network(lat, lon) for lat, lon in zip(lats, lons)]
+        # 2026-10: ジオメトリ表（spot_geometry.npy）の標高を優先。表にない点だけ概算。
+        rows = [_spot_geometry_row(lat, lon) for lat, lon in zip(lats, lons)]
+        return [
+            row['elevation'] if row is not None else _approximate_elevation_no_network(lat, lon)
+            for row, lat, lon in zip(rows, lats, lons)
+        ]
+    # 全点が表のDEM標高を持っていればライブ取得は不要（49点グリッドは固定）
+    rows = [_spot_geometry_row(lat, lon) for lat, lon in zip(lats, lons)]
+    if rows and all(row is not None and row['elevation_source'] == 'dem' for row in rows):
+        return [row['elevation'] for row in rows]
     return _fetch_elevations_batch(lats, lons, source='field')
 
 
@@ -4918,46 +5084,55 @@ def _get_field_sst(field_type: str, day: int, lat: float, lon: float) -> list:
         raise
 
 
-def _extract_day_window(hourly: dict, target_date: str) -> dict:
-    """
-    Open-Meteo hourly dict から target_date の作業時間帯（04〜16時JST）だけ抽出。
-    Returns {variable: [values]} — time キーは除外。
-    """
-    times = hourly.get('time', [])
-    indices = [
-        i for i, t in enumerate(times)
-        if t.startswith(target_date) and 4 <= int(t[11:13]) <= 16
-    ]
-    result = {}
-    for var, values in hourly.items():
-        if var == 'time':
-            continue
-        result[var] = [values[i] for i in indices if i < len(values)]
-    return result
-
-
-def _safe_max(values) -> float | None:
-    """None を除いた最大値。値が空なら None。"""
-    valid = [v for v in (values or []) if v is not None]
-    return max(valid) if valid else None
-
+# 2026-10: 6つの _compute_*_field() が同じ上流ペイロードを各自で取得し、各地点の
+# hourly['time'] を変数ごとに startswith / int(t[11:13]) で再走査していた。
+# ペイロードを1回だけ FieldGridDataset（地点×時刻×変数のNumPyキューブ）に解析し、
+# 全フィールドタイプで共有する。旧 _extract_day_window() / _safe_max() 等は
+# キューブ上のスライスとベクトル化集約（field_grid_dataset.nanmax 等）に置き換え。
+#
+# 変数リストは open_meteo_prefetch.FIELD_GRID_HOURLY_VARS（scoreの上位集合）と同一。
+# 6タイプすべてが同じ1リクエストを使うため、ライブ取得でもprefetchでも
+# 解析結果をそのまま使い回せる。
+_FIELD_GRID_VARS = [v.strip() for v in FIELD_GRID_HOURLY_VARS.split(',') if v.strip()]
 
-def _safe_min(values) -> float | None:
-    """None を除いた最小値。値が空なら None。"""
-    valid = [v for v in (values or []) if v is not None]
-    return min(valid) if valid else None
+# key: prefetch経路を使ったか(bool) → {'dataset', 'expires'}
+# prefetch由来のデータセットは _field_prefetch_allowed() が許可した (type, day) だけが
+# 使う（ゲーティングの意味を変えないため）。ライブ由来はどの (type, day) でも共有可。
+_field_dataset_cache: dict = {}
+_field_dataset_lock = threading.Lock()
 
 
-def _safe_avg(values) -> float | None:
-    """None を除いた平均値。値が空なら None。"""
-    valid = [v for v in (values or []) if v is not None]
-    return sum(valid) / len(valid) if valid else None
+def _get_field_grid_dataset(field_type: str, day: int) -> FieldGridDataset:
+    """
+    Parsed 49-point grid dataset shared by all 6 _compute_*_field() functions.
 
+    Fetches through _fetch_field_grid_data() (prefetch-first, live fallback)
+    with the superset variable list, parses it once, and keeps it in-process
+    for _FIELD_CACHE_TTL so switching type/hour on the map reuses the same
+    cube instead of re-fetching and re-parsing. An empty payload (live fetch
+    failure → all points {'hourly': {}}) is returned but never cached.
+    OpenMeteoRateLimitError/OpenMeteoCircuitOpenError propagate unchanged.
+    """
+    use_prefetch = _field_prefetch_allowed(field_type, day)
+    now = datetime.now(JST)
+    with _field_dataset_lock:
+        entry = _field_dataset_cache.get(use_prefetch)
+        if entry and now < entry['expires']:
+            return entry['dataset']
 
-def _safe_sum(values) -> float | None:
-    """None を除いた合計。値が空なら None。"""
-    valid = [v for v in (values or []) if v is not None]
-    return sum(valid) if valid else None
+    grid = _build_rishiri_grid()
+    lats = [g['lat'] for g in grid]
+    lons = [g['lon'] for g in grid]
+    payload = _fetch_field_grid_data(field_type, day, lats, lons, _FIELD_GRID_VARS)
+    dataset = FieldGridDataset(grid, payload, _FIELD_GRID_VARS)
+
+    if dataset.has_data():
+        with _field_dataset_lock:
+            _field_dataset_cache[use_prefetch] = {
+                'dataset': dataset,
+                'expires': now + timedelta(seconds=_FIELD_CACHE_TTL),
+            }
+    return dataset
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -5446,14 +5621,6 @@ def _compute_score_field(day: int) -> dict:
     lats = [g['lat'] for g in grid]
     lons = [g['lon'] for g in grid]
 
-    hourly_vars = [
-        'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m',
-        'precipitation', 'precipitation_probability', 'shortwave_radiation',
-        'dewpoint_2m',          # 露点温度: 霧リスク判定に使用 (/api/forecast と同一ロジック)
-        'cape',                 # CAPE 対流不安定リスク（assess_cape_risk() に供給）
-        'wind_direction_10m',   # フェーン判定（06時角度ゲート + 山頂R_1800_2392との温位差）
-    ]
-
     # 標高を一括取得（1HTTPリクエスト ≈ 2s）
     # 個別取得(48×get_elevation() ≈ 72s)を回避する核心の高速化
     # 2026-08-04: prefetch対象(type, day)の場合はネットワーク不要の概算標高を使う
@@ -5465,12 +5632,15 @@ def _compute_score_field(day: int) -> dict:
     except (OpenMeteoRateLimitError, OpenMeteoCircuitOpenError) as e:
         return {'error': f'Open-Meteo rate limited: {e}'}
 
+    # 露点(霧リスク)・CAPE・風向(フェーン判定)を含む上位集合の変数を
+    # 共有データセットから参照する（_FIELD_GRID_VARS 参照）。
     try:
-        api_results = _fetch_field_grid_data('score', day, lats, lons, hourly_vars)
+        ds = _get_field_grid_dataset('score', day)
     except (OpenMeteoRateLimitError, OpenMeteoCircuitOpenError) as e:
         return {'error': f'Open-Meteo rate limited: {e}'}
     except Exception as e:
         return {'error': f'Open-Meteo fetch failed: {e}'}
+    grid = ds.points
 
     # ─── 島共通 SST（Marine API は 1 回だけ取得）──────────────────────────────
     # 利尻島は直径約20km。SST の島内空間変動は小さいため、
@@ -5482,69 +5652,70 @@ def _compute_score_field(day: int) -> dict:
         return {'error': f'Open-Meteo rate limited: {e}'}
     _sst_today_field = _sst_field[day] if day < len(_sst_field) else None
 
+    # ─── 作業時間帯（04〜16時）の集約を全地点まとめてベクトル計算 ────────────
+    temp_win   = ds.window('temperature_2m', target_date)        # (点, 時)
+    dewpt_win  = ds.window('dewpoint_2m', target_date)
+    wind_win   = ds.window('wind_speed_10m', target_date) / 3.6  # km/h → m/s
+    wdir_win   = ds.window('wind_direction_10m', target_date)
+    temp_max_a     = nanmax(temp_win)
+    humidity_min_a = nanmin(ds.window('relative_humidity_2m', target_date))
+    wind_avg_a     = nanmean(wind_win)
+    wind_max_a     = nanmax(wind_win)   # 日内最大風速（wind_warning 判定に使用）
+    precip_sum_a   = nansum(ds.window('precipitation', target_date))
+    pop_max_a      = nanmax(ds.window('precipitation_probability', target_date))
+    solar_avg_a    = nanmean(ds.window('shortwave_radiation', target_date))
+    cape_max_a     = nanmax(ds.window('cape', target_date))
+    wdir_hours_a   = ds.window_length('wind_direction_10m', target_date)
+
+    # 06:00 = 04:00始まり窓の3番目（列2）。窓が3時間未満なら 06時値なし。
+    _nan = np.full(ds.n_points, np.nan)
+    has_0600 = temp_win.shape[1] > 2
+    temp_0600_a = temp_win[:, 2] if has_0600 else _nan
+    wind_0600_a = wind_win[:, 2] if has_0600 else _nan
+    wdir_0600_a = wdir_win[:, 2] if has_0600 else _nan
+
+    # 06時の風下角度差: 風が吹いていく方向と山頂方位角の差（0〜180°）
+    maz_a = _geometry_arrays([g['lat'] for g in grid], [g['lon'] for g in grid])['mountain_azimuth']
+    angle_0600_a = np.abs((wdir_0600_a + 180) % 360 - maz_a)
+    angle_0600_a = np.where(angle_0600_a > 180, 360 - angle_0600_a, angle_0600_a)
+
     # 山頂(R_1800_2392)の06時気温をMeteoSwiss式フェーン強度の参照点として抽出。
     # grid には山頂自身が既に含まれており（同じ _fetch_open_meteo_multi 呼び出しで
     # 取得済み）、新規APIコールは不要。
     _summit_idx = next((idx for idx, gp in enumerate(grid) if gp.get('label') == '利尻山頂'), None)
     _summit_temp_0600 = None
     if _summit_idx is not None:
-        _summit_win = _extract_day_window(api_results[_summit_idx].get('hourly', {}), target_date)
-        _summit_temps = _summit_win.get('temperature_2m', [])
-        if len(_summit_temps) > 2:
-            _summit_temp_0600 = _summit_temps[2]  # 04:00始まり窓の3番目=06:00
+        _summit_temp_0600 = to_optional(temp_0600_a[_summit_idx])
 
     points = []
     counts = {'excellent': 0, 'fair': 0, 'poor': 0}
     best = None
 
-    for i, (g, api_data) in enumerate(zip(grid, api_results)):
-        win = _extract_day_window(api_data.get('hourly', {}), target_date)
-        wind_kmh     = win.get('wind_speed_10m', [])
-        wind_ms_vals = [v / 3.6 for v in wind_kmh if v is not None]
-
-        temp_vals    = win.get('temperature_2m', [])
-        dewpt_vals   = win.get('dewpoint_2m', [])
-        temp_max     = _safe_max(temp_vals)
-        temp_avg     = _safe_avg(temp_vals)
-        humidity_min = _safe_min(win.get('relative_humidity_2m', []))
-        wind_avg_ms  = _safe_avg(wind_ms_vals)
-        wind_max_ms  = _safe_max(wind_ms_vals)   # 日内最大風速（wind_warning 判定に使用）
-        precip_sum   = _safe_sum(win.get('precipitation', []))
-        pop_max      = _safe_max(win.get('precipitation_probability', []))
-        solar_avg    = _safe_avg(win.get('shortwave_radiation', []))
+    for i, g in enumerate(grid):
+        temp_max     = to_optional(temp_max_a[i])
+        humidity_min = to_optional(humidity_min_a[i])
+        wind_avg_ms  = to_optional(wind_avg_a[i])
+        wind_max_ms  = to_optional(wind_max_a[i])
+        precip_sum   = to_optional(precip_sum_a[i])
+        pop_max      = to_optional(pop_max_a[i])
+        solar_avg    = to_optional(solar_avg_a[i])
         elev         = grid_elevations[i] if i < len(grid_elevations) else 0.0
+        wdir_hours   = int(wdir_hours_a[i])
 
         # フェーン（MeteoSwiss式、山頂R_1800_2392との06時温位差ベース）
         # スコア計算（solar boost）と local_risk_adjustments の両方で使うため先に算出。
-        _maz_f = mountain_azimuth(g['lat'], g['lon'])
-        _wind_dirs_f = win.get('wind_direction_10m', [])
-        _wind_kmh_f  = win.get('wind_speed_10m', [])
-        _angle_diff_0600 = None
-        _wind_ms_0600 = None
-        _spot_temp_0600 = None
-        if len(_wind_dirs_f) > 2 and _wind_dirs_f[2] is not None:
-            _wind_toward_0600 = (_wind_dirs_f[2] + 180) % 360
-            _angle_diff_0600 = abs(_wind_toward_0600 - _maz_f)
-            if _angle_diff_0600 > 180:
-                _angle_diff_0600 = 360 - _angle_diff_0600
-        if len(_wind_kmh_f) > 2 and _wind_kmh_f[2] is not None:
-            _wind_ms_0600 = _wind_kmh_f[2] / 3.6
-        if len(temp_vals) > 2:
-            _spot_temp_0600 = temp_vals[2]
         _foehn_h = _compute_foehn_intensity_hours(
-            angle_diff_0600=_angle_diff_0600,
-            wind_speed_ms_0600=_wind_ms_0600,
-            spot_temp_0600=_spot_temp_0600,
+            angle_diff_0600=to_optional(angle_0600_a[i]),
+            wind_speed_ms_0600=to_optional(wind_0600_a[i]),
+            spot_temp_0600=to_optional(temp_0600_a[i]),
             spot_elevation=elev,
             summit_temp_0600=_summit_temp_0600,
-            total_hours=len(_wind_dirs_f),
+            total_hours=wdir_hours,
         )
 
         # 風下側「山陰晴れ」補正（/api/forecast と同一のスコア統一ルール経由）
         # 表示用の solar_avg はそのまま。スコア入力だけ控えめに底上げする。
-        solar_avg_for_score = _apply_leeward_solar_boost(
-            solar_avg, _foehn_h, len(win.get('wind_direction_10m', []))
-        )
+        solar_avg_for_score = _apply_leeward_solar_boost(solar_avg, _foehn_h, wdir_hours)
 
         score = calculate_enhanced_drying_score(
             temp_max=temp_max,
@@ -5563,11 +5734,11 @@ def _compute_score_field(day: int) -> dict:
         # 4補正を適用する。入力値の算出のみがここの責務。
 
         # CAPE
-        _cape_risk_f = assess_cape_risk(_safe_max(win.get('cape', [])))
+        _cape_risk_f = assess_cape_risk(to_optional(cape_max_a[i]))
 
         # 霧（露点降下法 / 湿度推定フォールバック）
         _fog_sum_f, _fog_note_f, _dewpt_method = _compute_fog_from_dewpoint(
-            temp_vals, dewpt_vals, humidity_min
+            to_optional_list(temp_win[i]), to_optional_list(dewpt_win[i]), humidity_min
         )
 
         # SST（島共通）
@@ -5644,36 +5815,23 @@ def _compute_wind_field(day: int, hour: int) -> dict:
     target_date = _field_target_date(day)
     target_time = f'{target_date}T{hour:02d}:00'
 
-    grid = _build_rishiri_grid()
-    lats = [g['lat'] for g in grid]
-    lons = [g['lon'] for g in grid]
-
     try:
-        api_results = _fetch_field_grid_data(
-            'wind', day, lats, lons, ['wind_speed_10m', 'wind_direction_10m']
-        )
+        ds = _get_field_grid_dataset('wind', day)
     except Exception as e:
         return {'error': f'Open-Meteo fetch failed: {e}'}
 
+    speed_a = ds.at('wind_speed_10m', target_time) / 3.6   # km/h → m/s
+    dir_a   = ds.at('wind_direction_10m', target_time)
+    rad_a   = np.radians(dir_a)
+    u_a     = np.round(-speed_a * np.sin(rad_a), 3)   # 風向のどちらかが欠損なら NaN
+    v_a     = np.round(-speed_a * np.cos(rad_a), 3)
+
     vectors = []
-    for g, api_data in zip(grid, api_results):
-        hourly = api_data.get('hourly', {})
-        times  = hourly.get('time', [])
-        try:
-            idx = times.index(target_time)
-        except ValueError:
-            idx = None
-
-        speed_kmh = hourly.get('wind_speed_10m', [None])[idx] if idx is not None else None
-        direction = hourly.get('wind_direction_10m', [None])[idx] if idx is not None else None
-        speed_ms  = speed_kmh / 3.6 if speed_kmh is not None else None
-
-        if speed_ms is not None and direction is not None:
-            rad = _math.radians(direction)
-            u = round(-speed_ms * _math.sin(rad), 3)
-            v = round(-speed_ms * _math.cos(rad), 3)
-        else:
-            u = v = None
+    for i, g in enumerate(ds.points):
+        speed_ms  = to_optional(speed_a[i])
+        direction = to_optional(dir_a[i])
+        u = to_optional(u_a[i])
+        v = to_optional(v_a[i])
 
         vectors.append({
             'lat':       round(g['lat'], 4),
@@ -5707,37 +5865,29 @@ def _compute_humidity_field(day: int, hour: int) -> dict:
     target_date = _field_target_date(day)
     target_time = f'{target_date}T{hour:02d}:00'
 
-    grid = _build_rishiri_grid()
-    lats = [g['lat'] for g in grid]
-    lons = [g['lon'] for g in grid]
-
     try:
-        api_results = _fetch_field_grid_data(
-            'humidity', day, lats, lons, ['relative_humidity_2m', 'wind_direction_10m']
-        )
+        ds = _get_field_grid_dataset('humidity', day)
     except Exception as e:
         return {'error': f'Open-Meteo fetch failed: {e}'}
 
-    points = []
-    for i, (g, api_data) in enumerate(zip(grid, api_results)):
-        hourly = api_data.get('hourly', {})
-        times  = hourly.get('time', [])
-        try:
-            idx = times.index(target_time)
-        except ValueError:
-            idx = None
+    raw_a      = ds.at('relative_humidity_2m', target_time)
+    wind_dir_a = ds.at('wind_direction_10m', target_time)
+    geo        = _geometry_arrays([g['lat'] for g in ds.points], [g['lon'] for g in ds.points])
+    onshore_a  = _geometry_onshore_factor(geo['sea_direction'], wind_dir_a)
 
-        raw      = hourly.get('relative_humidity_2m', [None])[idx] if idx is not None else None
-        wind_dir = hourly.get('wind_direction_10m',   [None])[idx] if idx is not None else None
+    points = []
+    for i, g in enumerate(ds.points):
+        raw      = to_optional(raw_a[i])
+        wind_dir = to_optional(wind_dir_a[i])
 
         hum = raw
         correction_parts = []
         if hum is not None:
-            if is_forest_area(g['lat'], g['lon']):
+            if geo['is_forest'][i]:
                 hum = min(100.0, hum + 10.0)
                 correction_parts.append('森林+10%')
-            if is_coastal_area(g['lat'], g['lon']) and wind_dir is not None:
-                onshore_factor = get_onshore_wind_factor(g['lat'], g['lon'], wind_dir)
+            if geo['is_coastal'][i] and wind_dir is not None:
+                onshore_factor = float(onshore_a[i])
                 coastal_adj = 5.0 * onshore_factor
                 if coastal_adj > 0.1:
                     hum = min(100.0, hum + coastal_adj)
@@ -5778,25 +5928,16 @@ def _compute_solar_field(day: int, hour: int) -> dict:
     target_date = _field_target_date(day)
     target_time = f'{target_date}T{hour:02d}:00'
 
-    grid = _build_rishiri_grid()
-    lats = [g['lat'] for g in grid]
-    lons = [g['lon'] for g in grid]
-
     try:
-        api_results = _fetch_field_grid_data('solar', day, lats, lons, ['shortwave_radiation'])
+        ds = _get_field_grid_dataset('solar', day)
     except Exception as e:
         return {'error': f'Open-Meteo fetch failed: {e}'}
 
-    points = []
-    for i, (g, api_data) in enumerate(zip(grid, api_results)):
-        hourly = api_data.get('hourly', {})
-        times  = hourly.get('time', [])
-        try:
-            idx = times.index(target_time)
-        except ValueError:
-            idx = None
+    raw_a = ds.at('shortwave_radiation', target_time)
 
-        raw = hourly.get('shortwave_radiation', [None])[idx] if idx is not None else None
+    points = []
+    for i, g in enumerate(ds.points):
+        raw = to_optional(raw_a[i])
         solar = round(raw) if raw is not None else None
 
         display_name = f'格子点{i + 1} ({g["lat"]:.2f}N,{g["lon"]:.2f}E)'
@@ -5830,25 +5971,16 @@ def _compute_temperature_field(day: int, hour: int) -> dict:
     target_date = _field_target_date(day)
     target_time = f'{target_date}T{hour:02d}:00'
 
-    grid = _build_rishiri_grid()
-    lats = [g['lat'] for g in grid]
-    lons = [g['lon'] for g in grid]
-
     try:
-        api_results = _fetch_field_grid_data('temperature', day, lats, lons, ['temperature_2m'])
+        ds = _get_field_grid_dataset('temperature', day)
     except Exception as e:
         return {'error': f'Open-Meteo fetch failed: {e}'}
 
-    points = []
-    for i, (g, api_data) in enumerate(zip(grid, api_results)):
-        hourly = api_data.get('hourly', {})
-        times  = hourly.get('time', [])
-        try:
-            idx = times.index(target_time)
-        except ValueError:
-            idx = None
+    raw_a = ds.at('temperature_2m', target_time)
 
-        raw  = hourly.get('temperature_2m', [None])[idx] if idx is not None else None
+    points = []
+    for i, g in enumerate(ds.points):
+        raw  = to_optional(raw_a[i])
         temp = round(raw, 1) if raw is not None else None
 
         display_name = f'格子点{i + 1} ({g["lat"]:.2f}N,{g["lon"]:.2f}E)'
@@ -5887,29 +6019,20 @@ def _compute_precipitation_field(day: int, hour: int) -> dict:
     target_date = _field_target_date(day)
     target_time = f'{target_date}T{hour:02d}:00'
 
-    grid = _build_rishiri_grid()
-    lats = [g['lat'] for g in grid]
-    lons = [g['lon'] for g in grid]
-
     try:
-        api_results = _fetch_field_grid_data('precipitation', day, lats, lons, ['precipitation'])
+        ds = _get_field_grid_dataset('precipitation', day)
     except Exception as e:
         return {'error': f'Open-Meteo fetch failed: {e}'}
 
+    raw_a = ds.at('precipitation', target_time)
+
     points     = []
     all_zero   = True
     max_precip = 0.0
     max_spot   = None
 
-    for i, (g, api_data) in enumerate(zip(grid, api_results)):
-        hourly = api_data.get('hourly', {})
-        times  = hourly.get('time', [])
-        try:
-            idx = times.index(target_time)
-        except ValueError:
-            idx = None
-
-        raw    = hourly.get('precipitation', [None])[idx] if idx is not None else None
+    for i, g in enumerate(ds.points):
+        raw    = to_optional(raw_a[i])
         precip = round(raw, 1) if raw is not None else None
 
         if precip is not None and precip > 0:
@@ -6691,6 +6814,30 @@ def get_contour_analysis():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def _emagram_stability_timeline(hourly, pressure_levels):
+    """取得済みの毎時プロファイル (時刻, 気圧面) から安定度指標を一括計算（湿潤パーセル）"""
+    from stability_batch import stability_indices
+
+    def column(key):
+        values = hourly.get(key) or []
+        return [np.nan if v is None else v for v in values]
+
+    times = hourly.get('time', [])
+    arrays = {}
+    for var in ('temperature', 'dewpoint', 'geopotential_height'):
+        arrays[var] = np.array([column(f'{var}_{p}hPa') or [np.nan] * len(times) for p in pressure_levels],
+                               dtype=np.float64).T
+    indices = stability_indices(np.array(pressure_levels, dtype=np.float64), arrays['temperature'],
+                                arrays['dewpoint'], arrays['geopotential_height'], parcel='moist')
+    indices.pop('vertical_p_velocity')  # 風速は取得していない
+    return {
+        'time': times,
+        'parcel': 'moist',
+        **{name: [None if not np.isfinite(v) else round(float(v), 2) for v in values]
+           for name, values in indices.items()},
+    }
+
+
 @app.route('/api/emagram')
 def get_emagram_data():
     """
@@ -6702,6 +6849,7 @@ def get_emagram_data():
         time: 予報時刻オフセット（時間単位、デフォルト0=現在）
         apply_theta_e_correction: θₑ補正を適用（'true'/'false'、デフォルト'false'）
         wind_direction: 風向（度、北を0度）※補正時必須
+        stability: 'true' で7日分の毎時安定度指標（stability_timeline）も返す
 
     Returns:
         pressure_levels: 気圧面リスト（hPa）
@@ -6710,6 +6858,7 @@ def get_emagram_data():
         height: 各気圧面の高度（m）
         correction_applied: 補正が適用されたか
         correction_info: 補正情報（適用時のみ）
+        stability_timeline: 毎時の SSI/CAPE/CIN/LI/K/TT/θe850/PW（stability=true 時のみ）
     """
     try:
         lat = float(request.args.get('lat', 45.242))
@@ -6897,6 +7046,9 @@ def get_emagram_data():
         if correction_info:
             result['correction_info'] = correction_info
 
+        if request.args.get('stability', 'false').lower() == 'true':
+            result['stability_timeline'] = _emagram_stability_timeline(hourly, pressure_levels)
+
         return jsonify(result)
 
     except Exception as e:
@@ -7392,63 +7544,38 @@ def _record_nowcast_snapshot() -> None:
 
 
 def _scheduled_nowcast_observation_snapshots():
-    """Background thread: record nowcast mesh observations from 04:00 to 16:00 JST.
+    """Scheduler job: record nowcast mesh observations every 10 min, 04:00-16:50 JST.
 
     JMA nowcast is realtime data, so we must save snapshots during the drying
     window. The stored Redis rows are later exposed to n8n/Google Sheets.
     """
-    import time as _time
-    from datetime import timedelta as _td
-
-    while True:
-        now = datetime.now(tz=JST)
-        if 4 <= now.hour <= 16:
-            next_run = now.replace(second=0, microsecond=0)
-            minute_mod = next_run.minute % 10
-            if minute_mod or now.second or now.microsecond:
-                next_run += _td(minutes=(10 - minute_mod) if minute_mod else 10)
-            if next_run.hour <= 16:
-                _time.sleep(max((next_run - now).total_seconds(), 1))
-                _record_nowcast_snapshot()
-                continue
+    _record_nowcast_snapshot()
 
-        next_window = now.replace(hour=4, minute=0, second=0, microsecond=0)
-        if now >= next_window:
-            next_window += _td(days=1)
-        _time.sleep((next_window - now).total_seconds())
 
+def _daily_amedas_collection(attempt: int = 1) -> bool:
+    """Scheduler job: collect yesterday's amedas data once a day at 03:00 JST.
 
-def _daily_amedas_collection():
-    """Background thread: collect yesterday's amedas data once a day at 03:00 JST.
-
-    03:00 JST に取得を試み、失敗した場合は 30 分後（03:30 JST）に1回だけリトライする。
+    03:00 JST に取得を試み、失敗した場合は 30 分後（03:30 JST）に1回だけリトライする
+    （False を返すとスケジューラが retry_delay 後に attempt=2 で再実行）。
     Open-Meteo Archive API が一時障害を起こした日も feedback_log が欠落しないようにするため。
     """
-    import time
     from datetime import timedelta
-    while True:
-        now = datetime.now(tz=JST)
-        next_run = now.replace(hour=3, minute=0, second=0, microsecond=0)
-        if now >= next_run:
-            next_run = next_run + timedelta(days=1)
-        time.sleep((next_run - now).total_seconds())
-
-        yesterday = (datetime.now(tz=JST) - timedelta(days=1)).strftime('%Y%m%d')
-        ok = _collect_amedas_from_openmeteo(yesterday)
+    yesterday = (datetime.now(tz=JST) - timedelta(days=1)).strftime('%Y%m%d')
+    ok = _collect_amedas_from_openmeteo(yesterday)
 
-        if not ok:
-            # 30 分後に 1 回だけリトライ（Open-Meteo Archive 一時障害対策）
-            app.logger.warning('[amedas] 03:00 attempt failed for %s — retrying in 30 min', yesterday)
-            time.sleep(30 * 60)
-            ok = _collect_amedas_from_openmeteo(yesterday)
-            if ok:
-                app.logger.info('[amedas] retry succeeded for %s', yesterday)
-            else:
-                app.logger.error('[amedas] retry also failed for %s — feedback_log will be incomplete', yesterday)
+    if not ok and attempt == 1:
+        # 30 分後に 1 回だけリトライ（Open-Meteo Archive 一時障害対策）
+        app.logger.warning('[amedas] 03:00 attempt failed for %s — retrying in 30 min', yesterday)
+        return False
+    if ok and attempt > 1:
+        app.logger.info('[amedas] retry succeeded for %s', yesterday)
+    elif not ok:
+        app.logger.error('[amedas] retry also failed for %s — feedback_log will be incomplete', yesterday)
 
-        if ok:
-            _auto_compare_precip_forecast(yesterday)
-        _record_nowcast_snapshot()  # 03:00/03:30 JST ナウキャストスナップショット
+    if ok:
+        _auto_compare_precip_forecast(yesterday)
+    _record_nowcast_snapshot()  # 03:00/03:30 JST ナウキャストスナップショット
+    return ok
 
 
 def _auto_compare_precip_forecast(date_str: str) -> int:
@@ -7718,6 +7845,7 @@ def _auto_compare_precip_forecast(date_str: str) -> int:
         updated += len(new_rows)
 
     fb_df.to_csv(FEEDBACK_FILE, index=False, encoding='utf-8')
+    _datasets.invalidate(FEEDBACK_FILE)
     _feedback_log_redis_save(fb_df)  # Render デプロイ後も消えないよう Redis に永続化
     app.logger.info(
         '[auto_compare] %s: %d spot(s) via nowcast, %d AMEDAS station(s) available | %d rows written',
@@ -8022,6 +8150,11 @@ def generate_terrain_description(is_forest, is_coastal, elevation):
 
     return "、".join(desc_parts)
 
+# 1リクエストあたりの上限。matrix は N×N 要素 × 7種類を返すのでカタログ全件(334)が入る程度に抑える
+_SPOT_DIFF_MAX_SPOTS = 1000
+_SPOT_DIFF_MAX_MATRIX_SPOTS = 400
+
+
 @app.route('/api/analysis/spot-differences')
 def get_spot_weather_differences():
     """
@@ -8032,11 +8165,16 @@ def get_spot_weather_differences():
     - Elevation differences
     - Terrain type differences
     - Local geography effects
+
+    spots=H_..,H_..（数百地点可）または spots=all（干場カタログ全件）。
+    mode=matrix で spot × spot の差異行列（行=基準干場、列=比較干場）を返す。
+    計算は spot_differences.py の配列演算、標高は _grid_elevations() で一括解決。
     """
     try:
         # Get reference spot (default: Kutsugata Amedas location)
         ref_lat = float(request.args.get('ref_lat', 45.178333))
         ref_lon = float(request.args.get('ref_lon', 141.138333))
+        mode = request.args.get('mode', 'list')
 
         # Get comparison spots
         spots_param = request.args.get('spots', '')
@@ -8045,73 +8183,56 @@ def get_spot_weather_differences():
                 "status": "error",
                 "message": "比較する干場を指定してください（spots パラメータ）"
             }), 400
+        if mode not in ('list', 'matrix'):
+            return jsonify({"status": "error", "message": "mode は list または matrix"}), 400
+
+        if spots_param.strip().lower() == 'all':
+            catalog = _load_all_spots_for_field()
+            spot_names = [spot['name'] for spot in catalog]
+            lats = np.array([spot['lat'] for spot in catalog], dtype=np.float64)
+            lons = np.array([spot['lon'] for spot in catalog], dtype=np.float64)
+        else:
+            spot_names, lats, lons = _spot_diff.parse_spot_names(spots_param.split(','))
+        limit = _SPOT_DIFF_MAX_MATRIX_SPOTS if mode == 'matrix' else _SPOT_DIFF_MAX_SPOTS
+        if len(spot_names) > limit:
+            return jsonify({
+                "status": "error",
+                "message": f"一度に比較できる干場は{limit}地点までです"
+            }), 400
 
-        spot_names = spots_param.split(',')
-        differences = []
-
-        for spot_name in spot_names:
-            spot_name = spot_name.strip()
-            if not spot_name:
-                continue
+        elevations = _grid_elevations(lats, lons) if len(spot_names) else np.zeros(0)
 
-            # Extract coordinates
-            parts = spot_name.split('_')
-            if len(parts) != 3 or parts[0] != 'H':
-                continue
+        if mode == 'matrix':
+            return jsonify({
+                'status': 'success',
+                'mode': 'matrix',
+                'spots': spot_names,
+                **_spot_difference_matrix(lats, lons, elevations),
+                'methodology': '地形・距離・標高差に基づく局地気象差異推定（仕様書 lines 425-433）',
+                'note': 'matrix[i][j] = 干場iを基準にした干場jの差異',
+            })
 
-            lat = 45.0 + float(parts[1]) / 10000.0
-            lon = 141.0 + float(parts[2]) / 10000.0
-
-            # Calculate distance
-            distance = ((lat - ref_lat) ** 2 + (lon - ref_lon) ** 2) ** 0.5 * 111  # km
-
-            # Calculate direction
-            import math
-            dx = lon - ref_lon
-            dy = lat - ref_lat
-            direction = (math.degrees(math.atan2(dx, dy)) + 360) % 360
-
-            # Terrain differences
-            ref_elevation = get_elevation(ref_lat, ref_lon)
-            spot_elevation = get_elevation(lat, lon)
-            elevation_diff = spot_elevation - ref_elevation
-
-            ref_is_forest = is_forest_area(ref_lat, ref_lon)
-            spot_is_forest = is_forest_area(lat, lon)
-
-            # Estimate weather differences based on distance and terrain
-            # Temperature: decreases with elevation and distance from coast
-            temp_diff = -(elevation_diff / 100) * 0.6
-
-            # Humidity: increases with forest cover and decreases with elevation
-            humidity_diff = 0.0
-            if spot_is_forest and not ref_is_forest:
-                humidity_diff += 10.0
-            elif ref_is_forest and not spot_is_forest:
-                humidity_diff -= 10.0
-            humidity_diff -= (elevation_diff / 100) * 1.0
-
-            # Wind speed: decreases with forest cover, increases with elevation
-            wind_diff = 0.0
-            if spot_is_forest and not ref_is_forest:
-                wind_diff -= 2.5
-            elif ref_is_forest and not spot_is_forest:
-                wind_diff += 2.5
-            wind_diff += (elevation_diff / 100) * 0.5
+        ref_elevation = get_elevation(ref_lat, ref_lon)
+        diff = _spot_diff.difference_arrays(ref_lat, ref_lon, ref_elevation, lats, lons, elevations)
+        confidence = _spot_diff.confidence_percent(diff['distance_km'], diff['elevation_difference_m'])
+        names = _spot_diff.direction_names(diff['direction_deg'])
 
+        differences = []
+        for i, spot_name in enumerate(spot_names):
+            percent = round(float(confidence[i]), 1)
             differences.append({
                 'spot_name': spot_name,
-                'coordinates': {'lat': lat, 'lon': lon},
-                'distance_km': round(distance, 2),
-                'direction_deg': round(direction, 1),
-                'direction_name': get_direction_name(direction),
-                'elevation_difference_m': round(elevation_diff, 1),
+                'coordinates': {'lat': float(lats[i]), 'lon': float(lons[i])},
+                'distance_km': round(float(diff['distance_km'][i]), 2),
+                'direction_deg': round(float(diff['direction_deg'][i]), 1),
+                'direction_name': str(names[i]),
+                'elevation_difference_m': round(float(diff['elevation_difference_m'][i]), 1),
                 'predicted_differences': {
-                    'temperature_c': round(temp_diff, 1),
-                    'humidity_percent': round(humidity_diff, 1),
-                    'wind_speed_ms': round(wind_diff, 1)
+                    'temperature_c': round(float(diff['temperature_c'][i]), 1),
+                    'humidity_percent': round(float(diff['humidity_percent'][i]), 1),
+                    'wind_speed_ms': round(float(diff['wind_speed_ms'][i]), 1)
                 },
-                'confidence': calculate_difference_confidence(distance, elevation_diff)
+                'confidence': {'level': _spot_diff.confidence_level(float(confidence[i])), 'percent': percent}
             })
 
         return jsonify({
@@ -8125,40 +8246,24 @@ def get_spot_weather_differences():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
-def get_direction_name(degrees):
-    """Convert degrees to cardinal direction name"""
-    directions = ['北', '北北東', '北東', '東北東', '東', '東南東', '南東', '南南東',
-                  '南', '南南西', '南西', '西南西', '西', '西北西', '北西', '北北西']
-    index = int((degrees + 11.25) / 22.5) % 16
-    return directions[index]
 
-def calculate_difference_confidence(distance_km, elevation_diff):
-    """
-    Calculate confidence level for predicted weather differences
-
-    Confidence decreases with:
-    - Greater distance (less correlation)
-    - Larger elevation differences (more uncertainty)
-    """
-    confidence = 100.0
-
-    # Distance penalty: -10% per km
-    confidence -= distance_km * 10
-
-    # Elevation penalty: -5% per 100m
-    confidence -= abs(elevation_diff) / 100 * 5
-
-    # Clamp to 0-100
-    confidence = max(0, min(100, confidence))
-
-    if confidence >= 80:
-        return {'level': 'high', 'percent': round(confidence, 1)}
-    elif confidence >= 60:
-        return {'level': 'medium', 'percent': round(confidence, 1)}
-    elif confidence >= 40:
-        return {'level': 'low', 'percent': round(confidence, 1)}
-    else:
-        return {'level': 'very_low', 'percent': round(confidence, 1)}
+def _spot_difference_matrix(lats, lons, elevations) -> dict:
+    """全干場ペアの差異行列（JSON用に丸めたリスト）と各干場の標高。"""
+    diff = _spot_diff.difference_arrays(lats[:, None], lons[:, None], elevations[:, None],
+                                        lats[None, :], lons[None, :], elevations[None, :])
+    confidence = _spot_diff.confidence_percent(diff['distance_km'], diff['elevation_difference_m'])
+    return {
+        'elevation_m': np.round(elevations, 1).tolist(),
+        'matrices': {
+            'distance_km': np.round(diff['distance_km'], 2).tolist(),
+            'direction_deg': np.round(diff['direction_deg'], 1).tolist(),
+            'elevation_difference_m': np.round(diff['elevation_difference_m'], 1).tolist(),
+            'temperature_c': np.round(diff['temperature_c'], 1).tolist(),
+            'humidity_percent': np.round(diff['humidity_percent'], 1).tolist(),
+            'wind_speed_ms': np.round(diff['wind_speed_ms'], 1).tolist(),
+            'confidence_percent': np.round(confidence, 1).tolist(),
+        },
+    }
 
 # Simple startup function
 def main():
@@ -9256,9 +9361,6 @@ def calculate_solunar_score(target_date):
     return score, phase_name, round(moon_age, 1)
 
 
-import threading as _threading
-
-
 def _try_acquire_notify_lock(key: str, ttl: int = 3600) -> bool:
     """Two-layer lock to prevent duplicate notifications.
 
@@ -9310,41 +9412,30 @@ def _try_acquire_notify_lock(key: str, ttl: int = 3600) -> bool:
         return True
 
 
-def _scheduled_line_notify(kind: str, hour: int, minute: int) -> None:
-    """Background thread: fire LINE push notifications at a fixed daily JST time.
+def _scheduled_line_notify(kind: str) -> None:
+    """Scheduler job: fire LINE push notifications at a fixed daily JST time.
 
-    kind  : 'evening' (翌日予報) or 'morning' (当日予報)
-    hour  : JST hour  (16 for evening, 1 for morning)
-    minute: JST minute (0 for evening, 30 for morning)
+    kind  : 'evening' (翌日予報, 16:00) or 'morning' (当日予報, 01:30)
 
-    Uses a Redis NX lock so only one Gunicorn worker sends per day,
-    even when --workers > 1.
+    Runs only on the scheduler leader; the Redis NX lock stays as a second
+    guard so only one Gunicorn worker sends per day, even when --workers > 1.
     """
-    import time
-    from datetime import timedelta
-    while True:
-        now = datetime.now(tz=JST)
-        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        if now >= next_run:
-            next_run += timedelta(days=1)
-        time.sleep((next_run - now).total_seconds())
-
-        date_str = datetime.now(tz=JST).strftime('%Y-%m-%d')
-        lock_key = f'line_notify_lock:{kind}:{date_str}'
+    date_str = datetime.now(tz=JST).strftime('%Y-%m-%d')
+    lock_key = f'line_notify_lock:{kind}:{date_str}'
 
-        if _try_acquire_notify_lock(lock_key):
-            try:
-                from line_integration import notify_all
-                result = notify_all(kind)
-                app.logger.info('LINE %s notification result: %s', kind, result)
-            except Exception as exc:
-                app.logger.error('LINE %s notification failed: %s', kind, exc)
-            # 通知時刻のナウキャストスナップショットを記録（lockを取得したワーカーのみ）
-            _record_nowcast_snapshot()
-        else:
-            app.logger.info(
-                'LINE %s notification already sent by another worker, skipping', kind
-            )
+    if _try_acquire_notify_lock(lock_key):
+        try:
+            from line_integration import notify_all
+            result = notify_all(kind)
+            app.logger.info('LINE %s notification result: %s', kind, result)
+        except Exception as exc:
+            app.logger.error('LINE %s notification failed: %s', kind, exc)
+        # 通知時刻のナウキャストスナップショットを記録（lockを取得したワーカーのみ）
+        _record_nowcast_snapshot()
+    else:
+        app.logger.info(
+            'LINE %s notification already sent by another worker, skipping', kind
+        )
 
 
 # ============================================================================
@@ -9562,69 +9653,144 @@ def _daily_data_integrity_check(target_date: str | None = None) -> dict:
 
 
 def _scheduled_integrity_check():
-    """バックグラウンドスレッド: 毎日05:00 JSTにデータ整合性チェックを実行する。
+    """スケジューラジョブ: 毎日05:00 JSTにデータ整合性チェックを実行する。
 
     03:00 アメダス収集 → (03:30 リトライ) → feedback_log 更新、の完了を待ってから検証。
     """
-    import time as _time
-    from datetime import timedelta
-    while True:
-        now = datetime.now(tz=JST)
-        next_run = now.replace(hour=5, minute=0, second=0, microsecond=0)
-        if now >= next_run:
-            next_run += timedelta(days=1)
-        _time.sleep((next_run - now).total_seconds())
-
-        date_str = datetime.now(tz=JST).strftime('%Y%m%d')
-        lock_key = f'integrity_check_lock:{date_str}'
-        if _try_acquire_notify_lock(lock_key):
-            try:
-                _daily_data_integrity_check()
-            except Exception as exc:
-                app.logger.error('[integrity] check error: %s', exc)
-        else:
-            app.logger.info('[integrity] already run by another worker, skipping')
+    date_str = datetime.now(tz=JST).strftime('%Y%m%d')
+    lock_key = f'integrity_check_lock:{date_str}'
+    if _try_acquire_notify_lock(lock_key):
+        try:
+            _daily_data_integrity_check()
+        except Exception as exc:
+            app.logger.error('[integrity] check error: %s', exc)
+    else:
+        app.logger.info('[integrity] already run by another worker, skipping')
 
 
-def _start_background_threads():
-    """Start long-running background threads.  Called once from wsgi.py so the
-    thread is NOT started when the module is merely imported (e.g. in tests or
-    gunicorn worker forks before application code runs)."""
-    # Nightly AMEDAS data collection at 03:00 JST
-    t1 = _threading.Thread(target=_daily_amedas_collection, daemon=True)
-    t1.start()
-
-    # LINE evening notification at 16:00 JST (翌日予報)
-    t2 = _threading.Thread(
-        target=_scheduled_line_notify, args=('evening', 16, 0), daemon=True
-    )
-    t2.start()
+# ── ウォームスタート（warm_start.py） ─────────────────────────────────────────
+# 無料枠ホストはアイドルで眠るため、起動ごとにキャッシュが空から始まる。
+# 最後に分かっている状態（干場カタログ・標高・分布図/アメダス/ナウキャスト）を
+# 終了時と定期的にローカルへ保存し、次の起動で最初のリクエスト前に復元する。
+WARM_START_FILE = os.path.join(BASE_DIR, DEFAULT_SNAPSHOT_FILE)
+_WARM_START_SAVE_INTERVAL = 15 * 60
+# 最初のリクエストが来ないままこの秒数が過ぎたらスケジューラを起動する
+_BACKGROUND_THREADS_FALLBACK_DELAY = 60
 
-    # LINE morning notification at 01:30 JST (当日予報)
-    t3 = _threading.Thread(
-        target=_scheduled_line_notify, args=('morning', 1, 30), daemon=True
-    )
-    t3.start()
+
+def _save_warm_start_snapshot(path: str | None = None) -> bool:
+    """プロセス内キャッシュをスナップショットに書き出す（期限切れの分布図は除く）。"""
+    now = datetime.now(JST)
+    sections = {
+        'spot_catalog': {'signature': _spot_catalog['signature'], 'spots': list(_spot_catalog['spots'])}
+        if _spot_catalog['path'] == CSV_FILE else None,
+        'elevation': dict(_elevation_cache),
+        'field_cache': {k: v for k, v in list(_analysis_field_cache.items()) if v.get('expires') and v['expires'] > now},
+        'amedas_rt': dict(_AMEDAS_RT_CACHE),
+        'nowcast': dict(_NOWCAST_CACHE),
+    }
+    sections = {name: value for name, value in sections.items() if value}
+    return save_snapshot(path or WARM_START_FILE, sections, sources={'spot_catalog': CSV_FILE})
+
+
+def _restore_warm_start_snapshot(path: str | None = None) -> list:
+    """スナップショットを復元し、復元した section 名を返す。すでにある値は上書きしない。"""
+    sections = load_snapshot(path or WARM_START_FILE, sources={'spot_catalog': CSV_FILE})
+    restored = []
+    catalog = sections.get('spot_catalog')
+    if catalog and catalog.get('signature') == file_signature(CSV_FILE) and _spot_catalog['path'] is None:
+        _spot_catalog.update(path=CSV_FILE, signature=catalog['signature'], spots=catalog['spots'])
+        restored.append('spot_catalog')
+    if sections.get('elevation'):
+        for key, value in sections['elevation'].items():
+            _elevation_cache.setdefault(key, value)
+        restored.append('elevation')
+    now = datetime.now(JST)
+    fresh = {k: v for k, v in sections.get('field_cache', {}).items() if v['expires'] > now}
+    if fresh:
+        for key, entry in fresh.items():
+            _analysis_field_cache.setdefault(key, entry)
+        restored.append('field_cache')
+    for name, cache in (('amedas_rt', _AMEDAS_RT_CACHE), ('nowcast', _NOWCAST_CACHE)):
+        saved = sections.get(name)
+        if saved and saved.get('data') is not None and cache['data'] is None:
+            cache.update(data=saved['data'], fetched_at=saved['fetched_at'])
+            restored.append(name)
+    if restored:
+        app.logger.info('[warm-start] restored %s from %s', ', '.join(restored), path or WARM_START_FILE)
+    return restored
+
+
+def _warm_start_after_first_request():
+    """初回リクエスト処理後: 遅延モジュールの先読みとバックグラウンドスレッドの起動。"""
+    preload_lazy_modules([pd])
+    _start_background_threads()
+
+
+def _start_background_threads_after_first_request(fallback_after: float | None = _BACKGROUND_THREADS_FALLBACK_DELAY):
+    """wsgi.py から呼ぶ。スレッド起動と pandas の import を最初のリクエストの後ろへ回す。"""
+    return FirstRequestHook(_warm_start_after_first_request).init_app(app, fallback_after=fallback_after)
+
+
+def _start_background_threads():
+    """Register the background jobs on the shared scheduler and start it.
+    Called once from wsgi.py so nothing runs when the module is merely
+    imported (e.g. in tests or gunicorn worker forks before application code
+    runs).
+
+    Every worker registers every job; jobs marked leader_only run only in the
+    worker holding the scheduler lease (job_scheduler.py), one at a time, in
+    priority order. The per-run date locks (_try_acquire_notify_lock) remain as
+    defense in depth across a leader failover."""
+    scheduler = default_scheduler()
+
+    # Nightly AMEDAS data collection at 03:00 JST (失敗時は 30 分後に 1 回だけ再試行)
+    scheduler.add_job('amedas', _daily_amedas_collection, DailyAt(3, 0),
+                      priority=30, jitter=60, misfire_grace=3600, retries=1, retry_delay=30 * 60)
+
+    # LINE evening notification at 16:00 JST (翌日予報) / morning at 01:30 JST (当日予報)
+    scheduler.add_job('line-evening', lambda: _scheduled_line_notify('evening'), DailyAt(16, 0),
+                      priority=10, misfire_grace=1800)
+    scheduler.add_job('line-morning', lambda: _scheduled_line_notify('morning'), DailyAt(1, 30),
+                      priority=10, misfire_grace=1800)
 
     # Daily forecast history snapshot at 16:20 JST (全334地点を一括保存。
     # 16:00のLINE通知と重ならないよう20分ずらしている)
-    t4 = _threading.Thread(target=_scheduled_forecast_snapshot, daemon=True)
-    t4.start()
+    scheduler.add_job('forecast-snapshot', _scheduled_forecast_snapshot, DailyAt(16, 20),
+                      priority=40, jitter=60, misfire_grace=3 * 3600)
 
     # Daily data integrity check at 05:00 JST (欠落・Redis永続化・精度比較を検証)
-    t5 = _threading.Thread(target=_scheduled_integrity_check, daemon=True)
-    t5.start()
+    scheduler.add_job('integrity-check', _scheduled_integrity_check, DailyAt(5, 0),
+                      priority=50, jitter=60, misfire_grace=3 * 3600)
 
-    # JMA nowcast mesh observations every 10 minutes during 04:00-16:00 JST
-    t6 = _threading.Thread(target=_scheduled_nowcast_observation_snapshots, daemon=True)
-    t6.start()
+    # JMA nowcast mesh observations every 10 minutes during 04:00-16:50 JST
+    # (遅れても次の10分枠までは実行、それ以上遅れたら捨てる)
+    scheduler.add_job('nowcast-observation', _scheduled_nowcast_observation_snapshots,
+                      Every(10 * 60, hours=(4, 16)), priority=20, jitter=20, misfire_grace=9 * 60)
 
+    # Warm-start snapshot every 15 minutes (次回のコールドスタート用。
+    # プロセス内キャッシュの保存なので各ワーカーで実行)
+    scheduler.add_job('warm-start-snapshot', _save_warm_start_snapshot,
+                      Every(_WARM_START_SAVE_INTERVAL, aligned=False),
+                      priority=90, misfire_grace=_WARM_START_SAVE_INTERVAL, leader_only=False)
+
+    scheduler.start()
     app.logger.info(
-        'Background threads started: amedas@03:00, line-evening@16:00, '
+        'Background scheduler started (%s): amedas@03:00, line-evening@16:00, '
         'line-morning@01:30, forecast-snapshot@16:20, integrity-check@05:00, '
-        'nowcast-observation@04:00-16:00/10min JST'
+        'nowcast-observation@04:00-16:50/10min JST, warm-start-snapshot/15min',
+        scheduler.owner,
     )
 
+
+@app.route('/api/scheduler/status', methods=['GET'])
+def scheduler_status():
+    """Scheduler leader/lease, next runs and per-job history. Requires X-Admin-Secret (see _check_admin_secret)."""
+    auth_error = _check_admin_secret()
+    if auth_error:
+        return auth_error
+    return jsonify(default_scheduler().status())
+
 # ============================================================================
 # LINE Messaging API endpoints (line_integration.py)
 # ============================================================================
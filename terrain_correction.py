@@ -0,0 +1,162 @@
+"""Vectorized per-grid-cell terrain correction.
+
+start.py's apply_terrain_correction_to_grid() used to walk the grid cell by
+cell, calling is_forest_area() / is_coastal_area() / get_elevation() and
+get_season_solar_factor() (which only depends on month/hour) for every cell
+before applying scalar corrections. Here the same corrections are expressed
+over 2-D arrays:
+
+    TerrainGrid         static per-cell terrain (forest/coastal masks,
+                        elevation, sea-side azimuth) — built once per grid
+                        and reused for every category / hour
+    correct_grid()      wind / humidity / temperature correction + the
+                        clip statistics, all as NumPy masks and reductions
+
+Results are identical to the old loop, including its NaN handling (Python
+``min(100, nan)`` is 100 and ``max(0, nan)`` is 0 — reproduced with
+``np.where`` rather than np.minimum/np.maximum, which propagate NaN).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from spot_geometry import coastal_mask, forest_mask, onshore_factor, sea_direction
+
+
+WIND_CATEGORIES = ('wind', 'wind_850hpa', 'wind_700hpa')
+HUMIDITY_CATEGORIES = ('humidity', 'humidity_850hpa', 'humidity_700hpa')
+TEMPERATURE_CATEGORIES = ('temperature', 'temperature_850hpa', 'temperature_700hpa')
+
+FOREST_WIND_FACTOR = 0.4        # 森林で60%減衰（実測：2.5m/s減少@4m/s → 約60%減）
+ONSHORE_THRESHOLD = 0.1         # onshore wind と判定する係数の閾値
+ELEVATION_THRESHOLD_M = 10      # これを超えると標高補正
+
+
+@dataclass(frozen=True)
+class TerrainGrid:
+    """Static terrain of one lat/lon grid (all arrays have the grid's shape)."""
+    is_forest: np.ndarray
+    is_coastal: np.ndarray
+    elevation: np.ndarray
+    sea_direction: np.ndarray
+
+    @property
+    def shape(self) -> tuple:
+        return self.elevation.shape
+
+
+def build_terrain_grid(grid_lat, grid_lon, elevation) -> TerrainGrid:
+    """Terrain masks/azimuths for a grid; ``elevation`` [m] comes from the caller
+    (start.py resolves it through the geometry table / elevation cache)."""
+    grid_lat = np.asarray(grid_lat, dtype=np.float64)
+    grid_lon = np.asarray(grid_lon, dtype=np.float64)
+    return TerrainGrid(
+        is_forest=forest_mask(grid_lat, grid_lon),
+        is_coastal=coastal_mask(grid_lat, grid_lon),
+        elevation=np.asarray(elevation, dtype=np.float64).reshape(grid_lat.shape),
+        sea_direction=sea_direction(grid_lat, grid_lon),
+    )
+
+
+def saturation_vapor_pressure(T):
+    """飽和水蒸気圧 [hPa]（Magnus式、Sonntag 1990）"""
+    return 6.112 * np.exp(17.67 * T / (T + 243.5))
+
+
+def _min_100(x):
+    # Python の min(100, x) と同じ（NaN → 100）
+    return np.where(x < 100, x, 100.0)
+
+
+def _max_0(x):
+    # Python の max(0, x) と同じ（NaN → 0）
+    return np.where(x > 0, x, 0.0)
+
+
+def empty_stats() -> dict:
+    return {
+        'clipped_high': 0,  # 上限クリップ回数
+        'clipped_low': 0,   # 下限クリップ回数
+        'wind_reduced_to_zero': 0,  # 風速がゼロに減衰した回数
+        'humidity_saturated': 0,  # 湿度が100%に達した回数
+        'onshore_wind_active': 0,  # onshore wind補正が有効だった回数
+        'forest_transpiration_active': 0  # 森林蒸散補正が有効だった回数
+    }
+
+
+def _onshore(terrain: TerrainGrid, grid_wind_direction):
+    """(onshore 係数, 補正が有効なセルのマスク)。風向なしなら (None, 全False)。"""
+    if grid_wind_direction is None:
+        return None, np.zeros(terrain.shape, dtype=bool)
+    factor = onshore_factor(terrain.sea_direction, grid_wind_direction)
+    active = terrain.is_coastal & (factor > ONSHORE_THRESHOLD)
+    return factor, active
+
+
+def correct_grid(grid_values, category: str, terrain: TerrainGrid, grid_temperature=None,
+                 grid_wind_direction=None, transp_factor: float = 0.0, shade_factor: float = 1.0):
+    """
+    Apply the terrain correction of one category to a whole grid.
+
+    ``transp_factor`` / ``shade_factor`` are get_season_solar_factor(month, hour)
+    — computed once by the caller instead of once per cell.
+
+    Returns (corrected_values, correction_stats) like apply_terrain_correction_to_grid().
+    """
+    corrected_values = np.array(grid_values, copy=True)
+    stats = empty_stats()
+    values = np.asarray(grid_values, dtype=np.float64)
+
+    if category in WIND_CATEGORIES:
+        # 乗算型補正（負値を自然に防ぐ）
+        reduction = np.where(terrain.is_forest, FOREST_WIND_FACTOR, 1.0)
+        onshore, active = _onshore(terrain, grid_wind_direction)
+        if onshore is not None:
+            reduction = np.where(active, reduction * (1.0 + 0.25 * onshore), reduction)  # 最大25%増加
+        result = _max_0(values * reduction)
+        stats['onshore_wind_active'] = int(active.sum())
+        stats['wind_reduced_to_zero'] = int(((result == 0) & (values > 0)).sum())
+        corrected_values[...] = result
+
+    elif category in HUMIDITY_CATEGORIES:
+        elevated = terrain.elevation > ELEVATION_THRESHOLD_M
+        if grid_temperature is None:
+            # 気温データなし：簡易補正（後方互換性）
+            rh = np.where(terrain.is_forest, _min_100(values + 10.0), values)
+            rh = np.where(terrain.is_coastal, _min_100(rh + 5.0), rh)
+            rh = np.where(elevated, _max_0(rh - (terrain.elevation / 100) * 1.0), rh)
+        else:
+            # 水蒸気圧ベースの物理的補正（相対湿度→水蒸気圧→補正→相対湿度）
+            T = np.asarray(grid_temperature, dtype=np.float64)
+            es_original = saturation_vapor_pressure(T)
+            e = es_original * (values / 100.0)
+
+            # 森林補正（季節・日射依存）: 蒸散成分 + 遮蔽成分
+            forest_factor = 1.0 + (0.10 * transp_factor + 0.05 * shade_factor)
+            e = np.where(terrain.is_forest, e * forest_factor, e)
+            if transp_factor > 0.3:
+                stats['forest_transpiration_active'] = int(terrain.is_forest.sum())
+
+            # 海岸補正（風向依存、onshore wind の時のみ）
+            onshore, active = _onshore(terrain, grid_wind_direction)
+            if onshore is not None:
+                e = np.where(active, e * (1.0 + 0.08 * onshore), e)
+            stats['onshore_wind_active'] = int(active.sum())
+
+            # 標高補正（簡易的な気圧低下、標高100m≈12hPa）
+            pressure_ratio = (1000 - terrain.elevation / 9) / 1000
+            e = np.where(elevated, e * pressure_ratio, e)
+            rh = (e / es_original) * 100
+
+        # 境界値処理＆統計記録
+        stats['humidity_saturated'] = int((rh >= 100).sum())
+        high = rh > 100
+        low = rh < 0
+        stats['clipped_high'] = int(high.sum())
+        stats['clipped_low'] = int(low.sum())
+        corrected_values[...] = np.where(high, 100.0, np.where(low, 0.0, rh))
+
+    # 気温補正なし：Open-Meteoが既に0.7°C/100mで補正済み（TEMPERATURE_CATEGORIES）
+    return corrected_values, stats
@@ -20,6 +20,8 @@ from scipy.spatial import cKDTree
 import requests
 from pathlib import Path
 import logging
+import os
+import threading
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -70,6 +72,13 @@ class RishiriTerrainDatabase:
             10: "海岸・砂浜"
         }
         
+        # 最近傍検索用の空間インデックス（terrain_points を一度だけ読み込んだ
+        # cKDTree）と、その読み込みに使う共有の読み取り専用コネクション
+        self._index_lock = threading.Lock()
+        self._index = None
+        self._index_mtime = None
+        self._read_conn = None
+        
         self._initialize_database()
         
     def _initialize_database(self):
@@ -315,7 +324,66 @@ class RishiriTerrainDatabase:
         
         conn.commit()
         conn.close()
+        self._invalidate_index()
+    
+    def _get_read_connection(self) -> sqlite3.Connection:
+        """共有の読み取り専用コネクション（インスタンスごとに1本）"""
+        if self._read_conn is None:
+            uri = f"file:{Path(self.db_path).resolve().as_posix()}?mode=ro"
+            self._read_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._read_conn
+    
+    def _invalidate_index(self):
+        with self._index_lock:
+            self._index = None
+            self._index_mtime = None
     
+    def _load_index(self) -> Optional[dict]:
+        """
+        terrain_points 全行を配列として読み込み、緯度・経度の cKDTree を構築。
+        最近傍検索は O(log N)（旧実装は毎回テーブル全体を距離でソート）。
+        DBファイルが更新されていれば（mtime変化）作り直す。
+        """
+        try:
+            mtime = os.path.getmtime(self.db_path)
+        except OSError:
+            return None
+        with self._index_lock:
+            if self._index is not None and self._index_mtime == mtime:
+                return self._index
+            rows = self._get_read_connection().execute("""
+                SELECT latitude, longitude, elevation, land_use, distance_to_coast,
+                       slope, aspect, theta
+                FROM terrain_points
+                ORDER BY id
+            """).fetchall()
+            if rows:
+                data = np.array(rows, dtype=np.float64)
+                self._index = {
+                    'tree': cKDTree(data[:, :2]),
+                    'rows': data,
+                }
+            else:
+                self._index = {'tree': None, 'rows': np.empty((0, 8))}
+            self._index_mtime = mtime
+            return self._index
+    
+    def _row_to_terrain_point(self, row) -> TerrainPoint:
+        def nullable(v):
+            # NULL 列は配列上 NaN → 旧実装どおり None に戻す
+            return None if np.isnan(v) else float(v)
+
+        return TerrainPoint(
+            latitude=float(row[0]),
+            longitude=float(row[1]),
+            elevation=float(row[2]),
+            land_use=self.land_use_categories[int(row[3])],
+            distance_to_coast=nullable(row[4]),
+            slope=nullable(row[5]),
+            aspect=nullable(row[6]),
+            theta=nullable(row[7])
+        )
+
     def _generate_contour_lines(self):
         """等高線生成"""
         # データベースから地形データ取得
@@ -377,36 +445,38 @@ class RishiriTerrainDatabase:
         logger.info(f"Generated contour lines for {len(elevation_levels)} elevation levels")
     
     def get_terrain_at_point(self, lat: float, lon: float) -> Optional[TerrainPoint]:
-        """指定地点の地形データ取得"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 最近傍点検索
-        cursor.execute("""
-            SELECT latitude, longitude, elevation, land_use, distance_to_coast,
-                   slope, aspect, theta,
-                   (latitude - ?)*(latitude - ?) + (longitude - ?)*(longitude - ?) as distance
-            FROM terrain_points
-            ORDER BY distance
-            LIMIT 1
-        """, (lat, lat, lon, lon))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return TerrainPoint(
-                latitude=result[0],
-                longitude=result[1],
-                elevation=result[2],
-                land_use=self.land_use_categories[result[3]],
-                distance_to_coast=result[4],
-                slope=result[5],
-                aspect=result[6],
-                theta=result[7]
-            )
-        return None
+        """指定地点の地形データ取得（最近傍点）"""
+        return self.get_terrain_at_points([lat], [lon])[0]
     
+    def get_terrain_at_points(self, lats, lons) -> List[Optional[TerrainPoint]]:
+        """複数地点の地形データを一括取得（KD木で最近傍点、データなしは None）"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        index = self._load_index()
+        if index is None or index['tree'] is None:
+            return [None] * len(lats)
+        _, idx = index['tree'].query(np.column_stack((lats, lons)))
+        rows = index['rows']
+        return [self._row_to_terrain_point(rows[i]) for i in idx]
+
+    def get_elevations_at_points(self, lats, lons) -> np.ndarray:
+        """最近傍点の標高だけを配列で返す（入力と同じ形、データなしは NaN）"""
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=np.float64),
+                                         np.asarray(lons, dtype=np.float64))
+        index = self._load_index()
+        if index is None or index['tree'] is None:
+            return np.full(lats.shape, np.nan)
+        _, idx = index['tree'].query(np.column_stack((lats.ravel(), lons.ravel())))
+        return index['rows'][idx, 2].reshape(lats.shape)
+
+    def signature(self) -> Optional[Tuple[int, int]]:
+        """DBファイルの (mtime_ns, size)。派生キャッシュの無効化判定用"""
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
     def get_terrain_grid(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
         """地形グリッドデータ取得"""
         conn = sqlite3.connect(self.db_path)
@@ -0,0 +1,129 @@
+"""
+Unit tests for content-addressed backups (backup_store.py / backup_system.py):
+  - restore reassembles every file byte-for-byte (CSV, SQLite, binary)
+  - a second backup after a small append writes only the changed chunks
+    (dedup ratio), unchanged files are not even re-read
+  - corrupted chunks are detected, the target file is left untouched
+  - garbage collection keeps max_backups manifests and drops orphan chunks
+
+Run from project root:
+    python -m pytest tests/test_backup_system.py -v
+"""
+import os
+import sqlite3
+
+import pytest
+
+from backup_store import CHUNK_SIZE, BackupStore
+from backup_system import BackupSystem
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows = "".join(f"H_{i:04d},2026-07-{i % 28 + 1:02d},乾燥完了,{i % 7}\n" for i in range(20000))
+    (tmp_path / "hoshiba_records.csv").write_text("name,date,result,score\n" + rows, encoding="utf-8")
+    (tmp_path / "hoshiba_spots.csv").write_text("name,lat,lon\nH_1631_1434,45.1631,141.1434\n", encoding="utf-8")
+    (tmp_path / "model.pkl").write_bytes(os.urandom(300_000))
+    conn = sqlite3.connect(tmp_path / "cache.db")
+    conn.execute("CREATE TABLE t (k INTEGER PRIMARY KEY, v TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, f"value-{i}" * 5) for i in range(5000)])
+    conn.commit()
+    conn.close()
+    return tmp_path
+
+
+def _system(max_backups=30):
+    system = BackupSystem()
+    system.config["max_backups"] = max_backups
+    system.config["backup_targets"]["critical_files"] = ["hoshiba_spots.csv", "hoshiba_records.csv", "model.pkl",
+                                                          "cache.db"]
+    return system
+
+
+def test_restore_integrity(workdir):
+    system = _system()
+    originals = {name: (workdir / name).read_bytes()
+                 for name in ("hoshiba_records.csv", "hoshiba_spots.csv", "model.pkl", "cache.db")}
+    info = system.create_backup("konbu_backup_a")
+    assert info["status"] == "completed", info
+    assert {f["source"] for f in info["files"] if f["backed_up"]} >= set(originals)
+
+    (workdir / "hoshiba_records.csv").write_text("broken", encoding="utf-8")
+    (workdir / "model.pkl").unlink()
+    restored = system.restore_backup("konbu_backup_a")
+    assert restored["status"] == "completed", restored
+    actions = {r["file"]: r["action"] for r in restored["restored_files"]}
+    assert actions["hoshiba_records.csv"] == "replaced" and actions["model.pkl"] == "created"
+    assert actions["hoshiba_spots.csv"] == "unchanged"
+    for name, data in originals.items():
+        assert (workdir / name).read_bytes() == data, name
+    assert sqlite3.connect(workdir / "cache.db").execute("SELECT COUNT(*) FROM t").fetchone() == (5000,)
+
+    assert system.restore_backup("missing")["status"] == "error"
+    assert [b["name"] for b in system.list_backups()] == ["konbu_backup_a"]
+
+
+def test_incremental_backup_dedup(workdir):
+    system = _system()
+    first = system.create_backup("konbu_backup_1")
+    assert first["dedup_ratio"] == 0  # 初回は全チャンクが新規
+    assert first["written_mb"] < first["size_mb"]  # CSV・SQLite は圧縮される
+
+    with open(workdir / "hoshiba_records.csv", "a", encoding="utf-8") as f:
+        f.write("H_9999,2026-08-01,乾燥完了,5\n")
+    conn = sqlite3.connect(workdir / "cache.db")
+    conn.execute("UPDATE t SET v = 'changed' WHERE k = 42")
+    conn.commit()
+    conn.close()
+
+    second = system.create_backup("konbu_backup_2")
+    files = {f["source"]: f for f in second["files"] if f["backed_up"]}
+    assert files["model.pkl"]["reused"] and files["hoshiba_spots.csv"]["reused"]
+    assert not files["hoshiba_records.csv"]["reused"]
+    assert second["dedup_ratio"] > 0.9
+    assert second["written_mb"] * 1024 ** 2 <= 3 * CHUNK_SIZE
+
+    # どちらの時点にも戻せる
+    system.restore_backup("konbu_backup_1", target_files=["critical"])
+    assert not (workdir / "hoshiba_records.csv").read_text(encoding="utf-8").endswith("H_9999,2026-08-01,乾燥完了,5\n")
+    system.restore_backup("konbu_backup_2", target_files=["critical"])
+    assert (workdir / "hoshiba_records.csv").read_text(encoding="utf-8").endswith("H_9999,2026-08-01,乾燥完了,5\n")
+
+
+def test_corrupted_chunk_is_detected(workdir):
+    system = _system()
+    info = system.create_backup("konbu_backup_a")
+    entry = next(f for f in info["files"] if f["source"] == "model.pkl")
+    chunk_path = system.store._chunk_path(entry["chunks"][1])
+    with open(chunk_path, "r+b") as f:
+        f.seek(10)
+        f.write(b"\xff\xff\xff")
+    (workdir / "model.pkl").write_bytes(b"current")
+
+    result = system.restore_backup("konbu_backup_a", target_files=["critical"])
+    assert result["status"] == "completed_with_errors"
+    assert [e["file"] for e in result["errors"]] == ["model.pkl"]
+    assert (workdir / "model.pkl").read_bytes() == b"current"
+    assert not list(workdir.glob("model.pkl.restore.tmp"))
+
+
+def test_garbage_collection(workdir):
+    system = _system(max_backups=2)
+    store: BackupStore = system.store
+    for i in range(4):
+        (workdir / "model.pkl").write_bytes(os.urandom(200_000))
+        os.utime(workdir / "model.pkl", ns=(i * 10**9, i * 10**9))
+        system.create_backup(f"konbu_backup_{i}")
+        os.utime(store._manifest_path(f"konbu_backup_{i}"), (1_000 + i, 1_000 + i))
+
+    assert store.manifest_names() == ["konbu_backup_2", "konbu_backup_3"]
+    on_disk = {name for _, _, files in os.walk(store.chunk_dir) for name in files}
+    assert on_disk == store.referenced_chunks()
+
+    assert system.delete_backup("konbu_backup_2")
+    assert not system.delete_backup("konbu_backup_2")
+    on_disk = {name for _, _, files in os.walk(store.chunk_dir) for name in files}
+    assert on_disk == store.referenced_chunks(["konbu_backup_3"])
+    assert system.restore_backup("konbu_backup_3")["status"] == "completed"
+    assert system.get_backup_status()["backup_count"] == 1
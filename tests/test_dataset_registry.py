@@ -0,0 +1,125 @@
+"""
+Unit tests for dataset_registry.py (process-wide CSV frame cache):
+  - a CSV is parsed once until its (mtime, size) changes or invalidate() is called
+  - frame() hands out copies; indexes are built once per loaded version
+  - explicit dtypes keep key columns as strings
+  - /record POST + GET and the accuracy sheet export parse each CSV once
+
+Run from project root:
+    python -m pytest tests/test_dataset_registry.py -v
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import start
+from dataset_registry import RECORDS, SPOTS, DatasetRegistry, DatasetSpec
+
+SPOTS_CSV = (
+    "name,lat,lon,town,district,buraku\n"
+    "H_1631_1434,45.1631,141.1434,利尻町,沓形,本町\n"
+    "H_2480_2198,45.2480,141.2198,利尻富士町,鴛泊,\n"
+)
+
+
+def test_reload_on_change_and_invalidate(tmp_path):
+    path = tmp_path / "spots.csv"
+    path.write_text(SPOTS_CSV, encoding="utf-8")
+    registry = DatasetRegistry()
+
+    df = registry.frame(SPOTS, str(path))
+    df.loc[0, "town"] = "書き換え"  # コピーなのでキャッシュは汚れない
+    assert registry.frame(SPOTS, str(path)).loc[0, "town"] == "利尻町"
+    assert registry.stats == {"hits": 1, "loads": 1, "invalidations": 0}
+
+    names = registry.index(SPOTS, str(path), "names")
+    assert names == {"H_1631_1434", "H_2480_2198"}
+    assert registry.index(SPOTS, str(path), "names") is names
+    meta = registry.index(SPOTS, str(path), "metadata")
+    assert meta["H_2480_2198"]["buraku"] is None and meta["H_1631_1434"]["lat"] == 45.1631
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("H_9999_0001,45.2,141.2,利尻町,仙法志,\n")
+    assert "H_9999_0001" in registry.index(SPOTS, str(path), "names")
+    assert registry.stats["loads"] == 2
+
+    registry.invalidate(str(path))
+    assert len(registry.frame(SPOTS, str(path))) == 3
+    assert registry.stats["loads"] == 3 and registry.stats["invalidations"] == 1
+
+    with pytest.raises(FileNotFoundError):
+        registry.frame(SPOTS, str(tmp_path / "missing.csv"))
+
+
+def test_explicit_dtypes_and_columns(tmp_path):
+    path = tmp_path / "records.csv"
+    path.write_text("date,name,result,correction_count\n2026-07-01,0123,完全乾燥,1\n", encoding="utf-8")
+    registry = DatasetRegistry()
+    rows = registry.index(RECORDS, str(path), "by_key")
+    assert rows[("0123", "2026-07-01")]["correction_count"] == 1  # name は数値化されない
+
+    spec = DatasetSpec("x", dtype={"a": str}, columns=("a", "b"))
+    path.write_text("a\n007\n", encoding="utf-8")
+    df = registry.frame(spec, str(path))
+    assert list(df.columns) == ["a", "b"] and df.loc[0, "a"] == "007"
+
+
+def test_record_routes_parse_each_csv_once(tmp_path, monkeypatch):
+    spots = tmp_path / "spots.csv"
+    spots.write_text(SPOTS_CSV, encoding="utf-8")
+    records = tmp_path / "records.csv"
+    monkeypatch.setattr(start, "CSV_FILE", str(spots))
+    monkeypatch.setattr(start, "RECORD_FILE", str(records))
+    monkeypatch.setattr(start, "FEEDBACK_FILE", str(tmp_path / "feedback.csv"))
+    monkeypatch.setattr(start, "_records_restore_attempted", True)
+    monkeypatch.setattr(start, "_obs_redis_get", lambda key: "x")
+    monkeypatch.setattr(start, "_obs_redis_set", lambda key, data, ttl=None: True)
+    monkeypatch.setattr(start, "_record_forecast_feedback", lambda *a: None)
+    monkeypatch.setattr(start, "_datasets", DatasetRegistry())
+
+    parsed = []
+    original = pd.read_csv
+    monkeypatch.setattr(pd, "read_csv", lambda path, *a, **kw: parsed.append(os.path.basename(path))
+                        or original(path, *a, **kw))
+
+    client = start.app.test_client()
+    for result in ("完全乾燥", "半乾燥"):
+        resp = client.post("/record", json={"name": "H_1631_1434", "date": "2026-07-01", "result": result})
+        assert resp.get_json()["status"] == "success"
+    assert client.post("/record", json={"name": "H_0000_0000", "date": "2026-07-01",
+                                        "result": "完全乾燥"}).status_code == 400
+
+    body = client.get("/record/H_1631_1434/2026-07-01").get_json()
+    assert body["exists"] and body["record"]["result"] == "半乾燥"
+    assert body["record"]["correction_count"] == 1
+    assert client.get("/record/H_1631_1434/2026-07-02").get_json() == {"exists": False}
+    # 干場CSVは1回だけ。記録CSVは書き込み後の最初の読み込みだけ（初回はファイルなし）
+    assert parsed.count("spots.csv") == 1 and parsed.count("records.csv") == 3
+
+
+def test_feedback_sheet_rows_join_current_spot_metadata(tmp_path, monkeypatch):
+    spots = tmp_path / "spots.csv"
+    spots.write_text(SPOTS_CSV, encoding="utf-8")
+    feedback = tmp_path / "feedback.csv"
+    today = start.datetime.now(tz=start.JST).strftime("%Y-%m-%d")
+    feedback.write_text(
+        "date,spot_name,days_ahead,town,district,buraku,judgment_correct,has_drying_record\n"
+        f"{today},H_1631_1434,0,,,,True,True\n"
+        f"{today},H_2480_2198,1,旧町,,,False,False\n"
+        f"{today},H_0000_0000,0,,,,,False\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(start, "CSV_FILE", str(spots))
+    monkeypatch.setattr(start, "FEEDBACK_FILE", str(feedback))
+    monkeypatch.setattr(start, "_datasets", DatasetRegistry())
+
+    rows, summary = start._load_feedback_sheet_rows(days_back=7)
+    by_spot = {r["spot_name"]: r for r in rows}
+    assert by_spot["H_1631_1434"]["town"] == "利尻町" and by_spot["H_1631_1434"]["buraku"] == "本町"
+    assert by_spot["H_2480_2198"]["town"] == "旧町"  # 記録時点の分類を優先
+    assert by_spot["H_0000_0000"]["town"] is None  # 削除済み干場
+    assert summary["total_rows"] == 3 and summary["judgment_hit_rate_pct"] == 50.0
+
+    start._load_feedback_sheet_rows(days_back=7)
+    assert start._datasets.stats["loads"] == 2  # feedback + spots、2回目はヒット
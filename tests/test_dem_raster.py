@@ -0,0 +1,139 @@
+"""
+Unit tests for dem_raster.py and its use in start.py / spot_geometry.py:
+  - bilinear elevation_at() is exact on a plane, NaN outside, any input shape
+  - build_dem_raster() batches rows, saves progress on failure and resumes
+  - get_elevation() / _grid_elevations() answer from the raster without the API
+  - regenerate_geometry_table() takes DEM elevations from the raster
+  - the committed rishiri_dem.npz (built from rishiri_terrain.db) loads, covers
+    every spot, is rebuilt identically, and only answers when the API fails
+
+Run from project root:
+    python -m pytest tests/test_dem_raster.py -v
+"""
+import numpy as np
+import pytest
+
+import dem_raster
+from dem_raster import build_dem_raster, load_dem_raster
+
+BOUNDS = {"lat_min": 45.10, "lat_max": 45.12, "lon_min": 141.20, "lon_max": 141.23}
+
+
+def _plane(lats, lons):
+    return [100 + 5000 * (lat - 45.10) + 2000 * (lon - 141.20) for lat, lon in zip(lats, lons)]
+
+
+def _plane_raster():
+    raster = dem_raster.empty_raster(BOUNDS, resolution=0.005)
+    lat_nodes, lon_nodes = raster.node_coordinates()
+    grid_lat, grid_lon = np.meshgrid(lat_nodes, lon_nodes, indexing="ij")
+    raster.elevation[:] = np.reshape(_plane(grid_lat.ravel(), grid_lon.ravel()), raster.shape)
+    return raster
+
+
+def test_bilinear_sampling():
+    raster = _plane_raster()
+    assert raster.shape == (5, 7) and raster.complete
+
+    lats = np.array([45.10, 45.1037, 45.12, 45.1111])
+    lons = np.array([141.20, 141.2171, 141.23, 141.2049])
+    np.testing.assert_allclose(raster.elevation_at(lats, lons), _plane(lats, lons), rtol=1e-5)
+
+    grid = raster.elevation_at(*np.meshgrid(np.linspace(45.10, 45.12, 9), np.linspace(141.20, 141.23, 4),
+                                            indexing="ij"))
+    assert grid.shape == (9, 4) and np.isfinite(grid).all()
+    assert np.isnan(raster.elevation_at([45.09, 45.11], [141.21, 141.25])).all()
+    assert float(raster.elevation_at(45.11, 141.21)) == pytest.approx(_plane([45.11], [141.21])[0], rel=1e-5)
+
+
+def test_build_resumes_after_failure(tmp_path):
+    path = str(tmp_path / "dem.npz")
+    calls = []
+
+    def flaky(lats, lons):
+        calls.append(len(lats))
+        return None if len(calls) == 3 else _plane(lats, lons)
+
+    with pytest.raises(RuntimeError):
+        build_dem_raster(path, BOUNDS, resolution=0.005, fetch_batch=flaky, rows_per_request=1, pause=0)
+    assert calls == [7, 7, 7]
+    partial = load_dem_raster(str(tmp_path / "dem.partial.npz"))
+    assert np.isfinite(partial.elevation[:2]).all() and np.isnan(partial.elevation[2:]).all()
+
+    calls.clear()
+    raster = build_dem_raster(path, BOUNDS, resolution=0.005, fetch_batch=_record(calls), pause=0)
+    assert calls == [21]  # 未取得の3行だけ、1リクエストに100点までまとめる
+    assert raster.complete and not (tmp_path / "dem.partial.npz").exists()
+    loaded = load_dem_raster(path)
+    np.testing.assert_array_equal(loaded.elevation, _plane_raster().elevation)
+    assert loaded.bounds == pytest.approx(BOUNDS) and loaded.source == dem_raster.DEM_SOURCE
+
+
+def _record(calls):
+    def fetch(lats, lons):
+        calls.append(len(lats))
+        return _plane(lats, lons)
+    return fetch
+
+
+def test_start_elevation_uses_raster_offline(monkeypatch):
+    import start
+
+    monkeypatch.setattr(start, "_dem_raster", _plane_raster())
+    monkeypatch.setattr(start, "_spot_geometry", None)
+    monkeypatch.setattr(start, "_elevation_cache", {})
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("Elevation API must not be called inside the raster")
+
+    monkeypatch.setattr(start.requests, "get", no_network)
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", no_network)
+
+    assert start.get_elevation(45.1037, 141.2171) == pytest.approx(_plane([45.1037], [141.2171])[0], rel=1e-5)
+    grid = start._grid_elevations([45.105, 45.115], [141.205, 141.225])
+    np.testing.assert_allclose(grid, _plane([45.105, 45.115], [141.205, 141.225]), rtol=1e-5)
+    assert (45.1, 141.22) not in start._elevation_cache
+
+    # 範囲外は従来どおりバッチ取得へ
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", lambda lats, lons: [42.0] * len(lats))
+    assert start._grid_elevations([45.20], [141.30]).tolist() == [42.0]
+
+
+def test_geometry_table_takes_dem_from_raster(tmp_path):
+    import spot_geometry as sg
+
+    csv_path = tmp_path / "spots.csv"
+    csv_path.write_text("name,lat,lon\nH_A,45.1050,141.2100\nH_far,45.2400,141.3000\n", encoding="utf-8")
+    points = [("H_A", "spot", 45.1050, 141.2100), ("H_far", "spot", 45.2400, 141.3000)]
+    elevations, sources = sg.resolve_elevations(points, None, fetch_batch=lambda lats, lons: [9.0] * len(lats),
+                                                dem=_plane_raster())
+    assert sources == ["dem", "dem"]
+    assert elevations[0] == pytest.approx(_plane([45.105], [141.21])[0], rel=1e-5)
+    assert elevations[1] == 9.0
+
+
+def test_shipped_terrain_db_raster(tmp_path, monkeypatch):
+    import spot_geometry as sg
+    import start
+
+    shipped = load_dem_raster()
+    assert shipped is not None and shipped.source == dem_raster.TERRAIN_DB_SOURCE
+    assert shipped.elevation_source == "terrain_db" and shipped.complete
+    table = sg.load_geometry_table(sg.DEFAULT_TABLE_PATH)
+    spots = table.array[table.array["kind"] == "spot"]
+    values = shipped.elevation_at(spots["lat"], spots["lon"])
+    assert np.isfinite(values).mean() > 0.9 and 0 < np.nanmax(values) < 1721
+
+    rebuilt = dem_raster.build_dem_from_terrain_db(str(tmp_path / "dem.npz"))
+    np.testing.assert_array_equal(rebuilt.elevation, shipped.elevation)
+    assert rebuilt.bounds == pytest.approx(shipped.bounds)
+
+    # terrain db 由来のラスタは API の代わりにはならず、API が落ちたときだけ使う
+    monkeypatch.setattr(start, "_dem_raster", shipped)
+    monkeypatch.setattr(start, "_spot_geometry", None)
+    monkeypatch.setattr(start, "_elevation_cache", {})
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", lambda lats, lons: [42.0] * len(lats))
+    assert start._grid_elevations([45.18], [141.24]).tolist() == [42.0]
+    monkeypatch.setattr(start, "_elevation_cache", {})
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", lambda lats, lons: None)
+    assert start._grid_elevations([45.18], [141.24])[0] == pytest.approx(float(shipped.elevation_at(45.18, 141.24)))
@@ -0,0 +1,187 @@
+"""
+Unit tests for era5_toolkit.py:
+  - load_fields() NetCDF3 extraction (scale/offset, fill values, CF times)
+  - .npy cache keyed by file hash (reuse, incremental fields, invalidation)
+  - whole-axis vorticity() / wind helpers == the per-timestep loop of
+    analyze_era5_contours.py they replaced
+
+Run from project root:
+    python -m pytest tests/test_era5_toolkit.py -v
+"""
+import math
+
+import numpy as np
+import pytest
+from scipy.io import netcdf_file
+
+import era5_toolkit
+
+LAT = np.array([45.5, 45.25, 45.0, 44.75])  # ERA5 は北→南
+LON = np.array([140.75, 141.0, 141.25, 141.5, 141.75])
+LEVELS = np.array([500, 700, 850], dtype=np.int32)
+
+
+def _write_nc(path, n_time=30, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {name: rng.normal(0, 10, (n_time, len(LEVELS), len(LAT), len(LON))).astype(np.float32)
+            for name in ("u", "v")}
+    t_packed = rng.integers(-30000, 30000, (n_time, len(LEVELS), len(LAT), len(LON))).astype(np.int16)
+    t_packed[0, 2, 1, 1] = -32767
+    with netcdf_file(str(path), "w") as nc:
+        nc.createDimension("valid_time", n_time)
+        nc.createDimension("pressure_level", len(LEVELS))
+        nc.createDimension("latitude", len(LAT))
+        nc.createDimension("longitude", len(LON))
+        for name, values, dtype in (("latitude", LAT, "f8"), ("longitude", LON, "f8"),
+                                    ("pressure_level", LEVELS, "i4")):
+            nc.createVariable(name, dtype, (name,))[:] = values
+        time_var = nc.createVariable("valid_time", "i4", ("valid_time",))
+        time_var[:] = np.arange(n_time) * 6
+        time_var.units = b"hours since 2024-08-01 00:00:00"
+        dims = ("valid_time", "pressure_level", "latitude", "longitude")
+        for name, values in data.items():
+            nc.createVariable(name, "f4", dims)[:] = values
+        t_var = nc.createVariable("t", "i2", dims)
+        t_var[:] = t_packed
+        t_var.scale_factor = np.float32(0.001)
+        t_var.add_offset = np.float32(270.0)
+        t_var._FillValue = np.int16(-32767)
+    return data, t_packed
+
+
+@pytest.fixture
+def nc_file(tmp_path):
+    path = tmp_path / "era5_test.nc"
+    data, t_packed = _write_nc(path)
+    return path, data, t_packed
+
+
+def test_load_fields_extracts_levels_and_unpacks(nc_file, tmp_path):
+    path, data, t_packed = nc_file
+
+    fields = era5_toolkit.load_fields(path, {"u": [500, 850], "t": [850]}, cache_dir=tmp_path / "cache",
+                                      time_chunk=7)
+
+    np.testing.assert_array_equal(fields["u_500"], data["u"][:, 0])
+    np.testing.assert_array_equal(fields["u_850"], data["u"][:, 2])
+    expected_t = t_packed[:, 2].astype(np.float32) * np.float32(0.001) + np.float32(270.0)
+    expected_t[0, 1, 1] = np.nan
+    np.testing.assert_allclose(fields["t_850"], expected_t, equal_nan=True)
+    np.testing.assert_array_equal(fields.lat, LAT)
+    assert fields.times[1] == np.datetime64("2024-08-01T06:00:00")
+    assert isinstance(fields["u_500"], np.memmap)
+
+
+def test_cache_reused_and_extended(nc_file, tmp_path, monkeypatch):
+    path, data, _ = nc_file
+    cache = tmp_path / "cache"
+    first = era5_toolkit.load_fields(path, {"u": [500]}, cache_dir=cache)
+
+    opened = []
+    real_open = era5_toolkit._open_source
+    monkeypatch.setattr(era5_toolkit, "_open_source", lambda p: opened.append(p) or real_open(p))
+
+    again = era5_toolkit.load_fields(path, {"u": [500]}, cache_dir=cache)
+    assert opened == []
+    assert again.cache_path == first.cache_path
+
+    both = era5_toolkit.load_fields(path, {"u": [500], "v": [700]}, cache_dir=cache)
+    assert len(opened) == 1
+    np.testing.assert_array_equal(both["v_700"], data["v"][:, 1])
+    assert sorted(p.name for p in first.cache_path.glob("*.npy")) == [
+        "_lat.npy", "_lon.npy", "_times.npy", "u_500.npy", "v_700.npy"]
+
+
+def test_cache_invalidated_when_file_changes(nc_file, tmp_path):
+    path, _, _ = nc_file
+    cache = tmp_path / "cache"
+    old = era5_toolkit.load_fields(path, {"u": [500]}, cache_dir=cache)
+
+    new_data, _ = _write_nc(path, seed=1)
+    new = era5_toolkit.load_fields(path, {"u": [500]}, cache_dir=cache)
+
+    assert new.cache_path != old.cache_path
+    np.testing.assert_array_equal(new["u_500"], new_data["u"][:, 0])
+
+
+def test_geopotential_long_name_fallback(tmp_path):
+    path = tmp_path / "era5_long_names.nc"
+    geopotential = np.linspace(5.0e4, 5.6e4, 2 * len(LEVELS) * len(LAT) * len(LON), dtype=np.float32)
+    geopotential = geopotential.reshape(2, len(LEVELS), len(LAT), len(LON))
+    with netcdf_file(str(path), "w") as nc:
+        for name, size in (("valid_time", 2), ("pressure_level", len(LEVELS)),
+                           ("latitude", len(LAT)), ("longitude", len(LON))):
+            nc.createDimension(name, size)
+        for name, values, dtype in (("latitude", LAT, "f8"), ("longitude", LON, "f8"),
+                                    ("pressure_level", LEVELS, "i4")):
+            nc.createVariable(name, dtype, (name,))[:] = values
+        time_var = nc.createVariable("valid_time", "i4", ("valid_time",))
+        time_var[:] = [0, 6]
+        time_var.units = b"hours since 2024-08-01 00:00:00"
+        dims = ("valid_time", "pressure_level", "latitude", "longitude")
+        nc.createVariable("geopotential", "f4", dims)[:] = geopotential
+
+    fields = era5_toolkit.load_fields(path, {"z": [500]}, cache_dir=tmp_path / "cache")
+
+    np.testing.assert_array_equal(fields["z_500"], geopotential[:, 0])
+    with pytest.raises(KeyError):
+        era5_toolkit.load_fields(path, {"u": [500]}, cache_dir=tmp_path / "cache")
+
+
+def test_missing_level_raises_keyerror(nc_file, tmp_path):
+    path, _, _ = nc_file
+
+    with pytest.raises(KeyError):
+        era5_toolkit.load_fields(path, {"u": [300]}, cache_dir=tmp_path / "cache")
+
+
+def _slice_vorticity(u, v, lat, lon):
+    """analyze_era5_contours.calculate_vorticity_spatial() before vectorization (2-D only)."""
+    R = 6371000
+    dv_dlon = np.gradient(v, axis=-1)
+    du_dlat = np.gradient(u, axis=-2)
+    dlon = np.gradient(np.deg2rad(lon))
+    dlat = np.gradient(np.deg2rad(lat))
+    lat_rad_grid = np.deg2rad(np.meshgrid(lon, lat)[1])
+    dx = R * np.cos(lat_rad_grid) * dlon[None, :]
+    dy = R * dlat[:, None]
+    return (dv_dlon / dx - du_dlat / dy) * 1e5
+
+
+def test_vorticity_all_timesteps_matches_slice_loop(nc_file):
+    _, data, _ = nc_file
+    u, v = data["u"][:, 0], data["v"][:, 0]
+
+    got = era5_toolkit.vorticity(u, v, LAT, LON)
+
+    expected = np.stack([_slice_vorticity(u[t], v[t], LAT, LON) for t in range(len(u))])
+    np.testing.assert_allclose(got, expected, rtol=1e-5)
+
+
+def test_wind_helpers_match_scalar_loop():
+    rng = np.random.default_rng(3)
+    u, v = rng.normal(0, 8, 200), rng.normal(0, 8, 200)
+    azimuth = 113.7
+
+    cos_vals = era5_toolkit.cos_mountain_angle(era5_toolkit.wind_direction(u, v), azimuth)
+
+    for i in range(len(u)):
+        wind_dir = (np.degrees(np.arctan2(-u[i], -v[i])) + 360) % 360
+        angle_diff = abs((wind_dir + 180) % 360 - azimuth)
+        if angle_diff > 180:
+            angle_diff = 360 - angle_diff
+        assert cos_vals[i] == pytest.approx(math.cos(math.radians(angle_diff)))
+
+
+def test_point_extraction_and_statistics():
+    values = np.arange(2 * len(LAT) * len(LON), dtype=float).reshape(2, len(LAT), len(LON))
+    lat_idx, lon_idx = era5_toolkit.nearest_indices(LAT, LON, [(45.24, 141.11), (44.7, 141.8)])
+
+    assert lat_idx.tolist() == [1, 3] and lon_idx.tolist() == [1, 4]
+    np.testing.assert_array_equal(era5_toolkit.extract_points(values, lat_idx, lon_idx),
+                                  values[:, [1, 3], [1, 4]])
+
+    series = np.array([[1.0, np.nan], [5.0, np.nan], [np.nan, np.nan]])
+    np.testing.assert_array_equal(era5_toolkit.exceedance_fraction(series, 2.0), [0.5, np.nan])
+    assert era5_toolkit.pearson([1, 2, np.nan, 4], [2, 4, 5, 8]) == pytest.approx(1.0)
+    assert era5_toolkit.pearson([1, np.nan], [1, 2]) == 0.0
@@ -0,0 +1,222 @@
+"""
+Unit tests for field_grid_dataset.py and its use from start.py's
+/api/analysis/field computations:
+  - FieldGridDataset            payload → (point × hour × variable) cube
+  - nanmax/nanmin/nanmean/nansum  "no valid value → NaN" reductions
+  - _get_field_grid_dataset()   one fetch + parse shared by all 6 field types
+
+Run from project root:
+    python -m pytest tests/test_field_grid_dataset.py -v
+"""
+import math
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import start  # noqa: E402  (see tests/test_field_cache.py for why at module level)
+from field_grid_dataset import (
+    FieldGridDataset,
+    nanmax,
+    nanmean,
+    nanmin,
+    nansum,
+    to_optional,
+    to_optional_list,
+)
+
+
+def _hours(days=2, start_day=1):
+    return [f"2026-08-{d + start_day:02d}T{h:02d}:00" for d in range(days) for h in range(24)]
+
+
+def _payload(n_points, variables, value_fn, days=2):
+    times = _hours(days)
+    return [
+        {"hourly": {"time": times, **{v: [value_fn(p, v, k) for k in range(len(times))] for v in variables}}}
+        for p in range(n_points)
+    ]
+
+
+def _points(n):
+    return [{"lat": 45.1 + 0.01 * i, "lon": 141.2 + 0.01 * i} for i in range(n)]
+
+
+# ---------------------------------------------------------------------------
+# FieldGridDataset parsing
+# ---------------------------------------------------------------------------
+
+def test_dataset_cube_shape_and_values():
+    payload = _payload(3, ["temperature_2m", "precipitation"], lambda p, v, k: p * 100 + k)
+    ds = FieldGridDataset(_points(3), payload, ["temperature_2m", "precipitation"])
+
+    assert ds.cube.shape == (3, 48, 2)
+    assert ds.at("temperature_2m", "2026-08-01T10:00").tolist() == [10.0, 110.0, 210.0]
+    assert ds.at("precipitation", "2026-08-02T00:00").tolist() == [24.0, 124.0, 224.0]
+
+
+def test_dataset_none_values_become_nan():
+    payload = _payload(1, ["temperature_2m"], lambda p, v, k: None if k == 5 else 1.0)
+    ds = FieldGridDataset(_points(1), payload, ["temperature_2m"])
+
+    assert math.isnan(ds.at("temperature_2m", "2026-08-01T05:00")[0])
+    assert ds.at("temperature_2m", "2026-08-01T06:00")[0] == 1.0
+
+
+def test_dataset_window_is_04_to_16_of_target_date():
+    payload = _payload(2, ["temperature_2m"], lambda p, v, k: float(k))
+    ds = FieldGridDataset(_points(2), payload, ["temperature_2m"])
+
+    win = ds.window("temperature_2m", "2026-08-02")
+    assert win.shape == (2, 13)
+    assert win[0].tolist() == [float(24 + h) for h in range(4, 17)]
+    # 06:00 は窓の3列目（旧 _extract_day_window() の list[2] と同じ位置）
+    assert win[0, 2] == 30.0
+
+
+def test_dataset_missing_variable_and_unknown_time():
+    payload = _payload(1, ["temperature_2m"], lambda p, v, k: 1.0)
+    ds = FieldGridDataset(_points(1), payload, ["temperature_2m", "cape"])
+
+    assert np.isnan(ds.window("cape", "2026-08-01")).all()
+    assert ds.window_length("cape", "2026-08-01").tolist() == [0]
+    assert ds.window_length("temperature_2m", "2026-08-01").tolist() == [13]
+    assert np.isnan(ds.at("temperature_2m", "2030-01-01T10:00")).all()
+
+
+def test_dataset_failed_fetch_payload_is_empty_not_error():
+    ds = FieldGridDataset(_points(3), [{"hourly": {}} for _ in range(3)], ["temperature_2m"])
+
+    assert ds.has_data() is False
+    assert ds.window("temperature_2m", "2026-08-01").shape == (3, 0)
+    assert to_optional_list(nanmax(ds.window("temperature_2m", "2026-08-01"))) == [None, None, None]
+
+
+def test_dataset_aligns_point_with_different_time_axis():
+    times = _hours(1)
+    payload = [
+        {"hourly": {"time": times, "temperature_2m": [1.0] * 24}},
+        {"hourly": {"time": times[12:], "temperature_2m": [2.0] * 12}},
+    ]
+    ds = FieldGridDataset(_points(2), payload, ["temperature_2m"])
+
+    assert math.isnan(ds.at("temperature_2m", "2026-08-01T05:00")[1])
+    assert ds.at("temperature_2m", "2026-08-01T13:00").tolist() == [1.0, 2.0]
+
+
+# ---------------------------------------------------------------------------
+# Reductions keep the old _safe_*() "no valid values → None" semantics
+# ---------------------------------------------------------------------------
+
+def test_reductions_ignore_nan_and_keep_all_nan_rows_nan():
+    values = np.array([[1.0, np.nan, 3.0], [np.nan, np.nan, np.nan]])
+
+    assert to_optional_list(nanmax(values)) == [3.0, None]
+    assert to_optional_list(nanmin(values)) == [1.0, None]
+    assert to_optional_list(nanmean(values)) == [2.0, None]
+    assert to_optional_list(nansum(values)) == [4.0, None]
+
+
+def test_reductions_on_empty_window():
+    values = np.empty((2, 0))
+    for fn in (nanmax, nanmin, nanmean, nansum):
+        assert to_optional_list(fn(values)) == [None, None]
+
+
+def test_to_optional_converts_numpy_scalars():
+    assert to_optional(np.float64(1.5)) == 1.5
+    assert isinstance(to_optional(np.float64(1.5)), float)
+    assert to_optional(np.nan) is None
+    assert to_optional(None) is None
+
+
+# ---------------------------------------------------------------------------
+# start.py: one upstream payload shared by all field types
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def grid_payload(monkeypatch):
+    """Live-path grid payload for today/tomorrow (JST) with fixed values."""
+    monkeypatch.delenv("FIELD_PREFETCH_ENABLED", raising=False)
+    monkeypatch.setattr(start, "_field_dataset_cache", {})
+    grid = start._build_rishiri_grid()
+    today = start._field_target_date(0)
+    tomorrow = start._field_target_date(1)
+    times = [f"{d}T{h:02d}:00" for d in (today, tomorrow) for h in range(24)]
+    m = len(times)
+    point = {
+        "hourly": {
+            "time": times,
+            "temperature_2m": [15.0] * m,
+            "relative_humidity_2m": [70.0] * m,
+            "wind_speed_10m": [18.0] * m,   # 5 m/s
+            "precipitation": [0.0] * m,
+            "precipitation_probability": [10] * m,
+            "shortwave_radiation": [500.0] * m,
+            "dewpoint_2m": [5.0] * m,
+            "cape": [0.0] * m,
+            "wind_direction_10m": [270.0] * m,
+        }
+    }
+    return [point for _ in grid]
+
+
+def test_field_types_share_one_fetch_and_parse(grid_payload):
+    with patch.object(start, "_fetch_field_grid_data", return_value=grid_payload) as mock_fetch:
+        wind = start._compute_wind_field(0, 10)
+        hum = start._compute_humidity_field(0, 10)
+        temp = start._compute_temperature_field(0, 13)
+        solar = start._compute_solar_field(1, 7)
+        precip = start._compute_precipitation_field(1, 16)
+
+    assert mock_fetch.call_count == 1
+    # 上位集合の変数リストで取得する（全タイプが同じペイロードを使えるように）
+    assert mock_fetch.call_args.args[4] == start._FIELD_GRID_VARS
+
+    v0 = wind["vectors"][0]
+    assert v0["speed"] == 5.0
+    assert v0["direction"] == 270.0
+    assert v0["u"] == pytest.approx(5.0)   # 西風 → 東向きベクトル
+    assert v0["v"] == pytest.approx(0.0, abs=1e-3)
+    assert all(p["raw_value"] == 70 for p in hum["points"])
+    assert all(p["value"] == 15.0 for p in temp["points"])
+    assert all(p["value"] == 500 for p in solar["points"])
+    assert precip["all_zero"] is True
+
+
+def test_field_missing_hour_yields_none_values(grid_payload):
+    with patch.object(start, "_fetch_field_grid_data", return_value=grid_payload):
+        # 6日後は取得範囲外 → 各値 None（旧実装の times.index() ValueError と同じ扱い）
+        wind = start._compute_wind_field(6, 10)
+
+    assert all(v["speed"] is None and v["u"] is None for v in wind["vectors"])
+
+
+def test_empty_payload_is_not_cached(grid_payload):
+    empty = [{"hourly": {}} for _ in grid_payload]
+    with patch.object(start, "_fetch_field_grid_data", side_effect=[empty, grid_payload]) as mock_fetch:
+        first = start._compute_temperature_field(0, 10)
+        second = start._compute_temperature_field(0, 10)
+
+    assert mock_fetch.call_count == 2
+    assert all(p["value"] is None for p in first["points"])
+    assert all(p["value"] == 15.0 for p in second["points"])
+
+
+def test_score_field_uses_shared_dataset(grid_payload, monkeypatch):
+    monkeypatch.setattr(start, "_fetch_elevations_batch", lambda lats, lons, source=None: [10.0] * len(lats))
+    monkeypatch.setattr(start, "get_sea_surface_temperature", lambda lat, lon, source=None: [None] * 7)
+
+    with patch.object(start, "_fetch_field_grid_data", return_value=grid_payload) as mock_fetch:
+        score = start._compute_score_field(0)
+        start._compute_wind_field(0, 10)
+
+    assert mock_fetch.call_count == 1
+    assert len(score["points"]) == len(grid_payload)
+    metrics = score["points"][1]["metrics"]
+    assert metrics["avg_wind_ms"] == 5.0
+    assert metrics["max_wind_ms"] == 5.0
+    assert metrics["min_humidity"] == 70
+    assert metrics["avg_solar"] == 500
+    assert metrics["pop_max"] == 10
+    assert metrics["precipitation"] == 0
@@ -0,0 +1,180 @@
+"""
+Unit tests for the forecast_accuracy/ sqlite store:
+  - bulk ingestion (build_forecast_rows + save_forecast_rows, WAL mode)
+  - set-based analyze_accuracy() == the per-row calculate_errors() /
+    evaluate_drying_possibility() path it replaced
+  - summarize_accuracy() grouped MAE / bias / hit rates
+
+forecast_accuracy/ modules use flat imports (``from config import ...``), so
+they are imported with that directory on sys.path; the root-level modules of
+the same name are restored afterwards.
+
+Run from project root:
+    python -m pytest tests/test_forecast_accuracy_store.py -v
+"""
+import importlib
+import sqlite3
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "forecast_accuracy"
+_MODULES = ("config", "database", "accuracy_analyzer", "daily_forecast_collector", "benchmark_store")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(PKG_DIR))
+    for name in _MODULES:
+        if name in sys.modules:
+            monkeypatch.delitem(sys.modules, name)
+    mods = {name: importlib.import_module(name) for name in _MODULES}
+    monkeypatch.setattr(mods["database"], "DB_PATH", str(tmp_path / "accuracy.db"))
+    mods["database"].init_database()
+    yield mods
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+def _forecast_payload(start: date):
+    return {
+        "status": "success",
+        "forecasts": [
+            {
+                "date": (start + timedelta(days=d)).isoformat(),
+                "day_number": d,
+                "daily_summary": {"temperature_max": 20 + d, "temperature_min": 10, "precipitation": d % 2,
+                                  "drying_score": 50 + d,
+                                  "stage_analysis": {"risk_assessment": {"risk_level": "low"}}},
+                "hourly_details": [{"humidity": 80 + d, "wind_speed": 3.0}, {"humidity": 70, "wind_speed": 5.0}],
+            }
+            for d in range(8)
+        ],
+    }
+
+
+def test_save_forecast_to_db_bulk_and_wal(store):
+    collector, database = store["daily_forecast_collector"], store["database"]
+
+    saved = collector.save_forecast_to_db("H_A", date(2026, 7, 1), _forecast_payload(date(2026, 7, 1)))
+
+    assert saved == 6  # 1-6日先のみ
+    conn = sqlite3.connect(database.DB_PATH)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    rows = conn.execute("SELECT days_ahead, temp_max, humidity_min, wind_speed_avg, risk_level "
+                        "FROM forecast_archive ORDER BY days_ahead").fetchall()
+    conn.close()
+    assert rows[0] == (1, 21.0, 70.0, 4.0, "low")
+    assert [r[0] for r in rows] == [1, 2, 3, 4, 5, 6]
+
+
+def test_collect_daily_forecasts_writes_in_chunks(store, monkeypatch):
+    collector = store["daily_forecast_collector"]
+    spots = [{"name": f"H_{i}", "lat": 45.1, "lon": 141.2} for i in range(5)]
+    writes = []
+    save = collector.save_forecast_rows
+
+    def spy(rows):
+        writes.append(len(rows))
+        return save(rows)
+
+    monkeypatch.setattr(collector, "save_forecast_rows", spy)
+    monkeypatch.setattr(collector, "WRITE_CHUNK_SPOTS", 2)
+    monkeypatch.setattr(collector.time, "sleep", lambda s: None)
+    monkeypatch.setattr(collector, "fetch_forecast_for_spot",
+                        lambda spot: None if spot["name"] == "H_3" else _forecast_payload(date.today()))
+
+    stats = collector.collect_daily_forecasts(spots)
+
+    assert writes == [12, 12]  # (H_0,H_1) と (H_2,H_4)
+    assert stats == {"total_spots": 5, "successful_spots": 4, "failed_spots": 1, "total_records_saved": 24}
+
+
+def _reference_rows(analyzer, spots, target):
+    """The per-spot/per-horizon computation analyze_accuracy() used before."""
+    actual = analyzer.get_actual_data(target)
+    out = {}
+    for spot in spots:
+        for days_ahead in range(1, 7):
+            forecast = analyzer.get_forecast_data(spot["name"], target, days_ahead)
+            if not forecast:
+                continue
+            errors = analyzer.calculate_errors(forecast, actual)
+            f_ok = analyzer.evaluate_drying_possibility(forecast)
+            a_ok = analyzer.evaluate_drying_possibility(actual)
+            out[(spot["name"], days_ahead)] = (
+                errors["temp_max_error"], errors["temp_min_error"], errors["humidity_error"], errors["wind_error"],
+                errors["precipitation_forecast"], errors["precipitation_actual"], int(errors["precipitation_hit"]),
+                forecast["drying_score"], int(f_ok), int(a_ok), int(f_ok == a_ok),
+            )
+    return out
+
+
+def test_analyze_accuracy_matches_per_row_reference(store):
+    analyzer, bench, database = store["accuracy_analyzer"], store["benchmark_store"], store["database"]
+    spots = bench.synthetic_spots(4)
+    start = date(2026, 7, 1)
+    bench.seed_synthetic_year(spots, start, days=10)
+    # NULL を含む行（旧実装では誤差 None、降水は 0 扱い）
+    conn = database.get_connection()
+    with conn:
+        conn.execute("UPDATE forecast_archive SET temp_max = NULL, precipitation = NULL "
+                     "WHERE spot_name = ? AND days_ahead = 2", (spots[0]["name"],))
+        conn.execute("DELETE FROM forecast_archive WHERE spot_name = ? AND days_ahead = 5", (spots[1]["name"],))
+    conn.close()
+    target = start + timedelta(days=3)
+
+    stats = analyzer.analyze_accuracy(target, spots)
+
+    expected = _reference_rows(analyzer, spots, target)
+    conn = sqlite3.connect(database.DB_PATH)
+    got = {
+        (r[0], r[1]): tuple(r[2:])
+        for r in conn.execute("""
+            SELECT spot_name, days_ahead, temp_max_error, temp_min_error, humidity_error, wind_error,
+                   precipitation_forecast, precipitation_actual, precipitation_hit, drying_forecast_score,
+                   drying_possible_forecast, drying_possible_actual, forecast_correct
+            FROM accuracy_analysis WHERE target_date = ?
+        """, (target.isoformat(),))
+    }
+    conn.close()
+    assert got.keys() == expected.keys()
+    for key in expected:
+        assert got[key] == pytest.approx(expected[key], nan_ok=True), key
+
+    assert stats["successful_analyses"] == stats["total_analyses"] == 23
+    assert stats["failed_analyses"] == 1
+    for days_ahead, entry in stats["by_days_ahead"].items():
+        rows = [v for (s, d), v in expected.items() if d == days_ahead]
+        assert entry == {"count": len(rows), "correct_forecasts": sum(r[10] for r in rows),
+                         "precipitation_hits": sum(r[6] for r in rows)}
+
+
+def test_analyze_accuracy_without_actual_is_error(store):
+    stats = store["accuracy_analyzer"].analyze_accuracy(date(2026, 7, 1), [{"name": "H_A"}])
+
+    assert stats["status"] == "error"
+
+
+def test_summarize_accuracy_grouped_metrics(store):
+    analyzer, bench, database = store["accuracy_analyzer"], store["benchmark_store"], store["database"]
+    spots = bench.synthetic_spots(3)
+    start = date(2026, 7, 1)
+    bench.seed_synthetic_year(spots, start, days=5)
+
+    summary = analyzer.summarize_accuracy(start, start + timedelta(days=4), spots[:2])
+
+    conn = sqlite3.connect(database.DB_PATH)
+    pairs = conn.execute("""
+        SELECT f.temp_max, a.temp_max FROM forecast_archive f
+        JOIN amedas_actual a ON a.observation_date = f.target_date
+        WHERE f.days_ahead = 3 AND f.spot_name IN (?, ?)
+    """, (spots[0]["name"], spots[1]["name"])).fetchall()
+    conn.close()
+    assert sorted(summary) == [1, 2, 3, 4, 5, 6]
+    assert summary[3]["count"] == len(pairs) == 10
+    assert summary[3]["temp_max_mae"] == pytest.approx(sum(abs(f - a) for f, a in pairs) / len(pairs))
+    assert summary[3]["temp_max_bias"] == pytest.approx(sum(f - a for f, a in pairs) / len(pairs))
+    assert 0.0 <= summary[3]["drying_hit_rate"] <= 1.0
@@ -0,0 +1,105 @@
+"""
+Unit tests for isoline_grid.py (IsolineAnalysisEngine grid geometry):
+  - ObservationLayout.interpolate() == griddata cubic → linear → nearest
+  - quality_mask() == the previous per-cell distance loop
+  - terrain_elevation_raster() == per-cell get_terrain_at_point(), cached on
+    disk and rebuilt when the terrain DB changes
+
+Run from project root:
+    python -m pytest tests/test_isoline_grid.py -v
+"""
+import numpy as np
+import pytest
+from scipy.interpolate import griddata
+
+from isoline_grid import ObservationLayout, terrain_elevation_raster
+
+pytest.importorskip("matplotlib")
+from terrain_database import RishiriTerrainDatabase, TerrainPoint  # noqa: E402
+
+
+def _grid(step=0.01):
+    lats = np.arange(45.05, 45.28, step)
+    lons = np.arange(141.13, 141.33, step)
+    return np.meshgrid(lats, lons)  # IsolineAnalysisEngine._create_analysis_grid と同じ向き
+
+
+def _stations(n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(45.08, 45.25, n), rng.uniform(141.15, 141.30, n)
+
+
+def _legacy_interpolate(lats_obs, lons_obs, values, lat_grid, lon_grid):
+    points_obs = np.column_stack((lats_obs, lons_obs))
+    grid_points = np.column_stack((lat_grid.ravel(), lon_grid.ravel()))
+    interpolated = griddata(points_obs, values, grid_points, method='cubic')
+    nan_mask = np.isnan(interpolated)
+    if np.any(nan_mask):
+        interpolated[nan_mask] = griddata(points_obs, values, grid_points, method='linear')[nan_mask]
+    nan_mask = np.isnan(interpolated)
+    if np.any(nan_mask):
+        interpolated[nan_mask] = griddata(points_obs, values, grid_points, method='nearest')[nan_mask]
+    return interpolated.reshape(lat_grid.shape)
+
+
+def _legacy_quality_mask(lat_grid, lon_grid, lats_obs, lons_obs):
+    quality_mask = np.ones_like(lat_grid)
+    for i in range(lat_grid.shape[0]):
+        for j in range(lat_grid.shape[1]):
+            min_distance = np.min(np.sqrt((lats_obs - lat_grid[i, j]) ** 2 + (lons_obs - lon_grid[i, j]) ** 2))
+            if min_distance > 0.05:
+                quality_mask[i, j] = max(0.1, 1.0 - (min_distance - 0.05) * 2)
+    return quality_mask
+
+
+def test_layout_matches_griddata_for_every_parameter():
+    lat_grid, lon_grid = _grid()
+    lats_obs, lons_obs = _stations()
+    layout = ObservationLayout(lats_obs, lons_obs, lat_grid, lon_grid)
+    rng = np.random.default_rng(1)
+    for values in (rng.normal(15, 3, 12), rng.uniform(40, 100, 12), rng.normal(1010, 4, 12)):
+        np.testing.assert_allclose(layout.interpolate(values),
+                                   _legacy_interpolate(lats_obs, lons_obs, values, lat_grid, lon_grid),
+                                   rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(layout.quality_mask(), _legacy_quality_mask(lat_grid, lon_grid, lats_obs, lons_obs))
+
+    # 三角形分割できない配置（2点）は最近傍だけ
+    pair = ObservationLayout([45.1, 45.2], [141.2, 141.25], lat_grid, lon_grid)
+    out = pair.interpolate([1.0, 2.0])
+    assert set(np.unique(out)) == {1.0, 2.0}
+
+
+@pytest.fixture
+def terrain_db(tmp_path):
+    db = RishiriTerrainDatabase(str(tmp_path / "terrain.db"))
+    rng = np.random.default_rng(0)
+    db._save_terrain_points([
+        TerrainPoint(latitude=float(lat), longitude=float(lon), elevation=float(el), land_use="草地",
+                     distance_to_coast=1.0, slope=2.0, aspect=90.0, theta=0.0)
+        for lat, lon, el in zip(rng.uniform(45.05, 45.28, 300), rng.uniform(141.13, 141.33, 300),
+                                rng.uniform(0, 1700, 300))
+    ])
+    return db
+
+
+def test_terrain_raster_cached_and_invalidated(terrain_db, tmp_path, monkeypatch):
+    lat_grid, lon_grid = _grid(0.02)
+    cache_dir = str(tmp_path / "cache")
+    raster = terrain_elevation_raster(terrain_db, lat_grid, lon_grid, cache_dir)
+    expected = [[terrain_db.get_terrain_at_point(lat_grid[i, j], lon_grid[i, j]).elevation
+                 for j in range(lat_grid.shape[1])] for i in range(lat_grid.shape[0])]
+    np.testing.assert_array_equal(raster, expected)
+    assert len(list((tmp_path / "cache").glob("terrain_*.npz"))) == 1
+
+    # 2回目はディスクから（DB を引かない）
+    monkeypatch.setattr(terrain_db, "get_elevations_at_points", lambda *a: pytest.fail("cache miss"))
+    np.testing.assert_array_equal(terrain_elevation_raster(terrain_db, lat_grid, lon_grid, cache_dir), raster)
+    monkeypatch.undo()
+
+    # DB が書き換わったら作り直す
+    terrain_db._save_terrain_points([TerrainPoint(45.15, 141.2, 5.0, "草地", 1.0, 0.0, 0.0, 0.0)])
+    rebuilt = terrain_elevation_raster(terrain_db, lat_grid, lon_grid, cache_dir)
+    assert not np.array_equal(rebuilt, raster)
+
+    empty = RishiriTerrainDatabase(str(tmp_path / "empty.db"))
+    assert np.isnan(terrain_elevation_raster(empty, lat_grid, lon_grid, None)).all()
@@ -0,0 +1,262 @@
+"""
+Unit tests for job_scheduler.py (one leader-elected scheduler for start.py and
+the notification systems):
+  - triggers: daily JST times, aligned intervals inside an hour window
+  - only the lease holder runs leader_only jobs; a follower takes over after
+    the leader stops renewing and still runs a job due within misfire_grace
+  - each heartbeat tick is a single pipelined Redis request
+  - misfire, retry (attempt=), jitter bounds, priority order, per-job history
+  - the runner thread never overlaps two jobs
+  - start.py / notification systems register on the shared scheduler
+
+Run from project root:
+    python -m pytest tests/test_job_scheduler.py -v
+"""
+import random
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import job_scheduler
+from job_scheduler import JST, DailyAt, Every, JobScheduler
+from upstream_stubs import RedisRestEmulator
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _ts(text):
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S").replace(tzinfo=JST).timestamp()
+
+
+def _jst(ts):
+    return datetime.fromtimestamp(ts, JST).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _pipeline(redis):
+    return lambda commands: [redis._reply(c).get("result") for c in commands]
+
+
+def test_triggers():
+    daily = DailyAt(16, 20)
+    assert _jst(daily.next_after(_ts("2026-07-01 09:00:00"))) == "2026-07-01 16:20:00"
+    assert _jst(daily.next_after(_ts("2026-07-01 16:20:00"))) == "2026-07-02 16:20:00"
+    assert str(DailyAt.parse("01:30")) == "daily@01:30"
+
+    nowcast = Every(600, hours=(4, 16))
+    assert _jst(nowcast.next_after(_ts("2026-07-01 04:03:10"))) == "2026-07-01 04:10:00"
+    assert _jst(nowcast.next_after(_ts("2026-07-01 16:50:00"))) == "2026-07-02 04:00:00"
+    assert _jst(nowcast.next_after(_ts("2026-07-01 02:00:00"))) == "2026-07-01 04:00:00"
+    assert Every(900, aligned=False).next_after(100.0) == 1000.0
+    with pytest.raises(ValueError):
+        Every(0)
+
+
+def test_leader_election_and_failover(tmp_path):
+    clock = Clock(_ts("2026-07-01 15:59:00"))
+    redis = RedisRestEmulator(clock=clock)
+    a = JobScheduler(redis_pipeline=_pipeline(redis), lease_seconds=30, clock=clock, owner="a",
+                     lock_path=str(tmp_path / "l"))
+    b = JobScheduler(redis_pipeline=_pipeline(redis), lease_seconds=30, clock=clock, owner="b",
+                     lock_path=str(tmp_path / "l"))
+    sent = []
+    for sched in (a, b):
+        sched.add_job("line-evening", lambda s=sched: sent.append(s.owner), DailyAt(16, 0), misfire_grace=1800)
+        sched.add_job("local", lambda s=sched: sent.append(f"local-{s.owner}"), DailyAt(16, 0), leader_only=False)
+
+    assert a.heartbeat() and not b.heartbeat()
+    assert redis.data["scheduler:leader"] == "a"
+    clock.now = _ts("2026-07-01 15:59:20")
+    assert a.heartbeat()  # 延長
+    assert redis.expiry["scheduler:leader"] == pytest.approx(clock.now + 30)
+
+    clock.now = _ts("2026-07-01 16:00:00")
+    assert a.heartbeat() and not b.heartbeat()
+    assert [r["job"] for r in a.run_pending()] == ["line-evening", "local"]
+    assert [r["job"] for r in b.run_pending()] == ["local"]  # フォロワーは保留
+    assert sent == ["a", "local-a", "local-b"]
+
+    # a が落ちる（更新が止まる）→ リース失効後に b が引き継ぐ
+    b.add_job("integrity-check", lambda: sent.append("b-integrity"), DailyAt(16, 1), misfire_grace=600)
+    clock.now = _ts("2026-07-01 16:01:00")
+    assert b.run_pending() == [] and not b.is_leader()
+    clock.now = _ts("2026-07-01 16:01:31")
+    assert b.heartbeat() and redis.data["scheduler:leader"] == "b"
+    # 16:00 の回は a が実行済み（scheduler:run の記録）→ 繰り返さない
+    assert [(r["job"], r["status"]) for r in b.run_pending()] == [("line-evening", "standby"),
+                                                                   ("integrity-check", "ok")]
+    assert sent == ["a", "local-a", "local-b", "b-integrity"]
+    assert not a.heartbeat()
+
+    b.release()
+    assert "scheduler:leader" not in redis.data and not b.is_leader()
+    status = a.status()
+    assert status["owner"] == "a" and not status["leader"]
+    line = next(j for j in status["jobs"] if j["name"] == "line-evening")
+    assert line["runs"] == 1 and line["last"]["status"] == "ok"
+    assert line["next_run"].startswith("2026-07-02T16:00:00")
+
+
+def test_heartbeat_is_one_request_per_tick(tmp_path):
+    clock = Clock(_ts("2026-07-01 00:00:00"))
+    redis = RedisRestEmulator(clock=clock)
+    calls = []
+
+    def pipeline(commands):
+        calls.append([c[0] for c in commands])
+        return _pipeline(redis)(commands)
+
+    leader = JobScheduler(redis_pipeline=pipeline, clock=clock, owner="a", lock_path=str(tmp_path / "l"))
+    follower = JobScheduler(redis_pipeline=pipeline, clock=clock, owner="b", lock_path=str(tmp_path / "l"))
+    assert leader.heartbeat_interval == 40
+    ticks = int(3600 / leader.heartbeat_interval)
+    for _ in range(ticks):
+        assert leader.heartbeat() and not follower.heartbeat()
+        clock.now += leader.heartbeat_interval
+    assert redis.expiry["scheduler:leader"] > clock.now
+    # 1 tick = 1 リクエスト。延長 (EXPIRE) は保持中のリーダーだけ
+    assert len(calls) == 2 * ticks
+    assert calls[-2:] == [["SET", "GET", "EXPIRE"], ["SET", "GET"]]
+    assert redis.commands["SET"] == redis.commands["GET"] == 2 * ticks
+    assert redis.commands["EXPIRE"] == ticks - 1
+
+
+def test_file_lock_fallback_without_redis(tmp_path):
+    lock = str(tmp_path / "leader.lock")
+    a = JobScheduler(lock_path=lock, owner="a")
+    b = JobScheduler(lock_path=lock, owner="b")
+    assert a.heartbeat() and not b.heartbeat()
+    a.release()
+    assert b.heartbeat()
+    b.release()
+
+    # Redis が落ちている間はファイルロックに退避
+    down = JobScheduler(redis_pipeline=lambda cmds: None, lock_path=lock)
+    assert down.heartbeat() and down.status()["lease_source"] == "file"
+    down.release()
+
+
+def test_misfire_retry_and_history(tmp_path):
+    clock = Clock(_ts("2026-07-01 02:59:00"))
+    sched = JobScheduler(clock=clock, lock_path=str(tmp_path / "l"))
+    attempts = []
+
+    def amedas(attempt):
+        attempts.append(attempt)
+        return attempt > 1
+
+    sched.add_job("amedas", amedas, DailyAt(3, 0), retries=1, retry_delay=1800)
+    sched.add_job("integrity", lambda: 1 / 0, DailyAt(3, 0), priority=200)
+
+    clock.now = _ts("2026-07-01 03:00:00")
+    assert sched.heartbeat()  # リースは lease_seconds で切れる → 実行前に更新
+    assert [(r["job"], r["status"]) for r in sched.run_pending()] == [("amedas", "retry"), ("integrity", "failed")]
+    clock.now = _ts("2026-07-01 03:30:00")
+    assert sched.heartbeat()
+    assert [(r["job"], r["status"], r["attempt"]) for r in sched.run_pending()] == [("amedas", "ok", 2)]
+    assert attempts == [1, 2]
+    assert "ZeroDivisionError" in sched.get_job("integrity").history[-1]["error"]
+
+    # ホストが眠っていて大幅に遅れた回は捨て、翌日に回す
+    clock.now = _ts("2026-07-02 03:20:00")
+    sched.heartbeat()
+    records = sched.run_pending()
+    assert {r["status"] for r in records} == {"misfired"}
+    assert attempts == [1, 2]
+    job = sched.get_job("amedas")
+    assert [h["status"] for h in job.history] == ["retry", "ok", "misfired"]
+    assert job.runs == 2 and job.failures == 1
+    assert _jst(job.next_run) == "2026-07-03 03:00:00"
+
+
+def test_jitter_and_priority(tmp_path):
+    clock = Clock(_ts("2026-07-01 03:00:00"))
+    sched = JobScheduler(clock=clock, rng=random.Random(7), lock_path=str(tmp_path / "l"))
+    base = _ts("2026-07-01 16:00:00")
+    delays = [sched.add_job(f"j{i}", lambda: None, DailyAt(16, 0), jitter=120).next_run - base for i in range(50)]
+    assert all(0 <= d <= 120 for d in delays) and len(set(delays)) > 40
+
+    order = []
+    sched = JobScheduler(clock=clock, lock_path=str(tmp_path / "l2"))
+    for name, priority in (("snapshot", 40), ("line", 10), ("nowcast", 20)):
+        sched.add_job(name, lambda n=name: order.append(n), DailyAt(16, 0), priority=priority)
+    sched.remove_job("nowcast")
+    clock.now = base
+    sched.heartbeat()
+    sched.run_pending()
+    assert order == ["line", "snapshot"]
+
+
+def test_runner_thread_never_overlaps(tmp_path):
+    sched = JobScheduler(lock_path=str(tmp_path / "l"))
+    active, peak, runs = [0], [0], []
+    guard = threading.Lock()
+
+    def heavy(name):
+        with guard:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with guard:
+            active[0] -= 1
+        runs.append(name)
+
+    for name in ("nowcast", "snapshot", "integrity"):
+        sched.add_job(name, lambda n=name: heavy(n), Every(0.1), leader_only=False)
+    assert sched.start() and not sched.start()
+    deadline = time.time() + 5
+    while len(runs) < 9 and time.time() < deadline:
+        time.sleep(0.02)
+    sched.stop()
+    assert len(runs) >= 9 and peak[0] == 1
+
+
+def test_start_and_notification_systems_share_scheduler(tmp_path, monkeypatch):
+    import start
+
+    sched = JobScheduler(lock_path=str(tmp_path / "l"))
+    monkeypatch.setattr(sched, "start", lambda: True)
+    monkeypatch.setattr(job_scheduler, "_default_scheduler", sched)
+    monkeypatch.setattr(start, "default_scheduler", lambda: sched)
+    start._start_background_threads()
+    jobs = {j["name"]: j for j in sched.status()["jobs"]}
+    assert set(jobs) == {"amedas", "line-evening", "line-morning", "forecast-snapshot", "integrity-check",
+                         "nowcast-observation", "warm-start-snapshot"}
+    assert not jobs["warm-start-snapshot"]["leader_only"] and jobs["line-evening"]["leader_only"]
+    assert jobs["line-morning"]["trigger"] == "daily@01:30"
+
+    monkeypatch.delenv("LINE_ADMIN_NOTIFY_SECRET", raising=False)
+    resp = start.app.test_client().get("/api/scheduler/status")
+    assert resp.status_code == 200 and len(resp.get_json()["jobs"]) == 7
+    monkeypatch.setenv("RENDER", "true")  # 本番で秘密未設定なら閉じる
+    assert start.app.test_client().get("/api/scheduler/status").status_code == 503
+    monkeypatch.delenv("RENDER")
+    monkeypatch.setenv("LINE_ADMIN_NOTIFY_SECRET", "s3cret")
+    client = start.app.test_client()
+    assert client.get("/api/scheduler/status", headers={"X-Admin-Secret": "wrong"}).status_code == 401
+    assert client.get("/api/scheduler/status", headers={"X-Admin-Secret": "s3cret"}).status_code == 200
+
+    # 通知システムは自分のグループだけを入れ替える（schedule.clear() で他を消さない）
+    monkeypatch.chdir(tmp_path)
+    from notification_system import NotificationSystem
+    from personal_notification_system import PersonalNotificationSystem
+    notifier = NotificationSystem()
+    personal = PersonalNotificationSystem()
+    assert len(sched.status()["jobs"]) == 7  # 開始前は登録しない
+    notifier.start_scheduler()
+    personal.start_notification_service()
+    names = {j["name"] for j in sched.status()["jobs"]}
+    assert "notification:daily_forecast" in names and "personal:fog_alerts" in names
+    assert notifier.update_notification_time("daily_forecast", "15:30")
+    assert str(sched.get_job("notification:daily_forecast").trigger) == "daily@15:30"
+    assert "personal:fog_alerts" in {j["name"] for j in sched.status()["jobs"]}
+    personal.stop_notification_service()
+    notifier.stop_scheduler()
+    assert len(sched.status()["jobs"]) == 7
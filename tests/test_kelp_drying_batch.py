@@ -0,0 +1,140 @@
+"""
+Golden tests for the multi-spot drying engine in kelp_drying_model.py:
+  - simulate_drying_batch() (NumPy and the numba-compatible loop kernel)
+    == the scalar per-hour loop simulate_drying_process() used before
+  - simulate_drying_process() wrapper keeps its row format
+  - drying_condition_scores() == evaluate_drying_conditions() scores
+
+Run from project root:
+    python -m pytest tests/test_kelp_drying_batch.py -v
+"""
+import math
+
+import numpy as np
+import pytest
+
+import kelp_drying_model
+from kelp_drying_model import KelpDryingModel, drying_condition_scores, simulate_drying_batch
+
+
+def _scalar_reference(model, weather_data, initial=300.0, target=15.0):
+    """simulate_drying_process() before vectorization."""
+    results = []
+    current = initial
+    total_time = 0
+    for i, data in enumerate(weather_data):
+        temp, humidity, wind = data['temperature'], data['relative_humidity'], data['wind_speed']
+        time_step = data.get('time_step', 3600)
+        equilibrium_water = max(8.0, 15.0 - temp * 0.1)
+        free_water = max(0, current - equilibrium_water)
+        drying_rate = model.calculate_drying_rate(temp, humidity, wind, free_water)
+        water_loss = drying_rate * time_step
+        current = max(target, current - water_loss * 100)
+        results.append({
+            'time': total_time, 'hour': i, 'temperature': temp, 'humidity': humidity, 'wind_speed': wind,
+            'water_content': current, 'free_water_content': free_water, 'drying_rate': drying_rate,
+            'water_loss': water_loss, 'drying_completed': current <= target,
+        })
+        total_time += time_step / 3600
+        if current <= target:
+            break
+    return results
+
+
+def _weather(n_spots=60, n_hours=13, seed=0):
+    rng = np.random.default_rng(seed)
+    temperature = rng.uniform(8, 30, (n_spots, n_hours))
+    humidity = rng.uniform(35, 100, (n_spots, n_hours))
+    wind = rng.uniform(0, 12, (n_spots, n_hours))
+    # 半数は高湿・無風（乾燥が何時間も続く／終わらない干場）
+    half = n_spots // 2
+    humidity[:half] = rng.uniform(97, 100, (half, n_hours))
+    wind[:half] *= 0.01
+    return temperature, humidity, wind
+
+
+def _rows(temperature, humidity, wind, i, time_step=3600):
+    return [{'temperature': float(t), 'relative_humidity': float(h), 'wind_speed': float(w), 'time_step': time_step}
+            for t, h, w in zip(temperature[i], humidity[i], wind[i])]
+
+
+@pytest.mark.parametrize("initial,target", [(28.0, 15.0), (24.0, 18.0), (300.0, 15.0)])
+def test_batch_matches_scalar_loop(initial, target):
+    model = KelpDryingModel()
+    temperature, humidity, wind = _weather()
+
+    batch = simulate_drying_batch(temperature, humidity, wind, initial_water_content=initial,
+                                  target_water_content=target, backend="numpy")
+
+    for i in range(len(temperature)):
+        ref = _scalar_reference(model, _rows(temperature, humidity, wind, i), initial, target)
+        n = len(ref)
+        assert batch['steps'][i] == n
+        for key in ('water_content', 'free_water_content', 'drying_rate', 'water_loss'):
+            np.testing.assert_allclose(batch[key][i, :n], [r[key] for r in ref], rtol=1e-12, atol=1e-15)
+            assert np.isnan(batch[key][i, n:]).all()
+        assert batch['final_water_content'][i] == pytest.approx(ref[-1]['water_content'], rel=1e-12)
+        expected_hour = next((r['hour'] for r in ref if r['drying_completed']), -1)
+        assert batch['completed_hour'][i] == expected_hour
+
+
+def test_loop_kernel_matches_numpy_backend():
+    temperature, humidity, wind = _weather(seed=4)
+    numpy_result = simulate_drying_batch(temperature, humidity, wind, backend="numpy")
+
+    # numba 無しでも JIT 対象カーネルを素の Python で検証
+    humidity_gap = (kelp_drying_model.wet_bulb_saturation_humidity_array(temperature, humidity) -
+                    kelp_drying_model.absolute_humidity_array(temperature, humidity))
+    wind_factor = (0.159 * wind + 0.0132) / 0.050
+    outs = [np.full(temperature.shape, np.nan) for _ in range(4)]
+    steps = np.zeros(len(temperature), dtype=np.int64)
+    kelp_drying_model._advance_loops(temperature, humidity_gap, wind_factor, np.full(temperature.shape, 3600.0),
+                                     300.0, 15.0, *outs, steps)
+
+    np.testing.assert_array_equal(steps, numpy_result['steps'])
+    for out, key in zip(outs, ('water_content', 'free_water_content', 'drying_rate', 'water_loss')):
+        np.testing.assert_allclose(out, numpy_result[key], rtol=1e-12, equal_nan=True)
+
+
+def test_numba_backend_requires_numba(monkeypatch):
+    monkeypatch.setattr(kelp_drying_model, "_advance_jit", None)
+
+    with pytest.raises(RuntimeError):
+        simulate_drying_batch([[20.0]], [[60.0]], [[3.0]], backend="numba")
+
+
+def test_wrapper_keeps_row_format():
+    model = KelpDryingModel()
+    weather = [{'temperature': 20 + 5 * math.sin(h * math.pi / 6),
+                'relative_humidity': 70 - 10 * math.sin(h * math.pi / 6),
+                'wind_speed': 2.0 + 1.0 * math.sin(h * math.pi / 4),
+                'time_step': 1800 if h % 2 else 3600} for h in range(12)]
+
+    got = model.simulate_drying_process(weather)
+
+    expected = _scalar_reference(model, weather)
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g.keys() == e.keys()
+        assert g['time'] == e['time'] and g['hour'] == e['hour']
+        assert g['drying_completed'] == e['drying_completed']
+        for key in ('water_content', 'free_water_content', 'drying_rate', 'water_loss'):
+            assert g[key] == pytest.approx(e[key], rel=1e-12, abs=1e-15)
+            assert type(g[key]) is float
+    assert model.simulate_drying_process([]) == []
+
+
+def test_condition_scores_match_evaluate(monkeypatch):
+    model = KelpDryingModel()
+    monkeypatch.setattr(model, "simulate_drying_process",
+                        lambda weather: KelpDryingModel.simulate_drying_process(model, weather, 28.0, 15.0))
+    temperature, humidity, wind = _weather(n_spots=40, seed=7)
+
+    batch = simulate_drying_batch(temperature, humidity, wind, initial_water_content=28.0,
+                                  target_water_content=15.0)
+    scores = drying_condition_scores(batch['completed_hour'], batch['final_water_content'])
+
+    expected = [model.evaluate_drying_conditions(_rows(temperature, humidity, wind, i))['score']
+                for i in range(len(temperature))]
+    assert scores.tolist() == expected
+    assert len(set(expected)) >= 3
@@ -0,0 +1,133 @@
+"""
+Unit tests for line_image_cache.py (cached LINE rich-menu rendering):
+  - memory → disk → Redis → render lookup; lower-tier hits fill the tiers above
+  - a layout or font change is a new cache key (re-render)
+  - palette-quantized PNG is smaller than the plain RGB PNG
+  - fonts are loaded once per (path, size); the first candidate that loads is
+    picked (a present but unreadable file is skipped)
+  - generate_rich_menu_image() renders once and serves the cache afterwards
+
+Run from project root:
+    python -m pytest tests/test_line_image_cache.py -v
+"""
+import io
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image, ImageDraw  # noqa: E402
+
+import line_image_cache  # noqa: E402
+from line_image_cache import (  # noqa: E402
+    ImageRenderCache, load_font, optimize_png, render_key, resolve_font_path,
+)
+
+
+def _buttons():
+    img = Image.new("RGB", (600, 400), "#0f172a")
+    draw = ImageDraw.Draw(img)
+    for i, color in enumerate(("#1d4ed8", "#15803d", "#7c3aed")):
+        draw.rounded_rectangle([i * 200 + 8, 8, i * 200 + 192, 392], radius=20, fill=color, outline="#e2e8f0", width=4)
+        draw.text((i * 200 + 60, 180), "label", fill="#ffffff", font=load_font(None, 40))
+    return img
+
+
+class Renderer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return _buttons()
+
+
+def test_memory_disk_redis_tiers(tmp_path):
+    store = {}
+    kw = dict(redis_get=store.get, redis_set=lambda k, v, ttl: store.__setitem__(k, v))
+    render = Renderer()
+    spec = {"size": [600, 400], "buttons": ["a", "b", "c"]}
+
+    cache = ImageRenderCache(str(tmp_path / "a"), **kw)
+    data, source = cache.get_or_render("menu", spec, render)
+    assert source == "render" and render.calls == 1
+    assert cache.get_or_render("menu", spec, render) == (data, "memory")
+    assert len(store) == 1 and os.listdir(tmp_path / "a") == [f"menu_{render_key('menu', spec)}.png"]
+
+    # 再起動（メモリは空）→ ディスク
+    assert ImageRenderCache(str(tmp_path / "a"), **kw).get_or_render("menu", spec, render) == (data, "disk")
+    # 別インスタンス（ディスクも空）→ Redis、ディスクを埋める
+    other = ImageRenderCache(str(tmp_path / "b"), **kw)
+    assert other.get_or_render("menu", spec, render) == (data, "redis")
+    assert os.listdir(tmp_path / "b")
+    assert other.stats == {"memory": 0, "disk": 0, "redis": 1, "render": 0}
+    assert render.calls == 1
+
+
+def test_spec_or_font_change_rerenders(tmp_path):
+    font = tmp_path / "font.ttf"
+    font.write_bytes(b"v1")
+    cache = ImageRenderCache(str(tmp_path / "c"))
+    render = Renderer()
+    spec = {"buttons": ["a"]}
+    cache.get_or_render("menu", spec, render, assets=[str(font)])
+    cache.get_or_render("menu", {"buttons": ["b"]}, render, assets=[str(font)])
+    assert render.calls == 2
+
+    key = render_key("menu", spec, [str(font)])
+    font.write_bytes(b"v2-larger")
+    assert render_key("menu", spec, [str(font)]) != key
+    assert cache.get_or_render("menu", spec, render, assets=[str(font)])[1] == "render"
+    assert render.calls == 3
+
+
+def test_quantized_png_is_smaller():
+    img = _buttons()
+    plain = io.BytesIO()
+    img.save(plain, "PNG", optimize=True)
+    data = optimize_png(img)
+    assert len(data) < len(plain.getvalue())
+    out = Image.open(io.BytesIO(data))
+    assert out.mode == "P" and out.size == img.size
+
+
+def test_load_font_is_cached():
+    load_font.cache_clear()
+    path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    assert load_font(path, 30) is load_font(path, 30)
+    assert load_font(path, 30) is not load_font(path, 31)
+    assert load_font.cache_info().misses == 2
+
+
+def test_resolve_font_path_skips_unloadable_files(tmp_path):
+    broken = tmp_path / "broken.ttf"
+    broken.write_bytes(b"not a font")
+    good = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    if not os.path.isfile(good):
+        pytest.skip("DejaVu font not installed")
+    assert resolve_font_path([str(tmp_path / "missing.ttf"), str(broken), good]) == good
+    assert resolve_font_path([str(broken)]) is None
+
+
+def test_generate_rich_menu_image_uses_cache(tmp_path, monkeypatch):
+    import line_integration as li
+
+    monkeypatch.setattr(li, "_upstash_available", lambda: False)
+    monkeypatch.setattr(li, "_line_image_cache", ImageRenderCache(str(tmp_path / "cache")))
+    calls = []
+    original = li._render_rich_menu
+    monkeypatch.setattr(li, "_render_rich_menu", lambda font: calls.append(font) or original(font))
+
+    path = tmp_path / "icons" / "rich_menu.png"
+    assert li.generate_rich_menu_image(str(path))
+    mtime = os.stat(path).st_mtime_ns
+    assert li.generate_rich_menu_image(str(path))
+    assert len(calls) == 1 and os.stat(path).st_mtime_ns == mtime  # 同じ内容は書き直さない
+    assert li._line_image_cache.stats["memory"] == 1
+    assert Image.open(path).size == (2500, 1686)
+
+    # ボタン文言を変えたら描き直す
+    monkeypatch.setattr(li, "_RICH_MENU_BUTTONS", li._RICH_MENU_BUTTONS[:-1] + [(2, 1, "#0d9488", "設定", "")])
+    assert li.rich_menu_image_bytes() != path.read_bytes()
+    assert len(calls) == 2
+    assert line_image_cache.DEFAULT_CACHE_DIR.endswith("line_image_cache")
@@ -0,0 +1,187 @@
+"""
+Unit tests for monitoring.py:
+  - LatencyHistogram percentiles (bucket interpolation, overflow bucket)
+  - /metrics: per-endpoint p50/p95/p99 and a real uptime
+  - /metrics and /health/detailed behind the auth hook (admin secret in start.py);
+    only slow and 4xx/5xx requests are logged unless LOG_ALL_REQUESTS is set
+  - instrument_http(): Open-Meteo / Upstash / JMA timing from requests and urllib
+  - SlowRequestProfiler writes collapsed stacks only for slow requests
+
+Run from project root:
+    python -m pytest tests/test_monitoring.py -v
+"""
+import io
+import time
+import urllib.request
+import urllib.response
+
+import pytest
+import requests
+from flask import Flask, request
+
+import monitoring
+from monitoring import LatencyHistogram, MonitoringManager, SlowRequestProfiler
+
+
+@pytest.fixture
+def manager():
+    monitoring.uninstrument_http()
+    mgr = MonitoringManager()
+    monitoring.instrument_http(mgr)
+    yield mgr
+    monitoring.uninstrument_http()
+
+
+def _app(mgr, profiler=None, **kwargs):
+    app = Flask(__name__)
+
+    @app.route('/fast')
+    def fast():
+        return 'ok'
+
+    @app.route('/slow')
+    def slow():
+        _busy_wait_for_profile(0.08)
+        return 'ok'
+
+    @app.route('/missing')
+    def missing():
+        return 'no', 404
+
+    mgr.init_app(app, configure_logging=False, profiler=profiler, **kwargs)
+    return app
+
+
+def _busy_wait_for_profile(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(buckets=(10, 20, 50, 100))
+    for value in [5] * 50 + [15] * 40 + [80] * 9 + [500]:
+        histogram.observe(value)
+
+    assert histogram.percentile(50) == pytest.approx(10.0)
+    assert 10 < histogram.percentile(90) <= 20
+    assert 50 < histogram.percentile(95) <= 80
+    assert histogram.percentile(100) == 500
+    assert histogram.count_above(20) == 10
+    stats = histogram.to_dict()
+    assert stats['count'] == 100 and stats['max_ms'] == 500 and stats['buckets']['le_inf'] == 1
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_metrics_report_percentiles_and_uptime(manager):
+    app = _app(manager)
+    client = app.test_client()
+    for _ in range(20):
+        client.get('/fast')
+    client.get('/slow')
+
+    manager.started_at -= monitoring.timedelta(seconds=42)
+    metrics = client.get('/metrics').get_json()
+
+    assert metrics['uptime_seconds'] >= 42
+    fast = metrics['endpoints']['fast']
+    assert fast['count'] == 20
+    assert fast['p50_ms'] <= fast['p95_ms'] <= fast['p99_ms'] <= fast['max_ms']
+    assert metrics['endpoints']['slow']['min_ms'] >= 80
+    assert len(manager.response_times['fast']) == 20
+
+
+def test_admin_endpoints_require_auth(manager):
+    def auth():
+        return None if request.headers.get('X-Admin-Secret') == 's' else ('unauthorized', 401)
+
+    client = _app(manager, auth=auth).test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/health/detailed').status_code == 401
+    assert 'endpoints' in client.get('/metrics', headers={'X-Admin-Secret': 's'}).get_json()
+
+
+def test_start_protects_admin_endpoints(monkeypatch):
+    import start
+
+    monkeypatch.setenv('LINE_ADMIN_NOTIFY_SECRET', 'secret')
+    client = start.app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/health/detailed').status_code == 401
+    assert client.get('/metrics', headers={'X-Admin-Secret': 'secret'}).status_code == 200
+
+
+def test_request_logging_only_slow_and_errors(manager, monkeypatch, caplog):
+    monkeypatch.delenv('LOG_ALL_REQUESTS', raising=False)
+    app = _app(manager)
+    client = app.test_client()
+    with caplog.at_level('INFO', logger=app.logger.name):
+        client.get('/fast')
+        client.get('/missing')
+    messages = [r.getMessage() for r in caplog.records]
+    assert not any(m.startswith('Request:') for m in messages)
+    assert any(m.startswith('Client Error:') for m in messages)
+
+    caplog.clear()
+    app = _app(manager, log_all_requests=True)
+    with caplog.at_level('INFO', logger=app.logger.name):
+        app.test_client().get('/fast')
+    assert any(r.getMessage().startswith('Request:') for r in caplog.records)
+
+
+def test_http_layer_records_upstreams(manager, monkeypatch):
+    def fake_send(adapter, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 503 if 'upstash' in request.url else 200
+        response.raw = io.BytesIO(b'{}')
+        response.url = request.url
+        return response
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', fake_send)
+    requests.get('https://api.open-meteo.com/v1/forecast?latitude=45.2')
+    requests.post('https://eu1-demo.upstash.io/pipeline', json=[])
+    requests.get('https://example.com/other')
+
+    class JmaHandler(urllib.request.BaseHandler):
+        handler_order = 100  # 標準の HTTPSHandler より先に応答する
+
+        def https_open(self, req):
+            response = urllib.response.addinfourl(io.BytesIO(b'2026-10-18T12:00:00+09:00'), {}, req.full_url, 200)
+            response.msg = 'OK'
+            return response
+
+    with urllib.request.build_opener(JmaHandler).open('https://www.jma.go.jp/bosai/amedas/data/latest_time.txt') as r:
+        assert r.read().startswith(b'2026')
+
+    assert manager.upstream_latency['open_meteo'].count == 1
+    assert manager.upstream_latency['upstash'].count == 1
+    assert manager.upstream_errors['upstash'] == 1 and 'open_meteo' not in manager.upstream_errors
+    assert manager.upstream_latency['jma'].count == 1 and 'jma' not in manager.upstream_errors
+    assert set(manager.upstream_latency) == {'open_meteo', 'upstash', 'jma'}
+
+
+def test_profiler_dumps_only_slow_requests(manager, tmp_path):
+    profiler = SlowRequestProfiler(threshold_ms=50, output_dir=str(tmp_path), interval=0.002)
+    client = _app(manager, profiler).test_client()
+
+    client.get('/fast')
+    assert list(tmp_path.iterdir()) == []
+
+    client.get('/slow')
+    dumps = list(tmp_path.glob('*.folded'))
+    assert len(dumps) == 1 and 'GET_slow' in dumps[0].name
+    lines = dumps[0].read_text().splitlines()
+    assert any('_busy_wait_for_profile' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert profiler.recent_dumps() == [dumps[0].name]
+
+
+def test_profiler_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv('PROFILE_SLOW_REQUEST_MS', raising=False)
+    assert SlowRequestProfiler.from_env(str(tmp_path)) is None
+
+    monkeypatch.setenv('PROFILE_SLOW_REQUEST_MS', '750')
+    monkeypatch.setenv('PROFILE_SAMPLE_RATE', '0.25')
+    profiler = SlowRequestProfiler.from_env(str(tmp_path))
+    assert profiler.threshold_ms == 750 and profiler.sample_rate == 0.25
+    assert profiler.output_dir == str(tmp_path / 'profiles')
@@ -0,0 +1,135 @@
+"""
+Unit tests for parameter_search.py and the objectives built on it:
+  - grid / random / Latin hypercube candidate generation
+  - sqlite checkpoint: a rerun resumes without calling the objective again
+  - successive halving keeps the best candidate and ends at budget 1.0
+  - pool evaluation == serial evaluation
+  - tuning_accuracy() == the per-record scoring loop it replaces
+
+Run from project root:
+    python -m pytest tests/test_parameter_search.py -v
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import parameter_search
+from parameter_search import SearchRunner, TrialStore, budget_subset, candidate_key, feature_digest
+
+CALLS = []
+
+
+def _objective(features, params, budget):
+    """最適値 a=0.3, b=0.7。budget が小さいほどノイズが乗る"""
+    CALLS.append((candidate_key(params), budget))
+    noise = features["noise"][budget_subset(len(features["noise"]), budget)].mean()
+    return -(params["a"] - 0.3) ** 2 - (params["b"] - 0.7) ** 2 + noise * (1 - budget)
+
+
+@pytest.fixture
+def features():
+    CALLS.clear()
+    return {"noise": np.random.default_rng(0).normal(0, 0.01, 90)}
+
+
+def test_candidate_generators():
+    grid = parameter_search.grid_candidates({"a": [1, 2], "b": ["x", "y", "z"]})
+    assert len(grid) == 6 and {"a": 2, "b": "z"} in grid
+    with pytest.raises(ValueError):
+        parameter_search.grid_candidates({"a": (0.0, 1.0)})
+
+    rand = parameter_search.random_candidates({"a": (0.0, 1.0), "b": [1, 2]}, 50, seed=3)
+    assert rand == parameter_search.random_candidates({"a": (0.0, 1.0), "b": [1, 2]}, 50, seed=3)
+    assert all(0 <= c["a"] < 1 and c["b"] in (1, 2) and type(c["a"]) is float for c in rand)
+
+    lhs = parameter_search.latin_hypercube_candidates({"a": (2.0, 4.0), "b": [10, 20, 30, 40, 50]}, 10, seed=1)
+    bins = sorted(int((c["a"] - 2.0) / 0.2) for c in lhs)
+    assert bins == list(range(10))  # 各区間にちょうど1点
+    assert [c["b"] for c in lhs].count(30) == 2
+
+
+def test_checkpoint_resumes_without_reevaluating(features, tmp_path):
+    space = {"a": (0.0, 1.0), "b": (0.0, 1.0)}
+    path = str(tmp_path / "search.sqlite")
+    with SearchRunner(_objective, features, study="s", checkpoint=path, workers=1) as runner:
+        runner.evaluate(parameter_search.latin_hypercube_candidates(space, 30, seed=0)[:12])
+    assert len(CALLS) == 12
+
+    CALLS.clear()
+    with SearchRunner(_objective, features, study="s", checkpoint=path, workers=1) as runner:
+        trials = runner.evaluate(parameter_search.latin_hypercube_candidates(space, 30, seed=0))
+        assert runner.evaluated == 18
+    assert len(CALLS) == 18
+    assert sum(t.cached for t in trials) == 12
+
+    store = TrialStore(path, "s")
+    assert store.best().score == pytest.approx(max(t.score for t in trials))
+    assert TrialStore(path, "other").best() is None
+    store.close()
+
+
+def test_successive_halving_finds_optimum(features):
+    candidates = [{"a": a, "b": b} for a in np.linspace(0, 1, 9) for b in np.linspace(0, 1, 3)]
+    with SearchRunner(_objective, features, workers=1) as runner:
+        final = runner.successive_halving(candidates, min_budget=1 / 9, eta=3)
+
+    assert final[0].budget == 1.0
+    assert final[0].params == {"a": 0.25, "b": 0.5}
+    budgets = [b for _, b in CALLS]
+    assert budgets.count(1 / 9) == 27 and budgets.count(1 / 3) == 9 and budgets.count(1.0) == 3
+
+
+def test_pool_matches_serial(features, tmp_path):
+    space = {"a": (0.0, 1.0), "b": [0.1, 0.5, 0.7]}
+    candidates = parameter_search.random_candidates(space, 40, seed=5)
+
+    with SearchRunner(_objective, features, workers=1) as serial:
+        expected = serial.evaluate(candidates, budget=0.5)
+    progress = []
+    with SearchRunner(_objective, features, workers=3, checkpoint=str(tmp_path / "p.sqlite"),
+                      progress=lambda done, total: progress.append(done)) as pooled:
+        got = pooled.evaluate(candidates, budget=0.5)
+
+    assert [t.params for t in got] == candidates
+    assert [t.score for t in got] == [t.score for t in expected]
+    assert progress[-1] == 40
+    assert len(TrialStore(str(tmp_path / "p.sqlite"), "default").completed(0.5)) == 40
+
+
+def test_budget_subsets_are_nested():
+    small, large = budget_subset(100, 0.2), budget_subset(100, 0.6)
+    assert len(small) == 20 and len(large) == 60
+    assert set(small) <= set(large)
+    assert budget_subset(100, 1.0).tolist() == list(range(100))
+    assert feature_digest({"x": np.arange(3)}) != feature_digest({"x": np.arange(4)})
+
+
+def test_tuning_accuracy_matches_record_loop():
+    pytest.importorskip("sklearn")
+    pytest.importorskip("aiohttp")
+    import parameter_tuning_system as pts
+
+    records = pd.read_csv("hoshiba_records.csv")
+    records = records[records["result"] != "中止"]
+    spots = pd.read_csv("hoshiba_spots.csv")
+    features = pts.build_tuning_features(records, spots, seed=1)
+
+    tuner = pts.ParameterTuner.__new__(pts.ParameterTuner)
+    tuner.current_params = {"thresholds": {"marginal_to_good": 5.0, "good_to_excellent": 6.8},
+                            "terrain_corrections": {"temperature_coeff": -0.3, "humidity_coastal": 4}}
+    draws = iter(np.column_stack([features["temperature"], features["humidity"], features["wind"]]))
+    correct = 0
+    for draw, success, elevation, coastal in zip(draws, features["success"], features["elevation"],
+                                                  features["coastal"]):
+        temperature, humidity, wind = draw
+        corrected_temp = temperature + -0.3 * (elevation / 100)
+        corrected_humidity = humidity + (4 if coastal else 0)
+        score = (1 - abs(corrected_temp - 20) / 20) * 0.3 + max(0, (100 - corrected_humidity) / 100) * 0.4 \
+            + max(0, min(1, wind / 10)) * 0.3
+        correct += (max(0, min(10, score * 10)) >= 5.0) == success
+
+    flat = pts.flatten_params(tuner.current_params)
+    assert pts.tuning_accuracy(features, flat) == pytest.approx(correct / len(features["success"]) * 100)
+    assert pts.apply_flat_params(tuner.current_params, dict(flat, humidity_coastal=9)) \
+        ["terrain_corrections"]["humidity_coastal"] == 9
+    assert tuner.current_params["terrain_corrections"]["humidity_coastal"] == 4
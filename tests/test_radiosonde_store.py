@@ -0,0 +1,178 @@
+"""
+Unit tests for radiosonde_store.py against a local HTTP stub that serves the
+recorded Wakkanai sounding (radiosonde_sample.txt):
+  - fixed-width parsing (blank dew point etc. → NaN) and columnar .npz cache
+  - bounded per-host concurrency in RadiosondeFetcher
+  - resumable runs: cached / no-data soundings are not requested again
+  - retry on HTTP 503 and Wyoming's "try again later" page
+
+Run from project root:
+    python -m pytest tests/test_radiosonde_store.py -v
+"""
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+import radiosonde_store
+from fetch_radiosonde_batch import fetch_period
+
+SAMPLE = (Path(__file__).resolve().parents[1] / "radiosonde_sample.txt").read_text()
+NO_DATA = "<HTML><BODY>Can't get 47401 Wakkanai Observations at 00Z 05 Aug 2024.</BODY></HTML>"
+
+
+class _Stub:
+    """Recorded soundings by FROM=DDHH; request log and peak concurrency."""
+
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+        self.delay = 0.0
+        self.failures = {}  # FROM -> [status or "busy", ...] served before the real page
+        self.lock = threading.Lock()
+
+    def respond(self, query):
+        key = query["FROM"][0]
+        with self.lock:
+            self.requests.append(key)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            pending = self.failures.get(key)
+            if pending:
+                failure = pending.pop(0)
+                return (200, "Sorry, the server is too busy. Please try again later.") if failure == "busy" \
+                    else (failure, "error")
+            return 200, (NO_DATA if key == "0500" else SAMPLE)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def stub():
+    state = _Stub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = state.respond(parse_qs(urlsplit(self.path).query))
+            payload = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_address[1]}/cgi-bin/sounding"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def _fetcher(stub, tmp_path, **kwargs):
+    options = dict(cache_dir=tmp_path / "cache", url=stub.url, min_interval=0.0, backoff=0.0)
+    options.update(kwargs)
+    return radiosonde_store.RadiosondeFetcher(**options)
+
+
+def test_parse_sounding_keeps_rows_with_blank_columns():
+    profile = radiosonde_store.parse_sounding(SAMPLE)
+
+    assert set(profile) == set(radiosonde_store.COLUMNS)
+    assert profile["pres"][0] == 1007.0 and profile["thte"][0] == 324.6
+    top = int(np.flatnonzero(profile["pres"] == 200.0)[0])
+    assert profile["temp"][top] == -50.1
+    assert np.isnan(profile["dwpt"][top]) and profile["drct"][top] == 310.0
+    assert radiosonde_store.parse_sounding(NO_DATA) is None
+
+
+def test_fetch_range_caches_columnar_profiles(stub, tmp_path):
+    fetcher = _fetcher(stub, tmp_path)
+
+    stats = fetcher.fetch_range("47401", datetime(2024, 8, 1), datetime(2024, 8, 6))
+
+    assert stats == {"cached": 0, "fetched": 5, "missing": 1, "failed": 0}
+    profiles = radiosonde_store.load_profiles(datetime(2024, 8, 1), datetime(2024, 8, 6), hours=(0,),
+                                              cache_dir=tmp_path / "cache")
+    assert sorted(p.day for p in profiles) == [1, 2, 3, 4, 6]
+    expected = radiosonde_store.parse_sounding(SAMPLE)
+    for name in radiosonde_store.COLUMNS:
+        np.testing.assert_array_equal(profiles[datetime(2024, 8, 3)][name], expected[name])
+
+
+def test_concurrency_bounded_per_host(stub, tmp_path):
+    stub.delay = 0.05
+    fetcher = _fetcher(stub, tmp_path, max_workers=8, per_host_concurrency=3)
+
+    fetcher.fetch_range("47401", datetime(2024, 8, 6), datetime(2024, 8, 20))
+
+    assert len(stub.requests) == 15
+    assert 1 < stub.peak <= 3
+
+
+def test_rerun_resumes_without_refetching(stub, tmp_path):
+    _fetcher(stub, tmp_path).fetch_range("47401", datetime(2024, 8, 4), datetime(2024, 8, 5))
+    stub.requests.clear()
+
+    stats = _fetcher(stub, tmp_path).fetch_range("47401", datetime(2024, 8, 4), datetime(2024, 8, 7))
+
+    assert sorted(stub.requests) == ["0600", "0700"]
+    assert stats == {"cached": 1, "fetched": 2, "missing": 1, "failed": 0}
+
+    stub.requests.clear()
+    _fetcher(stub, tmp_path).fetch_range("47401", datetime(2024, 8, 5), datetime(2024, 8, 5), retry_missing=True)
+    assert stub.requests == ["0500"]
+
+
+def test_transient_errors_are_retried(stub, tmp_path):
+    stub.failures = {"0100": [503, "busy"], "0200": [503, 503, 503]}
+    fetcher = _fetcher(stub, tmp_path, retries=2)
+
+    stats = fetcher.fetch_range("47401", datetime(2024, 8, 1), datetime(2024, 8, 2))
+
+    assert stats == {"cached": 0, "fetched": 1, "missing": 0, "failed": 1}
+    assert stub.requests.count("0100") == 3
+    assert stub.requests.count("0200") == 3
+    assert not fetcher.cache.has("47401", datetime(2024, 8, 2))
+    assert "2024080200" not in fetcher.cache.missing("47401")
+
+
+def test_host_politeness_spaces_request_starts():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(round(seconds, 6))
+        now[0] += seconds
+
+    polite = radiosonde_store.HostPoliteness(max_concurrent=1, min_interval=1.5, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        with polite.slot("http://weather.uwyo.edu/cgi-bin/sounding"):
+            now[0] += 0.5
+    with polite.slot("http://other.example/x"):
+        pass
+
+    assert sleeps == [1.0, 1.0]
+
+
+def test_fetch_period_reads_levels_from_cache(stub, tmp_path, capsys):
+    fetcher = _fetcher(stub, tmp_path)
+
+    results = fetch_period(datetime(2024, 8, 4), datetime(2024, 8, 6), fetcher)
+
+    assert [r["date"] for r in results] == ["2024-08-04", "2024-08-06"]
+    assert results[0]["levels"]["500hPa"]["hght"] == 5800.0
+    assert results[0]["levels"]["850hPa"]["temp"] == 14.0
@@ -0,0 +1,236 @@
+"""
+Unit tests for rate_limiter.py (GCRA limiter shared through Redis):
+  - burst of N, then one request per period/N; limits parsed like flask_limiter
+  - blocking is opt-in: by default a rejection on one scope never touches
+    another; with block_after, repeated violations block the client on every
+    scope, the block expires, and Retry-After is the longer of GCRA / block
+  - two workers reconcile through the Upstash REST emulator without a Redis
+    call on the request path; failed syncs are retried
+  - idle buckets send nothing but a rare GET; block keys are per limiter
+    namespace and only limiters that block poll them
+  - the Flask decorator: 429 JSON + Retry-After, ``enabled`` switch, start.py
+
+Run from project root:
+    python -m pytest tests/test_rate_limiter.py -v
+"""
+import pytest
+from flask import Flask
+
+from rate_limiter import RateLimiter, parse_limit
+from upstream_stubs import RedisRestEmulator
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _pipeline(redis, calls=None):
+    def pipeline(commands):
+        if calls is not None:
+            calls.append(len(commands))
+        return [redis._reply(c).get("result") for c in commands]
+    return pipeline
+
+
+def test_parse_limit():
+    assert parse_limit("60 per minute") == (60, 60.0)
+    assert parse_limit("2 per hour") == (2, 3600.0)
+    assert parse_limit("20/minute") == (20, 60.0)
+    assert parse_limit("10 per 5 minutes") == (10, 300.0)
+    for bad in ("per minute", "0 per hour", "5 per fortnight"):
+        with pytest.raises(ValueError):
+            parse_limit(bad)
+
+
+def test_gcra_burst_then_steady_rate():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock, block_after=0)
+    results = [limiter.hit("api", "1.2.3.4", 60, 60)[0] for _ in range(61)]
+    assert results == [True] * 60 + [False]
+    assert limiter.hit("api", "5.6.7.8", 60, 60)[0]  # クライアントごと
+    assert limiter.hit("other", "1.2.3.4", 60, 60)[0]  # エンドポイントごと
+
+    allowed, retry_after = limiter.hit("api", "1.2.3.4", 60, 60)
+    assert not allowed and retry_after == pytest.approx(1.0)
+    clock.now += 1.0
+    assert limiter.hit("api", "1.2.3.4", 60, 60)[0]
+    assert not limiter.hit("api", "1.2.3.4", 60, 60)[0]
+
+
+def test_repeated_violations_block_then_expire():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock, block_after=3, block_seconds=600)
+    for _ in range(5):
+        limiter.hit("api", "ip", 5, 60)
+    assert not limiter.is_blocked("ip")
+    limiter.hit("api", "ip", 5, 60)
+    limiter.hit("api", "ip", 5, 60)
+    assert not limiter.is_blocked("ip")
+    limiter.hit("api", "ip", 5, 60)  # 3回目の拒否でブロック
+    assert limiter.is_blocked("ip")
+    # ブロック中は他のエンドポイントも拒否
+    allowed, retry_after = limiter.hit("forecast", "ip", 100, 60)
+    assert not allowed and retry_after == pytest.approx(600)
+    clock.now += 601
+    assert not limiter.is_blocked("ip")
+    assert limiter.hit("api", "ip", 5, 60)[0]
+    limiter.sync()  # Redis なし → 何もしない
+    assert limiter.stats()["blocked"] == 0
+
+
+def test_default_limiter_never_blocks_other_scopes():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock)
+    for _ in range(50):
+        limiter.hit("api", "ip", 2, 60)
+    assert not limiter.is_blocked("ip")
+    assert limiter.hit("forecast", "ip", 100, 60)[0]
+
+
+def test_retry_after_is_longer_of_gcra_and_block():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock, block_seconds=900)
+    for _ in range(2):
+        limiter.hit("api", "ip", 2, 3600)
+    allowed, retry_after = limiter.hit("api", "ip", 2, 3600, block_after=1)
+    assert not allowed and retry_after == pytest.approx(1800)  # GCRA の待ちの方が長い
+    clock.now += 100
+    assert limiter.hit("api", "ip", 2, 3600)[1] == pytest.approx(1700)
+    assert limiter.hit("other", "ip", 100, 60)[1] == pytest.approx(800)  # こちらはブロックの残り
+
+
+def test_workers_reconcile_through_redis():
+    clock = Clock(60_000.0)
+    redis = RedisRestEmulator(clock=clock)
+    calls = []
+    worker_a = RateLimiter(clock=clock, redis_pipeline=_pipeline(redis, calls), block_after=0, poll_interval=0)
+    worker_b = RateLimiter(clock=clock, redis_pipeline=_pipeline(redis, calls), block_after=100)
+    worker_a._sync_thread = worker_b._sync_thread = object()  # 同期はテストから明示的に
+
+    assert all(worker_a.hit("api", "ip", 60, 60)[0] for _ in range(40))
+    assert all(worker_b.hit("api", "ip", 60, 60)[0] for _ in range(15))
+    assert calls == []  # リクエスト経路では Redis を呼ばない
+    assert worker_a.sync() and worker_b.sync()
+    assert len(calls) == 2
+    assert redis.data["rl:api:ip:1000"] == "55"
+
+    # B は A の 40 件を取り込み、残り 5 件で打ち止め
+    assert [worker_b.hit("api", "ip", 60, 60)[0] for _ in range(6)] == [True] * 5 + [False]
+    worker_b.sync()
+    assert worker_a.sync() and len(calls) == 3  # A は流量なし・poll 間隔前 → Redis を呼ばない
+    clock.now += 6
+    worker_a.sync()  # 流量のないバケットは period/10 ごとに GET で他ワーカー分を見る
+    assert worker_a._buckets[("api", "ip")].others == 20
+    # 6秒で戻った6件分だけ許可
+    assert [worker_a.hit("api", "ip", 60, 60)[0] for _ in range(7)] == [True] * 6 + [False]
+
+    # ブロックは Redis 経由で他ワーカーにも伝わり、期限つき
+    worker_a.block("bad", 120)
+    worker_a.sync()
+    worker_b.hit("api", "bad", 60, 60)
+    worker_b.sync()
+    assert worker_b.is_blocked("bad")
+    clock.now += 121
+    assert not worker_b.is_blocked("bad")
+
+
+def test_idle_buckets_cost_no_redis_commands():
+    clock = Clock(60_000.0)
+    redis = RedisRestEmulator(clock=clock)
+    limiter = RateLimiter(clock=clock, redis_pipeline=_pipeline(redis))
+    limiter._sync_thread = object()
+    assert limiter.hit("setup", "ip", 2, 3600)[0]
+    limiter.sync()
+    assert dict(redis.commands) == {"INCRBY": 1, "EXPIRE": 1}  # ブロックしない limiter は TTL を見ない
+    redis.reset_counts()
+    for _ in range(900):  # 2秒ごとの sync を30分
+        clock.now += 2
+        limiter.sync()
+    assert dict(redis.commands) == {"GET": 4}  # 到着時刻(30分後)まで period/10 = 360秒ごとの GET だけ
+
+
+def test_blocks_are_namespaced_per_limiter():
+    clock = Clock()
+    redis = RedisRestEmulator(clock=clock)
+    security = RateLimiter(clock=clock, redis_pipeline=_pipeline(redis), namespace="security")
+    app = RateLimiter(clock=clock, redis_pipeline=_pipeline(redis), namespace="app")
+    security._sync_thread = app._sync_thread = object()
+    security.block("1.2.3.4", 600)
+    security.sync()
+    assert "rl:security:block:1.2.3.4" in redis.data
+    app.hit("api", "1.2.3.4", 60, 60)
+    app.sync()
+    assert not app.is_blocked("1.2.3.4") and "TTL" not in redis.commands
+
+
+def test_failed_sync_is_retried():
+    clock = Clock()
+    redis = RedisRestEmulator(clock=clock)
+    up = {"ok": False}
+    good = _pipeline(redis)
+    limiter = RateLimiter(clock=clock, redis_pipeline=lambda cmds: good(cmds) if up["ok"] else None)
+    limiter._sync_thread = object()
+    for _ in range(3):
+        limiter.hit("api", "ip", 10, 60)
+    assert not limiter.sync()
+    assert limiter.stats()["pending_hits"] == 3
+    up["ok"] = True
+    assert limiter.sync()
+    assert limiter.stats()["pending_hits"] == 0
+    assert sum(int(v) for k, v in redis.data.items() if k.startswith("rl:api:ip:")) == 3
+
+
+def test_flask_decorator():
+    app = Flask(__name__)
+    limiter = RateLimiter(app, block_after=0)
+
+    @app.route("/limited")
+    @limiter.limit("2 per minute")
+    def limited():
+        return "ok"
+
+    client = app.test_client()
+    assert [client.get("/limited").status_code for _ in range(3)] == [200, 200, 429]
+    resp = client.get("/limited")
+    assert resp.get_json()["error"] == "Rate limit exceeded"
+    assert 1 <= int(resp.headers["Retry-After"]) <= 30
+    limiter.enabled = False
+    assert client.get("/limited").status_code == 200
+
+
+def test_start_and_security_manager_use_shared_limiter():
+    import security
+    import start
+
+    assert isinstance(start.limiter, RateLimiter)
+    manager = security.SecurityManager()
+    assert isinstance(manager.limiter, RateLimiter)
+    manager.limiter.block("9.9.9.9", 60)
+    assert manager.is_blocked("9.9.9.9") and not manager.is_blocked("1.1.1.1")
+    assert start.limiter.block_after is None
+
+
+def test_security_manager_blocks_at_old_threshold():
+    import security
+
+    app = Flask(__name__)
+    manager = security.SecurityManager(app)
+    manager.limiter.block_seconds = 900
+
+    @app.route("/guarded")
+    @manager.rate_limit(max_requests=3, window=60)
+    def guarded():
+        return "ok"
+
+    client = app.test_client()
+    # 旧実装: 窓内 2×max_requests を超えたらブロック → 3件許可 + 4回拒否目でブロック
+    codes = [client.get("/guarded").status_code for _ in range(6)]
+    assert codes == [200] * 3 + [429] * 3
+    assert not manager.is_blocked("127.0.0.1")
+    resp = client.get("/guarded")
+    assert resp.status_code == 429 and manager.is_blocked("127.0.0.1")
+    assert resp.get_json()["error"] == "Access denied" and int(resp.headers["Retry-After"]) >= 899
@@ -0,0 +1,149 @@
+"""
+Unit tests for SeaFogPredictionEngine's historical-analog search
+(sea_fog_prediction.py):
+  - batched calculate_statistical_fog_probabilities() == the per-record
+    calculate_condition_similarity() scan it replaced
+  - feature matrix kept in sync by add_observation() (incl. the 1000 cap)
+  - predict_sea_fog() evaluates all hours with one batched query
+
+Run from project root:
+    python -m pytest tests/test_sea_fog_prediction.py -v
+"""
+import numpy as np
+import pytest
+
+from sea_fog_prediction import SeaFogPredictionEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    # 設定・履歴ファイルはカレントディレクトリに作られる
+    monkeypatch.chdir(tmp_path)
+    return SeaFogPredictionEngine()
+
+
+def _history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "lat": 45.2, "lon": 141.2, "datetime": "2026-07-01T06:00:00",
+            "fog_observed": bool(rng.random() < 0.4),
+            "conditions": {
+                "temperature": float(rng.uniform(8, 22)),
+                "humidity": float(rng.uniform(60, 100)),
+                "wind_speed": float(rng.uniform(0, 10)),
+                "pressure": float(rng.uniform(995, 1025)),
+            },
+        }
+        for _ in range(n)
+    ]
+
+
+def _weather(hours=72, seed=1):
+    rng = np.random.default_rng(seed)
+    return {
+        "temperature_2m": rng.uniform(8, 22, hours).tolist(),
+        "relative_humidity_2m": rng.uniform(60, 100, hours).tolist(),
+        "wind_speed_10m": rng.uniform(0, 10, hours).tolist(),
+        "pressure_msl": rng.uniform(995, 1025, hours).tolist(),
+    }
+
+
+def _reference(engine, weather, lat, lon, hour):
+    """The per-record scan calculate_statistical_fog_probability() used before batching."""
+    current = {
+        "temperature": weather["temperature_2m"][hour],
+        "humidity": weather["relative_humidity_2m"][hour],
+        "wind_speed": weather["wind_speed_10m"][hour],
+        "pressure": weather["pressure_msl"][hour],
+    }
+    similar = [r for r in engine.historical_data if engine.calculate_condition_similarity(current, r) > 0.7]
+    if not similar:
+        return engine.estimate_seasonal_probability(lat, lon)
+    return sum(1 for r in similar if r.get("fog_observed", False)) / len(similar)
+
+
+def _with_history(engine, records):
+    engine.historical_data = records
+    engine._build_analog_index()
+
+
+def test_batched_statistical_probability_matches_scan(engine):
+    _with_history(engine, _history(500))
+    weather = _weather()
+
+    got = engine.calculate_statistical_fog_probabilities(weather, 45.242, 141.242, list(range(72)))
+
+    expected = [_reference(engine, weather, 45.242, 141.242, h) for h in range(72)]
+    np.testing.assert_allclose(got, expected)
+    assert engine.calculate_statistical_fog_probability(weather, 45.242, 141.242, 5) == pytest.approx(expected[5])
+
+
+def test_non_numeric_conditions_never_match(engine):
+    records = _history(3)
+    records[0]["conditions"]["humidity"] = None
+    records[1]["conditions"] = "broken"
+    _with_history(engine, records)
+    weather = _weather(2)
+    weather["temperature_2m"][1] = None
+
+    got = engine.calculate_statistical_fog_probabilities(weather, 45.242, 141.242, [0, 1])
+
+    expected = [_reference(engine, weather, 45.242, 141.242, h) for h in range(2)]
+    np.testing.assert_allclose(got, expected)
+    assert got[1] == engine.estimate_seasonal_probability(45.242, 141.242)
+
+
+def test_empty_history_uses_seasonal_probability(engine):
+    _with_history(engine, [])
+
+    got = engine.calculate_statistical_fog_probabilities(_weather(3), 45.134, 141.203, [0, 1, 2])
+
+    assert got.tolist() == [engine.estimate_seasonal_probability(45.134, 141.203)] * 3
+
+
+def test_add_observation_updates_index_incrementally(engine, monkeypatch):
+    monkeypatch.setattr(engine, "MAX_HISTORICAL_RECORDS", 5)
+    _with_history(engine, _history(5))
+    build = engine._build_analog_index
+    monkeypatch.setattr(engine, "_build_analog_index", lambda: pytest.fail("full rebuild not expected"))
+
+    conditions = {"temperature": 12.0, "humidity": 95.0, "wind_speed": 4.0, "pressure": 1010.0}
+    assert engine.add_observation(45.2, 141.2, "2026-07-02T05:00:00", True, conditions) is True
+
+    incremental = (engine._analog_matrix.copy(), engine._analog_fog.copy())
+    build()
+    assert len(engine.historical_data) == 5
+    np.testing.assert_array_equal(incremental[0], engine._analog_matrix)
+    np.testing.assert_array_equal(incremental[1], engine._analog_fog)
+    assert engine._analog_matrix[-1].tolist() == [12.0, 95.0, 4.0, 1010.0]
+
+
+def test_index_loaded_from_history_file(engine):
+    engine.historical_data = _history(4)
+    engine.save_historical_data()
+
+    reloaded = SeaFogPredictionEngine()
+
+    assert reloaded._analog_matrix.shape == (4, 4)
+
+
+def test_predict_sea_fog_queries_all_hours_at_once(engine, monkeypatch):
+    _with_history(engine, _history(200))
+    weather = _weather(72)
+    monkeypatch.setattr(engine, "get_enhanced_weather_data", lambda lat, lon, date: weather)
+    calls = []
+    batched = engine.calculate_statistical_fog_probabilities
+
+    def spy(*args):
+        calls.append(len(args[3]))
+        return batched(*args)
+
+    monkeypatch.setattr(engine, "calculate_statistical_fog_probabilities", spy)
+
+    result = engine.predict_sea_fog(45.242, 141.242, "2026-07-01", 72)
+
+    assert calls == [72]
+    components = [p["components"]["statistical_probability"] for p in result["hourly_predictions"]]
+    expected = [round(_reference(engine, weather, 45.242, 141.242, h), 3) for h in range(72)]
+    assert components == expected
@@ -0,0 +1,134 @@
+"""
+Unit tests for sheet_export_log.py (cursor-paginated /sheets exports):
+  - apply() logs only new / changed rows (synced_at_jst ignored), drops
+    rows that disappeared; page() walks them oldest-first with next_cursor
+  - a cursor from another log instance (restart, eviction) resets to the start
+  - derived values (summary tables) are rebuilt only after the log changed
+  - /sheets routes: since/limit returns only new rows; without them the full
+    legacy response is unchanged; accuracy rows are not rebuilt while
+    feedback_log.csv is unchanged
+
+Run from project root:
+    python -m pytest tests/test_sheet_export_log.py -v
+"""
+import start
+from dataset_registry import DatasetRegistry
+from sheet_export_log import RowLog, SheetExportLogs, parse_cursor
+
+
+def _row(key, value, synced="2026-07-01T10:00:00+09:00"):
+    return {"upsert_key": key, "value": value, "synced_at_jst": synced}
+
+
+def test_apply_and_page():
+    log = RowLog()
+    assert log.apply([_row("a", 1), _row("b", 2), _row("c", 3)]) == {"changed": 3, "removed": 0}
+    first = log.page(None, limit=2)
+    assert [r["upsert_key"] for r in first["rows"]] == ["a", "b"] and first["has_more"]
+    second = log.page(first["next_cursor"], limit=2)
+    assert [r["upsert_key"] for r in second["rows"]] == ["c"] and not second["has_more"]
+    cursor = second["next_cursor"]
+    assert log.page(cursor)["rows"] == []
+
+    # synced_at_jst だけの違いは変更扱いしない。b を更新、a を削除、d を追加
+    stats = log.apply([_row("b", 20, "later"), _row("c", 3, "later"), _row("d", 4)])
+    assert stats == {"changed": 2, "removed": 1}
+    page = log.page(cursor)
+    assert [(r["upsert_key"], r["value"]) for r in page["rows"]] == [("b", 20), ("d", 4)]
+    assert [r["upsert_key"] for r in log.rows()] == ["c", "b", "d"]
+    assert [r["upsert_key"] for r in log.page(None)["rows"]] == ["c", "b", "d"]
+    assert parse_cursor(page["next_cursor"]) == (log.epoch, log.seq)
+
+
+def test_foreign_cursor_resets_and_compaction():
+    log = RowLog()
+    log.apply([_row("a", 1)])
+    page = log.page("deadbeef-99")
+    assert page["reset"] and [r["upsert_key"] for r in page["rows"]] == ["a"]
+    assert not log.page(log.cursor)["reset"] and parse_cursor("garbage") == (None, 0)
+
+    for value in range(1500):
+        log.apply([_row("a", value)])
+    assert len(log._seqs) < 1100  # 古い版は詰められる
+    assert log.page(None)["rows"] == [_row("a", 1499)]
+
+
+def test_derived_and_lru():
+    log = RowLog()
+    builds = []
+    build = lambda rows: builds.append(len(rows)) or len(rows)  # noqa: E731
+    log.apply([_row("a", 1)], source_version=1)
+    assert log.derived("n", build) == 1 and log.derived("n", build) == 1
+    log.apply([_row("a", 1)], source_version=1)
+    assert builds == [1]
+    log.apply([_row("a", 1)], source_version=2)  # 行は同じでもソースが変わったら作り直す
+    log.apply([_row("a", 1), _row("b", 2)], source_version=2)
+    assert log.derived("n", build) == 2 and builds == [1, 2]
+
+    logs = SheetExportLogs(max_logs=2)
+    first = logs.get("nowcast", ("20260701",))
+    assert logs.get("nowcast", ("20260701",)) is first
+    logs.get("nowcast", ("20260702",))
+    logs.get("nowcast", ("20260703",))
+    assert logs.get("nowcast", ("20260701",)) is not first
+
+
+def test_nowcast_sheets_cursor(monkeypatch, tmp_path):
+    spots = tmp_path / "spots.csv"
+    spots.write_text("name,lat,lon,town,district,buraku\n"
+                     "H_1631_1434,45.1631,141.1434,利尻町,沓形,神居\n"
+                     "H_2480_2198,45.2480,141.2198,利尻富士町,鴛泊,\n", encoding="utf-8")
+    snapshots = [{"time": "04:00", "basetime": "b0", "spots": {"H_1631_1434": 0.0, "H_2480_2198": 0.0}}]
+    monkeypatch.setattr(start, "CSV_FILE", str(spots))
+    monkeypatch.setattr(start, "_obs_redis_get", lambda key: list(snapshots) if key == "nowcast:daily:20260701" else None)
+    monkeypatch.setattr(start, "_sheet_exports", SheetExportLogs())
+    client = start.app.test_client()
+
+    legacy = client.get("/api/observations/nowcast/sheets?date=2026-07-01").get_json()
+    assert len(legacy["rows"]) == 2 and legacy["summary"]["total_rows"] == 2
+    cursor = legacy["cursor"]["next_cursor"]
+    assert client.get(f"/api/observations/nowcast/sheets?date=2026-07-01&since={cursor}").get_json()["rows"] == []
+
+    snapshots.append({"time": "04:10", "basetime": "b1", "spots": {"H_1631_1434": 1.5, "H_2480_2198": 0.0}})
+    data = client.get(f"/api/observations/nowcast/sheets?date=2026-07-01&since={cursor}&limit=1").get_json()
+    assert [r["upsert_key"] for r in data["rows"]] == ["20260701|04:10|H_1631_1434"]
+    assert data["cursor"]["has_more"] and data["summary"]["total_rows"] == 4
+    data = client.get(f"/api/observations/nowcast/sheets?date=2026-07-01&since={data['cursor']['next_cursor']}"
+                      ).get_json()
+    assert [r["upsert_key"] for r in data["rows"]] == ["20260701|04:10|H_2480_2198"]
+    assert not data["cursor"]["has_more"] and not data["cursor"]["reset"]
+
+
+def test_accuracy_sheets_skip_rebuild_while_csv_unchanged(monkeypatch, tmp_path):
+    today = start.datetime.now(tz=start.JST).strftime("%Y-%m-%d")
+    feedback = tmp_path / "feedback.csv"
+    feedback.write_text("date,spot_name,days_ahead,forecast_label,actual_label,judgment_correct,has_drying_record\n"
+                        f"{today},H_1631_1434,1,可,可,True,True\n", encoding="utf-8")
+    spots = tmp_path / "spots.csv"
+    spots.write_text("name,lat,lon,town,district,buraku\nH_1631_1434,45.1631,141.1434,利尻町,沓形,神居\n",
+                     encoding="utf-8")
+    monkeypatch.setattr(start, "FEEDBACK_FILE", str(feedback))
+    monkeypatch.setattr(start, "CSV_FILE", str(spots))
+    monkeypatch.setattr(start, "_datasets", DatasetRegistry())
+    monkeypatch.setattr(start, "_sheet_exports", SheetExportLogs())
+    loads = []
+    original = start._load_feedback_sheet_rows
+    monkeypatch.setattr(start, "_load_feedback_sheet_rows", lambda *a: loads.append(a) or original(*a))
+    client = start.app.test_client()
+
+    data = client.get("/api/validation/accuracy/sheets?days=30&limit=100").get_json()
+    assert [r["town"] for r in data["rows"]] == ["利尻町"]
+    cursor = data["cursor"]["next_cursor"]
+    assert client.get(f"/api/validation/accuracy/sheets?days=30&since={cursor}").get_json()["rows"] == []
+    summary = client.get("/api/validation/accuracy/sheets/summary?days=30").get_json()
+    assert summary["tables"]["by_day"][0]["rows"] == 1 and summary["source_summary"]["total_rows"] == 1
+    assert len(loads) == 1
+
+    with open(feedback, "a", encoding="utf-8") as f:
+        f.write(f"{today},H_1631_1434,2,可,不可,False,True\n")
+    data = client.get(f"/api/validation/accuracy/sheets?days=30&since={cursor}").get_json()
+    assert [r["upsert_key"] for r in data["rows"]] == [f"{today}|H_1631_1434|2"]
+    summary = client.get("/api/validation/accuracy/sheets/summary?days=30").get_json()
+    assert summary["tables"]["by_day"][0]["rows"] == 2
+    assert summary["tables"]["by_day"][0]["judgment_hit_rate_pct"] == 50.0
+    assert len(loads) == 2
@@ -0,0 +1,123 @@
+"""
+Unit tests for spot_artifacts.py (incremental KML / all_spots_array.js sync):
+  - full render is byte-identical to the committed artifacts
+  - add / edit / delete re-render only the affected entries and still equal
+    a full rebuild; an unchanged CSV rewrites nothing
+  - a hand-edited artifact falls back to a full render
+  - syncing one artifact at a time (kml, then js) still updates both
+  - /all_spots_array.js carries a content-hash ETag and answers 304
+
+Run from project root:
+    python -m pytest tests/test_spot_artifacts.py -v
+"""
+import csv
+import os
+import shutil
+from pathlib import Path
+
+from spot_artifacts import JS_FORMAT, KML_FORMAT, ArtifactFormat, SpotArtifacts, content_etag, read_spots
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _counting(fmt, calls):
+    def render(spot):
+        calls.append(spot["name"])
+        return fmt.render(spot)
+    return ArtifactFormat(fmt.header, fmt.footer, fmt.separator, render)
+
+
+def _full(fmt, spots):
+    return fmt.assemble([fmt.render(s) for s in spots]).encode("utf-8")
+
+
+def _artifacts(tmp_path, calls=None):
+    kml, js = (KML_FORMAT, JS_FORMAT) if calls is None else (_counting(KML_FORMAT, calls), _counting(JS_FORMAT, calls))
+    return SpotArtifacts({"kml": (str(tmp_path / "spots.kml"), kml), "js": (str(tmp_path / "spots.js"), js)},
+                         str(tmp_path / "manifest.json"))
+
+
+def test_full_render_matches_committed_files(tmp_path):
+    spots = read_spots(str(ROOT / "hoshiba_spots.csv"))
+    assert len(spots) > 300
+    stats = _artifacts(tmp_path).sync(spots)
+    assert stats["full"] == ["kml", "js"] and stats["added"] == len(spots)
+    assert (tmp_path / "spots.js").read_bytes() == (ROOT / "all_spots_array.js").read_bytes()
+    assert (tmp_path / "spots.kml").read_bytes() == (ROOT / "hoshiba_spots_named.kml").read_bytes()
+
+
+def test_incremental_add_edit_delete(tmp_path):
+    spots = read_spots(str(ROOT / "hoshiba_spots.csv"))
+    _artifacts(tmp_path).sync(spots)
+
+    calls = []
+    artifacts = _artifacts(tmp_path, calls)
+    js_mtime = os.stat(tmp_path / "spots.js").st_mtime_ns
+    stats = artifacts.sync(spots)
+    assert stats["written"] == [] and calls == []  # 変化なし → 書かない
+    assert os.stat(tmp_path / "spots.js").st_mtime_ns == js_mtime
+
+    edited = [dict(s) for s in spots]
+    edited[5]["buraku"] = "新しい部落"
+    removed = edited.pop(10)
+    edited.insert(100, {"name": "H_9999_0001", "lat": 45.2, "lon": 141.2, "town": "利尻町", "district": "仙法志",
+                        "buraku": ""})
+    stats = artifacts.sync(edited)
+    assert (stats["added"], stats["changed"], stats["removed"]) == (1, 1, 1)
+    assert stats["full"] == [] and stats["written"] == ["kml", "js"]
+    assert sorted(calls) == sorted([edited[5]["name"], "H_9999_0001"] * 2)
+    assert (tmp_path / "spots.js").read_bytes() == _full(JS_FORMAT, edited)
+    assert (tmp_path / "spots.kml").read_bytes() == _full(KML_FORMAT, edited)
+    assert removed["name"] not in (tmp_path / "spots.js").read_text(encoding="utf-8")
+    assert not [p for p in os.listdir(tmp_path) if ".tmp" in p]
+
+
+def test_hand_edited_artifact_is_rebuilt(tmp_path):
+    spots = read_spots(str(ROOT / "hoshiba_spots.csv"))[:20]
+    _artifacts(tmp_path).sync(spots)
+    (tmp_path / "spots.js").write_text("// broken\n", encoding="utf-8")
+    spots[0]["town"] = "利尻富士町"
+    stats = _artifacts(tmp_path).sync(spots)
+    assert stats["full"] == ["js"]
+    assert (tmp_path / "spots.js").read_bytes() == _full(JS_FORMAT, spots)
+
+
+def test_partial_syncs_keep_rows_per_artifact(tmp_path):
+    spots = read_spots(str(ROOT / "hoshiba_spots.csv"))[:20]
+    artifacts = _artifacts(tmp_path)
+    artifacts.sync(spots)
+    moved = [dict(s) for s in spots]
+    moved[1]["lat"] += 0.05
+    # sync_kml_file(df) → sync_js_array_file(df) と同じ順
+    assert artifacts.sync(moved, only=["kml"])["written"] == ["kml"]
+    stats = artifacts.sync(moved, only=["js"])
+    assert stats["written"] == ["js"] and stats["changed"] == 1 and stats["full"] == []
+    assert (tmp_path / "spots.js").read_bytes() == _full(JS_FORMAT, moved)
+    assert (tmp_path / "spots.kml").read_bytes() == _full(KML_FORMAT, moved)
+    assert artifacts.sync(moved)["written"] == []
+
+
+def test_all_spots_js_etag(tmp_path, monkeypatch):
+    import start
+
+    csv_path = tmp_path / "spots.csv"
+    shutil.copy(ROOT / "hoshiba_spots.csv", csv_path)
+    monkeypatch.setattr(start, "CSV_FILE", str(csv_path))
+    monkeypatch.setattr(start, "KML_FILE", str(tmp_path / "spots.kml"))
+    monkeypatch.setattr(start, "JS_ARRAY_FILE", str(tmp_path / "spots.js"))
+    monkeypatch.setattr(start, "sync_geometry_file", lambda: True)
+    result = start.sync_all_files_from_csv()
+    assert result["js"] and result["total_spots"] == result["changes"]["added"]
+
+    client = start.app.test_client()
+    resp = client.get("/all_spots_array.js")
+    etag = resp.headers["ETag"].strip('"')
+    assert resp.status_code == 200 and etag == content_etag((tmp_path / "spots.js").read_bytes())
+    assert client.get("/all_spots_array.js", headers={"If-None-Match": f'"{etag}"'}).status_code == 304
+
+    with open(csv_path, "a", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(["H_9999_0001", 45.2, 141.2, "利尻町", "仙法志", ""])
+    result = start.sync_all_files_from_csv()
+    assert result["changes"]["added"] == 1 and result["changes"]["full"] == []
+    resp = client.get("/all_spots_array.js", headers={"If-None-Match": f'"{etag}"'})
+    assert resp.status_code == 200 and b"H_9999_0001" in resp.data
@@ -0,0 +1,136 @@
+"""
+Unit tests for spot_differences.py / /api/analysis/spot-differences:
+  - list mode returns exactly what the old per-spot loop returned
+  - spots=all covers the spot catalog with one batch elevation lookup
+  - mode=matrix: spot × spot matrices, antisymmetric where they should be
+
+Run from project root:
+    python -m pytest tests/test_spot_differences.py -v
+"""
+import math
+
+import numpy as np
+import pytest
+
+import dem_raster
+import start
+
+NAMES = ["H_1631_1434", "H_1821_2421", "H_2000_2300", "H_1050_2100", "bad_name", "H_1800_2450"]
+
+
+@pytest.fixture
+def offline_elevation(monkeypatch):
+    """島全域を覆う合成 DEM（山頂ほど高い）で標高をネットワークなしに決める"""
+    raster = dem_raster.empty_raster(resolution=0.005)
+    lat_nodes, lon_nodes = raster.node_coordinates()
+    grid_lat, grid_lon = np.meshgrid(lat_nodes, lon_nodes, indexing="ij")
+    raster.elevation[:] = np.maximum(5, 1700 - 25000 * np.hypot(grid_lat - 45.1821, grid_lon - 141.2421))
+    monkeypatch.setattr(start, "_dem_raster", raster)
+    monkeypatch.setattr(start, "_spot_geometry", None)
+    monkeypatch.setattr(start.limiter, "enabled", False)
+    calls = []
+    grid_elevations = start._grid_elevations
+    monkeypatch.setattr(start, "_grid_elevations", lambda lats, lons: calls.append(len(lats)) or
+                        grid_elevations(lats, lons))
+    return calls
+
+
+def _legacy_direction_name(degrees):
+    """変更前の start.get_direction_name"""
+    directions = ['北', '北北東', '北東', '東北東', '東', '東南東', '南東', '南南東',
+                  '南', '南南西', '南西', '西南西', '西', '西北西', '北西', '北北西']
+    return directions[int((degrees + 11.25) / 22.5) % 16]
+
+
+def _legacy_confidence(distance_km, elevation_diff):
+    """変更前の start.calculate_difference_confidence"""
+    confidence = max(0, min(100, 100.0 - distance_km * 10 - abs(elevation_diff) / 100 * 5))
+    for threshold, level in ((80, 'high'), (60, 'medium'), (40, 'low')):
+        if confidence >= threshold:
+            return {'level': level, 'percent': round(confidence, 1)}
+    return {'level': 'very_low', 'percent': round(confidence, 1)}
+
+
+def _legacy(spot_name, ref_lat, ref_lon):
+    """変更前のループ本体（get_spot_weather_differences）"""
+    parts = spot_name.split('_')
+    lat = 45.0 + float(parts[1]) / 10000.0
+    lon = 141.0 + float(parts[2]) / 10000.0
+    distance = ((lat - ref_lat) ** 2 + (lon - ref_lon) ** 2) ** 0.5 * 111
+    direction = (math.degrees(math.atan2(lon - ref_lon, lat - ref_lat)) + 360) % 360
+    elevation_diff = start.get_elevation(lat, lon) - start.get_elevation(ref_lat, ref_lon)
+    ref_is_forest = start.is_forest_area(ref_lat, ref_lon)
+    spot_is_forest = start.is_forest_area(lat, lon)
+    humidity_diff = 0.0
+    wind_diff = 0.0
+    if spot_is_forest and not ref_is_forest:
+        humidity_diff += 10.0
+        wind_diff -= 2.5
+    elif ref_is_forest and not spot_is_forest:
+        humidity_diff -= 10.0
+        wind_diff += 2.5
+    humidity_diff -= (elevation_diff / 100) * 1.0
+    wind_diff += (elevation_diff / 100) * 0.5
+    return {
+        'spot_name': spot_name,
+        'coordinates': {'lat': lat, 'lon': lon},
+        'distance_km': round(distance, 2),
+        'direction_deg': round(direction, 1),
+        'direction_name': _legacy_direction_name(direction),
+        'elevation_difference_m': round(elevation_diff, 1),
+        'predicted_differences': {
+            'temperature_c': round(-(elevation_diff / 100) * 0.6, 1),
+            'humidity_percent': round(humidity_diff, 1),
+            'wind_speed_ms': round(wind_diff, 1),
+        },
+        'confidence': _legacy_confidence(distance, elevation_diff),
+    }
+
+
+@pytest.mark.parametrize("ref", [(45.178333, 141.138333), (45.1821, 141.2421)])
+def test_list_mode_matches_legacy_loop(offline_elevation, ref):
+    client = start.app.test_client()
+    resp = client.get(f"/api/analysis/spot-differences?spots={','.join(NAMES)}&ref_lat={ref[0]}&ref_lon={ref[1]}")
+    body = resp.get_json()
+    assert resp.status_code == 200, body
+    expected = [_legacy(name, *ref) for name in NAMES if name.startswith("H_")]
+    assert body["spot_differences"] == expected
+    assert offline_elevation == [5]  # 標高は1回のバッチで解決
+
+
+def test_all_spots_and_matrix(offline_elevation):
+    client = start.app.test_client()
+    spots = start._load_all_spots_for_field()
+    catalog = [s["name"] for s in spots if s["name"].startswith("H_")]
+
+    body = client.get("/api/analysis/spot-differences?spots=all").get_json()
+    assert [d["spot_name"] for d in body["spot_differences"]] == [s["name"] for s in spots]
+    assert body["spot_differences"][0]["coordinates"] == {"lat": spots[0]["lat"], "lon": spots[0]["lon"]}
+
+    names = ",".join(catalog[:25])
+    body = client.get(f"/api/analysis/spot-differences?spots={names}&mode=matrix").get_json()
+    assert body["spots"] == catalog[:25]
+    m = {k: np.array(v) for k, v in body["matrices"].items()}
+    assert m["distance_km"].shape == (25, 25)
+    np.testing.assert_allclose(m["distance_km"], m["distance_km"].T)
+    np.testing.assert_allclose(np.diag(m["distance_km"]), 0)
+    np.testing.assert_allclose(m["elevation_difference_m"], -m["elevation_difference_m"].T, atol=0.11)
+    np.testing.assert_allclose(m["wind_speed_ms"], -m["wind_speed_ms"].T, atol=0.11)
+
+    # 行 i = 干場 i を基準にした list モードと一致
+    ref_name = catalog[3]
+    lat = 45.0 + float(ref_name.split("_")[1]) / 10000
+    lon = 141.0 + float(ref_name.split("_")[2]) / 10000
+    elevation = float(start._dem_raster.elevation_at(lat, lon))
+    row = client.get(f"/api/analysis/spot-differences?spots={names}&ref_lat={lat}&ref_lon={lon}").get_json()
+    assert elevation > 0
+    np.testing.assert_allclose([d["predicted_differences"]["temperature_c"] for d in row["spot_differences"]],
+                               body["matrices"]["temperature_c"][3], atol=0.051)
+
+
+def test_rejects_bad_mode_and_oversized_matrix(offline_elevation, monkeypatch):
+    client = start.app.test_client()
+    assert client.get("/api/analysis/spot-differences?spots=H_1631_1434&mode=x").status_code == 400
+    monkeypatch.setattr(start, "_SPOT_DIFF_MAX_MATRIX_SPOTS", 10)
+    assert client.get("/api/analysis/spot-differences?spots=all&mode=matrix").status_code == 400
+    assert client.get("/api/analysis/spot-differences").status_code == 400
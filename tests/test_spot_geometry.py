@@ -0,0 +1,195 @@
+"""
+Unit tests for spot_geometry.py (precomputed per-point geometry table) and
+its use from start.py:
+  - vectorized geometry == start.py's scalar calculate_spot_theta() etc.
+  - build / atomic save / memory-mapped load of the .npy table
+  - elevation source chain: stored DEM → batch fetch → terrain db → approx
+  - get_elevation() / sync_all_files_from_csv() integration
+
+Run from project root:
+    python -m pytest tests/test_spot_geometry.py -v
+"""
+import csv
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import start  # noqa: E402  (see tests/test_field_cache.py for why at module level)
+import spot_geometry as sg
+
+
+def _spots():
+    with open(start.CSV_FILE, newline="", encoding="utf-8") as f:
+        return [(float(r["lat"]), float(r["lon"])) for r in csv.DictReader(f)]
+
+
+# ---------------------------------------------------------------------------
+# Vectorized geometry matches the scalar originals in start.py
+# ---------------------------------------------------------------------------
+
+def test_vectorized_geometry_matches_scalar_functions():
+    pts = _spots() + [(g["lat"], g["lon"]) for g in start._build_rishiri_grid()]
+    lats = np.array([p[0] for p in pts])
+    lons = np.array([p[1] for p in pts])
+
+    assert np.allclose(sg.spot_theta(lats, lons), [start.calculate_spot_theta(a, b) for a, b in pts])
+    assert np.allclose(sg.mountain_azimuth(lats, lons), [start.mountain_azimuth(a, b) for a, b in pts])
+    assert sg.forest_mask(lats, lons).tolist() == [start.is_forest_area(a, b) for a, b in pts]
+    assert sg.coastal_mask(lats, lons).tolist() == [start.is_coastal_area(a, b) for a, b in pts]
+
+
+@pytest.mark.parametrize("wind_dir", [0.0, 45.0, 135.0, 200.0, 270.0, 359.0])
+def test_onshore_factor_matches_scalar(wind_dir):
+    pts = _spots()[:50]
+    lats = np.array([p[0] for p in pts])
+    lons = np.array([p[1] for p in pts])
+
+    got = sg.onshore_factor(sg.sea_direction(lats, lons), wind_dir)
+    expected = [start.get_onshore_wind_factor(a, b, wind_dir) for a, b in pts]
+    assert np.allclose(got, expected)
+
+
+def test_onshore_factor_nan_wind_is_nan():
+    assert np.isnan(sg.onshore_factor([90.0], [np.nan])[0])
+
+
+# ---------------------------------------------------------------------------
+# Build / save / load
+# ---------------------------------------------------------------------------
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["name", "lat", "lon", "town", "district", "buraku"])
+        for name, lat, lon in rows:
+            w.writerow([name, lat, lon, "", "", ""])
+
+
+def test_table_roundtrip_is_memory_mapped(tmp_path):
+    points = [("H_1", "spot", 45.1021947, 141.247311), ("g", "grid", 45.2, 141.3)]
+    table = sg.build_geometry_table(points, [5.0, 80.0], ["dem", "approx"])
+    path = tmp_path / "geo.npy"
+    sg.save_geometry_table(table, str(path))
+
+    loaded = sg.load_geometry_table(str(path))
+
+    assert isinstance(loaded.array, np.memmap)
+    assert len(loaded) == 2
+    row = loaded.row(45.10219, 141.24731)  # 1e-4° match
+    assert row["name"] == "H_1"
+    assert row["elevation"] == 5.0
+    assert row["elevation_source"] == "dem"
+    assert row["theta"] == pytest.approx(start.calculate_spot_theta(45.1021947, 141.247311))
+    assert loaded.index_of_name("H_1") == 0
+    assert loaded.row(45.0, 141.0) is None
+    assert loaded.rows_for([45.2, 45.0], [141.3, 141.0]).tolist() == [1, -1]
+
+
+def test_load_missing_or_outdated_table_returns_none(tmp_path):
+    assert sg.load_geometry_table(str(tmp_path / "missing.npy")) is None
+    np.save(tmp_path / "old.npy", np.zeros(3))
+    assert sg.load_geometry_table(str(tmp_path / "old.npy")) is None
+
+
+def test_regenerate_reuses_dem_and_fetches_only_new_points(tmp_path):
+    csv_path = tmp_path / "spots.csv"
+    path = str(tmp_path / "geo.npy")
+    _write_csv(csv_path, [("H_A", 45.11, 141.25)])
+    calls = []
+
+    def fetch(lats, lons):
+        calls.append(list(lats))
+        return [12.0] * len(lats)
+
+    first = sg.regenerate_geometry_table(str(csv_path), path, fetch_batch=fetch)
+    n_grid = len(start._build_rishiri_grid())
+    assert len(first) == 1 + n_grid
+    assert len(calls[0]) == 1 + n_grid
+
+    _write_csv(csv_path, [("H_A", 45.11, 141.25), ("H_B", 45.12, 141.26)])
+    second = sg.regenerate_geometry_table(str(csv_path), path, fetch_batch=fetch)
+
+    assert calls[1] == [45.12]              # only the new spot is fetched
+    assert second.row(45.12, 141.26)["elevation"] == 12.0
+    assert second.row(45.12, 141.26)["elevation_source"] == "dem"
+
+
+def test_failed_fetch_falls_back_to_terrain_db_then_retries(tmp_path):
+    csv_path = tmp_path / "spots.csv"
+    path = str(tmp_path / "geo.npy")
+    _write_csv(csv_path, [("H_A", 45.11, 141.25)])
+
+    offline = sg.regenerate_geometry_table(str(csv_path), path, fetch_batch=lambda lats, lons: None)
+    assert offline.row(45.11, 141.25)["elevation_source"] == "terrain_db"
+
+    # terrain_db rows are not "sticky": the next regeneration retries the DEM
+    online = sg.regenerate_geometry_table(str(csv_path), path, fetch_batch=lambda lats, lons: [7.0] * len(lats))
+    assert online.row(45.11, 141.25)["elevation_source"] == "dem"
+
+
+def test_no_sources_falls_back_to_approximation(tmp_path):
+    points = [("H_A", "spot", 45.11, 141.25)]
+    elev, src = sg.resolve_elevations(points, None, fetch_batch=None,
+                                      terrain_db_path=str(tmp_path / "none.db"))
+    assert src == ["approx"]
+    assert elev[0] == pytest.approx(sg.approximate_elevation_m(45.11, 141.25))
+
+
+def test_fetch_elevations_open_meteo_rejects_short_response():
+    resp = MagicMock()
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = {"elevation": [1.0]}
+    req = MagicMock()
+    req.get.return_value = resp
+
+    assert sg.fetch_elevations_open_meteo([45.1, 45.2], [141.1, 141.2], requests_module=req) is None
+
+
+# ---------------------------------------------------------------------------
+# start.py integration
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def geometry_table(tmp_path, monkeypatch):
+    points = [("H_X", "spot", 45.15, 141.30)]
+    table = sg.build_geometry_table(points, [33.0], ["dem"])
+    path = tmp_path / "geo.npy"
+    sg.save_geometry_table(table, str(path))
+    monkeypatch.setattr(start, "_spot_geometry", sg.load_geometry_table(str(path)))
+    monkeypatch.setattr(start, "_elevation_cache", {})
+
+
+def test_get_elevation_uses_dem_table_without_network(geometry_table, monkeypatch):
+    get = MagicMock(side_effect=AssertionError("network must not be used"))
+    monkeypatch.setattr(start.requests, "get", get)
+
+    assert start.get_elevation(45.15, 141.30) == 33.0
+    get.assert_not_called()
+
+
+def test_get_elevation_offline_fallback_prefers_table(tmp_path, monkeypatch):
+    table = sg.build_geometry_table([("H_X", "spot", 45.15, 141.30)], [44.0], ["terrain_db"])
+    sg.save_geometry_table(table, str(tmp_path / "geo.npy"))
+    monkeypatch.setattr(start, "_spot_geometry", sg.load_geometry_table(str(tmp_path / "geo.npy")))
+    monkeypatch.setattr(start, "_elevation_cache", {})
+    monkeypatch.setattr(start.requests, "get", MagicMock(side_effect=OSError("offline")))
+
+    assert start.get_elevation(45.15, 141.30) == 44.0
+
+
+def test_sync_all_files_regenerates_geometry(tmp_path, monkeypatch):
+    csv_path = tmp_path / "spots.csv"
+    _write_csv(csv_path, [("H_1500_3000", 45.15, 141.30)])
+    monkeypatch.setattr(start, "CSV_FILE", str(csv_path))
+    monkeypatch.setattr(start, "KML_FILE", str(tmp_path / "spots.kml"))
+    monkeypatch.setattr(start, "JS_ARRAY_FILE", str(tmp_path / "spots.js"))
+    monkeypatch.setattr(start, "SPOT_GEOMETRY_FILE", str(tmp_path / "geo.npy"))
+    monkeypatch.setattr(start, "_spot_geometry", None)
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", lambda lats, lons, requests_module=None: [9.0] * len(lats))
+
+    result = start.sync_all_files_from_csv()
+
+    assert result["geometry"] is True
+    assert start._spot_geometry.row(45.15, 141.30)["elevation"] == 9.0
+    assert (tmp_path / "geo.npy").exists()
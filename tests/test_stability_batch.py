@@ -0,0 +1,140 @@
+"""
+Unit tests for stability_batch.py:
+  - parcel="dry" reproduces AtmosphericStabilityAnalyzer profile by profile
+  - the pseudo-adiabat table agrees with a fine-step direct integration
+  - moist parcels: dry below the LCL, warmer than the dry parcel above it
+  - missing levels / off-level interpolation and /api/emagram?stability=true
+
+Run from project root:
+    python -m pytest tests/test_stability_batch.py -v
+"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import stability_batch as sb
+
+PRESSURE = np.array([1000, 925, 850, 700, 500, 400, 300, 250, 200, 150, 100], dtype=np.float64)
+HEIGHT = np.array([110, 770, 1460, 3010, 5580, 7190, 9160, 10360, 11780, 13610, 16180], dtype=np.float64)
+
+
+def _profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    temperature = 18 - 0.0068 * HEIGHT[None, :].clip(max=11000) + rng.normal(0, 2, (n, len(PRESSURE)))
+    dewpoint = temperature - rng.uniform(0.5, 12, temperature.shape)
+    wind = rng.uniform(0, 35, temperature.shape)
+    return temperature, dewpoint, wind
+
+
+def test_dry_parcel_matches_scalar_analyzer():
+    pytest.importorskip("matplotlib")
+    pytest.importorskip("scipy")
+    from atmospheric_stability_analyzer import AtmosphericProfile, AtmosphericStabilityAnalyzer
+
+    temperature, dewpoint, wind = _profiles(40)
+    analyzer = AtmosphericStabilityAnalyzer()
+    batch = analyzer.calculate_stability_indices_batch(PRESSURE, temperature, dewpoint, HEIGHT, wind)
+    for i in range(len(temperature)):
+        profile = AtmosphericProfile(datetime(2026, 7, 1), 45.18, 141.24, PRESSURE, temperature[i],
+                                     dewpoint[i], wind[i], np.zeros(len(PRESSURE)), HEIGHT)
+        scalar = analyzer.calculate_stability_indices(profile)
+        for name, values in batch.items():
+            assert values[i] == pytest.approx(getattr(scalar, name), rel=1e-9, abs=1e-9), name
+
+
+def _integrate_pseudo_adiabat(theta_w_c, p_to, step=0.05):
+    """1000hPa, T=θw から p_to まで細かい刻みのオイラー法で積分"""
+    p, t = 1000.0, theta_w_c + sb.T0
+    n = int(round(abs(p_to - p) / step))
+    h = (p_to - p) / n
+    for _ in range(n):
+        t += h * sb._moist_lapse(p + h / 2, t + h / 2 * sb._moist_lapse(p, t))
+        p += h
+    return t
+
+
+@pytest.mark.parametrize("theta_w, p", [(20.0, 500.0), (8.5, 700.0), (-5.0, 300.0), (14.0, 1040.0)])
+def test_pseudo_adiabat_table_matches_direct_integration(theta_w, p):
+    table = sb.default_table()
+    index = (theta_w - table.tw_min) / table.dtw
+    assert float(table.temperature(p, index)) == pytest.approx(_integrate_pseudo_adiabat(theta_w, p), abs=0.05)
+    # 逆引き（(p, T) → θw）は往復で元に戻る
+    t = table.temperature(p, index)
+    assert float(table.theta_w_index(p, t)) == pytest.approx(index, abs=1e-3)
+
+
+def test_moist_parcel_profile():
+    temperature, dewpoint, _ = _profiles(6, seed=1)
+    p_lcl, _ = sb.lifting_condensation_level(temperature[:, 0], dewpoint[:, 0], 1000.0)
+    moist = sb.moist_parcel_temperature(temperature[:, 0], dewpoint[:, 0], np.full(6, 1000.0), PRESSURE)
+    dry = sb.dry_parcel_temperature(temperature[:, :1] + sb.T0, 1000.0, PRESSURE)
+    assert moist.shape == (6, len(PRESSURE))
+    below = PRESSURE[None, :] >= p_lcl[:, None]
+    np.testing.assert_allclose(moist[below], dry[below])
+    assert (moist[~below] > dry[~below]).all()
+    # 飽和した地上パーセルは最初から湿潤断熱
+    saturated = sb.moist_parcel_temperature(np.array([15.0]), np.array([15.0]), np.array([1000.0]), PRESSURE)
+    assert saturated[0, 0] == pytest.approx(15.0 + sb.T0, abs=0.05)
+
+    indices = sb.stability_indices(PRESSURE, temperature, dewpoint, HEIGHT, parcel="moist")
+    dry_indices = sb.stability_indices(PRESSURE, temperature, dewpoint, HEIGHT)
+    assert (indices["lifted_index"] < dry_indices["lifted_index"]).all()
+    assert (indices["cape"] >= dry_indices["cape"]).all()
+    with pytest.raises(ValueError):
+        sb.stability_indices(PRESSURE, temperature, dewpoint, HEIGHT, parcel="wet")
+
+
+def test_interpolation_and_missing_levels():
+    values = np.array([[10.0, 4.0, 0.0], [10.0, np.nan, 0.0]])
+    pressure = np.array([1000.0, 800.0, 600.0])
+    np.testing.assert_allclose(sb.interpolate_to_level(pressure, values, 900), [7.0, np.nan])
+    np.testing.assert_allclose(sb.interpolate_to_level(pressure, values, 600), [0.0, 0.0])
+    assert np.isnan(sb.interpolate_to_level(pressure, values, 500)).all()
+
+    temperature, dewpoint, _ = _profiles(2, seed=2)
+    temperature[1, 5] = np.nan
+    indices = sb.stability_indices(PRESSURE, temperature, dewpoint, HEIGHT)
+    assert np.isfinite(indices["cape"]).all() and np.isfinite(indices["ssi"]).all()
+    assert np.isnan(indices["vertical_p_velocity"]).all()  # 風速なし
+
+
+def test_emagram_stability_timeline(monkeypatch):
+    import start
+
+    levels = [1000, 975, 950, 925, 900, 850, 800, 700, 600, 500, 400, 300, 250, 200, 150, 100]
+    heights = np.interp(levels, PRESSURE[::-1], HEIGHT[::-1])
+    temperature, dewpoint, _ = _profiles(24, seed=3)
+    temperature = np.array([np.interp(levels, PRESSURE[::-1], row[::-1]) for row in temperature])
+    dewpoint = np.array([np.interp(levels, PRESSURE[::-1], row[::-1]) for row in dewpoint])
+    hourly = {"time": [f"2026-07-01T{h:02d}:00" for h in range(24)]}
+    for k, p in enumerate(levels):
+        hourly[f"temperature_{p}hPa"] = temperature[:, k].tolist()
+        hourly[f"dewpoint_{p}hPa"] = dewpoint[:, k].tolist()
+        hourly[f"geopotential_height_{p}hPa"] = [float(heights[k])] * 24
+    hourly["temperature_100hPa"][5] = None
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"hourly": hourly}
+
+    monkeypatch.setattr(start.limiter, "enabled", False)
+    monkeypatch.setattr(start, "get_elevation", lambda lat, lon: 50.0)
+    monkeypatch.setattr(start.requests, "get", lambda *args, **kwargs: FakeResponse())
+    client = start.app.test_client()
+
+    plain = client.get("/api/emagram?time=3").get_json()
+    assert "stability_timeline" not in plain and plain["data"]["temperature"][0] == temperature[3, 0]
+
+    body = client.get("/api/emagram?time=3&stability=true").get_json()
+    assert body["data"] == plain["data"]
+    timeline = body["stability_timeline"]
+    assert timeline["time"] == hourly["time"] and len(timeline["ssi"]) == 24
+    expected = sb.stability_indices(np.array(levels, dtype=float), temperature, dewpoint,
+                                    np.broadcast_to(heights, temperature.shape), parcel="moist")
+    np.testing.assert_allclose(timeline["cape"], expected["cape"], atol=0.006)
+    np.testing.assert_allclose(timeline["k_index"], expected["k_index"], atol=0.006)
+    assert "vertical_p_velocity" not in timeline
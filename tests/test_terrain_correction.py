@@ -0,0 +1,209 @@
+"""
+Unit tests for terrain_correction.py and start.apply_terrain_correction_to_grid():
+  - vectorized correction == the previous per-cell loop (values + clip stats)
+  - terrain grid (masks + elevation) built once per grid and cached
+  - batched, cached elevation resolution for grid cells
+
+Run from project root:
+    python -m pytest tests/test_terrain_correction.py -v
+"""
+import numpy as np
+import pytest
+
+import start  # noqa: E402  (see tests/test_field_cache.py for why at module level)
+from terrain_correction import build_terrain_grid, correct_grid
+
+
+def _grid(n=12):
+    lat = np.linspace(45.10, 45.26, n)
+    lon = np.linspace(141.14, 141.34, n)
+    return np.meshgrid(lat, lon, indexing="ij")
+
+
+def _elevation(lat, lon):
+    # 山頂付近で高く、海岸で0に近い決定論的な地形
+    return max(0.0, 1700 - 60000 * ((lat - 45.1821) ** 2 + (lon - 141.2421) ** 2) ** 0.5)
+
+
+def _reference_loop(grid_lat, grid_lon, grid_values, category, grid_temperature=None,
+                    grid_wind_direction=None, month=7, hour_jst=12):
+    """The per-cell implementation apply_terrain_correction_to_grid() used before
+    vectorization (elevation via _elevation instead of get_elevation)."""
+    corrected = grid_values.copy()
+    stats = dict.fromkeys(["clipped_high", "clipped_low", "wind_reduced_to_zero", "humidity_saturated",
+                           "onshore_wind_active", "forest_transpiration_active"], 0)
+    transp, shade = start.get_season_solar_factor(month, hour_jst)
+    for i in range(grid_lat.shape[0]):
+        for j in range(grid_lat.shape[1]):
+            lat, lon = grid_lat[i, j], grid_lon[i, j]
+            forest, coastal = start.is_forest_area(lat, lon), start.is_coastal_area(lat, lon)
+            elev = _elevation(lat, lon)
+            wd = grid_wind_direction[i, j] if grid_wind_direction is not None else None
+            if category == "wind":
+                orig, f = corrected[i, j], 1.0
+                if forest:
+                    f *= 0.4
+                if coastal and wd is not None:
+                    of = start.get_onshore_wind_factor(lat, lon, wd)
+                    if of > 0.1:
+                        f *= 1.0 + 0.25 * of
+                        stats["onshore_wind_active"] += 1
+                corrected[i, j] = max(0, orig * f)
+                if corrected[i, j] == 0 and orig > 0:
+                    stats["wind_reduced_to_zero"] += 1
+            elif category == "humidity":
+                rh = corrected[i, j]
+                if grid_temperature is None:
+                    if forest:
+                        corrected[i, j] = min(100, rh + 10.0)
+                    if coastal:
+                        corrected[i, j] = min(100, corrected[i, j] + 5.0)
+                    if elev > 10:
+                        corrected[i, j] = max(0, corrected[i, j] - (elev / 100) * 1.0)
+                else:
+                    T = grid_temperature[i, j]
+                    es = 6.112 * np.exp(17.67 * T / (T + 243.5))
+                    e = es * (rh / 100.0)
+                    if forest:
+                        e *= 1.0 + (0.10 * transp + 0.05 * shade)
+                        if transp > 0.3:
+                            stats["forest_transpiration_active"] += 1
+                    if coastal and wd is not None:
+                        of = start.get_onshore_wind_factor(lat, lon, wd)
+                        if of > 0.1:
+                            e *= 1.0 + 0.08 * of
+                            stats["onshore_wind_active"] += 1
+                    if elev > 10:
+                        e *= (1000 - elev / 9) / 1000
+                    corrected[i, j] = (e / es) * 100
+                if corrected[i, j] >= 100:
+                    stats["humidity_saturated"] += 1
+                if corrected[i, j] > 100:
+                    corrected[i, j] = 100
+                    stats["clipped_high"] += 1
+                if corrected[i, j] < 0:
+                    corrected[i, j] = 0
+                    stats["clipped_low"] += 1
+    return corrected, stats
+
+
+@pytest.fixture
+def terrain_grid(monkeypatch):
+    monkeypatch.setattr(start, "_terrain_grid_cache", {})
+    monkeypatch.setattr(start, "_grid_elevations",
+                        lambda lats, lons: np.array([_elevation(a, b) for a, b in zip(np.ravel(lats), np.ravel(lons))]))
+    return _grid()
+
+
+@pytest.mark.parametrize("category,with_temp,with_wind,month,hour", [
+    ("wind", False, False, 7, 12),
+    ("wind", False, True, 7, 12),
+    ("humidity", False, False, 7, 12),
+    ("humidity", True, False, 7, 12),
+    ("humidity", True, True, 7, 12),
+    ("humidity", True, True, 1, 22),
+])
+def test_vectorized_matches_reference_loop(terrain_grid, category, with_temp, with_wind, month, hour):
+    lat, lon = terrain_grid
+    rng = np.random.default_rng(0)
+    if category == "wind":
+        values = rng.uniform(-1, 12, lat.shape)
+    else:
+        values = rng.uniform(40, 100, lat.shape)
+    values[0, 0] = np.nan
+    temp = rng.uniform(-5, 25, lat.shape) if with_temp else None
+    wind_dir = rng.uniform(0, 360, lat.shape) if with_wind else None
+
+    got, got_stats = start.apply_terrain_correction_to_grid(lat, lon, values, category, temp, wind_dir, month, hour)
+    ref, ref_stats = _reference_loop(lat, lon, values, category, temp, wind_dir, month, hour)
+
+    np.testing.assert_allclose(got, ref, rtol=1e-12, equal_nan=True)
+    assert got_stats == ref_stats
+
+
+def test_humidity_clip_stats_counted(terrain_grid):
+    lat, lon = terrain_grid
+    values = np.full(lat.shape, 99.0)
+    onshore = start._get_terrain_grid(lat, lon).sea_direction  # 全セル真向きの onshore 風
+
+    _, simple = start.apply_terrain_correction_to_grid(lat, lon, values, "humidity")
+    got, physical = start.apply_terrain_correction_to_grid(lat, lon, values, "humidity",
+                                                           np.full(lat.shape, 10.0), onshore)
+
+    # 簡易補正は min(100, …) で頭打ち → 飽和のみ記録、クリップなし
+    assert simple["humidity_saturated"] > 0 and simple["clipped_high"] == 0
+    # 水蒸気圧補正は低地セルで100%超 → クリップして記録
+    assert physical["clipped_high"] > 0
+    assert physical["onshore_wind_active"] == lat.size
+    assert got.max() == 100.0
+
+
+def test_temperature_is_passthrough(terrain_grid):
+    lat, lon = terrain_grid
+    values = np.full(lat.shape, 12.5)
+    got, stats = start.apply_terrain_correction_to_grid(lat, lon, values, "temperature")
+
+    assert np.array_equal(got, values)
+    assert got is not values
+    assert set(stats.values()) == {0}
+
+
+def test_terrain_grid_built_once_per_grid(monkeypatch):
+    monkeypatch.setattr(start, "_terrain_grid_cache", {})
+    calls = []
+
+    def fake_elevations(lats, lons):
+        calls.append(np.size(lats))
+        return np.zeros(np.size(lats))
+
+    monkeypatch.setattr(start, "_grid_elevations", fake_elevations)
+    lat, lon = _grid(5)
+    for category in ("wind", "humidity", "temperature"):
+        start.apply_terrain_correction_to_grid(lat, lon, np.ones(lat.shape), category)
+    start.apply_terrain_correction_to_grid(*_grid(6), np.ones((6, 6)), "wind")
+
+    assert calls == [25, 36]
+
+
+def test_grid_elevations_batches_by_cache_cell(monkeypatch):
+    monkeypatch.setattr(start, "_elevation_cache", {})
+    monkeypatch.setattr(start, "_spot_geometry", None)
+    batches = []
+
+    def fake_fetch(lats, lons):
+        batches.append(len(lats))
+        return [float(round(a, 2) * 10) for a in lats]
+
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", fake_fetch)
+    lats = np.array([45.101, 45.102, 45.121, 45.131])
+    lons = np.array([141.201, 141.202, 141.201, 141.201])
+
+    first = start._grid_elevations(lats, lons)
+    second = start._grid_elevations(lats, lons)
+
+    assert batches == [3]  # 0.01°セル単位で1回だけ、2回目は全てキャッシュ
+    assert first[0] == first[1] == pytest.approx(451.0)
+    assert np.array_equal(first, second)
+
+
+def test_grid_elevations_offline_fallback(monkeypatch):
+    monkeypatch.setattr(start, "_elevation_cache", {})
+    monkeypatch.setattr(start, "_spot_geometry", None)
+    monkeypatch.setattr(start, "_dem_raster", None)  # 同梱ラスタの代替は test_dem_raster.py
+    monkeypatch.setattr(start, "fetch_elevations_open_meteo", lambda lats, lons: None)
+
+    got = start._grid_elevations([45.15], [141.30])
+
+    assert got[0] == pytest.approx(start._approximate_elevation_no_network(45.15, 141.30))
+
+
+def test_correct_grid_nan_semantics_follow_python_min_max():
+    lat, lon = _grid(2)
+    terrain = build_terrain_grid(lat, lon, np.zeros(lat.shape))
+    values = np.full(lat.shape, np.nan)
+
+    wind, _ = correct_grid(values, "wind", terrain)
+    hum, _ = correct_grid(values, "humidity", terrain)
+
+    assert (wind == 0).all()     # max(0, nan) → 0
+    assert (hum == 100).all()    # min(100, nan + 5) → 100
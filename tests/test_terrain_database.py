@@ -0,0 +1,87 @@
+"""
+Unit tests for RishiriTerrainDatabase nearest-point lookups (terrain_database.py):
+  - KD-tree lookup == the previous "ORDER BY squared distance LIMIT 1" query
+  - batch get_terrain_at_points()
+  - index rebuilt when terrain_points is rewritten
+
+Run from project root:
+    python -m pytest tests/test_terrain_database.py -v
+"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+from terrain_database import RishiriTerrainDatabase, TerrainPoint  # noqa: E402
+
+
+def _points(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        TerrainPoint(latitude=float(lat), longitude=float(lon), elevation=float(el),
+                     land_use="草地", distance_to_coast=1.0, slope=2.0, aspect=90.0, theta=float(th))
+        for lat, lon, el, th in zip(rng.uniform(45.05, 45.28, n), rng.uniform(141.13, 141.33, n),
+                                    rng.uniform(0, 1700, n), rng.uniform(0, 360, n))
+    ]
+
+
+@pytest.fixture
+def terrain_db(tmp_path):
+    db = RishiriTerrainDatabase(str(tmp_path / "terrain.db"))
+    db._save_terrain_points(_points())
+    return db
+
+
+def _sql_nearest(db_path, lat, lon):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("""
+        SELECT latitude, longitude, elevation,
+               (latitude - ?)*(latitude - ?) + (longitude - ?)*(longitude - ?) as distance
+        FROM terrain_points ORDER BY distance LIMIT 1
+    """, (lat, lat, lon, lon)).fetchone()
+    conn.close()
+    return row[:3]
+
+
+def test_kdtree_matches_sql_nearest(terrain_db):
+    rng = np.random.default_rng(1)
+    for lat, lon in zip(rng.uniform(45.0, 45.3, 50), rng.uniform(141.1, 141.4, 50)):
+        p = terrain_db.get_terrain_at_point(lat, lon)
+        assert (p.latitude, p.longitude, p.elevation) == _sql_nearest(terrain_db.db_path, lat, lon)
+        assert p.land_use == "草地"
+
+
+def test_batch_matches_single_lookups(terrain_db):
+    lats = [45.10, 45.20, 45.15]
+    lons = [141.20, 141.25, 141.30]
+
+    batch = terrain_db.get_terrain_at_points(lats, lons)
+
+    assert batch == [terrain_db.get_terrain_at_point(a, b) for a, b in zip(lats, lons)]
+
+
+def test_index_loaded_once(terrain_db):
+    terrain_db.get_terrain_at_point(45.1, 141.2)
+    tree = terrain_db._index["tree"]
+    terrain_db.get_terrain_at_points([45.1, 45.2], [141.2, 141.3])
+
+    assert terrain_db._index["tree"] is tree
+
+
+def test_index_rebuilt_after_save(terrain_db):
+    terrain_db.get_terrain_at_point(45.1, 141.2)
+    only = TerrainPoint(45.2, 141.2, 123.0, "森林（混交林）", 2.0, 5.0, 180.0, 10.0)
+    terrain_db._save_terrain_points([only])
+
+    p = terrain_db.get_terrain_at_point(45.1, 141.3)
+
+    assert p.elevation == 123.0
+    assert p.land_use == "森林（混交林）"
+
+
+def test_empty_database_returns_none(tmp_path):
+    db = RishiriTerrainDatabase(str(tmp_path / "empty.db"))
+
+    assert db.get_terrain_at_point(45.1, 141.2) is None
+    assert db.get_terrain_at_points([45.1, 45.2], [141.2, 141.2]) == [None, None]
@@ -0,0 +1,98 @@
+"""
+Unit tests for upstream_stubs.py (offline benchmark harness):
+  - RedisRestEmulator behind start._obs_redis_* / line_integration._upstash_*
+  - transport rerouting of open-meteo / JMA hosts, blocking of any other host
+  - FaultPlan error injection
+  - /api/forecast and the JMA nowcast served entirely by the stubs
+
+Run from project root:
+    python -m pytest tests/test_upstream_stubs.py -v
+"""
+import json
+
+import pytest
+import requests
+
+import line_integration
+import start
+from upstream_stubs import FaultPlan, OfflineUpstreams
+
+
+@pytest.fixture
+def upstreams():
+    with OfflineUpstreams() as stubs:
+        yield stubs
+
+
+def test_redis_emulator_via_app_helpers(upstreams):
+    assert start._obs_redis_set('obs:2026-07-15:A', {'temp': 21.5})
+    assert start._obs_redis_get('obs:2026-07-15:A') == {'temp': 21.5}
+    start._obs_redis_set('obs:2026-07-15:B', {'temp': 19.0})
+    start._obs_redis_set('nowcast:daily:2026-07-15', {})
+    assert sorted(start._obs_redis_scan_keys('obs:*')) == ['obs:2026-07-15:A', 'obs:2026-07-15:B']
+    assert 0 < upstreams.redis.execute('TTL', 'obs:2026-07-15:A') <= start._OBS_KEY_TTL
+
+    assert line_integration._upstash_set('line_k', {'a': 1}, ttl=60)
+    assert line_integration._upstash_get('line_k') == {'a': 1}
+    assert upstreams.redis.commands['SET'] >= 4
+
+
+def test_redis_set_options_and_pipeline(upstreams):
+    redis = upstreams.redis
+    assert redis.execute('SET', 'lock', '1', 'NX', 'EX', '30') == 'OK'
+    assert redis.execute('SET', 'lock', '2', 'NX') is None
+    assert redis.execute('SET', 'missing', '1', 'XX') is None
+    assert redis.execute('GET', 'lock') == '1'
+
+    url = upstreams.servers['upstash'].url
+    headers = {'Authorization': f'Bearer {redis.token}'}
+    resp = requests.post(f'{url}/pipeline', headers=headers,
+                         json=[['INCR', 'n'], ['INCR', 'n'], ['MGET', 'n', 'lock', 'none']])
+    assert [r['result'] for r in resp.json()] == [1, 2, ['2', '1', None]]
+    assert requests.get(f'{url}/get/lock').status_code == 401
+
+
+def test_rerouting_and_blocking(upstreams):
+    resp = requests.get('https://api.open-meteo.com/v1/forecast',
+                        params={'latitude': 45.2, 'longitude': 141.2, 'hourly': 'temperature_2m',
+                                'forecast_days': 2})
+    assert resp.status_code == 200
+    assert len(resp.json()['hourly']['temperature_2m']) == 48
+    assert upstreams.servers['open_meteo'].calls['/v1/forecast'] == 1
+
+    import urllib.request
+    with urllib.request.urlopen('https://www.jma.go.jp/bosai/amedas/data/latest_time.txt') as r:
+        assert r.read().decode().startswith('20')
+    assert upstreams.call_counts()['jma'] == 1
+
+    with pytest.raises(requests.ConnectionError):
+        requests.get('https://example.com/')
+
+
+def test_fault_injection():
+    plan = FaultPlan(error_rate=0.0)
+    plan.fail_next(2, status=429)
+    with OfflineUpstreams(faults={'open_meteo': plan}) as stubs:
+        url = 'https://api.open-meteo.com/v1/elevation?latitude=45.2&longitude=141.2'
+        assert [requests.get(url).status_code for _ in range(3)] == [429, 429, 200]
+        assert stubs.call_counts()['open_meteo'] == 3
+
+    with OfflineUpstreams(error_rate=1.0, error_status=503) as stubs:
+        assert requests.get('https://api.open-meteo.com/v1/elevation?latitude=45&longitude=141') \
+            .status_code == 503
+
+
+def test_forecast_and_nowcast_served_offline(upstreams, monkeypatch, tmp_path):
+    monkeypatch.setattr(start.limiter, 'enabled', False)
+    monkeypatch.setattr(start, 'FORECAST_HISTORY_DIR', str(tmp_path))
+    monkeypatch.setitem(start._NOWCAST_CACHE, 'data', None)
+    monkeypatch.setitem(start._NOWCAST_CACHE, 'fetched_at', None)
+
+    resp = start.app.test_client().get('/api/forecast?lat=45.2417&lon=141.2092&name=H_test')
+    assert resp.status_code == 200
+    assert json.loads(resp.data)
+    assert upstreams.call_counts()['open_meteo'] >= 1
+
+    nowcast = start._fetch_nowcast_precip_rishiri()
+    assert nowcast and nowcast['tiles_fetched'] >= 1 and nowcast['spots']
+    assert upstreams.call_counts()['jma'] >= 2
@@ -0,0 +1,125 @@
+"""
+Unit tests for warm_start.py and the cold-start path in start.py / wsgi.py:
+  - import start leaves pandas / scipy.optimize unimported (LazyModule)
+  - snapshot round trip; sections dropped when their source file changes
+  - start._save/_restore_warm_start_snapshot() restore the in-process caches
+  - FirstRequestHook fires once, after the first request or the fallback delay
+
+Run from project root:
+    python -m pytest tests/test_warm_start.py -v
+"""
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+import warm_start
+from warm_start import FirstRequestHook, LazyModule, load_snapshot, save_snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_start_defers_heavy_modules():
+    code = ("import sys, start; "
+            "print(sorted(m for m in ('pandas', 'scipy.optimize') if m in sys.modules)); "
+            "start.pd.DataFrame; print('pandas' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.split("\n")[:2] == ["[]", "True"]
+
+
+def test_lazy_module_loads_on_first_attribute():
+    module = LazyModule("json")
+    assert not module.loaded and "not loaded" in repr(module)
+    assert module.dumps({"a": 1}) == '{"a": 1}'
+    assert module.loaded
+    warm_start.preload([LazyModule("no_such_module_for_warm_start")])  # 失敗しても例外にしない
+
+
+def test_snapshot_round_trip_and_invalidation(tmp_path):
+    source = tmp_path / "spots.csv"
+    source.write_text("name,lat,lon\nA,45.1,141.2\n")
+    path = str(tmp_path / "snap.pkl")
+    assert save_snapshot(path, {"catalog": [1, 2], "elevation": {(45.1, 141.2): 12.0}},
+                         sources={"catalog": str(source)})
+    assert load_snapshot(path, sources={"catalog": str(source)}) == {
+        "catalog": [1, 2], "elevation": {(45.1, 141.2): 12.0}}
+
+    source.write_text("name,lat,lon\nA,45.1,141.2\nB,45.2,141.3\n")
+    assert load_snapshot(path, sources={"catalog": str(source)}) == {"elevation": {(45.1, 141.2): 12.0}}
+    assert load_snapshot(path, max_age=60, now=os.path.getmtime(path) + 3600) == {}
+    assert load_snapshot(str(tmp_path / "missing.pkl")) == {}
+
+    (tmp_path / "broken.pkl").write_bytes(b"not a pickle")
+    assert load_snapshot(str(tmp_path / "broken.pkl")) == {}
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".warm_start_")] == []
+
+
+def test_start_snapshot_restores_caches(tmp_path, monkeypatch):
+    import start
+
+    csv_path = tmp_path / "hoshiba_spots.csv"
+    csv_path.write_text("name,lat,lon,town,district,buraku\nH_1,45.10,141.20,利尻町,沓形,本町\n",
+                        encoding="utf-8")
+    monkeypatch.setattr(start, "CSV_FILE", str(csv_path))
+    for name, empty in (("_spot_catalog", {"path": None, "signature": None, "spots": []}),
+                        ("_elevation_cache", {}), ("_analysis_field_cache", {}),
+                        ("_AMEDAS_RT_CACHE", {"data": None, "fetched_at": None}),
+                        ("_NOWCAST_CACHE", {"data": None, "fetched_at": None})):
+        monkeypatch.setattr(start, name, dict(empty))
+
+    assert start._load_all_spots_for_field()[0]["name"] == "H_1"
+    now = datetime.now(start.JST)
+    start._elevation_cache[(45.1, 141.2)] = 35.0
+    start._analysis_field_cache["fresh"] = {"data": {"v": 1}, "expires": now + timedelta(hours=1)}
+    start._analysis_field_cache["expired"] = {"data": {"v": 0}, "expires": now - timedelta(minutes=1)}
+    start._NOWCAST_CACHE.update(data={"spots": {"H_1": 0.5}}, fetched_at=123.0)
+    snapshot = str(tmp_path / "snap.pkl")
+    assert start._save_warm_start_snapshot(snapshot)
+
+    # 新しいワーカー相当: キャッシュを空にして復元
+    start._spot_catalog.update(path=None, signature=None, spots=[])
+    start._elevation_cache.clear()
+    start._analysis_field_cache.clear()
+    start._NOWCAST_CACHE.update(data=None, fetched_at=None)
+    restored = start._restore_warm_start_snapshot(snapshot)
+
+    assert restored == ["spot_catalog", "elevation", "field_cache", "nowcast"]
+    assert start._spot_catalog["spots"][0]["lat"] == 45.10
+    assert start._elevation_cache == {(45.1, 141.2): 35.0}
+    assert list(start._analysis_field_cache) == ["fresh"]
+    assert start._NOWCAST_CACHE["fetched_at"] == 123.0
+
+    # CSVが変わったらカタログは捨てて再パースする
+    csv_path.write_text("name,lat,lon,town,district,buraku\nH_2,45.20,141.30,,,\n", encoding="utf-8")
+    assert [s["name"] for s in start._load_all_spots_for_field()] == ["H_2"]
+
+
+def test_first_request_hook_fires_once():
+    fired = []
+    done = threading.Event()
+
+    def callback():
+        fired.append(threading.current_thread().name)
+        done.set()
+
+    app = Flask(__name__)
+    app.add_url_rule("/", "index", lambda: "ok")
+    hook = FirstRequestHook(callback).init_app(app)
+    assert not hook.fired
+
+    client = app.test_client()
+    client.get("/")
+    client.get("/")
+    assert done.wait(2)
+    hook.thread.join(2)
+    assert fired == ["warm-start"]
+    assert hook.fire() is False
+
+
+def test_first_request_hook_fallback_without_traffic():
+    done = threading.Event()
+    hook = FirstRequestHook(done.set).init_app(Flask(__name__), fallback_after=0.05)
+    assert done.wait(2) and hook.fired
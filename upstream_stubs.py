@@ -0,0 +1,630 @@
+"""In-process stand-ins for every upstream the web app talks to.
+
+Used by scripts/benchmark_offline.py (and tests) to exercise /api/forecast,
+/api/analysis/field, notify_all and the nowcast job without network access:
+
+  - StubServer: a local ThreadingHTTPServer per upstream with per-path call
+    counts and FaultPlan latency / error injection
+  - OpenMeteoFixtures: replays recorded JSON from a fixture directory, or
+    synthesizes a deterministic response for any forecast / archive /
+    marine / elevation query (multi-location batches included)
+  - JmaFixtures: AMeDAS latest/map, nowcast target times, 4-bit hrpns tiles
+  - RedisRestEmulator: in-memory Upstash REST (path style, command body,
+    /pipeline; GET/SET[NX|XX|EX|PX]/MGET/DEL/EXISTS/EXPIRE/TTL/INCR/SCAN/KEYS)
+  - OfflineUpstreams: starts all of the above, points UPSTASH_* at the
+    emulator and reroutes open-meteo.com / jma.go.jp / api.line.me at the
+    transport layer (requests' HTTPAdapter.send and urllib's do_open), so
+    application code and monitoring.instrument_http() see the real URLs.
+    Any other outbound host raises instead of touching the network.
+"""
+from __future__ import annotations
+
+import fnmatch
+import http.client
+import json
+import math
+import os
+import random
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit, urlunsplit
+
+import requests
+
+JST = timezone(timedelta(hours=9))
+SUMMIT_LAT, SUMMIT_LON = 45.1794, 141.2425
+
+Response = Tuple[int, Dict[str, str], bytes]
+
+
+def _json(payload, status=200) -> Response:
+    return status, {"Content-Type": "application/json"}, json.dumps(payload, ensure_ascii=False).encode()
+
+
+# ---------------------------------------------------------------------------
+# Stub server + fault injection
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FaultPlan:
+    """応答遅延と障害注入（seed 固定で再現可能）"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 0
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._scripted = []  # fail_next() で積んだステータス
+
+    def fail_next(self, count: int = 1, status: int = 503) -> None:
+        with self._lock:
+            self._scripted.extend([status] * count)
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """(遅延秒, 注入するステータス or None)"""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            if self._scripted:
+                return delay, self._scripted.pop(0)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return delay, self.error_status
+            return delay, None
+
+
+class StubServer:
+    """app(method, path, query, headers, body) -> (status, headers, body) を返すローカル HTTP サーバー"""
+
+    def __init__(self, name: str, app: Callable[..., Response], faults: Optional[FaultPlan] = None):
+        self.name = name
+        self.app = app
+        self.faults = faults or FaultPlan()
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, payload = stub.dispatch(self.command, parts.path, parse_qs(parts.query),
+                                                         self.headers, body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_DELETE = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def dispatch(self, method, path, query, headers, body) -> Response:
+        with self._lock:
+            self.calls[path] += 1
+        delay, injected = self.faults.draw()
+        if delay:
+            time.sleep(delay)
+        if injected is not None:
+            extra = {"Retry-After": "60"} if injected == 429 else {}
+            return injected, {"Content-Type": "text/plain", **extra}, b"injected failure"
+        try:
+            return self.app(method, path, query, headers, body)
+        except Exception as exc:  # スタブ自体の不具合は 500 で返す
+            return 500, {"Content-Type": "text/plain"}, f"stub error: {exc}".encode()
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name=f"stub-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# Open-Meteo
+# ---------------------------------------------------------------------------
+
+def _floats(query, name):
+    raw = (query.get(name) or [""])[0]
+    return [float(v) for v in raw.split(",") if v.strip()]
+
+
+def _seed_offset(*parts) -> float:
+    """(地点, 変数) ごとに決まる 0-1 のずれ"""
+    return (zlib.crc32("|".join(str(p) for p in parts).encode()) % 1000) / 1000
+
+
+def synth_hourly_value(var: str, hour: int, day: int, offset: float) -> Optional[float]:
+    """変数名から妥当な値を作る（日変化つき、地点ごとに少しずらす）"""
+    diurnal = math.sin((hour - 9) / 24 * 2 * math.pi)
+    daylight = max(0.0, math.sin(math.pi * (hour - 4) / 15)) if 4 <= hour <= 19 else 0.0
+    level_drop = 15.0 if "700hPa" in var else 8.0 if "850hPa" in var else 0.0
+    if "precipitation_probability" in var:
+        return round(10 + 30 * offset + 10 * (day % 3), 0)
+    if "precipitation" in var or "rain" in var or "showers" in var:
+        return 0.4 if (hour + day) % 11 == 0 and offset > 0.5 else 0.0
+    if "dewpoint" in var or "dew_point" in var:
+        return round(12 + 2 * offset - level_drop, 1)
+    if "sea_surface_temperature" in var:
+        return round(17 + offset, 1)
+    if "temperature" in var:
+        return round(18 + 5 * diurnal + 2 * offset - level_drop - 0.3 * day, 1)
+    if "humidity" in var:
+        return round(min(100, 75 - 15 * diurnal + 5 * offset), 0)
+    if "direction" in var:
+        return round((240 + 30 * diurnal + 40 * offset + 15 * day) % 360, 0)
+    if "wind" in var:
+        return round(12 + 5 * daylight + 4 * offset, 1)
+    if "cloud" in var:
+        return round(30 + 40 * offset, 0)
+    if "radiation" in var or "sunshine" in var:
+        return round(750 * daylight * (1 - 0.3 * offset), 1)
+    if "pressure" in var:
+        return round((1008.0 if "surface" in var else 1013.0) - 2 * offset, 1)
+    if "cape" in var:
+        return round(80 * offset, 0)
+    if "visibility" in var:
+        return 20000.0
+    if "boundary_layer" in var or "height" in var or "geopotential" in var:
+        return round(800 + 400 * daylight, 0)
+    if "weather_code" in var or "weathercode" in var:
+        return 1.0
+    return 1.0
+
+
+_DAILY_SUFFIXES = {"_max": max, "_min": min, "_mean": lambda v: sum(v) / len(v), "_sum": sum,
+                   "_dominant": lambda v: sum(v) / len(v)}
+
+
+class OpenMeteoFixtures:
+    """
+    Open-Meteo 各 API の応答。fixture_dir/<host>/<path の / を _ に>.json があれば
+    それをそのまま返し（実録応答の再生）、無ければクエリから合成する。
+    """
+
+    def __init__(self, fixture_dir: Optional[Path] = None, today: Optional[datetime] = None):
+        self.fixture_dir = Path(fixture_dir) if fixture_dir else None
+        self.today = today
+
+    def __call__(self, method, path, query, headers, body) -> Response:
+        host = headers.get("X-Stub-Host", "api.open-meteo.com")
+        recorded = self._recorded(host, path)
+        if recorded is not None:
+            return 200, {"Content-Type": "application/json"}, recorded
+        lats, lons = _floats(query, "latitude"), _floats(query, "longitude")
+        if path.endswith("/elevation"):
+            return _json({"elevation": [self.elevation(la, lo) for la, lo in zip(lats, lons)]})
+        if not lats or len(lats) != len(lons):
+            return _json({"error": True, "reason": "latitude/longitude mismatch"}, 400)
+        locations = [self.location(la, lo, query) for la, lo in zip(lats, lons)]
+        return _json(locations[0] if len(locations) == 1 else locations)
+
+    def _recorded(self, host, path) -> Optional[bytes]:
+        if not self.fixture_dir:
+            return None
+        candidate = self.fixture_dir / host / (path.strip("/").replace("/", "_") + ".json")
+        return candidate.read_bytes() if candidate.is_file() else None
+
+    @staticmethod
+    def elevation(lat, lon) -> float:
+        distance_km = math.hypot((lat - SUMMIT_LAT) * 111, (lon - SUMMIT_LON) * 78.5)
+        return round(max(0.0, 1721 - distance_km * 260), 1)
+
+    def _dates(self, query):
+        if "start_date" in query:
+            start = datetime.strptime(query["start_date"][0], "%Y-%m-%d")
+            end = datetime.strptime(query.get("end_date", query["start_date"])[0], "%Y-%m-%d")
+            return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        today = (self.today or datetime.now(JST)).replace(hour=0, minute=0, second=0, microsecond=0,
+                                                          tzinfo=None)
+        past = int((query.get("past_days") or ["0"])[0])
+        days = int((query.get("forecast_days") or ["7"])[0])
+        return [today + timedelta(days=i) for i in range(-past, days)]
+
+    def location(self, lat, lon, query) -> dict:
+        dates = self._dates(query)
+        hourly_vars = [v for v in (query.get("hourly") or [""])[0].split(",") if v]
+        daily_vars = [v for v in (query.get("daily") or [""])[0].split(",") if v]
+        ms = (query.get("wind_speed_unit") or query.get("windspeed_unit") or [""])[0] == "ms"
+
+        def series(var):
+            offset = _seed_offset(round(lat, 4), round(lon, 4), var)
+            values = [synth_hourly_value(var, h, d, offset) for d in range(len(dates)) for h in range(24)]
+            if ms and "wind" in var and "direction" not in var:
+                values = [round(v / 3.6, 2) for v in values]
+            return values
+
+        result = {
+            "latitude": lat, "longitude": lon, "elevation": self.elevation(lat, lon),
+            "timezone": (query.get("timezone") or ["GMT"])[0], "utc_offset_seconds": 32400,
+        }
+        if hourly_vars:
+            result["hourly"] = {"time": [f"{d:%Y-%m-%d}T{h:02d}:00" for d in dates for h in range(24)]}
+            result["hourly"].update({var: series(var) for var in hourly_vars})
+        if daily_vars:
+            daily = {"time": [f"{d:%Y-%m-%d}" for d in dates]}
+            for var in daily_vars:
+                if var in ("sunrise", "sunset"):
+                    daily[var] = [f"{d:%Y-%m-%d}T{'04:10' if var == 'sunrise' else '18:50'}" for d in dates]
+                    continue
+                base, reduce = var, (lambda v: sum(v) / len(v))
+                for suffix, fn in _DAILY_SUFFIXES.items():
+                    if var.endswith(suffix):
+                        base, reduce = var[:-len(suffix)], fn
+                        break
+                hourly = series(base)
+                daily[var] = [round(reduce(hourly[i * 24:(i + 1) * 24]), 2) for i in range(len(dates))]
+            result["daily"] = daily
+        return result
+
+
+# ---------------------------------------------------------------------------
+# JMA
+# ---------------------------------------------------------------------------
+
+def hrpns_tile_png(rain_index: int = 3, band: Tuple[int, int] = (96, 160), seed: int = 0) -> bytes:
+    """4-bit パレット PNG（JMA hrpns と同じ形式）。band の行に rain_index の降水域を散らす"""
+    rng = random.Random(seed)
+    width = height = 256
+    rows = []
+    for y in range(height):
+        indices = [rain_index if band[0] <= y < band[1] and rng.random() < 0.6 else 0 for _ in range(width)]
+        packed = bytes((indices[i] << 4) | indices[i + 1] for i in range(0, width, 2))
+        rows.append(b"\x00" + packed)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    palette = [(0, 0, 0), (0, 0, 0), (242, 242, 255), (160, 210, 255), (33, 140, 255), (0, 65, 255),
+               (250, 245, 0), (255, 153, 0), (255, 40, 0), (180, 0, 104)]
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 4, 3, 0, 0, 0))
+            + chunk(b"PLTE", b"".join(bytes(c) for c in palette))
+            + chunk(b"tRNS", bytes([0, 0] + [255] * (len(palette) - 2)))
+            + chunk(b"IDAT", zlib.compress(b"".join(rows)))
+            + chunk(b"IEND", b""))
+
+
+class JmaFixtures:
+    """www.jma.go.jp の AMeDAS・ナウキャスト・警報 JSON"""
+
+    STATIONS = ("11151", "11091")
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now
+        self._tile = hrpns_tile_png()
+
+    def _latest(self) -> datetime:
+        now = (self.now or datetime.now(JST)).astimezone(JST)
+        return now.replace(minute=now.minute - now.minute % 10, second=0, microsecond=0)
+
+    def __call__(self, method, path, query, headers, body) -> Response:
+        latest = self._latest()
+        if path.endswith("/amedas/data/latest_time.txt"):
+            return 200, {"Content-Type": "text/plain"}, latest.isoformat().encode()
+        if "/amedas/data/map/" in path:
+            return _json({code: {
+                "temp": [18.2 + i, 0], "humidity": [78 - 5 * i, 0], "wind": [4.1 + i, 0],
+                "windDirection": [12, 0], "precipitation1h": [0.0, 0], "sun1h": [0.6, 0],
+                "pressure": [1012.4, 0],
+            } for i, code in enumerate(self.STATIONS)})
+        if path.endswith("/targetTimes_N1.json"):
+            basetime = latest.astimezone(timezone.utc).strftime("%Y%m%d%H%M%S")
+            return _json([{"basetime": basetime, "validtime": basetime, "elements": ["hrpns"]}])
+        if "/hrpns/" in path and path.endswith(".png"):
+            return 200, {"Content-Type": "image/png"}, self._tile
+        if "/warning/data/warning/" in path:
+            return _json({"reportDatetime": latest.isoformat(), "areaTypes": []})
+        return _json({"error": "not recorded"}, 404)
+
+
+def line_api(method, path, query, headers, body) -> Response:
+    """api.line.me / api-data.line.me（push・rich menu などは常に成功）"""
+    if path.endswith("/richmenu"):
+        return _json({"richMenuId": "richmenu-stub"})
+    return _json({})
+
+
+# ---------------------------------------------------------------------------
+# Upstash Redis REST emulator
+# ---------------------------------------------------------------------------
+
+class RedisRestEmulator:
+    """Upstash REST API の in-memory 実装（値はすべて文字列として保持）"""
+
+    def __init__(self, token: str = "stub-token", clock: Callable[[], float] = time.time):
+        self.token = token
+        self.clock = clock
+        self.data: Dict[str, str] = {}
+        self.expiry: Dict[str, float] = {}
+        self.commands = Counter()
+        self._lock = threading.Lock()
+
+    # -- HTTP ---------------------------------------------------------------
+    def __call__(self, method, path, query, headers, body) -> Response:
+        if headers.get("Authorization") != f"Bearer {self.token}":
+            return _json({"error": "Unauthorized"}, 401)
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        try:
+            if parts in (["pipeline"], ["multi-exec"]):
+                return _json([self._reply(cmd) for cmd in json.loads(body or b"[]")])
+            if not parts:
+                return _json(self._reply(json.loads(body or b"[]")))
+            command = parts
+            if method == "POST" and body and command[0].upper() in ("SET", "SETEX", "APPEND"):
+                command = command + [body.decode()]
+            for name in ("match", "count"):
+                if name in query:
+                    command = command + [name.upper(), query[name][0]]
+            reply = self._reply(command)
+            return _json(reply, 400 if "error" in reply else 200)
+        except (ValueError, TypeError) as exc:
+            return _json({"error": f"ERR {exc}"}, 400)
+
+    def _reply(self, command) -> dict:
+        try:
+            return {"result": self.execute(*command)}
+        except (ValueError, KeyError, IndexError) as exc:
+            return {"error": f"ERR {exc}"}
+
+    # -- commands -----------------------------------------------------------
+    def _alive(self, key) -> bool:
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    def execute(self, name, *args):
+        name = str(name).upper()
+        args = [a if isinstance(a, str) else json.dumps(a) if isinstance(a, (dict, list)) else str(a)
+                for a in args]
+        with self._lock:
+            self.commands[name] += 1
+            handler = getattr(self, f"_cmd_{name.lower()}", None)
+            if handler is None:
+                raise ValueError(f"unknown command '{name}'")
+            return handler(*args)
+
+    def _cmd_get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def _cmd_set(self, key, value, *options):
+        opts = [o.upper() for o in options]
+        exists = self._alive(key)
+        if ("NX" in opts and exists) or ("XX" in opts and not exists):
+            return None
+        ttl = None
+        for flag, scale in (("EX", 1.0), ("PX", 0.001)):
+            if flag in opts:
+                ttl = float(options[opts.index(flag) + 1]) * scale
+        self.data[key] = value
+        if ttl is not None:
+            self.expiry[key] = self.clock() + ttl
+        elif "KEEPTTL" not in opts:
+            self.expiry.pop(key, None)
+        return "OK"
+
+    def _cmd_setex(self, key, seconds, value):
+        return self._cmd_set(key, value, "EX", seconds)
+
+    def _cmd_mget(self, *keys):
+        return [self._cmd_get(k) for k in keys]
+
+    def _cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expiry.pop(key, None)
+                removed += 1
+        return removed
+
+    def _cmd_exists(self, *keys):
+        return sum(self._alive(k) for k in keys)
+
+    def _cmd_expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expiry[key] = self.clock() + float(seconds)
+        return 1
+
+    def _cmd_ttl(self, key):
+        if not self._alive(key):
+            return -2
+        deadline = self.expiry.get(key)
+        return -1 if deadline is None else int(math.ceil(deadline - self.clock()))
+
+    def _cmd_incr(self, key):
+        return self._cmd_incrby(key, 1)
+
+    def _cmd_incrby(self, key, amount):
+        value = int(self._cmd_get(key) or 0) + int(amount)
+        self.data[key] = str(value)
+        return value
+
+    def _cmd_keys(self, pattern):
+        return sorted(k for k in list(self.data) if self._alive(k) and fnmatch.fnmatchcase(k, pattern))
+
+    def _cmd_scan(self, cursor, *options):
+        opts = [o.upper() for o in options]
+        pattern = options[opts.index("MATCH") + 1] if "MATCH" in opts else "*"
+        count = int(options[opts.index("COUNT") + 1]) if "COUNT" in opts else 10
+        keys = sorted(k for k in list(self.data) if self._alive(k))
+        start = int(cursor)
+        page = keys[start:start + count]
+        next_cursor = start + count if start + count < len(keys) else 0
+        return [str(next_cursor), [k for k in page if fnmatch.fnmatchcase(k, pattern)]]
+
+    def _cmd_ping(self):
+        return "PONG"
+
+    def _cmd_flushall(self):
+        self.data.clear()
+        self.expiry.clear()
+        return "OK"
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.commands.clear()
+
+
+# ---------------------------------------------------------------------------
+# Routing
+# ---------------------------------------------------------------------------
+
+class OfflineUpstreams:
+    """
+    使い方:
+        with OfflineUpstreams(latency_ms=30) as upstreams:
+            ... アプリのコードを呼ぶ ...
+            upstreams.call_counts()  # {'open_meteo': 12, 'jma': 3, 'upstash': 40, 'line': 5}
+    """
+
+    HOSTS = {
+        "open-meteo.com": "open_meteo",
+        "jma.go.jp": "jma",
+        "line.me": "line",
+    }
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, faults: Optional[Dict[str, FaultPlan]] = None,
+                 fixture_dir: Optional[Path] = None, seed: int = 0, strict: bool = True):
+        def plan(name, index):
+            if faults and name in faults:
+                return faults[name]
+            return FaultPlan(latency_ms, jitter_ms, error_rate, error_status, seed + index)
+
+        self.redis = RedisRestEmulator()
+        self.open_meteo_fixtures = OpenMeteoFixtures(fixture_dir)
+        self.jma_fixtures = JmaFixtures()
+        self.servers = {
+            "open_meteo": StubServer("open_meteo", self.open_meteo_fixtures, plan("open_meteo", 0)),
+            "jma": StubServer("jma", self.jma_fixtures, plan("jma", 1)),
+            "upstash": StubServer("upstash", self.redis, plan("upstash", 2)),
+            "line": StubServer("line", line_api, plan("line", 3)),
+        }
+        self.strict = strict
+        self._saved_env = {}
+        self._originals = {}
+
+    # -- lifecycle ------------------------------------------------------------
+    def __enter__(self):
+        for server in self.servers.values():
+            server.start()
+        for key, value in (("UPSTASH_REDIS_REST_URL", self.servers["upstash"].url),
+                           ("UPSTASH_REDIS_REST_TOKEN", self.redis.token)):
+            self._saved_env[key] = os.environ.get(key)
+            os.environ[key] = value
+        self._patch()
+        return self
+
+    def __exit__(self, *exc):
+        self._unpatch()
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        for server in self.servers.values():
+            server.stop()
+
+    # -- reporting ------------------------------------------------------------
+    def call_counts(self) -> Dict[str, int]:
+        return {name: server.total_calls() for name, server in self.servers.items()}
+
+    def reset_counts(self) -> None:
+        for server in self.servers.values():
+            server.reset_counts()
+        self.redis.reset_counts()
+
+    # -- transport patches ----------------------------------------------------
+    def route(self, url: str) -> Optional[Tuple[str, str]]:
+        """元 URL → (スタブの URL, 元ホスト)。スタブ宛て以外は None"""
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        for suffix, name in self.HOSTS.items():
+            if host == suffix or host.endswith("." + suffix):
+                stub = urlsplit(self.servers[name].url)
+                return urlunsplit(("http", stub.netloc, parts.path, parts.query, "")), host
+        return None
+
+    def _blocked(self, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        return self.strict and host not in ("127.0.0.1", "localhost")
+
+    def _patch(self):
+        original_send = requests.adapters.HTTPAdapter.send
+        original_do_open = urllib.request.AbstractHTTPHandler.do_open
+        self._originals = {"send": original_send, "do_open": original_do_open}
+        upstreams = self
+
+        def send(adapter, request, **kwargs):
+            routed = upstreams.route(request.url)
+            if routed:
+                request.url, request.headers["X-Stub-Host"] = routed
+            elif upstreams._blocked(request.url):
+                raise requests.ConnectionError(f"offline: blocked request to {request.url}")
+            return original_send(adapter, request, **kwargs)
+
+        def do_open(handler, http_class, req, **kwargs):
+            routed = upstreams.route(req.full_url)
+            if routed:
+                req.full_url, host = routed
+                req.add_unredirected_header("X-Stub-Host", host)
+                http_class = http.client.HTTPConnection
+                kwargs.pop("context", None)
+                kwargs.pop("check_hostname", None)
+            elif upstreams._blocked(req.full_url):
+                raise urllib.error.URLError(f"offline: blocked request to {req.full_url}")
+            return original_do_open(handler, http_class, req, **kwargs)
+
+        requests.adapters.HTTPAdapter.send = send
+        urllib.request.AbstractHTTPHandler.do_open = do_open
+
+    def _unpatch(self):
+        if self._originals:
+            requests.adapters.HTTPAdapter.send = self._originals["send"]
+            urllib.request.AbstractHTTPHandler.do_open = self._originals["do_open"]
+            self._originals = {}
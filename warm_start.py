@@ -0,0 +1,199 @@
+"""Cold-start helpers for the gunicorn worker (wsgi.py).
+
+On a free-tier host that sleeps when idle, every wake-up pays the full import
+and cache-fill cost before the first request is served. Three pieces:
+
+  - LazyModule: a module stand-in that imports on first attribute access.
+    start.py binds ``pd`` to one, so pandas loads on the first route that
+    actually reads a CSV instead of at worker boot.
+  - save_snapshot() / load_snapshot(): last-known in-process state (spot
+    catalog, elevation cache, field / AMeDAS / nowcast caches) pickled to a
+    local file at shutdown and periodically, and restored before the first
+    request. Each section is tied to the signature (mtime, size) of the file
+    it was derived from and is dropped when that file has changed.
+  - FirstRequestHook: runs a callback once, on a separate thread, after the
+    first request has been handled (or after a fallback delay with no
+    traffic), so background threads and deferred imports don't compete
+    with it.
+
+``python scripts/benchmark_import_time.py`` tracks ``python -X importtime``
+for ``import start``.
+
+Standard library only: importing pandas here would undo what LazyModule
+defers for start.py.
+"""
+from __future__ import annotations
+
+import importlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_FILE = "warm_start_snapshot.pkl"
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # 1週間以上前のスナップショットは使わない
+
+
+class LazyModule:
+    """
+    初回の属性アクセスで import するモジュール代理。
+
+        pd = LazyModule("pandas")
+        pd.read_csv(...)   # ここで初めて pandas を import
+
+    すでに sys.modules にあれば import は即座に終わる。
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def preload(modules: Iterable[LazyModule]) -> None:
+    """遅延モジュールをまとめて読み込む（初回リクエスト後のバックグラウンド用）"""
+    for module in modules:
+        try:
+            module.load()
+        except Exception as e:
+            print(f"[warm-start] preload {module!r} failed: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+def file_signature(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size)。ファイルがなければ None"""
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def save_snapshot(path: str, sections: Dict[str, object],
+                  sources: Optional[Dict[str, str]] = None) -> bool:
+    """
+    sections をアトミックに書き出す。sources は section 名 → 元ファイルのパスで、
+    読み込み時にそのファイルが変わっていれば該当 section だけ捨てる。
+    """
+    sources = sources or {}
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "sections": sections,
+        "signatures": {name: file_signature(src) for name, src in sources.items()},
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=".warm_start_", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return True
+    except Exception as e:
+        print(f"[warm-start] failed to save {path}: {e}")
+        if tmp and os.path.exists(tmp):
+            os.unlink(tmp)
+        return False
+
+
+def load_snapshot(path: str, sources: Optional[Dict[str, str]] = None,
+                  max_age: float = DEFAULT_MAX_AGE, now: Optional[float] = None) -> Dict[str, object]:
+    """
+    保存済み sections を返す。ファイルがない・壊れている・古すぎる・バージョン違いなら {}。
+    元ファイルの署名が保存時と違う section は含めない。
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"[warm-start] ignoring unreadable snapshot {path}: {e}")
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        return {}
+    now = time.time() if now is None else now
+    if now - payload.get("saved_at", 0) > max_age:
+        return {}
+
+    sources = sources or {}
+    saved_signatures = payload.get("signatures", {})
+    sections = {}
+    for name, value in payload.get("sections", {}).items():
+        if name in sources and saved_signatures.get(name) != file_signature(sources[name]):
+            continue
+        sections[name] = value
+    return sections
+
+
+# ---------------------------------------------------------------------------
+# First-request hook
+# ---------------------------------------------------------------------------
+
+class FirstRequestHook:
+    """
+    最初のリクエストの処理が終わった時点で callback を別スレッドで1回だけ実行する。
+    Flask の teardown_request に登録して使う（wsgi.py）。
+    """
+
+    def __init__(self, callback: Callable[[], None]):
+        self.callback = callback
+        self._fired = False
+        self._lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def fired(self) -> bool:
+        return self._fired
+
+    def fire(self) -> bool:
+        with self._lock:
+            if self._fired:
+                return False
+            self._fired = True
+        self.thread = threading.Thread(target=self.callback, name="warm-start", daemon=True)
+        self.thread.start()
+        return True
+
+    def init_app(self, app, fallback_after: Optional[float] = None) -> "FirstRequestHook":
+        """
+        fallback_after 秒たってもリクエストが来なければその時点で実行する
+        （常時起動のホストでスケジューラが動かないままにならないように）。
+        """
+        @app.teardown_request
+        def _warm_start_after_first_request(exc=None):
+            if not self._fired:
+                self.fire()
+
+        if fallback_after is not None:
+            timer = threading.Timer(fallback_after, self.fire)
+            timer.daemon = True
+            timer.start()
+        return self
@@ -6,13 +6,32 @@ should run per-process (e.g. nightly amedas collection) are started here
 rather than at start.py module level, so that:
   - Tests that import start.py don't accidentally start threads
   - The thread is always started when the web process runs
+
+Cold start (warm_start.py): the last-known caches are restored from the local
+snapshot before the first request, and the background threads plus the
+deferred pandas import run only after the first request has been served
+(or after 60 s without traffic).  BACKGROUND_THREADS_START=immediate restores
+the old behaviour of starting the threads at import.
 """
+import atexit
 import os
-from start import app, _start_background_threads
+from start import (
+    app,
+    _restore_warm_start_snapshot,
+    _save_warm_start_snapshot,
+    _start_background_threads,
+    _start_background_threads_after_first_request,
+)
+
+_restore_warm_start_snapshot()
+atexit.register(_save_warm_start_snapshot)
 
 # Start nightly amedas collection thread.  Daemon=True so it never blocks
 # gunicorn worker shutdown.
-_start_background_threads()
+if os.environ.get("BACKGROUND_THREADS_START", "").strip().lower() == "immediate":
+    _start_background_threads()
+else:
+    _start_background_threads_after_first_request()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))